@@ -0,0 +1,271 @@
+"""
+Archivo histórico: los años cerrados de ventas y detalle_ventas pasan a
+archive_AAAA.db, junto a la base de datos principal.
+
+La caja solo necesita los meses recientes; con el historial fuera, la base de
+datos principal (y cada backup, arranque y verificación) queda chica. Los
+resúmenes (ventas_diarias, productos_diarios, productos_semanales) no se
+archivan: siguen completos en la base de datos principal.
+
+Mover: por lotes de VENTAS_POR_LOTE, cada lote en una sola transacción que
+abarca las dos bases de datos (INSERT en el archivo + DELETE en la principal),
+así una interrupción nunca deja ventas duplicadas ni perdidas. Las ventas de
+un turno todavía abierto no se mueven.
+
+Leer: conectar_historico() abre la base de datos en solo lectura, adjunta
+(ATTACH, mode=ro) solo los archivos de los años del rango y crea vistas TEMP
+ventas y detalle_ventas (UNION ALL) que tapan a las tablas reales: los
+reportes no cambian su SQL, y SQLite empuja el WHERE de fechas a cada parte.
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+from urllib.request import pathname2url
+
+from utils.db import conectar_solo_lectura
+
+PREFIJO_ARCHIVO = "archive_"
+PATRON_ARCHIVO = re.compile(r"^archive_(\d{4})\.db$")
+TABLAS_ARCHIVADAS = ("ventas", "detalle_ventas")
+VENTAS_POR_LOTE = 2000
+ANIOS_EN_VIVO = 1            # el año actual nunca se archiva; 2 = también el anterior
+MAX_ADJUNTOS = 10            # SQLITE_MAX_ATTACHED por defecto
+
+
+def ruta_archivo(db_path, anio):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), f"{PREFIJO_ARCHIVO}{anio}.db")
+
+
+def listar_archivos(db_path):
+    """{año: ruta} de los archive_AAAA.db junto a la base de datos"""
+    carpeta = os.path.dirname(os.path.abspath(db_path))
+    archivos = {}
+    for nombre in sorted(os.listdir(carpeta)) if os.path.isdir(carpeta) else []:
+        coincidencia = PATRON_ARCHIVO.match(nombre)
+        if coincidencia:
+            archivos[int(coincidencia.group(1))] = os.path.join(carpeta, nombre)
+    return archivos
+
+
+def anios_del_rango(archivos, fecha_desde=None, fecha_hasta=None):
+    """Años archivados que tocan el rango ('AAAA-MM-DD...' o None = sin límite)"""
+    desde = int(str(fecha_desde)[:4]) if fecha_desde else None
+    hasta = int(str(fecha_hasta)[:4]) if fecha_hasta else None
+    return [anio for anio in sorted(archivos)
+            if (desde is None or anio >= desde) and (hasta is None or anio <= hasta)]
+
+
+def hay_archivos_en_rango(db_path, fecha_desde=None, fecha_hasta=None):
+    return bool(anios_del_rango(listar_archivos(db_path), fecha_desde, fecha_hasta))
+
+
+def adjuntar_archivos(conn, db_path, fecha_desde=None, fecha_hasta=None, solo_lectura=True):
+    """ATTACH de los archivos del rango; retorna los alias ('archivo_AAAA') adjuntados.
+
+    solo_lectura usa una URI mode=ro: la conexión debe haberse abierto con uri=True.
+    """
+    archivos = listar_archivos(db_path)
+    anios = anios_del_rango(archivos, fecha_desde, fecha_hasta)
+    if len(anios) > MAX_ADJUNTOS:
+        raise sqlite3.OperationalError(
+            f"El rango abarca {len(anios)} años archivados; el máximo por consulta es {MAX_ADJUNTOS}")
+    adjuntos = {fila[1] for fila in conn.execute("PRAGMA database_list")}
+    alias = []
+    for anio in anios:
+        nombre = f"archivo_{anio}"
+        if nombre not in adjuntos:
+            destino = archivos[anio]
+            if solo_lectura:
+                destino = f"file:{pathname2url(os.path.abspath(destino))}?mode=ro"
+            conn.execute("ATTACH DATABASE ? AS " + nombre, (destino,))
+        alias.append(nombre)
+    return alias
+
+
+def desadjuntar_archivos(conn, alias):
+    for nombre in alias:
+        conn.execute(f"DETACH DATABASE {nombre}")
+
+
+def _columnas(conn, tabla, esquema="main"):
+    return [fila[1] for fila in conn.execute(f"PRAGMA {esquema}.table_info({tabla})")]
+
+
+def crear_vistas_historicas(conn, alias):
+    """Vistas TEMP ventas / detalle_ventas = tabla principal UNION ALL cada archivo.
+
+    Las vistas TEMP se buscan antes que main, así el SQL existente las usa sin cambios.
+    Solo para conexiones de lectura: la caja no puede insertar en una vista.
+    Una venta que está a la vez en main y en un archivo (p. ej. tras restaurar un backup
+    anterior al archivado) se toma solo de main.
+    """
+    filtros = {"ventas": "id", "detalle_ventas": "venta_id"}
+    for tabla in TABLAS_ARCHIVADAS:
+        columnas = _columnas(conn, tabla)
+        partes = ["SELECT " + ", ".join(f'"{c}"' for c in columnas) + f" FROM main.{tabla}"]
+        for nombre in alias:
+            # Un archivo viejo puede no tener columnas agregadas después: van como NULL
+            propias = set(_columnas(conn, tabla, nombre))
+            seleccion = ", ".join(f'"{c}"' if c in propias else f'NULL AS "{c}"' for c in columnas)
+            partes.append(f"SELECT {seleccion} FROM {nombre}.{tabla} "
+                          f"WHERE {filtros[tabla]} NOT IN (SELECT id FROM main.ventas)")
+        conn.execute(f"DROP VIEW IF EXISTS temp.{tabla}")
+        conn.execute(f"CREATE TEMP VIEW {tabla} AS " + " UNION ALL ".join(partes))
+
+
+def conectar_historico(db_path, fecha_desde=None, fecha_hasta=None):
+    """Conexión de solo lectura que ve también las ventas archivadas del rango"""
+    conn = conectar_solo_lectura(db_path)
+    try:
+        alias = adjuntar_archivos(conn, db_path, fecha_desde, fecha_hasta)
+        if alias:
+            crear_vistas_historicas(conn, alias)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def producto_en_archivos(db_path, producto_id):
+    """True si algún año archivado tiene ventas del producto (no se puede borrar del catálogo)"""
+    for ruta in listar_archivos(db_path).values():
+        conn = conectar_solo_lectura(ruta)
+        try:
+            if conn.execute("SELECT 1 FROM detalle_ventas WHERE producto_id = ? LIMIT 1", (producto_id,)).fetchone():
+                return True
+        finally:
+            conn.close()
+    return False
+
+
+# ===== ARCHIVADO =====
+def anios_cerrados(conn, anios_en_vivo=ANIOS_EN_VIVO, hoy=None):
+    """{año: ventas} que siguen en la base de datos principal y ya se pueden archivar"""
+    primer_anio_vivo = (hoy or datetime.now()).year - max(anios_en_vivo, 1) + 1
+    filas = conn.execute('''
+        SELECT CAST(substr(fecha, 1, 4) AS INTEGER), COUNT(*)
+        FROM ventas
+        WHERE fecha < ?
+        GROUP BY substr(fecha, 1, 4)
+    ''', (f"{primer_anio_vivo:04d}-01-01",)).fetchall()
+    return {anio: cantidad for anio, cantidad in filas if anio}
+
+
+def _crear_tablas_archivo(conn):
+    """Mismas columnas que las tablas principales, sin claves foráneas (usuarios,
+    productos y cierres quedan en la base de datos principal)"""
+    for tabla in TABLAS_ARCHIVADAS:
+        definicion = []
+        for _, nombre, tipo, _, _, pk in conn.execute(f"PRAGMA main.table_info({tabla})"):
+            definicion.append(f'"{nombre}" {tipo}' + (" PRIMARY KEY" if pk else ""))
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archivo.{tabla} ({', '.join(definicion)})")
+        # Columnas agregadas a la tabla principal después de crear el archivo
+        existentes = set(_columnas(conn, tabla, "archivo"))
+        for columna in definicion:
+            if columna.split('"')[1] not in existentes:
+                conn.execute(f"ALTER TABLE archivo.{tabla} ADD COLUMN {columna.replace(' PRIMARY KEY', '')}")
+    conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_ventas_fecha ON ventas (fecha, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_detalle_ventas_venta ON detalle_ventas (venta_id)")
+
+
+def archivar_anio(db_path, anio, tamano_lote=VENTAS_POR_LOTE, progreso=None):
+    """Mueve las ventas del año (y su detalle) a archive_AAAA.db; retorna cuántas se movieron.
+
+    progreso(movidas) después de cada lote. Cada lote es atómico en ambas bases de datos.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS archivo", (ruta_archivo(db_path, anio),))
+        _crear_tablas_archivo(conn)
+        conn.execute("CREATE TEMP TABLE lote_archivo (id INTEGER PRIMARY KEY)")
+        columnas = {tabla: ", ".join(f'"{c}"' for c in _columnas(conn, tabla)) for tabla in TABLAS_ARCHIVADAS}
+        rango = (f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01")
+
+        movidas = 0
+        while True:
+            # IMMEDIATE: el lote se elige y se mueve sin que otra conexión escriba en medio
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM lote_archivo")
+                conn.execute('''
+                    INSERT INTO lote_archivo (id)
+                    SELECT id FROM main.ventas
+                    WHERE fecha >= ? AND fecha < ?
+                      AND (cierre_id IS NULL OR cierre_id NOT IN (SELECT id FROM cierres_caja WHERE estado = 'abierto'))
+                    ORDER BY id
+                    LIMIT ?
+                ''', rango + (tamano_lote,))
+                cantidad = conn.execute("SELECT COUNT(*) FROM lote_archivo").fetchone()[0]
+                if cantidad == 0:
+                    conn.execute("COMMIT")
+                    break
+                # OR REPLACE: si se restauró un backup anterior al archivado, la fila ya existe igual
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO archivo.ventas ({columnas["ventas"]})
+                    SELECT {columnas["ventas"]} FROM main.ventas WHERE id IN (SELECT id FROM lote_archivo)
+                ''')
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO archivo.detalle_ventas ({columnas["detalle_ventas"]})
+                    SELECT {columnas["detalle_ventas"]} FROM main.detalle_ventas
+                    WHERE venta_id IN (SELECT id FROM lote_archivo)
+                ''')
+                conn.execute("DELETE FROM main.detalle_ventas WHERE venta_id IN (SELECT id FROM lote_archivo)")
+                conn.execute("DELETE FROM main.ventas WHERE id IN (SELECT id FROM lote_archivo)")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            movidas += cantidad
+            if progreso:
+                progreso(movidas)
+
+        problemas = [fila[0] for fila in conn.execute("PRAGMA archivo.quick_check")]
+        if problemas != ["ok"]:
+            raise sqlite3.DatabaseError(f"{PREFIJO_ARCHIVO}{anio}.db dañado: {'; '.join(problemas[:5])}")
+        print(f"🗄️ {movidas} ventas de {anio} archivadas en {PREFIJO_ARCHIVO}{anio}.db")
+        return movidas
+    finally:
+        conn.close()
+
+
+def compactar(db_path):
+    """VACUUM de la base de datos principal: devuelve al disco el espacio de lo archivado"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def archivar_anios_cerrados(db_path, anios_en_vivo=ANIOS_EN_VIVO, progreso=None, mensaje=None):
+    """Archiva todos los años cerrados y compacta; retorna {año: ventas movidas}.
+
+    progreso(porcentaje 0-100) según las ventas movidas; la compactación es el último paso.
+    """
+    avisar = mensaje or (lambda texto: None)
+    avanzar = progreso or (lambda porcentaje: None)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        pendientes = anios_cerrados(conn, anios_en_vivo)
+    finally:
+        conn.close()
+
+    total = sum(pendientes.values()) or 1
+    resumen = {}
+    hechas = 0
+    for anio in sorted(pendientes):
+        avisar(f"Archivando {anio} ({pendientes[anio]} ventas)...")
+        resumen[anio] = archivar_anio(
+            db_path, anio, progreso=lambda movidas: avanzar(int(90 * (hechas + movidas) / total)))
+        hechas += resumen[anio]
+
+    if any(resumen.values()):
+        avisar("Compactando base de datos...")
+        try:
+            compactar(db_path)
+        except sqlite3.OperationalError as e:
+            # Lo archivado ya está a salvo; el espacio se recupera en la próxima compactación
+            print(f"⚠️ No se pudo compactar la base de datos: {e}")
+    avanzar(100)
+    return resumen
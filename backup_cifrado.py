@@ -0,0 +1,230 @@
+"""
+Cifrado de backups por bloques autenticados (AES-256-GCM), sin Qt.
+
+Fernet (el que usa SecurityManager para las licencias) cifra todo el contenido
+de una vez, en memoria. Aquí el .zip se cifra en bloques fijos de TAMANO_BLOQUE
+a medida que se escribe, así que la memoria no depende del tamaño del backup y
+zipfile escribe directo sobre EscritorCifrado.
+
+Formato (.zip.enc):
+    cabecera:  MAGIA (8) | tamaño de bloque (4) | sal (16) | id de la clave (8)
+    bloques:   AES-GCM(bloque) + etiqueta (16), uno tras otro
+
+Cada archivo usa su propia clave, derivada con HKDF de la clave maestra y la
+sal, así el nonce puede ser el número de bloque (contador) sin repetirse nunca
+entre backups. El último byte del nonce marca el bloque final y la cabecera va
+como dato asociado: reordenar, quitar o truncar bloques hace fallar el descifrado.
+Como los bloques son de tamaño fijo, LectorCifrado permite seek() y zipfile
+puede leer el archivo en su lugar, sin descifrarlo antes a un temporal.
+"""
+import os
+import io
+import base64
+import struct
+import hashlib
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIA = b"CRBKAES1"
+TAMANO_BLOQUE = 64 * 1024
+TAMANO_ETIQUETA = 16
+TAMANO_SAL = 16
+EXTENSION_CIFRADA = ".enc"
+NOMBRE_CLAVE = "backup.key"
+_CABECERA = struct.Struct(">8sI16s8s")
+_INFO_HKDF = b"caja-registradora backup v1"
+
+
+class BackupCifradoError(Exception):
+    """El backup cifrado está dañado, truncado o fue alterado"""
+
+
+class ClaveBackupError(BackupCifradoError):
+    """No hay clave de cifrado o no es la que se usó para cifrar el backup"""
+
+
+def es_cifrado(ruta):
+    return ruta.endswith(EXTENSION_CIFRADA)
+
+
+def crear_clave(ruta_clave):
+    """Genera una clave AES-256 nueva y la guarda (base64, como las claves Fernet)"""
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_clave)), exist_ok=True)
+    clave = AESGCM.generate_key(bit_length=256)
+    # "x": nunca se pisa una clave existente, dejaría ilegibles los backups anteriores
+    with open(ruta_clave, "x") as f:
+        f.write(base64.urlsafe_b64encode(clave).decode() + "\n")
+    print(f"🔑 Clave de cifrado de backups creada en {ruta_clave}: guarde una copia fuera de este equipo")
+    return clave
+
+
+def cargar_clave(ruta_clave, crear=False):
+    """Lee la clave de backups; con crear=True la genera si todavía no existe"""
+    if not os.path.exists(ruta_clave):
+        if crear:
+            return crear_clave(ruta_clave)
+        raise ClaveBackupError(f"No existe la clave de cifrado de backups: {ruta_clave}")
+    with open(ruta_clave) as f:
+        try:
+            clave = base64.urlsafe_b64decode(f.read().strip())
+        except ValueError:
+            clave = b""
+    if len(clave) != 32:
+        raise ClaveBackupError(f"La clave de cifrado no es válida: {ruta_clave}")
+    return clave
+
+
+def id_clave(clave):
+    """Huella de la clave, para avisar de una clave equivocada antes de intentar descifrar"""
+    return hashlib.sha256(b"id:" + clave).digest()[:8]
+
+
+def _clave_archivo(clave, sal):
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=sal, info=_INFO_HKDF).derive(clave)
+
+
+def _nonce(indice, ultimo):
+    return indice.to_bytes(11, "big") + (b"\x01" if ultimo else b"\x00")
+
+
+class EscritorCifrado(io.RawIOBase):
+    """Archivo de solo escritura que cifra por bloques; no permite seek (zipfile lo detecta)"""
+
+    def __init__(self, ruta, clave, tamano_bloque=TAMANO_BLOQUE):
+        super().__init__()
+        sal = os.urandom(TAMANO_SAL)
+        self.cabecera = _CABECERA.pack(MAGIA, tamano_bloque, sal, id_clave(clave))
+        self.aes = AESGCM(_clave_archivo(clave, sal))
+        self.tamano_bloque = tamano_bloque
+        self.pendiente = bytearray()
+        self.indice = 0
+        self.posicion = 0
+        self.destino = open(ruta, "wb")
+        self.destino.write(self.cabecera)
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.posicion
+
+    def _cifrar(self, bloque, ultimo):
+        self.destino.write(self.aes.encrypt(_nonce(self.indice, ultimo), bytes(bloque), self.cabecera))
+        self.indice += 1
+
+    def write(self, datos):
+        self.pendiente += datos
+        self.posicion += len(datos)
+        # Se deja siempre algo pendiente: el último bloque se cifra recién en close()
+        while len(self.pendiente) > self.tamano_bloque:
+            self._cifrar(self.pendiente[:self.tamano_bloque], ultimo=False)
+            del self.pendiente[:self.tamano_bloque]
+        return len(datos)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._cifrar(self.pendiente, ultimo=True)
+            self.pendiente = bytearray()
+        finally:
+            self.destino.close()
+            super().close()
+
+
+class LectorCifrado(io.RawIOBase):
+    """Archivo de solo lectura que descifra bajo demanda; con seek() para zipfile"""
+
+    def __init__(self, ruta, clave):
+        super().__init__()
+        if clave is None:
+            raise ClaveBackupError("El backup está cifrado y no se indicó la clave")
+        self.origen = open(ruta, "rb")
+        try:
+            self.cabecera = self.origen.read(_CABECERA.size)
+            if len(self.cabecera) != _CABECERA.size:
+                raise BackupCifradoError("El archivo cifrado está incompleto")
+            magia, self.tamano_bloque, sal, huella = _CABECERA.unpack(self.cabecera)
+            if magia != MAGIA:
+                raise BackupCifradoError("No es un backup cifrado")
+            if huella != id_clave(clave):
+                raise ClaveBackupError("El backup fue cifrado con otra clave")
+            self.aes = AESGCM(_clave_archivo(clave, sal))
+
+            cuerpo = os.fstat(self.origen.fileno()).st_size - _CABECERA.size
+            registro = self.tamano_bloque + TAMANO_ETIQUETA
+            self.bloques = -(-cuerpo // registro)
+            if self.bloques == 0 or cuerpo - (self.bloques - 1) * registro < TAMANO_ETIQUETA:
+                raise BackupCifradoError("El archivo cifrado está truncado")
+            self.tamano = cuerpo - self.bloques * TAMANO_ETIQUETA
+            self.posicion = 0
+            self.en_cache = (None, b"")
+            # El último bloque se autentica al abrir: un archivo truncado falla acá y no a mitad de restaurar
+            self._bloque(self.bloques - 1)
+        except BaseException:
+            self.origen.close()
+            raise
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.posicion
+
+    def seek(self, desplazamiento, desde=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.posicion, io.SEEK_END: self.tamano}[desde]
+        if base + desplazamiento < 0:
+            raise ValueError("Posición negativa")
+        self.posicion = base + desplazamiento
+        return self.posicion
+
+    def _bloque(self, indice):
+        if self.en_cache[0] == indice:
+            return self.en_cache[1]
+        registro = self.tamano_bloque + TAMANO_ETIQUETA
+        self.origen.seek(_CABECERA.size + indice * registro)
+        cifrado = self.origen.read(registro)
+        try:
+            bloque = self.aes.decrypt(_nonce(indice, indice == self.bloques - 1), cifrado, self.cabecera)
+        except InvalidTag:
+            raise BackupCifradoError(f"Bloque {indice} del backup cifrado alterado o dañado") from None
+        self.en_cache = (indice, bloque)
+        return bloque
+
+    def readinto(self, destino):
+        # Se llena todo lo pedido aunque cruce bloques: zipfile toma una lectura corta como archivo truncado
+        leidos = 0
+        while leidos < len(destino) and self.posicion < self.tamano:
+            indice, inicio = divmod(self.posicion, self.tamano_bloque)
+            datos = self._bloque(indice)[inicio:inicio + len(destino) - leidos]
+            destino[leidos:leidos + len(datos)] = datos
+            leidos += len(datos)
+            self.posicion += len(datos)
+        return leidos
+
+    def close(self):
+        if not self.closed:
+            self.origen.close()
+        super().close()
+
+
+def cifrar_archivo(origen, destino, clave):
+    """Cifra un archivo existente (p. ej. un .zip anterior) en streaming"""
+    with open(origen, "rb") as entrada, EscritorCifrado(destino, clave) as salida:
+        for bloque in iter(lambda: entrada.read(TAMANO_BLOQUE), b""):
+            salida.write(bloque)
+    return destino
+
+
+def descifrar_archivo(origen, destino, clave):
+    """Descifra un .zip.enc a un .zip normal (para abrirlo con otras herramientas)"""
+    with LectorCifrado(origen, clave) as entrada, open(destino, "wb") as salida:
+        for bloque in iter(lambda: entrada.read(TAMANO_BLOQUE), b""):
+            salida.write(bloque)
+    return destino
@@ -0,0 +1,333 @@
+"""
+Funciones de respaldo sin Qt (las usan los workers de backup_manager).
+
+La base de datos se copia en línea con la API de backup de SQLite: por lotes de
+páginas, soltando el bloqueo de lectura entre pasos para que la caja pueda seguir
+cobrando mientras se respalda. La copia se verifica antes de darla por buena.
+
+El .zip se escribe directo desde los archivos originales (sin carpeta temporal);
+solo la base de datos pasa por un archivo temporal, porque la API de backup
+necesita una base de datos destino. Al final se agrega manifest.json con el
+SHA-256 y tamaño de cada archivo, la versión del esquema y las filas por tabla,
+para poder verificar el respaldo sin restaurarlo.
+
+Con una clave, el mismo .zip se escribe a través de backup_cifrado (.zip.enc)
+y se lee descifrando bloque a bloque: nada se descifra a disco.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import zipfile
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_cifrado import EscritorCifrado, LectorCifrado, BackupCifradoError, es_cifrado
+from archivo_historico import PATRON_ARCHIVO
+
+PAGINAS_POR_PASO = 256       # ~1 MB con páginas de 4 KB
+PAUSA_ENTRE_PASOS = 0.01     # segundos: deja pasar las escrituras de la caja
+MAX_REINICIOS = 3            # después, se termina en un solo paso
+
+NIVEL_COMPRESION = 6         # zlib 0-9; 0 = todo sin comprimir
+NOMBRE_DB_BACKUP = "caja_registradora.db"
+ARCHIVOS_CONFIG = ["config.json", "licencia.json"]
+NOMBRE_MANIFIESTO = "manifest.json"
+VERSION_MANIFIESTO = 1
+HILOS_VERIFICACION = 4
+TAMANO_LECTURA = 1024 * 1024
+# Ya vienen comprimidos: se guardan tal cual (ZIP_STORED), recomprimir solo gasta CPU
+EXTENSIONES_COMPRIMIDAS = {'.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.png', '.jpg', '.jpeg',
+                           '.gif', '.webp', '.pdf', '.docx', '.xlsx', '.mp3', '.mp4'}
+
+
+class _BackupReiniciado(Exception):
+    """Otra conexión escribió y SQLite reinició la copia desde el principio"""
+
+
+class BackupInvalidoError(Exception):
+    """La copia de la base de datos no pasó la verificación de integridad"""
+
+
+def verificar_integridad(ruta, completa=False):
+    """PRAGMA quick_check (o integrity_check si completa=True); retorna la lista de problemas"""
+    conn = sqlite3.connect(ruta)
+    try:
+        pragma = "integrity_check" if completa else "quick_check"
+        resultado = [fila[0] for fila in conn.execute(f"PRAGMA {pragma}")]
+    finally:
+        conn.close()
+    return [] if resultado == ["ok"] else resultado
+
+
+def copiar_base_datos(origen, destino, progreso=None, paginas=PAGINAS_POR_PASO,
+                      pausa=PAUSA_ENTRE_PASOS, completa=False):
+    """Copia consistente de una base de datos en uso y la verifica.
+
+    progreso(paginas_copiadas, paginas_totales) se llama después de cada paso.
+    Si otra conexión escribe durante la copia, SQLite la reinicia desde el
+    principio; con ventas frecuentes eso podría no terminar nunca, así que tras
+    MAX_REINICIOS intentos el resto se copia en un solo paso (bloqueo breve).
+    Lanza BackupInvalidoError si la verificación falla.
+    """
+    restantes_previas = [None]
+
+    def avance(status, restantes, total):
+        if restantes_previas[0] is not None and restantes > restantes_previas[0]:
+            raise _BackupReiniciado()
+        restantes_previas[0] = restantes
+        if progreso:
+            progreso(total - restantes, total)
+        if pausa:
+            time.sleep(pausa)
+
+    if not os.path.exists(origen):
+        raise FileNotFoundError(f"No existe la base de datos: {origen}")
+
+    fuente = sqlite3.connect(origen, timeout=30)
+    copia = sqlite3.connect(destino)
+    try:
+        for intento in range(MAX_REINICIOS):
+            restantes_previas[0] = None
+            try:
+                fuente.backup(copia, pages=paginas, progress=avance, sleep=pausa or 0.25)
+                break
+            except _BackupReiniciado:
+                print(f"⚠️ Backup reiniciado por escrituras concurrentes ({intento + 1}/{MAX_REINICIOS})")
+        else:
+            restantes_previas[0] = None
+            fuente.backup(copia, pages=-1, progress=avance)
+    finally:
+        copia.close()
+        fuente.close()
+
+    problemas = verificar_integridad(destino, completa)
+    if problemas:
+        raise BackupInvalidoError(f"La copia de la base de datos está dañada: {'; '.join(problemas[:5])}")
+    return destino
+
+
+def modo_compresion(nombre, nivel=NIVEL_COMPRESION):
+    if nivel == 0 or os.path.splitext(nombre)[1].lower() in EXTENSIONES_COMPRIMIDAS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def archivos_backup(app_dir, include_config=True, include_tickets=True, include_historico=True):
+    """Lista de (ruta_origen, nombre_en_zip) además de la base de datos"""
+    archivos = []
+    if include_historico:
+        # Años archivados (archive_AAAA.db): no cambian, en los snapshots no ocupan espacio extra
+        for nombre in sorted(os.listdir(app_dir)) if os.path.isdir(app_dir) else []:
+            if PATRON_ARCHIVO.match(nombre):
+                archivos.append((os.path.join(app_dir, nombre), nombre))
+    if include_config:
+        for config_file in ARCHIVOS_CONFIG:
+            config_path = os.path.join(app_dir, config_file)
+            if os.path.exists(config_path):
+                archivos.append((config_path, config_file))
+    if include_tickets:
+        tickets_dir = os.path.join(app_dir, "tickets")
+        for carpeta, _, nombres in os.walk(tickets_dir):
+            for nombre in sorted(nombres):
+                ruta = os.path.join(carpeta, nombre)
+                archivos.append((ruta, os.path.relpath(ruta, app_dir).replace(os.sep, "/")))
+    return archivos
+
+
+def describir_base_datos(ruta):
+    """Versión del esquema y filas por tabla, para el manifiesto"""
+    conn = sqlite3.connect(ruta)
+    try:
+        tablas = [fila[0] for fila in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        return {
+            "user_version": conn.execute("PRAGMA user_version").fetchone()[0],
+            "schema_version": conn.execute("PRAGMA schema_version").fetchone()[0],
+            "filas": {tabla: conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0] for tabla in tablas},
+        }
+    finally:
+        conn.close()
+
+
+def agregar_archivo(zf, ruta, nombre, nivel=NIVEL_COMPRESION):
+    """Copia un archivo al zip calculando su SHA-256 en la misma lectura; retorna la entrada del manifiesto"""
+    zinfo = zipfile.ZipInfo.from_file(ruta, nombre)
+    zinfo.compress_type = modo_compresion(nombre, nivel)
+    zinfo._compresslevel = nivel  # lo mismo que hace ZipFile.write(compresslevel=...)
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as origen, zf.open(zinfo, "w") as destino:
+        while True:
+            bloque = origen.read(TAMANO_LECTURA)
+            if not bloque:
+                break
+            sha.update(bloque)
+            destino.write(bloque)
+    return {"nombre": nombre, "tamano": zinfo.file_size, "sha256": sha.hexdigest()}
+
+
+def abrir_zip(zip_path, clave=None):
+    """ZipFile de lectura; si el backup está cifrado lo descifra en streaming con la clave"""
+    if not es_cifrado(zip_path):
+        return zipfile.ZipFile(zip_path)
+    lector = LectorCifrado(zip_path, clave)
+    try:
+        zf = zipfile.ZipFile(lector)
+    except BaseException:
+        lector.close()
+        raise
+    zf._filePassed = False  # que ZipFile.close() cierre también el lector
+    return zf
+
+
+def escribir_backup_zip(zip_path, db_path, archivos, nivel=NIVEL_COMPRESION, progreso=None, mensaje=None,
+                        clave=None):
+    """Escribe el respaldo directo en zip_path.
+
+    archivos: lista de (ruta_origen, nombre_en_zip) que se leen en streaming.
+    progreso(porcentaje 0-100): la base de datos cuenta como 40 %, el resto por bytes.
+    Con clave, el zip se cifra por bloques mientras se escribe (zip_path debería terminar en .enc).
+    Se escribe a un .tmp y se renombra al final: nunca queda un .zip a medias.
+    """
+    avisar = mensaje or (lambda texto: None)
+    avanzar = progreso or (lambda porcentaje: None)
+    zip_tmp = f"{zip_path}.tmp"
+    db_tmp = f"{zip_path}.db.tmp"
+    total_bytes = sum(os.path.getsize(ruta) for ruta, _ in archivos) or 1
+    escritos = 0
+
+    try:
+        avisar("Copiando base de datos...")
+        copiar_base_datos(db_path, db_tmp, progreso=lambda copiadas, total: avanzar(int(30 * copiadas / max(total, 1))))
+        avisar("Base de datos verificada (quick_check)")
+
+        manifiesto = {
+            "version": VERSION_MANIFIESTO,
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "base_datos": describir_base_datos(db_tmp),
+            "archivos": [],
+        }
+        destino = EscritorCifrado(zip_tmp, clave) if clave else open(zip_tmp, "wb")
+        with destino, zipfile.ZipFile(destino, 'w', allowZip64=True) as zf:
+            avisar("Comprimiendo base de datos...")
+            manifiesto["archivos"].append(agregar_archivo(zf, db_tmp, NOMBRE_DB_BACKUP, nivel))
+            os.remove(db_tmp)
+            avanzar(40)
+
+            if archivos:
+                avisar(f"Agregando {len(archivos)} archivos...")
+            for ruta, nombre in archivos:
+                entrada = agregar_archivo(zf, ruta, nombre, nivel)
+                manifiesto["archivos"].append(entrada)
+                escritos += entrada["tamano"]
+                avanzar(40 + int(60 * escritos / total_bytes))
+
+            zf.writestr(NOMBRE_MANIFIESTO, json.dumps(manifiesto, ensure_ascii=False, indent=1))
+
+        os.replace(zip_tmp, zip_path)
+        avanzar(100)
+        return zip_path
+    except BaseException:
+        for temporal in (zip_tmp, db_tmp):
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        raise
+
+
+def comparar_base_datos(ruta, esperado):
+    """integrity_check y filas por tabla contra lo registrado en el manifiesto"""
+    problemas = verificar_integridad(ruta, completa=True)
+    if esperado:
+        actual = describir_base_datos(ruta)
+        for tabla, filas in esperado.get("filas", {}).items():
+            if actual["filas"].get(tabla) != filas:
+                problemas.append(f"{tabla}: {actual['filas'].get(tabla)} filas, el manifiesto dice {filas}")
+    return problemas
+
+
+def verificar_en_paralelo(funcion, entradas, hilos=HILOS_VERIFICACION):
+    """Aplica funcion(entrada) -> problema o None con un pool de hilos; retorna la lista de problemas.
+
+    hashlib y zlib sueltan el GIL con bloques grandes, así que los hilos sí trabajan a la vez.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        return [problema for problema in pool.map(funcion, entradas) if problema]
+
+
+def verificar_backup(zip_path, completa=False, hilos=HILOS_VERIFICACION, clave=None):
+    """Verifica un .zip (o .zip.enc con su clave) contra su manifest.json; retorna la lista de
+    problemas (vacía = restaurable).
+
+    Cada hilo abre su propio ZipFile y recalcula SHA-256 y tamaño de los miembros; en
+    los cifrados, además, cada bloque se autentica con GCM al leerlo.
+    Los backups sin manifiesto (anteriores) solo se revisan por CRC. Con completa=True
+    además se extrae la base de datos y se corre integrity_check y el conteo de filas.
+    """
+    try:
+        with abrir_zip(zip_path, clave) as zf:
+            nombres = [nombre for nombre in zf.namelist() if not nombre.endswith("/")]
+            manifiesto = json.loads(zf.read(NOMBRE_MANIFIESTO)) if NOMBRE_MANIFIESTO in nombres else None
+    except (OSError, zipfile.BadZipFile, ValueError, BackupCifradoError) as e:
+        return [f"No se puede leer el archivo: {e}"]
+
+    problemas = []
+    if manifiesto is None:
+        print(f"ℹ️ {os.path.basename(zip_path)} no tiene manifiesto: solo se verifica el CRC")
+        entradas = [{"nombre": nombre} for nombre in nombres]
+    else:
+        entradas = manifiesto["archivos"]
+        registrados = {entrada["nombre"] for entrada in entradas} | {NOMBRE_MANIFIESTO}
+        problemas.extend(f"{nombre}: no está en el manifiesto" for nombre in nombres if nombre not in registrados)
+
+    locales = threading.local()
+    abiertos = []
+    candado = threading.Lock()
+
+    def revisar(entrada):
+        if not hasattr(locales, "zf"):
+            locales.zf = abrir_zip(zip_path, clave)
+            with candado:
+                abiertos.append(locales.zf)
+        sha, tamano = hashlib.sha256(), 0
+        try:
+            # ZipExtFile valida el CRC al llegar al final del miembro
+            with locales.zf.open(entrada["nombre"]) as f:
+                while True:
+                    bloque = f.read(TAMANO_LECTURA)
+                    if not bloque:
+                        break
+                    sha.update(bloque)
+                    tamano += len(bloque)
+        except KeyError:
+            return f"{entrada['nombre']}: falta en el archivo"
+        except (zipfile.BadZipFile, zlib.error, OSError, EOFError, BackupCifradoError) as e:
+            return f"{entrada['nombre']}: {e}"
+        if "tamano" in entrada and tamano != entrada["tamano"]:
+            return f"{entrada['nombre']}: {tamano} bytes, el manifiesto dice {entrada['tamano']}"
+        if "sha256" in entrada and sha.hexdigest() != entrada["sha256"]:
+            return f"{entrada['nombre']}: SHA-256 distinto"
+        return None
+
+    try:
+        problemas.extend(verificar_en_paralelo(revisar, entradas, hilos))
+    finally:
+        for zf in abiertos:
+            zf.close()
+
+    if completa and not problemas and NOMBRE_DB_BACKUP in nombres:
+        descriptor, db_tmp = tempfile.mkstemp(suffix=".db")
+        try:
+            with os.fdopen(descriptor, "wb") as destino, abrir_zip(zip_path, clave) as zf, zf.open(NOMBRE_DB_BACKUP) as f:
+                while True:
+                    bloque = f.read(TAMANO_LECTURA)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+            problemas.extend(comparar_base_datos(db_tmp, manifiesto and manifiesto.get("base_datos")))
+        finally:
+            os.remove(db_tmp)
+    return problemas
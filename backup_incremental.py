@@ -0,0 +1,282 @@
+"""
+Backups incrementales con almacén de chunks direccionado por contenido.
+
+Cada archivo del respaldo (la base de datos, config y tickets) se parte en chunks
+de tamaño fijo y cada chunk se guarda una sola vez en Backups/chunks/ con su
+SHA-256 como nombre. Un snapshot es solo un manifiesto JSON
+(Backups/incremental_AAAAMMDD_HHMMSS.json) con la lista de chunks de cada archivo.
+
+SQLite escribe por páginas en posiciones fijas, así que con chunks alineados a
+páginas un día de ventas solo cambia unos pocos chunks: el resto ya está en el
+almacén. Los tickets que no cambiaron (mismo tamaño y fecha de modificación que
+en el snapshot anterior) ni siquiera se vuelven a leer.
+"""
+import os
+import json
+import zlib
+import time
+import hashlib
+import tempfile
+from datetime import datetime
+
+from backup_core import (
+    copiar_base_datos, describir_base_datos, comparar_base_datos, verificar_en_paralelo,
+    BackupInvalidoError, NIVEL_COMPRESION, NOMBRE_DB_BACKUP, HILOS_VERIFICACION
+)
+
+TAMANO_CHUNK = 64 * 1024     # múltiplo de cualquier tamaño de página de SQLite (512 B - 64 KB)
+CARPETA_CHUNKS = "chunks"
+PREFIJO_SNAPSHOT = "incremental_"
+VERSION_MANIFIESTO = 2       # 2: sha256 por archivo y datos de la base de datos
+GRACIA_RECOLECCION = 3600    # segundos: chunks recientes pueden ser de un snapshot en curso
+
+
+def es_snapshot(nombre):
+    return os.path.basename(nombre).startswith(PREFIJO_SNAPSHOT) and nombre.endswith(".json")
+
+
+def ruta_chunk(backup_dir, hash_chunk):
+    """Backups/chunks/ab/abcdef...: dos niveles para no tener miles de archivos en una carpeta"""
+    return os.path.join(backup_dir, CARPETA_CHUNKS, hash_chunk[:2], hash_chunk)
+
+
+def leer_manifiesto(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def listar_snapshots(backup_dir):
+    """Rutas de los manifiestos, del más antiguo al más reciente"""
+    if not os.path.isdir(backup_dir):
+        return []
+    return [os.path.join(backup_dir, nombre) for nombre in sorted(os.listdir(backup_dir)) if es_snapshot(nombre)]
+
+
+def _tocar_chunk(ruta):
+    """Renueva la fecha de un chunk que se va a reutilizar (recolectar_chunks respeta los recientes);
+    False si no existe"""
+    try:
+        os.utime(ruta)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def guardar_chunk(backup_dir, datos, nivel=NIVEL_COMPRESION):
+    """Guarda el chunk si no existe; retorna (hash, bytes escritos en disco)"""
+    hash_chunk = hashlib.sha256(datos).hexdigest()
+    ruta = ruta_chunk(backup_dir, hash_chunk)
+    if _tocar_chunk(ruta):
+        return hash_chunk, 0
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    comprimido = zlib.compress(datos, nivel)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(comprimido)
+    os.replace(temporal, ruta)
+    return hash_chunk, len(comprimido)
+
+
+def leer_chunk(backup_dir, hash_chunk):
+    """Contenido del chunk verificado contra su hash"""
+    ruta = ruta_chunk(backup_dir, hash_chunk)
+    if not os.path.exists(ruta):
+        raise BackupInvalidoError(f"Falta el chunk {hash_chunk[:12]}")
+    with open(ruta, "rb") as f:
+        datos = zlib.decompress(f.read())
+    if hashlib.sha256(datos).hexdigest() != hash_chunk:
+        raise BackupInvalidoError(f"Chunk dañado: {hash_chunk[:12]}")
+    return datos
+
+
+def _guardar_archivo(backup_dir, ruta, nivel, avance):
+    """Parte un archivo en chunks; retorna (lista de hashes, SHA-256 del archivo, bytes nuevos)"""
+    chunks, nuevos = [], 0
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        while True:
+            datos = f.read(TAMANO_CHUNK)
+            if not datos:
+                break
+            sha.update(datos)
+            hash_chunk, escritos = guardar_chunk(backup_dir, datos, nivel)
+            chunks.append(hash_chunk)
+            nuevos += escritos
+            avance(len(datos))
+    return chunks, sha.hexdigest(), nuevos
+
+
+def crear_snapshot(backup_dir, db_path, archivos, nivel=NIVEL_COMPRESION, progreso=None, mensaje=None):
+    """Crea un snapshot incremental; retorna (ruta del manifiesto, manifiesto).
+
+    archivos: lista de (ruta_origen, nombre) como la de backup_core.archivos_backup.
+    progreso(porcentaje 0-100). El manifiesto se escribe al final: si algo falla
+    solo quedan chunks sueltos, que recolectar_chunks() elimina.
+    """
+    avisar = mensaje or (lambda texto: None)
+    avanzar = progreso or (lambda porcentaje: None)
+    fecha = datetime.now()
+    manifiesto_path = os.path.join(backup_dir, f"{PREFIJO_SNAPSHOT}{fecha.strftime('%Y%m%d_%H%M%S')}.json")
+    db_tmp = f"{manifiesto_path}.db.tmp"
+
+    # Archivos sin cambios desde el último snapshot: se reutilizan sus chunks sin leerlos
+    anteriores = {}
+    snapshots = listar_snapshots(backup_dir)
+    if snapshots:
+        try:
+            for entrada in leer_manifiesto(snapshots[-1])["archivos"]:
+                if entrada.get("mtime_ns") is not None:
+                    anteriores[entrada["nombre"]] = entrada
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ No se pudo leer el snapshot anterior: {e}")
+
+    try:
+        avisar("Copiando base de datos...")
+        copiar_base_datos(db_path, db_tmp, progreso=lambda copiadas, total: avanzar(int(30 * copiadas / max(total, 1))))
+        avisar("Base de datos verificada (quick_check)")
+
+        pendientes = [(db_tmp, NOMBRE_DB_BACKUP)] + list(archivos)
+        total_bytes = sum(os.path.getsize(ruta) for ruta, _ in pendientes) or 1
+        procesados = [0]
+
+        def avance(cantidad):
+            procesados[0] += cantidad
+            avanzar(30 + int(70 * procesados[0] / total_bytes))
+
+        entradas, bytes_nuevos, reutilizados = [], 0, 0
+        avisar("Guardando chunks nuevos...")
+        for ruta, nombre in pendientes:
+            estado = os.stat(ruta)
+            mtime_ns = None if ruta == db_tmp else estado.st_mtime_ns
+            anterior = anteriores.get(nombre)
+            if (anterior and "sha256" in anterior and anterior["tamano"] == estado.st_size
+                    and anterior["mtime_ns"] == mtime_ns
+                    and all(_tocar_chunk(ruta_chunk(backup_dir, h)) for h in anterior["chunks"])):
+                chunks, sha256 = anterior["chunks"], anterior["sha256"]
+                reutilizados += 1
+                avance(estado.st_size)
+            else:
+                chunks, sha256, nuevos = _guardar_archivo(backup_dir, ruta, nivel, avance)
+                bytes_nuevos += nuevos
+            entradas.append({"nombre": nombre, "tamano": estado.st_size, "mtime_ns": mtime_ns,
+                             "sha256": sha256, "chunks": chunks})
+        base_datos = describir_base_datos(db_tmp)
+        os.remove(db_tmp)
+
+        manifiesto = {
+            "version": VERSION_MANIFIESTO,
+            "fecha": fecha.strftime("%Y-%m-%d %H:%M:%S"),
+            "tamano_chunk": TAMANO_CHUNK,
+            "bytes_totales": sum(entrada["tamano"] for entrada in entradas),
+            "bytes_nuevos": bytes_nuevos,
+            "base_datos": base_datos,
+            "archivos": entradas,
+        }
+        temporal = f"{manifiesto_path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False)
+        os.replace(temporal, manifiesto_path)
+        avanzar(100)
+        print(f"✅ Snapshot incremental: {bytes_nuevos / 1024 / 1024:.2f} MB nuevos, "
+              f"{reutilizados} archivos sin cambios")
+        return manifiesto_path, manifiesto
+    except BaseException:
+        if os.path.exists(db_tmp):
+            os.remove(db_tmp)
+        raise
+
+
+def restaurar_snapshot(manifiesto_path, destino, progreso=None):
+    """Reconstruye los archivos del snapshot dentro de destino (misma estructura que el .zip)"""
+    backup_dir = os.path.dirname(os.path.abspath(manifiesto_path))
+    manifiesto = leer_manifiesto(manifiesto_path)
+    total_bytes = manifiesto.get("bytes_totales") or 1
+    escritos = 0
+    for entrada in manifiesto["archivos"]:
+        ruta = os.path.join(destino, *entrada["nombre"].split("/"))
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            for hash_chunk in entrada["chunks"]:
+                datos = leer_chunk(backup_dir, hash_chunk)
+                f.write(datos)
+                escritos += len(datos)
+                if progreso:
+                    progreso(int(100 * escritos / total_bytes))
+        if os.path.getsize(ruta) != entrada["tamano"]:
+            raise BackupInvalidoError(f"Tamaño incorrecto al restaurar {entrada['nombre']}")
+    return destino
+
+
+def verificar_snapshot(manifiesto_path, completa=False, hilos=HILOS_VERIFICACION):
+    """Verifica un snapshot sin restaurarlo; retorna la lista de problemas (vacía = restaurable).
+
+    Cada archivo se reconstruye en memoria chunk por chunk (leer_chunk valida cada
+    hash) y se compara con el SHA-256 y tamaño del manifiesto, en paralelo.
+    """
+    backup_dir = os.path.dirname(os.path.abspath(manifiesto_path))
+    try:
+        manifiesto = leer_manifiesto(manifiesto_path)
+    except (OSError, ValueError) as e:
+        return [f"No se puede leer el manifiesto: {e}"]
+
+    def revisar(entrada):
+        sha, tamano = hashlib.sha256(), 0
+        try:
+            for hash_chunk in entrada["chunks"]:
+                datos = leer_chunk(backup_dir, hash_chunk)
+                sha.update(datos)
+                tamano += len(datos)
+        except (BackupInvalidoError, OSError, zlib.error) as e:
+            return f"{entrada['nombre']}: {e}"
+        if tamano != entrada["tamano"]:
+            return f"{entrada['nombre']}: {tamano} bytes, el manifiesto dice {entrada['tamano']}"
+        if "sha256" in entrada and sha.hexdigest() != entrada["sha256"]:
+            return f"{entrada['nombre']}: SHA-256 distinto"
+        return None
+
+    problemas = verificar_en_paralelo(revisar, manifiesto["archivos"], hilos)
+    if completa and not problemas:
+        with tempfile.TemporaryDirectory() as carpeta:
+            entrada_db = [e for e in manifiesto["archivos"] if e["nombre"] == NOMBRE_DB_BACKUP]
+            if entrada_db:
+                db_tmp = os.path.join(carpeta, NOMBRE_DB_BACKUP)
+                with open(db_tmp, "wb") as f:
+                    for hash_chunk in entrada_db[0]["chunks"]:
+                        f.write(leer_chunk(backup_dir, hash_chunk))
+                problemas.extend(comparar_base_datos(db_tmp, manifiesto.get("base_datos")))
+    return problemas
+
+
+def recolectar_chunks(backup_dir):
+    """Elimina los chunks que ningún snapshot usa; retorna (chunks borrados, bytes liberados)"""
+    limite = time.time() - GRACIA_RECOLECCION
+    # Snapshot en curso (.json.db.tmp / .json.tmp recientes): su manifiesto aún no existe
+    for nombre in os.listdir(backup_dir) if os.path.isdir(backup_dir) else []:
+        if nombre.startswith(PREFIJO_SNAPSHOT) and nombre.endswith(".tmp"):
+            if os.path.getmtime(os.path.join(backup_dir, nombre)) >= limite:
+                print("⏳ Snapshot incremental en curso: la recolección de chunks se omite")
+                return 0, 0
+
+    usados = set()
+    for manifiesto_path in listar_snapshots(backup_dir):
+        for entrada in leer_manifiesto(manifiesto_path)["archivos"]:
+            usados.update(entrada["chunks"])
+
+    borrados = liberados = 0
+    carpeta_chunks = os.path.join(backup_dir, CARPETA_CHUNKS)
+    for carpeta, _, nombres in os.walk(carpeta_chunks):
+        for nombre in nombres:
+            ruta = os.path.join(carpeta, nombre)
+            if nombre not in usados and os.path.getmtime(ruta) < limite:
+                liberados += os.path.getsize(ruta)
+                os.remove(ruta)
+                borrados += 1
+    if borrados:
+        print(f"🗑️ {borrados} chunks sin uso eliminados ({liberados / 1024 / 1024:.2f} MB)")
+    return borrados, liberados
+
+
+def eliminar_snapshot(manifiesto_path):
+    """Borra el manifiesto y los chunks que solo él usaba"""
+    os.remove(manifiesto_path)
+    return recolectar_chunks(os.path.dirname(os.path.abspath(manifiesto_path)))
@@ -1,78 +1,176 @@
 import os
 import shutil
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QMessageBox, QListWidget, QProgressBar, QGroupBox, QCheckBox,
-    QTimeEdit, QComboBox, QSpinBox, QFormLayout, QApplication
+    QTimeEdit, QComboBox, QSpinBox, QFormLayout, QApplication, QDateEdit, QDialogButtonBox,
+    QFileDialog
 )
-from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QThread, QDate, QTime, pyqtSignal
 from PyQt6.QtGui import QPalette, QColor
 
 # Importar las nuevas funciones de rutas
 from paths import get_app_directory, get_backups_directory, ensure_directory_exists
+from backup_core import archivos_backup, escribir_backup_zip, verificar_backup, NIVEL_COMPRESION
+from backup_incremental import (
+    crear_snapshot, eliminar_snapshot, es_snapshot, leer_manifiesto,
+    verificar_snapshot
+)
+from backup_restore import restaurar, COMPONENTES
+from backup_retention import aplicar_retencion, eliminar_registro, POLITICA_DEFECTO
+from backup_cifrado import cargar_clave, es_cifrado, EXTENSION_CIFRADA, NOMBRE_CLAVE
+from archivo_historico import anios_cerrados, archivar_anios_cerrados, ANIOS_EN_VIVO
+
+VERIFICAR_ULTIMOS = 3               # backups más recientes que se verifican solos
+FRECUENCIAS_BACKUP = ["Diario", "Semanal", "Cada hora"]
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+CONFIG_AUTO_BACKUP_DEFECTO = {
+    "habilitado": False,
+    "hora": "02:00",
+    "frecuencia": "diario",
+    "dia_semana": 0,                # lunes (datetime.weekday)
+    "silencio_desde": "",           # horas sin backups, p. ej. horario de atención
+    "silencio_hasta": "",
+    "mantener_diarios": POLITICA_DEFECTO["diarios"],
+    "mantener_semanales": POLITICA_DEFECTO["semanales"],
+    "mantener_mensuales": POLITICA_DEFECTO["mensuales"],
+    "max_mb": POLITICA_DEFECTO["max_mb"],     # 0 = sin tope
+    "nivel_compresion": NIVEL_COMPRESION,
+    "incremental": False,
+    "cifrado": False,
+    "verificar_ultimos": VERIFICAR_ULTIMOS
+}
+
+def leer_configuracion_auto_backup(conn):
+    """Configuración de auto-backup (claves auto_backup_* de la tabla configuracion)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT clave, valor FROM configuracion 
+        WHERE clave LIKE 'auto_backup_%'
+    """)
+    config_data = {row[0]: row[1] for row in cursor.fetchall()}
+    
+    config = dict(CONFIG_AUTO_BACKUP_DEFECTO)
+    config.update({
+        "habilitado": config_data.get("auto_backup_habilitado", "0") == "1",
+        "hora": config_data.get("auto_backup_hora", config["hora"]),
+        "frecuencia": config_data.get("auto_backup_frecuencia", config["frecuencia"]),
+        "dia_semana": int(config_data.get("auto_backup_dia_semana", config["dia_semana"])),
+        "silencio_desde": config_data.get("auto_backup_silencio_desde", ""),
+        "silencio_hasta": config_data.get("auto_backup_silencio_hasta", ""),
+        # Antes solo había "días a mantener": se usa como cantidad de diarios
+        "mantener_diarios": int(config_data.get("auto_backup_mantener_diarios",
+                                                config_data.get("auto_backup_mantener_dias", config["mantener_diarios"]))),
+        "mantener_semanales": int(config_data.get("auto_backup_mantener_semanales", config["mantener_semanales"])),
+        "mantener_mensuales": int(config_data.get("auto_backup_mantener_mensuales", config["mantener_mensuales"])),
+        "max_mb": int(config_data.get("auto_backup_max_mb", config["max_mb"])),
+        "nivel_compresion": int(config_data.get("auto_backup_nivel_compresion", config["nivel_compresion"])),
+        "incremental": config_data.get("auto_backup_incremental", "0") == "1",
+        "cifrado": config_data.get("auto_backup_cifrado", "0") == "1",
+        "verificar_ultimos": int(config_data.get("auto_backup_verificar_ultimos", config["verificar_ultimos"]))
+    })
+    return config
+
+def ruta_clave_backup():
+    """Clave AES de los backups cifrados (no se incluye en los backups)"""
+    return os.path.join(get_app_directory(), "data", NOMBRE_CLAVE)
+
+def clave_para(backup_path):
+    """La clave si el backup está cifrado; None si no hace falta"""
+    return cargar_clave(ruta_clave_backup()) if es_cifrado(backup_path) else None
+
+def es_backup(nombre):
+    return nombre.endswith(('.zip', '.zip' + EXTENSION_CIFRADA)) or es_snapshot(nombre)
+
+def listar_backups_recientes(backup_dir, cantidad):
+    """Rutas de los backups (.zip, .zip.enc y snapshots) más recientes primero"""
+    if not os.path.exists(backup_dir):
+        return []
+    backups = [os.path.join(backup_dir, f) for f in os.listdir(backup_dir) if es_backup(f)]
+    backups.sort(key=os.path.getctime, reverse=True)
+    return backups[:cantidad]
+
+def politica_retencion(config):
+    return {
+        "diarios": config["mantener_diarios"],
+        "semanales": config["mantener_semanales"],
+        "mensuales": config["mantener_mensuales"],
+        "max_mb": config["max_mb"],
+    }
+
+def limpiar_backups_antiguos(db_path, backup_dir, config, simular=False):
+    """Aplica la retención GFS configurada (con simular=True solo calcula); retorna el plan"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        return aplicar_retencion(conn, backup_dir, politica_retencion(config), simular)
+    finally:
+        conn.close()
 
 class BackupWorker(QThread):
     progress = pyqtSignal(int)
     message = pyqtSignal(str)
     finished = pyqtSignal(bool, str)
 
-    def __init__(self, db_path, backup_dir, include_config=True, include_tickets=True):
+    def __init__(self, db_path, backup_dir, include_config=True, include_tickets=True, nivel_compresion=NIVEL_COMPRESION,
+                 incremental=False, tipo="manual", cifrar=False):
         super().__init__()
         self.db_path = db_path
         self.backup_dir = backup_dir
         self.include_config = include_config
         self.include_tickets = include_tickets
+        self.nivel_compresion = nivel_compresion
+        self.incremental = incremental
+        self.tipo = tipo                # "manual" o "automático" (tabla backups)
+        self.cifrar = cifrar            # solo .zip: los snapshots incrementales no se cifran
 
     def run(self):
         try:
             # Usar ensure_directory_exists para crear directorio de backup
             ensure_directory_exists(self.backup_dir)
             
+            archivos = archivos_backup(get_app_directory(), self.include_config, self.include_tickets)
+            
+            # ✅ INCREMENTAL: SOLO SE GUARDAN LOS CHUNKS QUE NO ESTÁN EN Backups/chunks
+            if self.incremental:
+                self.message.emit("Iniciando backup incremental...")
+                self.progress.emit(10)
+                manifiesto_path, manifiesto = crear_snapshot(
+                    self.backup_dir, self.db_path, archivos, self.nivel_compresion,
+                    progreso=lambda porcentaje: self.progress.emit(10 + int(porcentaje * 0.8)),
+                    mensaje=self.message.emit
+                )
+                nuevos_mb = manifiesto["bytes_nuevos"] / (1024 * 1024)
+                self.crear_registro_backup(manifiesto_path, nuevos_mb)
+                self.progress.emit(100)
+                
+                self.message.emit("Backup incremental completado exitosamente")
+                self.finished.emit(True, f"Backup incremental guardado en: {manifiesto_path}\n"
+                                         f"Datos nuevos: {nuevos_mb:.2f} MB de {manifiesto['bytes_totales'] / (1024 * 1024):.2f} MB")
+                return
+            
             # Fecha y hora para el nombre del backup
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"backup_{timestamp}"
-            backup_path = os.path.join(self.backup_dir, backup_name)
-            os.makedirs(backup_path, exist_ok=True)
+            zip_path = os.path.join(self.backup_dir, f"backup_{timestamp}.zip")
+            clave = None
+            if self.cifrar:
+                # La primera vez se genera la clave en data/backup.key
+                clave = cargar_clave(ruta_clave_backup(), crear=True)
+                zip_path += EXTENSION_CIFRADA
             
             self.message.emit("Iniciando backup...")
             self.progress.emit(10)
             
-            # Backup de la base de datos
-            self.message.emit("Copiando base de datos...")
-            db_backup_path = os.path.join(backup_path, "caja_registradora.db")
-            shutil.copy2(self.db_path, db_backup_path)
-            self.progress.emit(30)
-            
-            # Backup de archivos de configuración
-            if self.include_config:
-                self.message.emit("Copiando configuración...")
-                config_files = ["config.json", "licencia.json"]
-                app_dir = get_app_directory()
-                for config_file in config_files:
-                    config_path = os.path.join(app_dir, config_file)
-                    if os.path.exists(config_path):
-                        shutil.copy2(config_path, backup_path)
-                self.progress.emit(50)
-            
-            # Backup de tickets
-            if self.include_tickets:
-                self.message.emit("Copiando tickets...")
-                tickets_dir = os.path.join(get_app_directory(), "tickets")
-                if os.path.exists(tickets_dir):
-                    tickets_backup_path = os.path.join(backup_path, "tickets")
-                    shutil.copytree(tickets_dir, tickets_backup_path)
-                self.progress.emit(70)
-            
-            # Comprimir el backup
-            self.message.emit("Comprimiendo backup...")
-            zip_path = f"{backup_path}.zip"
-            shutil.make_archive(backup_path, 'zip', backup_path)
-            
-            # Eliminar directorio temporal
-            shutil.rmtree(backup_path)
-            self.progress.emit(90)
+            # ✅ ZIP EN STREAMING DESDE LOS ORIGINALES: SIN CARPETA TEMPORAL NI make_archive
+            # ✅ CIFRADO: AES-GCM POR BLOQUES MIENTRAS SE ESCRIBE, SIN CARGAR EL ZIP EN MEMORIA
+            escribir_backup_zip(
+                zip_path, self.db_path, archivos, self.nivel_compresion,
+                progreso=lambda porcentaje: self.progress.emit(10 + int(porcentaje * 0.8)),
+                mensaje=self.message.emit,
+                clave=clave
+            )
             
             # Crear registro del backup
             self.crear_registro_backup(zip_path)
@@ -139,8 +237,8 @@ class BackupWorker(QThread):
         except Exception as e:
             print(f"❌ Error verificando tabla backups: {e}")
 
-    def crear_registro_backup(self, backup_path):
-        """Registra el backup en la base de datos"""
+    def crear_registro_backup(self, backup_path, tamaño=None):
+        """Registra el backup en la base de datos (tamaño en MB; por defecto el del archivo)"""
         try:
             # LLAMAR A LA VERIFICACIÓN ANTES DE TODO
             self.verificar_y_corregir_tabla_backups()
@@ -149,10 +247,11 @@ class BackupWorker(QThread):
             cursor = conn.cursor()
             
             # SOLO INSERTAR EL REGISTRO (la tabla ya está verificada)
-            tamaño = os.path.getsize(backup_path) / (1024 * 1024)  # MB
+            if tamaño is None:
+                tamaño = os.path.getsize(backup_path) / (1024 * 1024)  # MB
             cursor.execute(
                 "INSERT INTO backups (archivo_path, tamaño, tipo) VALUES (?, ?, ?)",
-                (backup_path, tamaño, "automático")
+                (backup_path, tamaño, self.tipo)
             )
             conn.commit()
             conn.close()
@@ -167,71 +266,160 @@ class RestoreWorker(QThread):
     message = pyqtSignal(str)
     finished = pyqtSignal(bool, str)
 
-    def __init__(self, backup_path, db_path, app_dir):
+    def __init__(self, backup_path, db_path, app_dir, componentes=None, tickets_desde=None, tickets_hasta=None):
         super().__init__()
         self.backup_path = backup_path
         self.db_path = db_path
         self.app_dir = app_dir
+        self.componentes = set(componentes or COMPONENTES)
+        self.tickets_desde = tickets_desde
+        self.tickets_hasta = tickets_hasta
 
     def run(self):
         try:
             self.message.emit("Iniciando restauración...")
-            self.progress.emit(10)
+            self.progress.emit(5)
 
-            # Crear directorio temporal para extracción
-            temp_dir = os.path.join(self.app_dir, "temp_restore")
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            
-            self.message.emit("Extrayendo archivos de backup...")
-            shutil.unpack_archive(self.backup_path, temp_dir)
-            self.progress.emit(30)
-
-            # Cerrar todas las conexiones a la base de datos existente
-            self.message.emit("Preparando base de datos...")
-            self.progress.emit(50)
-
-            # Copiar base de datos del backup
-            db_backup_path = os.path.join(temp_dir, "caja_registradora.db")
-            if os.path.exists(db_backup_path):
-                # Hacer backup de la base de datos actual antes de reemplazar
-                backup_actual = f"{self.db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                if os.path.exists(self.db_path):
-                    shutil.copy2(self.db_path, backup_actual)
-                
-                # Reemplazar base de datos
-                shutil.copy2(db_backup_path, self.db_path)
-                self.progress.emit(70)
-
-            # Restaurar archivos de configuración
-            self.message.emit("Restaurando configuración...")
-            for config_file in ["config.json", "licencia.json"]:
-                config_backup_path = os.path.join(temp_dir, config_file)
-                if os.path.exists(config_backup_path):
-                    shutil.copy2(config_backup_path, os.path.join(self.app_dir, config_file))
-            self.progress.emit(85)
-
-            # Restaurar tickets
-            self.message.emit("Restaurando tickets...")
-            tickets_backup_path = os.path.join(temp_dir, "tickets")
-            tickets_dir = os.path.join(self.app_dir, "tickets")
-            if os.path.exists(tickets_backup_path):
-                if os.path.exists(tickets_dir):
-                    shutil.rmtree(tickets_dir)
-                shutil.copytree(tickets_backup_path, tickets_dir)
-            self.progress.emit(95)
-
-            # Limpiar directorio temporal
-            shutil.rmtree(temp_dir)
-            self.progress.emit(100)
+            # ✅ STREAMING DESDE EL BACKUP A CADA DESTINO: SIN temp_restore NI copytree
+            resumen = restaurar(
+                self.backup_path, self.db_path, self.app_dir,
+                self.componentes, self.tickets_desde, self.tickets_hasta,
+                progreso=lambda porcentaje: self.progress.emit(5 + int(porcentaje * 0.95)),
+                mensaje=self.message.emit,
+                clave=clave_para(self.backup_path)
+            )
 
+            detalle = ", ".join(f"{COMPONENTES[c].split(' (')[0]}: {n} archivo(s)" for c, n in resumen.items())
             self.message.emit("Restauración completada exitosamente")
-            self.finished.emit(True, "Backup restaurado correctamente. Reinicie la aplicación.")
+            if "base_datos" in self.componentes:
+                self.finished.emit(True, f"Backup restaurado correctamente ({detalle}). Reinicie la aplicación.")
+            else:
+                self.finished.emit(True, f"Backup restaurado correctamente ({detalle}).")
 
         except Exception as e:
             self.message.emit(f"Error en restauración: {str(e)}")
             self.finished.emit(False, f"Error durante la restauración: {str(e)}")
 
+class RestoreOptionsDialog(QDialog):
+    """Qué restaurar: componentes y, opcionalmente, un rango de fechas de tickets"""
+
+    def __init__(self, backup_name, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Restaurar Backup")
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"📦 {backup_name}"))
+        
+        componentes_group = QGroupBox("Restaurar")
+        componentes_layout = QVBoxLayout()
+        self.checks = {}
+        for clave, texto in COMPONENTES.items():
+            self.checks[clave] = QCheckBox(texto)
+            self.checks[clave].setChecked(True)
+            componentes_layout.addWidget(self.checks[clave])
+        componentes_group.setLayout(componentes_layout)
+        layout.addWidget(componentes_group)
+        
+        # Rango de tickets
+        self.cb_rango = QCheckBox("Solo tickets entre estas fechas:")
+        layout.addWidget(self.cb_rango)
+        rango_layout = QHBoxLayout()
+        self.fecha_desde = QDateEdit(QDate.currentDate())
+        self.fecha_hasta = QDateEdit(QDate.currentDate())
+        for fecha_edit in (self.fecha_desde, self.fecha_hasta):
+            fecha_edit.setCalendarPopup(True)
+            fecha_edit.setDisplayFormat("yyyy-MM-dd")
+            fecha_edit.setEnabled(False)
+        rango_layout.addWidget(self.fecha_desde)
+        rango_layout.addWidget(QLabel("a"))
+        rango_layout.addWidget(self.fecha_hasta)
+        layout.addLayout(rango_layout)
+        self.cb_rango.toggled.connect(self.actualizar_rango)
+        self.checks["tickets"].toggled.connect(self.actualizar_rango)
+        
+        botones = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        botones.accepted.connect(self.accept)
+        botones.rejected.connect(self.reject)
+        layout.addWidget(botones)
+        
+        self.setLayout(layout)
+
+    def actualizar_rango(self):
+        self.cb_rango.setEnabled(self.checks["tickets"].isChecked())
+        activo = self.cb_rango.isEnabled() and self.cb_rango.isChecked()
+        self.fecha_desde.setEnabled(activo)
+        self.fecha_hasta.setEnabled(activo)
+
+    def componentes(self):
+        return {clave for clave, check in self.checks.items() if check.isChecked()}
+
+    def rango_tickets(self):
+        """(desde, hasta) como date, o (None, None) si se restauran todos"""
+        if not (self.checks["tickets"].isChecked() and self.cb_rango.isChecked()):
+            return None, None
+        return self.fecha_desde.date().toPyDate(), self.fecha_hasta.date().toPyDate()
+
+class VerifyWorker(QThread):
+    """Verifica backups (.zip o snapshots) contra su manifiesto sin restaurarlos"""
+    progress = pyqtSignal(int)
+    message = pyqtSignal(str)
+    finished = pyqtSignal(object)  # {ruta: [problemas]}
+
+    def __init__(self, backup_paths, completa=False):
+        super().__init__()
+        self.backup_paths = backup_paths
+        self.completa = completa
+
+    def run(self):
+        resultados = {}
+        for i, backup_path in enumerate(self.backup_paths):
+            nombre = os.path.basename(backup_path)
+            self.message.emit(f"Verificando {nombre}...")
+            try:
+                if es_snapshot(backup_path):
+                    problemas = verificar_snapshot(backup_path, self.completa)
+                else:
+                    problemas = verificar_backup(backup_path, self.completa, clave=clave_para(backup_path))
+            except Exception as e:
+                problemas = [f"Error verificando: {e}"]
+            resultados[backup_path] = problemas
+            if problemas:
+                print(f"❌ Backup con problemas {nombre}: {'; '.join(problemas[:5])}")
+            else:
+                print(f"✅ Backup verificado: {nombre}")
+            self.progress.emit(int(100 * (i + 1) / len(self.backup_paths)))
+        self.finished.emit(resultados)
+
+
+class ArchiveWorker(QThread):
+    """Mueve los años cerrados de ventas a archive_AAAA.db y compacta la base de datos"""
+    progress = pyqtSignal(int)
+    message = pyqtSignal(str)
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, db_path, anios_en_vivo=ANIOS_EN_VIVO):
+        super().__init__()
+        self.db_path = db_path
+        self.anios_en_vivo = anios_en_vivo
+
+    def run(self):
+        try:
+            tamano_antes = os.path.getsize(self.db_path)
+            resumen = archivar_anios_cerrados(
+                self.db_path, self.anios_en_vivo,
+                progreso=self.progress.emit, mensaje=self.message.emit
+            )
+            tamano_despues = os.path.getsize(self.db_path)
+            detalle = "\n".join(f"{anio}: {cantidad} ventas" for anio, cantidad in sorted(resumen.items()))
+            self.finished.emit(True, (
+                f"Años archivados:\n{detalle}\n\n"
+                f"Base de datos: {tamano_antes / 1024 / 1024:.1f} MB → {tamano_despues / 1024 / 1024:.1f} MB"
+            ))
+        except Exception as e:
+            print(f"❌ Error archivando años cerrados: {e}")
+            self.finished.emit(False, f"Error archivando: {str(e)}\n\nLos lotes ya archivados quedan completos.")
+
+
 class AutoBackupConfigDialog(QDialog):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
@@ -261,14 +449,78 @@ class AutoBackupConfigDialog(QDialog):
         
         # Frecuencia
         self.combo_frecuencia = QComboBox()
-        self.combo_frecuencia.addItems(["Diario", "Semanal"])
+        self.combo_frecuencia.addItems(FRECUENCIAS_BACKUP)
+        self.combo_frecuencia.setToolTip("Cada hora: se usan solo los minutos de la hora indicada")
         form_layout.addRow("Frecuencia:", self.combo_frecuencia)
         
-        # Días a mantener backups
-        self.spin_dias = QSpinBox()
-        self.spin_dias.setRange(1, 365)
-        self.spin_dias.setValue(7)
-        form_layout.addRow("Días a mantener backups:", self.spin_dias)
+        # Día de la semana (frecuencia semanal)
+        self.combo_dia = QComboBox()
+        self.combo_dia.addItems(DIAS_SEMANA)
+        form_layout.addRow("Día (semanal):", self.combo_dia)
+        self.combo_frecuencia.currentTextChanged.connect(
+            lambda texto: self.combo_dia.setEnabled(texto == "Semanal"))
+        
+        # Horas de silencio: no se hacen backups (p. ej. mientras la tienda atiende)
+        self.cb_silencio = QCheckBox("No hacer backups entre:")
+        silencio_layout = QHBoxLayout()
+        self.silencio_desde = QTimeEdit(QTime(9, 0))
+        self.silencio_hasta = QTimeEdit(QTime(21, 0))
+        for time_edit in (self.silencio_desde, self.silencio_hasta):
+            time_edit.setDisplayFormat("HH:mm")
+            time_edit.setEnabled(False)
+        silencio_layout.addWidget(self.silencio_desde)
+        silencio_layout.addWidget(QLabel("y"))
+        silencio_layout.addWidget(self.silencio_hasta)
+        self.cb_silencio.toggled.connect(self.silencio_desde.setEnabled)
+        self.cb_silencio.toggled.connect(self.silencio_hasta.setEnabled)
+        form_layout.addRow(self.cb_silencio, silencio_layout)
+        
+        # Retención abuelo-padre-hijo: el último backup de cada día, semana y mes
+        self.spin_diarios = QSpinBox()
+        self.spin_diarios.setRange(1, 365)
+        self.spin_diarios.setValue(POLITICA_DEFECTO["diarios"])
+        form_layout.addRow("Conservar backups diarios:", self.spin_diarios)
+        
+        self.spin_semanales = QSpinBox()
+        self.spin_semanales.setRange(0, 104)
+        self.spin_semanales.setValue(POLITICA_DEFECTO["semanales"])
+        form_layout.addRow("Conservar backups semanales:", self.spin_semanales)
+        
+        self.spin_mensuales = QSpinBox()
+        self.spin_mensuales.setRange(0, 120)
+        self.spin_mensuales.setValue(POLITICA_DEFECTO["mensuales"])
+        form_layout.addRow("Conservar backups mensuales:", self.spin_mensuales)
+        
+        self.spin_max_mb = QSpinBox()
+        self.spin_max_mb.setRange(0, 1000000)
+        self.spin_max_mb.setSuffix(" MB")
+        self.spin_max_mb.setSpecialValueText("Sin límite")
+        self.spin_max_mb.setToolTip("Si se supera, se eliminan los backups conservados más antiguos")
+        form_layout.addRow("Espacio máximo:", self.spin_max_mb)
+        
+        # Nivel de compresión del .zip
+        self.spin_compresion = QSpinBox()
+        self.spin_compresion.setRange(0, 9)
+        self.spin_compresion.setValue(NIVEL_COMPRESION)
+        self.spin_compresion.setToolTip("0 = sin comprimir (más rápido), 9 = máxima compresión")
+        form_layout.addRow("Nivel de compresión:", self.spin_compresion)
+        
+        # Incremental: los backups automáticos diarios solo guardan lo que cambió
+        self.cb_incremental = QCheckBox("Backup incremental (deduplicado)")
+        form_layout.addRow(self.cb_incremental)
+        
+        # Cifrado AES-256 (solo backups completos .zip)
+        self.cb_cifrado = QCheckBox("Cifrar backups (AES-256)")
+        self.cb_cifrado.setToolTip(f"La clave se guarda en data/{NOMBRE_CLAVE}: sin ella no se pueden restaurar")
+        self.cb_incremental.toggled.connect(lambda activo: self.cb_cifrado.setEnabled(not activo))
+        form_layout.addRow(self.cb_cifrado)
+        
+        # Verificación periódica de los últimos backups
+        self.spin_verificar = QSpinBox()
+        self.spin_verificar.setRange(0, 50)
+        self.spin_verificar.setValue(VERIFICAR_ULTIMOS)
+        self.spin_verificar.setToolTip("0 = no verificar automáticamente")
+        form_layout.addRow("Verificar los últimos N backups:", self.spin_verificar)
         
         form_group.setLayout(form_layout)
         layout.addWidget(form_group)
@@ -309,9 +561,24 @@ class AutoBackupConfigDialog(QDialog):
             index = self.combo_frecuencia.findText(config["frecuencia"].capitalize())
             if index >= 0:
                 self.combo_frecuencia.setCurrentIndex(index)
+            self.combo_dia.setCurrentIndex(config["dia_semana"])
+            self.combo_dia.setEnabled(config["frecuencia"] == "semanal")
+            
+            # Horas de silencio
+            if config["silencio_desde"] and config["silencio_hasta"]:
+                self.cb_silencio.setChecked(True)
+                self.silencio_desde.setTime(datetime.strptime(config["silencio_desde"], "%H:%M").time())
+                self.silencio_hasta.setTime(datetime.strptime(config["silencio_hasta"], "%H:%M").time())
             
             # Configurar días
-            self.spin_dias.setValue(config["mantener_dias"])
+            self.spin_diarios.setValue(config["mantener_diarios"])
+            self.spin_semanales.setValue(config["mantener_semanales"])
+            self.spin_mensuales.setValue(config["mantener_mensuales"])
+            self.spin_max_mb.setValue(config["max_mb"])
+            self.spin_compresion.setValue(config["nivel_compresion"])
+            self.cb_incremental.setChecked(config["incremental"])
+            self.cb_cifrado.setChecked(config["cifrado"])
+            self.spin_verificar.setValue(config["verificar_ultimos"])
             
         except Exception as e:
             print(f"❌ Error cargando configuración: {e}")
@@ -320,27 +587,10 @@ class AutoBackupConfigDialog(QDialog):
         """Carga la configuración de auto-backup desde la base de datos"""
         try:
             with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT clave, valor FROM configuracion 
-                    WHERE clave LIKE 'auto_backup_%'
-                """)
-                config_data = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                return {
-                    "habilitado": config_data.get("auto_backup_habilitado", "0") == "1",
-                    "hora": config_data.get("auto_backup_hora", "02:00"),
-                    "frecuencia": config_data.get("auto_backup_frecuencia", "diario"),
-                    "mantener_dias": int(config_data.get("auto_backup_mantener_dias", "7"))
-                }
+                return leer_configuracion_auto_backup(conn)
         except Exception as e:
             print(f"❌ Error cargando configuración auto-backup: {e}")
-            return {
-                "habilitado": False,
-                "hora": "02:00",
-                "frecuencia": "diario", 
-                "mantener_dias": 7
-            }
+            return dict(CONFIG_AUTO_BACKUP_DEFECTO)
 
     def guardar_configuracion(self):
         """Guarda la configuración de auto-backup en la BD"""
@@ -352,7 +602,17 @@ class AutoBackupConfigDialog(QDialog):
                     ("auto_backup_habilitado", "1" if self.cb_habilitado.isChecked() else "0", "Auto-backup habilitado"),
                     ("auto_backup_hora", self.time_edit.time().toString("HH:mm"), "Hora del backup automático"),
                     ("auto_backup_frecuencia", self.combo_frecuencia.currentText().lower(), "Frecuencia del backup"),
-                    ("auto_backup_mantener_dias", str(self.spin_dias.value()), "Días a mantener backups")
+                    ("auto_backup_dia_semana", str(self.combo_dia.currentIndex()), "Día del backup semanal (0 = lunes)"),
+                    ("auto_backup_silencio_desde", self.silencio_desde.time().toString("HH:mm") if self.cb_silencio.isChecked() else "", "Inicio de horas sin backups"),
+                    ("auto_backup_silencio_hasta", self.silencio_hasta.time().toString("HH:mm") if self.cb_silencio.isChecked() else "", "Fin de horas sin backups"),
+                    ("auto_backup_mantener_diarios", str(self.spin_diarios.value()), "Backups diarios a conservar"),
+                    ("auto_backup_mantener_semanales", str(self.spin_semanales.value()), "Backups semanales a conservar"),
+                    ("auto_backup_mantener_mensuales", str(self.spin_mensuales.value()), "Backups mensuales a conservar"),
+                    ("auto_backup_max_mb", str(self.spin_max_mb.value()), "Espacio máximo de backups en MB (0 = sin límite)"),
+                    ("auto_backup_nivel_compresion", str(self.spin_compresion.value()), "Nivel de compresión del backup (0-9)"),
+                    ("auto_backup_incremental", "1" if self.cb_incremental.isChecked() else "0", "Backup automático incremental"),
+                    ("auto_backup_cifrado", "1" if self.cb_cifrado.isChecked() else "0", "Cifrar backups automáticos (AES-256)"),
+                    ("auto_backup_verificar_ultimos", str(self.spin_verificar.value()), "Backups recientes a verificar")
                 ]
                 
                 for clave, valor, descripcion in configuraciones:
@@ -369,10 +629,42 @@ class AutoBackupConfigDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo guardar la configuración: {str(e)}")
 
+class RetentionPreviewDialog(QDialog):
+    """Vista previa (sin borrar nada) de lo que hará la política de retención"""
+
+    def __init__(self, plan, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Vista previa de retención")
+        self.setGeometry(250, 150, 650, 450)
+        
+        layout = QVBoxLayout()
+        eliminar = [b for b, conservar, _ in plan if not conservar]
+        liberados = sum(b["tamano_mb"] for b in eliminar if b["ruta"])
+        layout.addWidget(QLabel(f"Se eliminarán {len(eliminar)} de {len(plan)} backups "
+                                f"(≈ {liberados:.2f} MB). Nada se borra hasta confirmar."))
+        
+        lista = QListWidget()
+        for backup, conservar, motivo in plan:
+            nombre = os.path.basename(backup["ruta"] or backup["ruta_registrada"])
+            icono = "✅" if conservar else "🗑️"
+            lista.addItem(f"{icono} {backup['fecha'].strftime('%Y-%m-%d %H:%M')}  {nombre} "
+                          f"({backup['tamano_mb']:.2f} MB, {backup['tipo']}) - {motivo}")
+        layout.addWidget(lista)
+        
+        botones = QDialogButtonBox(QDialogButtonBox.StandardButton.Cancel)
+        btn_aplicar = botones.addButton(f"Eliminar {len(eliminar)} backups", QDialogButtonBox.ButtonRole.AcceptRole)
+        btn_aplicar.setStyleSheet("background-color: #e74c3c; color: white; font-weight: bold;")
+        botones.accepted.connect(self.accept)
+        botones.rejected.connect(self.reject)
+        layout.addWidget(botones)
+        
+        self.setLayout(layout)
+
 class BackupManagerDialog(QDialog):
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, db_manager, parent=None, scheduler=None):
         super().__init__(parent)
         self.db_manager = db_manager
+        self.scheduler = scheduler      # BackupScheduler de la aplicación (si está activo)
         
         # USAR RUTAS ABSOLUTAS con el nuevo sistema
         app_dir = get_app_directory()
@@ -401,6 +693,23 @@ class BackupManagerDialog(QDialog):
         self.cb_tickets.setChecked(True)
         config_layout.addWidget(self.cb_tickets)
         
+        # ✅ NIVEL DE COMPRESIÓN (LOS ARCHIVOS YA COMPRIMIDOS SIEMPRE SE GUARDAN SIN RECOMPRIMIR)
+        compresion_layout = QHBoxLayout()
+        compresion_layout.addWidget(QLabel("Nivel de compresión (0 = sin comprimir, 9 = máxima):"))
+        self.spin_compresion = QSpinBox()
+        self.spin_compresion.setRange(0, 9)
+        self.spin_compresion.setValue(NIVEL_COMPRESION)
+        compresion_layout.addWidget(self.spin_compresion)
+        compresion_layout.addStretch()
+        config_layout.addLayout(compresion_layout)
+        
+        self.cb_incremental = QCheckBox("Backup incremental (solo guarda lo que cambió desde el anterior)")
+        config_layout.addWidget(self.cb_incremental)
+        
+        self.cb_cifrado = QCheckBox(f"Cifrar backup (AES-256, clave en data/{NOMBRE_CLAVE})")
+        self.cb_incremental.toggled.connect(lambda activo: self.cb_cifrado.setEnabled(not activo))
+        config_layout.addWidget(self.cb_cifrado)
+        
         config_group.setLayout(config_layout)
         layout.addWidget(config_group)
         
@@ -419,6 +728,12 @@ class BackupManagerDialog(QDialog):
         btn_abrir_dir.clicked.connect(self.abrir_directorio_backups)
         dir_layout.addWidget(btn_abrir_dir)
         
+        btn_exportar_clave = QPushButton("Exportar Clave de Cifrado")
+        btn_exportar_clave.setStyleSheet("background-color: #34495e; color: white; font-weight: bold;")
+        btn_exportar_clave.setToolTip("Sin esta clave los backups cifrados no se pueden restaurar en otro equipo")
+        btn_exportar_clave.clicked.connect(self.exportar_clave)
+        dir_layout.addWidget(btn_exportar_clave)
+        
         dir_group.setLayout(dir_layout)
         layout.addWidget(dir_group)
         
@@ -471,11 +786,23 @@ class BackupManagerDialog(QDialog):
         btn_eliminar_backup.clicked.connect(self.eliminar_backup)
         backup_buttons_layout.addWidget(btn_eliminar_backup)
         
+        self.btn_verificar = QPushButton("Verificar")
+        self.btn_verificar.setStyleSheet("background-color: #16a085; color: white; font-weight: bold;")
+        self.btn_verificar.setToolTip("Comprueba SHA-256, tamaños e integridad de la base de datos sin restaurar")
+        self.btn_verificar.clicked.connect(self.verificar_backup_seleccionado)
+        backup_buttons_layout.addWidget(self.btn_verificar)
+        
         btn_limpiar_antiguos = QPushButton("Limpiar Backups Antiguos")
         btn_limpiar_antiguos.setStyleSheet("background-color: #e67e22; color: white; font-weight: bold;")
         btn_limpiar_antiguos.clicked.connect(self.limpiar_backups_antiguos)
         backup_buttons_layout.addWidget(btn_limpiar_antiguos)
         
+        self.btn_archivar = QPushButton("Archivar Años Cerrados")
+        self.btn_archivar.setStyleSheet("background-color: #2c3e50; color: white; font-weight: bold;")
+        self.btn_archivar.setToolTip("Mueve las ventas de años anteriores a archive_AAAA.db; los reportes las siguen viendo")
+        self.btn_archivar.clicked.connect(self.archivar_anios_cerrados)
+        backup_buttons_layout.addWidget(self.btn_archivar)
+        
         backups_layout.addLayout(backup_buttons_layout)
         backups_group.setLayout(backups_layout)
         layout.addWidget(backups_group)
@@ -488,12 +815,16 @@ class BackupManagerDialog(QDialog):
         
         self.setLayout(layout)
         
+        self.verify_worker = None
+        self.resultados_verificacion = {}  # nombre -> True (ok) / False (con problemas)
+        
         self.cargar_backups()
+        config_auto = self.cargar_configuracion_auto_backup()
+        self.spin_compresion.setValue(config_auto["nivel_compresion"])
+        self.cb_incremental.setChecked(config_auto["incremental"])
+        self.cb_cifrado.setChecked(config_auto["cifrado"])
         
-        # Timer para backup automático (verificar cada minuto)
-        self.auto_backup_timer = QTimer()
-        self.auto_backup_timer.timeout.connect(self.verificar_auto_backup)
-        self.auto_backup_timer.start(60000)
+        # ✅ LOS BACKUPS AUTOMÁTICOS Y LA VERIFICACIÓN PERIÓDICA LOS HACE BackupScheduler (backup_scheduler.py)
         
         # VERIFICAR ESTRUCTURA AL INICIAR
         self.verificar_estructura_backups()
@@ -520,16 +851,46 @@ class BackupManagerDialog(QDialog):
         except Exception as e:
             QMessageBox.warning(self, "Info", f"No se pudo abrir el directorio: {str(e)}")
 
+    def exportar_clave(self):
+        """Copia la clave de los backups cifrados (p. ej. a un pendrive)"""
+        ruta_clave = ruta_clave_backup()
+        if not os.path.exists(ruta_clave):
+            QMessageBox.information(self, "Clave de cifrado", "Todavía no hay backups cifrados: la clave se crea con el primero")
+            return
+        destino, _ = QFileDialog.getSaveFileName(self, "Exportar clave de cifrado", NOMBRE_CLAVE, "Clave (*.key)")
+        if not destino:
+            return
+        try:
+            shutil.copy2(ruta_clave, destino)
+            QMessageBox.information(self, "Éxito",
+                f"Clave exportada a {destino}\n\nGuárdela fuera de este equipo. Para restaurar en otro equipo "
+                f"cópiela en data/{NOMBRE_CLAVE}.")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo exportar la clave: {str(e)}")
+
     def cargar_backups(self):
         """Carga la lista de backups disponibles"""
         self.list_backups.clear()
         if os.path.exists(self.backup_dir):
-            backups = sorted([f for f in os.listdir(self.backup_dir) if f.endswith('.zip')], reverse=True)
+            backups = sorted([f for f in os.listdir(self.backup_dir) if es_backup(f)],
+                             key=lambda f: os.path.getctime(os.path.join(self.backup_dir, f)), reverse=True)
             for backup in backups:
                 backup_path = os.path.join(self.backup_dir, backup)
-                size = os.path.getsize(backup_path) / (1024 * 1024)
                 date = datetime.fromtimestamp(os.path.getctime(backup_path))
-                self.list_backups.addItem(f"{backup} ({size:.2f} MB) - {date.strftime('%Y-%m-%d %H:%M')}")
+                if es_snapshot(backup):
+                    try:
+                        size = leer_manifiesto(backup_path)["bytes_nuevos"] / (1024 * 1024)
+                    except Exception as e:
+                        print(f"❌ Error leyendo snapshot {backup}: {e}")
+                        continue
+                    texto = f"{backup} (incremental, {size:.2f} MB nuevos) - {date.strftime('%Y-%m-%d %H:%M')}"
+                else:
+                    size = os.path.getsize(backup_path) / (1024 * 1024)
+                    cifrado = "🔒 " if es_cifrado(backup) else ""
+                    texto = f"{backup} ({cifrado}{size:.2f} MB) - {date.strftime('%Y-%m-%d %H:%M')}"
+                if backup in self.resultados_verificacion:
+                    texto += " ✅ verificado" if self.resultados_verificacion[backup] else " ❌ con problemas"
+                self.list_backups.addItem(texto)
 
     def ejecutar_backup(self):
         # VERIFICACIÓN ADICIONAL ANTES DE BACKUP
@@ -542,7 +903,10 @@ class BackupManagerDialog(QDialog):
             self.db_path, 
             self.backup_dir,
             self.cb_config.isChecked(),
-            self.cb_tickets.isChecked()
+            self.cb_tickets.isChecked(),
+            self.spin_compresion.value(),
+            self.cb_incremental.isChecked(),
+            cifrar=self.cb_cifrado.isChecked() and not self.cb_incremental.isChecked()
         )
         
         self.worker.progress.connect(self.progress_bar.setValue)
@@ -556,7 +920,8 @@ class BackupManagerDialog(QDialog):
             QMessageBox.information(self, "Éxito", message)
             self.cargar_backups()
             # Limpiar backups antiguos después de crear uno nuevo
-            self.limpiar_backups_antiguos()
+            self.aplicar_retencion_automatica()
+            self.verificar_recientes()
         else:
             QMessageBox.critical(self, "Error", message)
         
@@ -572,10 +937,21 @@ class BackupManagerDialog(QDialog):
         backup_name = selected.text().split(' ')[0]
         backup_path = os.path.join(self.backup_dir, backup_name)
         
+        opciones = RestoreOptionsDialog(backup_name, self)
+        if opciones.exec() != QDialog.DialogCode.Accepted:
+            return
+        componentes = opciones.componentes()
+        if not componentes:
+            QMessageBox.warning(self, "Error", "Seleccione al menos un componente para restaurar")
+            return
+        tickets_desde, tickets_hasta = opciones.rango_tickets()
+        
+        aviso = "⚠️  Se sobreescribirán los datos actuales seleccionados."
+        if "base_datos" in componentes:
+            aviso = "⚠️  Se sobreescribirán los datos actuales y la aplicación se cerrará."
         respuesta = QMessageBox.question(
             self, "Confirmar", 
-            "¿Está seguro de restaurar este backup?\n\n"
-            "⚠️  Se sobreescribirán los datos actuales y la aplicación se cerrará."
+            f"¿Está seguro de restaurar este backup?\n\n{aviso}"
         )
         
         if respuesta == QMessageBox.StandardButton.Yes:
@@ -586,7 +962,10 @@ class BackupManagerDialog(QDialog):
                 self.restore_worker = RestoreWorker(
                     backup_path, 
                     self.db_path, 
-                    get_app_directory()
+                    get_app_directory(),
+                    componentes,
+                    tickets_desde,
+                    tickets_hasta
                 )
                 
                 self.restore_worker.progress.connect(self.progress_bar.setValue)
@@ -601,143 +980,147 @@ class BackupManagerDialog(QDialog):
         self.btn_restore.setEnabled(True)
         self.progress_bar.setValue(0)
         
-        if success:
+        if success and "base_datos" in self.restore_worker.componentes:
             QMessageBox.information(self, "Éxito", 
                 f"{message}\n\nLa aplicación se cerrará ahora para completar la restauración.")
             # Cerrar la aplicación
             QApplication.quit()
+        elif success:
+            QMessageBox.information(self, "Éxito", message)
+            self.lbl_status.setText("Listo para realizar backup")
         else:
             QMessageBox.critical(self, "Error", message)
             self.lbl_status.setText("Error en restauración")
 
-    def configurar_auto_backup(self):
-        """Abre el diálogo de configuración de auto-backup"""
-        dialog = AutoBackupConfigDialog(self.db_manager, self)
-        dialog.exec()
+    def verificar_backup_seleccionado(self):
+        """Verificación completa (incluye integrity_check de la base de datos) del backup elegido"""
+        selected = self.list_backups.currentItem()
+        if not selected:
+            QMessageBox.warning(self, "Error", "Seleccione un backup para verificar")
+            return
+        backup_path = os.path.join(self.backup_dir, selected.text().split(' ')[0])
+        self.iniciar_verificacion([backup_path], completa=True, manual=True)
 
-    def verificar_auto_backup(self):
-        """Verifica si es hora de hacer backup automático"""
-        ahora = datetime.now()
-        
-        # Cargar configuración de auto-backup
-        config = self.cargar_configuracion_auto_backup()
-        
-        if not config.get("habilitado", False):
+    def verificar_recientes(self):
+        """Verifica los últimos N backups (solo SHA-256 y tamaños) en segundo plano"""
+        cantidad = self.cargar_configuracion_auto_backup()["verificar_ultimos"]
+        if cantidad > 0:
+            self.iniciar_verificacion(listar_backups_recientes(self.backup_dir, cantidad), completa=False, manual=False)
+
+    def iniciar_verificacion(self, backup_paths, completa, manual):
+        if not backup_paths:
+            return
+        if self.verify_worker is not None and self.verify_worker.isRunning():
+            if manual:
+                QMessageBox.information(self, "Verificación", "Ya hay una verificación en curso")
             return
+        self.btn_verificar.setEnabled(False)
+        self.verify_worker = VerifyWorker(backup_paths, completa)
+        if manual:
+            self.verify_worker.progress.connect(self.progress_bar.setValue)
+            self.verify_worker.message.connect(self.lbl_status.setText)
+        self.verify_worker.finished.connect(lambda resultados: self.verificacion_finalizada(resultados, manual))
+        self.verify_worker.start()
+
+    def verificacion_finalizada(self, resultados, manual):
+        self.btn_verificar.setEnabled(True)
+        for backup_path, problemas in resultados.items():
+            self.resultados_verificacion[os.path.basename(backup_path)] = not problemas
+        self.cargar_backups()
         
-        hora_programada = config.get("hora", "02:00")
-        frecuencia = config.get("frecuencia", "diario")
+        con_problemas = {os.path.basename(ruta): problemas for ruta, problemas in resultados.items() if problemas}
+        if con_problemas:
+            detalle = "\n".join(f"• {nombre}: {'; '.join(problemas[:3])}" for nombre, problemas in con_problemas.items())
+            QMessageBox.warning(self, "Verificación de backups",
+                                f"⚠️ Hay backups que no se podrían restaurar:\n\n{detalle}")
+        elif manual:
+            QMessageBox.information(self, "Verificación", "✅ El backup está completo y se puede restaurar")
         
-        try:
-            hora_obj = datetime.strptime(hora_programada, "%H:%M").time()
-            ahora_time = ahora.time()
-            
-            # Verificar si es la hora programada (con margen de 1 minuto)
-            if (abs(ahora_time.hour - hora_obj.hour) == 0 and 
-                abs(ahora_time.minute - hora_obj.minute) <= 1):
-                
-                # Verificar que no hayamos hecho backup en la última hora
-                ultimo_backup = self.obtener_ultimo_backup_tiempo()
-                if ultimo_backup and (ahora - ultimo_backup).total_seconds() < 3600:
-                    return
-                
-                # Verificar frecuencia
-                if frecuencia == "diario":
-                    self.ejecutar_backup_automatico()
-                elif frecuencia == "semanal" and ahora.weekday() == 0:  # Lunes
-                    self.ejecutar_backup_automatico()
-                    
-        except Exception as e:
-            print(f"❌ Error verificando auto-backup: {e}")
+        if manual:
+            self.progress_bar.setValue(0)
+            self.lbl_status.setText("Listo para realizar backup")
 
-    def ejecutar_backup_automatico(self):
-        """Ejecuta backup automático sin interacción del usuario"""
-        try:
-            print("🔄 Iniciando backup automático...")
-            self.worker = BackupWorker(
-                self.db_path, 
-                self.backup_dir,
-                include_config=True,
-                include_tickets=True
-            )
-            self.worker.finished.connect(self.auto_backup_finalizado)
-            self.worker.start()
-        except Exception as e:
-            print(f"❌ Error iniciando backup automático: {e}")
-
-    def auto_backup_finalizado(self, success, message):
-        """Maneja la finalización del backup automático"""
-        if success:
-            print(f"✅ Backup automático completado: {message}")
-            self.cargar_backups()
-            self.limpiar_backups_antiguos()
-        else:
-            print(f"❌ Backup automático falló: {message}")
+    def configurar_auto_backup(self):
+        """Abre el diálogo de configuración de auto-backup"""
+        dialog = AutoBackupConfigDialog(self.db_manager, self)
+        if dialog.exec() == QDialog.DialogCode.Accepted and self.scheduler is not None:
+            # La próxima ejecución se calcula una sola vez con la configuración nueva
+            self.scheduler.reprogramar()
 
     def cargar_configuracion_auto_backup(self):
         """Carga la configuración de auto-backup desde la base de datos"""
         try:
             with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT clave, valor FROM configuracion 
-                    WHERE clave LIKE 'auto_backup_%'
-                """)
-                config_data = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                return {
-                    "habilitado": config_data.get("auto_backup_habilitado", "0") == "1",
-                    "hora": config_data.get("auto_backup_hora", "02:00"),
-                    "frecuencia": config_data.get("auto_backup_frecuencia", "diario"),
-                    "mantener_dias": int(config_data.get("auto_backup_mantener_dias", "7"))
-                }
+                return leer_configuracion_auto_backup(conn)
         except Exception as e:
             print(f"❌ Error cargando configuración auto-backup: {e}")
-            return {
-                "habilitado": False,
-                "hora": "02:00",
-                "frecuencia": "diario", 
-                "mantener_dias": 7
-            }
-
-    def obtener_ultimo_backup_tiempo(self):
-        """Obtiene el tiempo del último backup realizado"""
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT fecha FROM backups 
-                    ORDER BY fecha DESC LIMIT 1
-                """)
-                result = cursor.fetchone()
-                if result:
-                    return datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S")
-        except Exception as e:
-            print(f"❌ Error obteniendo último backup: {e}")
-        return None
+            return dict(CONFIG_AUTO_BACKUP_DEFECTO)
 
     def limpiar_backups_antiguos(self):
-        """Elimina backups más antiguos que los días configurados"""
+        """Vista previa de la retención configurada y, si se confirma, la aplica"""
         try:
             config = self.cargar_configuracion_auto_backup()
-            mantener_dias = config.get("mantener_dias", 7)
-            fecha_limite = datetime.now() - timedelta(days=mantener_dias)
+            plan = limpiar_backups_antiguos(self.db_path, self.backup_dir, config, simular=True)
+            a_eliminar = [(backup, motivo) for backup, conservar, motivo in plan if not conservar]
+            if not a_eliminar:
+                QMessageBox.information(self, "Retención", "No hay backups para eliminar según la política actual")
+                return
             
-            if os.path.exists(self.backup_dir):
-                eliminados = 0
-                for archivo in os.listdir(self.backup_dir):
-                    if archivo.endswith('.zip'):
-                        archivo_path = os.path.join(self.backup_dir, archivo)
-                        fecha_creacion = datetime.fromtimestamp(os.path.getctime(archivo_path))
-                        if fecha_creacion < fecha_limite:
-                            os.remove(archivo_path)
-                            eliminados += 1
-                            print(f"🗑️ Eliminado backup antiguo: {archivo}")
-                
-                if eliminados > 0:
-                    self.cargar_backups()
-                    print(f"✅ Eliminados {eliminados} backups antiguos")
-                    
+            vista = RetentionPreviewDialog(plan, self)
+            if vista.exec() == QDialog.DialogCode.Accepted:
+                limpiar_backups_antiguos(self.db_path, self.backup_dir, config)
+                self.cargar_backups()
+        except Exception as e:
+            print(f"❌ Error limpiando backups antiguos: {e}")
+            QMessageBox.critical(self, "Error", f"No se pudo aplicar la retención: {str(e)}")
+
+    def archivar_anios_cerrados(self):
+        """Confirma los años a archivar y los mueve en segundo plano"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                pendientes = anios_cerrados(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"No se pudo leer la base de datos: {str(e)}")
+            return
+        if not pendientes:
+            QMessageBox.information(self, "Archivar", "No hay años cerrados con ventas para archivar")
+            return
+        
+        detalle = "\n".join(f"   {anio}: {cantidad} ventas" for anio, cantidad in sorted(pendientes.items()))
+        respuesta = QMessageBox.question(
+            self, "Archivar Años Cerrados",
+            f"Se moverán a archive_AAAA.db las ventas de:\n\n{detalle}\n\n"
+            "Los reportes y el historial las siguen mostrando. "
+            "Se recomienda hacer un backup antes. ¿Continuar?"
+        )
+        if respuesta != QMessageBox.StandardButton.Yes:
+            return
+        
+        self.btn_archivar.setEnabled(False)
+        self.lbl_status.setText("Archivando años cerrados...")
+        self.archive_worker = ArchiveWorker(self.db_path)
+        self.archive_worker.progress.connect(self.progress_bar.setValue)
+        self.archive_worker.message.connect(self.lbl_status.setText)
+        self.archive_worker.finished.connect(self.archivado_finalizado)
+        self.archive_worker.start()
+
+    def archivado_finalizado(self, success, message):
+        self.btn_archivar.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.lbl_status.setText("Listo para realizar backup")
+        if success:
+            QMessageBox.information(self, "Éxito", message)
+        else:
+            QMessageBox.critical(self, "Error", message)
+
+    def aplicar_retencion_automatica(self):
+        """Después de cada backup: aplica la retención sin preguntar"""
+        try:
+            limpiar_backups_antiguos(self.db_path, self.backup_dir, self.cargar_configuracion_auto_backup())
+            self.cargar_backups()
         except Exception as e:
             print(f"❌ Error limpiando backups antiguos: {e}")
 
@@ -758,7 +1141,15 @@ class BackupManagerDialog(QDialog):
         
         if respuesta == QMessageBox.StandardButton.Yes:
             try:
-                os.remove(backup_path)
+                if es_snapshot(backup_path):
+                    eliminar_snapshot(backup_path)
+                else:
+                    os.remove(backup_path)
+                with self.db_manager.get_connection() as conn:
+                    for (backup_id,) in conn.execute("SELECT id FROM backups WHERE archivo_path LIKE ?",
+                                                     (f"%{backup_name}",)).fetchall():
+                        eliminar_registro(conn, backup_id)
+                    conn.commit()
                 QMessageBox.information(self, "Éxito", "Backup eliminado correctamente")
                 self.cargar_backups()
             except Exception as e:
@@ -0,0 +1,279 @@
+"""
+Restauración selectiva de backups (.zip o snapshots incrementales), sin Qt.
+
+Se elige qué restaurar (base de datos, configuración, tickets) y opcionalmente un
+rango de fechas de tickets. Cada miembro se lee en streaming del archivo directo a
+su destino: no hay carpeta temporal, y el tiempo depende de lo que se restaura,
+no del tamaño del backup.
+
+La base de datos se escribe junto a la actual (.restaurando), se valida (SHA-256
+del manifiesto y quick_check) y recién entonces reemplaza a la actual con
+os.replace. La base de datos anterior se conserva como .backup_AAAAMMDD_HHMMSS.
+
+Los .zip.enc se leen igual, descifrando cada bloque al pasar (hace falta la clave).
+"""
+import os
+import re
+import json
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime, date
+
+from backup_core import (
+    abrir_zip, copiar_base_datos, verificar_integridad, BackupInvalidoError,
+    NOMBRE_DB_BACKUP, ARCHIVOS_CONFIG, NOMBRE_MANIFIESTO, TAMANO_LECTURA
+)
+from backup_incremental import es_snapshot, leer_manifiesto, leer_chunk
+from archivo_historico import PATRON_ARCHIVO, listar_archivos
+
+COMPONENTES = {
+    "base_datos": "Base de datos",
+    "config": "Configuración (config.json, licencia.json)",
+    "tickets": "Tickets",
+    "historico": "Años archivados (archive_AAAA.db)",
+}
+# ticket_000123_2026-01-31_14-05-09.txt (ticket_generator)
+PATRON_FECHA_TICKET = re.compile(r"(\d{4}-\d{2}-\d{2})_\d{2}-\d{2}-\d{2}\.txt$")
+
+
+class Miembro:
+    """Un archivo dentro del backup; bloques() produce su contenido en streaming"""
+
+    def __init__(self, nombre, tamano, fecha, sha256, bloques):
+        self.nombre = nombre
+        self.tamano = tamano
+        self.fecha = fecha
+        self.sha256 = sha256
+        self.bloques = bloques
+
+
+def componente_de(nombre):
+    if nombre == NOMBRE_DB_BACKUP:
+        return "base_datos"
+    if nombre in ARCHIVOS_CONFIG:
+        return "config"
+    if nombre.startswith("tickets/"):
+        return "tickets"
+    if PATRON_ARCHIVO.match(nombre):
+        return "historico"
+    return None
+
+
+def fecha_ticket(miembro):
+    """Fecha del nombre del ticket; si no la trae, la fecha de modificación guardada"""
+    coincidencia = PATRON_FECHA_TICKET.search(miembro.nombre)
+    if coincidencia:
+        return datetime.strptime(coincidencia.group(1), "%Y-%m-%d").date()
+    return miembro.fecha
+
+
+def _miembros_zip(zf):
+    manifiesto = {}
+    if NOMBRE_MANIFIESTO in zf.namelist():
+        manifiesto = {entrada["nombre"]: entrada for entrada in json.loads(zf.read(NOMBRE_MANIFIESTO))["archivos"]}
+
+    def lector(nombre):
+        def bloques():
+            with zf.open(nombre) as f:
+                while True:
+                    bloque = f.read(TAMANO_LECTURA)
+                    if not bloque:
+                        return
+                    yield bloque
+        return bloques
+
+    for info in zf.infolist():
+        if info.is_dir() or info.filename == NOMBRE_MANIFIESTO:
+            continue
+        sha256 = manifiesto.get(info.filename, {}).get("sha256")
+        yield Miembro(info.filename, info.file_size, date(*info.date_time[:3]), sha256, lector(info.filename))
+
+
+def _miembros_snapshot(manifiesto_path):
+    backup_dir = os.path.dirname(os.path.abspath(manifiesto_path))
+
+    def lector(chunks):
+        def bloques():
+            for hash_chunk in chunks:
+                yield leer_chunk(backup_dir, hash_chunk)
+        return bloques
+
+    for entrada in leer_manifiesto(manifiesto_path)["archivos"]:
+        fecha = datetime.fromtimestamp(entrada["mtime_ns"] / 1e9).date() if entrada.get("mtime_ns") else None
+        yield Miembro(entrada["nombre"], entrada["tamano"], fecha, entrada.get("sha256"), lector(entrada["chunks"]))
+
+
+def seleccionar(miembros, componentes, tickets_desde=None, tickets_hasta=None):
+    """Filtra por componente y, para los tickets, por rango de fechas (date, inclusivo)"""
+    seleccion = []
+    for miembro in miembros:
+        componente = componente_de(miembro.nombre)
+        if componente not in componentes:
+            continue
+        if componente == "tickets" and (tickets_desde or tickets_hasta):
+            fecha = fecha_ticket(miembro)
+            if fecha is None or (tickets_desde and fecha < tickets_desde) or (tickets_hasta and fecha > tickets_hasta):
+                continue
+        seleccion.append(miembro)
+    return seleccion
+
+
+def _ruta_destino(app_dir, nombre):
+    """Ruta dentro de app_dir; rechaza nombres que intenten salir de la carpeta"""
+    raiz = os.path.abspath(app_dir)
+    ruta = os.path.abspath(os.path.join(raiz, *nombre.split("/")))
+    if os.path.commonpath([raiz, ruta]) != raiz:
+        raise BackupInvalidoError(f"Ruta no permitida en el backup: {nombre}")
+    return ruta
+
+
+def _volcar(miembro, destino, avance):
+    """Escribe el miembro en destino verificando tamaño y SHA-256 (si el manifiesto lo trae)"""
+    sha, escritos = hashlib.sha256(), 0
+    with open(destino, "wb") as f:
+        for bloque in miembro.bloques():
+            sha.update(bloque)
+            f.write(bloque)
+            escritos += len(bloque)
+            avance(len(bloque))
+    if escritos != miembro.tamano:
+        raise BackupInvalidoError(f"{miembro.nombre}: {escritos} bytes, se esperaban {miembro.tamano}")
+    if miembro.sha256 and sha.hexdigest() != miembro.sha256:
+        raise BackupInvalidoError(f"{miembro.nombre}: SHA-256 distinto al del manifiesto")
+
+
+def _reemplazar_base_datos(nueva, db_path):
+    """Cambia la base de datos por la restaurada en un solo paso"""
+    if os.path.exists(db_path):
+        respaldo = f"{db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            copiar_base_datos(db_path, respaldo)
+        except (BackupInvalidoError, sqlite3.DatabaseError) as e:
+            # Justo cuando se restaura porque la base de datos está dañada: se guarda tal cual
+            print(f"⚠️ La base de datos actual no pasa la verificación ({e}); se guarda sin validar")
+            shutil.copy2(db_path, respaldo)
+        print(f"💾 Base de datos anterior guardada en {respaldo}")
+
+    # Con un journal pendiente SQLite lo aplicaría sobre el archivo nuevo: mejor copiar
+    # dentro de la base de datos con la API de backup, que también es una sola transacción
+    hay_journal = any(os.path.exists(db_path + sufijo) for sufijo in ("-journal", "-wal"))
+    if not hay_journal:
+        try:
+            os.replace(nueva, db_path)
+            return
+        except PermissionError:
+            # Windows no deja renombrar sobre un archivo abierto por otra conexión
+            print("⚠️ Base de datos en uso: se restaura con la API de backup de SQLite")
+    copiar_base_datos(nueva, db_path, paginas=-1, pausa=0)
+    os.remove(nueva)
+
+
+def apartar_archivos_duplicados(db_path, nombres_backup):
+    """Después de restaurar la base de datos: aparta los archive_AAAA.db que duplicarían ventas.
+
+    Un backup anterior al archivado trae esas ventas en la propia base de datos; si el
+    archivo sigue ahí, los reportes las contarían dos veces. Se aparta (renombrado, no
+    borrado) el archivo que no viene en el backup o cuyas ventas del año siguen en la
+    base de datos restaurada.
+    Retorna las rutas apartadas.
+    """
+    apartados = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for anio, ruta in listar_archivos(db_path).items():
+            en_vivo = False
+            if os.path.basename(ruta) in nombres_backup:
+                # Por id y no solo por año: las ventas de un turno abierto al archivar quedan en vivo a propósito
+                conn.execute("ATTACH DATABASE ? AS revisar", (ruta,))
+                try:
+                    en_vivo = conn.execute('''
+                        SELECT 1 FROM main.ventas
+                        WHERE fecha >= ? AND fecha < ? AND id IN (SELECT id FROM revisar.ventas)
+                        LIMIT 1
+                    ''', (f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01")).fetchone() is not None
+                finally:
+                    conn.execute("DETACH DATABASE revisar")
+                if not en_vivo:
+                    continue
+            apartado = f"{ruta}.apartado_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            os.replace(ruta, apartado)
+            apartados.append(apartado)
+            print(f"⚠️ {os.path.basename(ruta)} no corresponde a la base de datos restaurada; apartado en {apartado}")
+    finally:
+        conn.close()
+    return apartados
+
+
+def restaurar(backup_path, db_path, app_dir, componentes=None, tickets_desde=None, tickets_hasta=None,
+              progreso=None, mensaje=None, clave=None):
+    """Restaura solo lo pedido; retorna {componente: archivos restaurados}.
+
+    La base de datos va primero: si no pasa la validación no se toca nada más.
+    progreso(porcentaje 0-100) según los bytes de lo seleccionado.
+    clave: la de backup_cifrado, solo para backups .zip.enc.
+    """
+    componentes = set(componentes or COMPONENTES)
+    avisar = mensaje or (lambda texto: None)
+    avanzar = progreso or (lambda porcentaje: None)
+
+    zf = None
+    if es_snapshot(backup_path):
+        miembros = _miembros_snapshot(backup_path)
+    else:
+        zf = abrir_zip(backup_path, clave)
+        miembros = _miembros_zip(zf)
+
+    try:
+        seleccion = seleccionar(miembros, componentes, tickets_desde, tickets_hasta)
+        seleccion.sort(key=lambda miembro: componente_de(miembro.nombre) != "base_datos")
+        total_bytes = sum(miembro.tamano for miembro in seleccion) or 1
+        procesados = [0]
+
+        def avance(cantidad):
+            procesados[0] += cantidad
+            avanzar(int(100 * procesados[0] / total_bytes))
+
+        resumen = {componente: 0 for componente in componentes}
+        for miembro in seleccion:
+            componente = componente_de(miembro.nombre)
+            if componente == "base_datos":
+                avisar("Restaurando base de datos...")
+                nueva = f"{db_path}.restaurando"
+                try:
+                    _volcar(miembro, nueva, avance)
+                    problemas = verificar_integridad(nueva)
+                    if problemas:
+                        raise BackupInvalidoError(f"La base de datos del backup está dañada: {'; '.join(problemas[:5])}")
+                    _reemplazar_base_datos(nueva, db_path)
+                finally:
+                    if os.path.exists(nueva):
+                        os.remove(nueva)
+            else:
+                if resumen[componente] == 0:
+                    avisar({"config": "Restaurando configuración...", "tickets": "Restaurando tickets...",
+                            "historico": "Restaurando años archivados..."}[componente])
+                # Los años archivados van junto a la base de datos, igual que al archivarlos
+                raiz = os.path.dirname(os.path.abspath(db_path)) if componente == "historico" else app_dir
+                destino = _ruta_destino(raiz, miembro.nombre)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                temporal = f"{destino}.restaurando"
+                try:
+                    _volcar(miembro, temporal, avance)
+                    if componente == "historico":
+                        problemas = verificar_integridad(temporal)
+                        if problemas:
+                            raise BackupInvalidoError(f"{miembro.nombre} del backup está dañado: {'; '.join(problemas[:5])}")
+                    os.replace(temporal, destino)
+                finally:
+                    if os.path.exists(temporal):
+                        os.remove(temporal)
+            resumen[componente] += 1
+        if resumen.get("base_datos"):
+            apartar_archivos_duplicados(db_path, {miembro.nombre for miembro in miembros})
+        avanzar(100)
+        print(f"✅ Restauración selectiva: {resumen}")
+        return resumen
+    finally:
+        if zf is not None:
+            zf.close()
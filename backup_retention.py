@@ -0,0 +1,162 @@
+"""
+Retención de backups abuelo-padre-hijo (GFS), a partir de la tabla backups.
+
+Se conserva el backup más reciente de cada uno de los últimos N días, M semanas
+y K meses (un mismo backup puede cubrir varios), más el último de todos. Si se
+define un tope en MB, después se descartan los más antiguos de los conservados
+hasta quedar por debajo. La fecha sale de la tabla, no de os.path.getctime, que
+cambia al copiar o restaurar archivos.
+
+plan_retencion() solo calcula (vista previa); aplicar_retencion() borra.
+"""
+import os
+import re
+from datetime import datetime
+
+from backup_incremental import es_snapshot, leer_manifiesto, recolectar_chunks
+
+POLITICA_DEFECTO = {"diarios": 7, "semanales": 4, "mensuales": 12, "max_mb": 0}
+PATRON_NOMBRE = re.compile(r"^(?:backup|incremental)_(\d{8}_\d{6})\.(?:zip|zip\.enc|json)$")
+
+
+def _ruta_actual(ruta, backup_dir):
+    """La ruta registrada, o la del mismo archivo en backup_dir si la carpeta se movió"""
+    if os.path.exists(ruta):
+        return ruta
+    candidata = os.path.join(backup_dir, os.path.basename(ruta))
+    return candidata if os.path.exists(candidata) else None
+
+
+def tamano_backup_mb(ruta):
+    """MB que ocupa el backup; para un snapshot, los datos nuevos que aportó"""
+    if es_snapshot(ruta):
+        return leer_manifiesto(ruta).get("bytes_nuevos", 0) / (1024 * 1024)
+    return os.path.getsize(ruta) / (1024 * 1024)
+
+
+def registrar_existentes(conn, backup_dir):
+    """Agrega a la tabla los backups de la carpeta que no estén registrados (anteriores a
+    la tabla o copiados a mano); la fecha sale del nombre del archivo. Retorna cuántos."""
+    if not os.path.isdir(backup_dir):
+        return 0
+    registrados = {os.path.basename(ruta) for (ruta,) in conn.execute("SELECT archivo_path FROM backups")}
+    agregados = 0
+    for nombre in sorted(os.listdir(backup_dir)):
+        coincidencia = PATRON_NOMBRE.match(nombre)
+        if not coincidencia or nombre in registrados:
+            continue
+        ruta = os.path.join(backup_dir, nombre)
+        fecha = datetime.strptime(coincidencia.group(1), "%Y%m%d_%H%M%S")
+        try:
+            tamano = tamano_backup_mb(ruta)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer {nombre}: {e}")
+            continue
+        # La tabla guarda UTC (CURRENT_TIMESTAMP)
+        conn.execute(
+            "INSERT INTO backups (fecha, archivo_path, tamaño, tipo) VALUES (datetime(?, 'utc'), ?, ?, 'importado')",
+            (fecha.strftime("%Y-%m-%d %H:%M:%S"), ruta, tamano)
+        )
+        agregados += 1
+    if agregados:
+        conn.commit()
+        print(f"📋 {agregados} backups existentes agregados a la tabla backups")
+    return agregados
+
+
+def leer_backups(conn, backup_dir):
+    """Backups registrados, del más reciente al más antiguo"""
+    backups = []
+    for backup_id, fecha, ruta, tamano, tipo in conn.execute(
+            "SELECT id, datetime(fecha, 'localtime'), archivo_path, tamaño, tipo FROM backups "
+            "ORDER BY fecha DESC, id DESC"):
+        backups.append({
+            "id": backup_id,
+            "fecha": datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S") if fecha else datetime.min,
+            "ruta": _ruta_actual(ruta, backup_dir),
+            "ruta_registrada": ruta,
+            "tamano_mb": tamano or 0,
+            "tipo": tipo,
+        })
+    return backups
+
+
+def plan_retencion(backups, politica=None):
+    """Decide qué conservar; retorna [(backup, conservar, motivo)] en el mismo orden"""
+    politica = dict(POLITICA_DEFECTO, **(politica or {}))
+    existentes = [b for b in backups if b["ruta"]]
+    niveles = [
+        ("diario", politica["diarios"], lambda f: f.strftime("%Y-%m-%d")),
+        ("semanal", politica["semanales"], lambda f: "%d-S%02d" % f.isocalendar()[:2]),
+        ("mensual", politica["mensuales"], lambda f: f.strftime("%Y-%m")),
+    ]
+    motivos = {}
+    if existentes:
+        motivos[existentes[0]["id"]] = ["el más reciente"]
+    for nombre, cantidad, clave in niveles:
+        periodos = set()
+        for backup in existentes:
+            periodo = clave(backup["fecha"])
+            if periodo in periodos:
+                continue
+            if len(periodos) >= cantidad:
+                break
+            periodos.add(periodo)
+            motivos.setdefault(backup["id"], []).append(f"{nombre} {periodo}")
+
+    # Tope de tamaño: se sueltan los más antiguos de los conservados (nunca el más reciente)
+    excedidos = set()
+    if politica["max_mb"]:
+        conservados = [b for b in existentes if b["id"] in motivos]
+        total = sum(b["tamano_mb"] for b in conservados)
+        for backup in reversed(conservados[1:]):
+            if total <= politica["max_mb"]:
+                break
+            excedidos.add(backup["id"])
+            total -= backup["tamano_mb"]
+
+    plan = []
+    for backup in backups:
+        if not backup["ruta"]:
+            plan.append((backup, False, "el archivo ya no existe (se quita el registro)"))
+        elif backup["id"] in excedidos:
+            plan.append((backup, False, f"excede el tope de {politica['max_mb']} MB"))
+        elif backup["id"] in motivos:
+            plan.append((backup, True, ", ".join(motivos[backup["id"]])))
+        else:
+            plan.append((backup, False, "fuera de la política"))
+    return plan
+
+
+def eliminar_registro(conn, backup_id):
+    conn.execute("DELETE FROM backups WHERE id = ?", (backup_id,))
+
+
+def aplicar_retencion(conn, backup_dir, politica=None, simular=False):
+    """Calcula el plan y, si no es simulación, borra archivos y registros; retorna el plan"""
+    registrar_existentes(conn, backup_dir)
+    plan = plan_retencion(leer_backups(conn, backup_dir), politica)
+    if simular:
+        return plan
+
+    eliminados = snapshots_eliminados = 0
+    for backup, conservar, motivo in plan:
+        if conservar:
+            continue
+        try:
+            if backup["ruta"]:
+                os.remove(backup["ruta"])
+                eliminados += 1
+                snapshots_eliminados += es_snapshot(backup["ruta"])
+                print(f"🗑️ Backup eliminado ({motivo}): {os.path.basename(backup['ruta'])}")
+            eliminar_registro(conn, backup["id"])
+        except OSError as e:
+            print(f"❌ No se pudo eliminar {backup['ruta']}: {e}")
+    conn.commit()
+
+    # Los chunks que ya no usa ningún snapshot se liberan una sola vez al final
+    if snapshots_eliminados:
+        recolectar_chunks(backup_dir)
+    if eliminados:
+        print(f"✅ Retención aplicada: {eliminados} backups eliminados")
+    return plan
@@ -0,0 +1,215 @@
+"""
+Programador de backups automáticos que vive mientras la aplicación está abierta.
+
+No revisa la hora cada minuto: calcula una sola vez la próxima ejecución
+(diaria, semanal o cada hora, saltando las horas de silencio) y arma un QTimer
+de un solo disparo. Al iniciar recupera el backup que se haya perdido con la
+aplicación cerrada, y si en ese momento hay ventas en curso lo pospone hasta
+que la caja quede libre unos minutos.
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QTimer
+
+from paths import get_app_directory, get_backups_directory, ensure_directory_exists
+from backup_manager import (
+    BackupWorker, VerifyWorker, leer_configuracion_auto_backup, limpiar_backups_antiguos,
+    listar_backups_recientes, CONFIG_AUTO_BACKUP_DEFECTO
+)
+
+RETRASO_RECUPERACION = timedelta(minutes=2)   # no competir con el arranque de la aplicación
+INACTIVIDAD_MINIMA = timedelta(minutes=3)     # sin ventas durante este tiempo = caja libre
+ESPERA_MAXIMA = timedelta(hours=1)            # después de esto el backup se hace igual
+VERIFICACION_CADA_MS = 6 * 3600 * 1000
+
+
+def _hora_minuto(texto):
+    horas, minutos = (int(x) for x in texto.split(":"))
+    return horas, minutos
+
+
+def ultima_programada(config, ahora):
+    """Última hora programada que ya pasó (<= ahora)"""
+    horas, minutos = _hora_minuto(config["hora"])
+    if config["frecuencia"] == "cada hora":
+        momento = ahora.replace(minute=minutos, second=0, microsecond=0)
+        return momento if momento <= ahora else momento - timedelta(hours=1)
+    momento = ahora.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    if config["frecuencia"] == "semanal":
+        momento -= timedelta(days=(momento.weekday() - config["dia_semana"]) % 7)
+        return momento if momento <= ahora else momento - timedelta(days=7)
+    return momento if momento <= ahora else momento - timedelta(days=1)
+
+
+def proxima_programada(config, ahora):
+    """Próxima hora programada (> ahora), sin considerar las horas de silencio"""
+    paso = {"cada hora": timedelta(hours=1), "semanal": timedelta(days=7)}.get(config["frecuencia"], timedelta(days=1))
+    return ultima_programada(config, ahora) + paso
+
+
+def fin_silencio(config, momento):
+    """Si momento cae en las horas de silencio, cuándo terminan; si no, None"""
+    if not (config["silencio_desde"] and config["silencio_hasta"]):
+        return None
+    horas, minutos = _hora_minuto(config["silencio_desde"])
+    inicio = momento.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    horas, minutos = _hora_minuto(config["silencio_hasta"])
+    fin = momento.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    if inicio < fin:
+        return fin if inicio <= momento < fin else None
+    # Cruza la medianoche (p. ej. 22:00 - 06:00)
+    if momento >= inicio:
+        return fin + timedelta(days=1)
+    return fin if momento < fin else None
+
+
+def fuera_de_silencio(config, momento):
+    return fin_silencio(config, momento) or momento
+
+
+def leer_ultimo_backup(conn):
+    """Fecha local del último backup registrado (la tabla guarda CURRENT_TIMESTAMP en UTC)"""
+    try:
+        fila = conn.execute("SELECT MAX(datetime(fecha, 'localtime')) FROM backups").fetchone()
+    except sqlite3.Error:
+        return None
+    return datetime.strptime(fila[0], "%Y-%m-%d %H:%M:%S") if fila and fila[0] else None
+
+
+class BackupScheduler(QObject):
+    """Backups automáticos y verificación periódica, independientes del diálogo de backups"""
+
+    def __init__(self, db_path=None, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path or os.path.join(get_app_directory(), "caja_registradora.db")
+        self.backup_dir = ensure_directory_exists(get_backups_directory())
+        self.config = dict(CONFIG_AUTO_BACKUP_DEFECTO)
+        self.worker = None
+        self.verify_worker = None
+        self.ultima_actividad = None
+        self.pospuesto_desde = None
+        self.proxima = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._al_disparar)
+
+        self.timer_verificacion = QTimer(self)
+        self.timer_verificacion.timeout.connect(self.verificar_recientes)
+
+    def _cargar_configuracion(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                self.config = leer_configuracion_auto_backup(conn)
+                ultimo = leer_ultimo_backup(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"❌ Error cargando configuración auto-backup: {e}")
+            self.config, ultimo = dict(CONFIG_AUTO_BACKUP_DEFECTO), None
+        return ultimo
+
+    def iniciar(self):
+        """Programa el siguiente backup y recupera el perdido si la aplicación estaba cerrada"""
+        ultimo = self._cargar_configuracion()
+        self.timer_verificacion.start(VERIFICACION_CADA_MS)
+        if not self.config["habilitado"]:
+            return
+        try:
+            ahora = datetime.now()
+            pendiente = ultima_programada(self.config, ahora)
+            # Solo se recupera el último backup pendiente, no todos los atrasados
+            if ultimo is None or ultimo < pendiente:
+                print(f"⏰ Backup del {pendiente.strftime('%Y-%m-%d %H:%M')} pendiente, se hará en breve")
+                self._armar(fuera_de_silencio(self.config, ahora + RETRASO_RECUPERACION))
+                return
+        except Exception as e:
+            print(f"❌ Error recuperando backup pendiente: {e}")
+        self.reprogramar(recargar=False)
+
+    def reprogramar(self, recargar=True):
+        """Calcula una sola vez la próxima ejecución y arma el temporizador"""
+        self.timer.stop()
+        if recargar:
+            self._cargar_configuracion()
+        if not self.config["habilitado"]:
+            print("⏰ Backup automático deshabilitado")
+            return
+        try:
+            ahora = datetime.now()
+            self._armar(fuera_de_silencio(self.config, proxima_programada(self.config, ahora)))
+        except Exception as e:
+            print(f"❌ Hora de backup automático inválida ({self.config['hora']}): {e}")
+
+    def _armar(self, momento):
+        self.proxima = momento
+        espera = max(0, int((momento - datetime.now()).total_seconds() * 1000))
+        self.timer.start(espera + 1000)
+        print(f"⏰ Backup automático programado para {momento.strftime('%Y-%m-%d %H:%M')}")
+
+    def registrar_actividad(self):
+        """Lo llama la caja al agregar productos o cobrar: el backup espera a que se calme"""
+        self.ultima_actividad = datetime.now()
+
+    def _al_disparar(self):
+        ahora = datetime.now()
+        # ✅ SI HAY VENTAS EN CURSO SE POSPONE (HASTA ESPERA_MAXIMA)
+        if self.ultima_actividad and ahora - self.ultima_actividad < INACTIVIDAD_MINIMA:
+            self.pospuesto_desde = self.pospuesto_desde or ahora
+            if ahora - self.pospuesto_desde < ESPERA_MAXIMA:
+                print("⏳ Backup pospuesto: hay ventas en curso")
+                self._armar(self.ultima_actividad + INACTIVIDAD_MINIMA)
+                return
+        self.pospuesto_desde = None
+        self.ejecutar()
+        self.reprogramar(recargar=False)
+
+    def ejecutar(self):
+        """Backup automático en segundo plano con la configuración guardada"""
+        if self.worker is not None and self.worker.isRunning():
+            print("⚠️ Backup automático en proceso, se omite esta ejecución")
+            return False
+        print("🔄 Iniciando backup automático...")
+        self.worker = BackupWorker(
+            self.db_path,
+            self.backup_dir,
+            include_config=True,
+            include_tickets=True,
+            nivel_compresion=self.config["nivel_compresion"],
+            incremental=self.config["incremental"],
+            tipo="automático",
+            cifrar=self.config["cifrado"]
+        )
+        self.worker.finished.connect(self._al_terminar)
+        self.worker.start()
+        return True
+
+    def _al_terminar(self, exito, mensaje):
+        if exito:
+            print(f"✅ Backup automático completado: {mensaje}")
+            try:
+                limpiar_backups_antiguos(self.db_path, self.backup_dir, self.config)
+            except Exception as e:
+                print(f"❌ Error limpiando backups antiguos: {e}")
+            self.verificar_recientes()
+        else:
+            print(f"❌ Backup automático falló: {mensaje}")
+
+    def verificar_recientes(self):
+        """Verifica los últimos N backups (SHA-256 y tamaños) sin bloquear la caja"""
+        cantidad = self.config["verificar_ultimos"]
+        if cantidad <= 0 or (self.verify_worker is not None and self.verify_worker.isRunning()):
+            return
+        backups = listar_backups_recientes(self.backup_dir, cantidad)
+        if backups:
+            self.verify_worker = VerifyWorker(backups)
+            self.verify_worker.start()
+
+    def detener(self):
+        self.timer.stop()
+        self.timer_verificacion.stop()
+        for worker in (self.worker, self.verify_worker):
+            if worker is not None:
+                worker.wait(5000)
@@ -0,0 +1,107 @@
+"""
+Benchmark: base de datos principal antes y después de archivar los años cerrados.
+
+Crea una base de datos temporal con N ventas por año (y 3 renglones de detalle
+cada una) y mide, antes y después de archivo_historico.archivar_anios_cerrados:
+
+  - Tamaño del archivo principal.
+  - Totales del día (la consulta de caja_registradora, con DATE(fecha): recorre ventas).
+  - PRAGMA quick_check (lo que hacen el backup y la verificación).
+  - Un reporte de un año archivado con conectar_historico (ATTACH mode=ro).
+
+Uso:
+    python benchmarks/bench_archivo_historico.py --anios 5 --ventas 200000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_historico import archivar_anios_cerrados, conectar_historico
+
+
+def crear_db(ruta, anios, ventas_por_anio):
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE cierres_caja (id INTEGER PRIMARY KEY, estado TEXT);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, fecha TIMESTAMP, total REAL, iva REAL,
+                             metodo_pago TEXT, usuario_id INTEGER, estado TEXT, cierre_id INTEGER);
+        CREATE TABLE detalle_ventas (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+                                     cantidad INTEGER, precio_unitario REAL, subtotal REAL);
+        CREATE INDEX idx_ventas_fecha ON ventas (fecha, id);
+        CREATE INDEX idx_detalle_ventas_venta ON detalle_ventas (venta_id);
+    """)
+    rnd = random.Random(7)
+    primer_anio = datetime.now().year - anios + 1
+    for anio in range(primer_anio, primer_anio + anios):
+        inicio = datetime(anio, 1, 1)
+        fechas = sorted(inicio + timedelta(seconds=rnd.randrange(365 * 86400)) for _ in range(ventas_por_anio))
+        for fecha in fechas:
+            total = round(rnd.uniform(10, 2000), 2)
+            cursor = conn.execute(
+                "INSERT INTO ventas (fecha, total, iva, metodo_pago, usuario_id, estado) VALUES (?, ?, ?, ?, 1, 'completada')",
+                (fecha.strftime("%Y-%m-%d %H:%M:%S"), total, round(total * 0.16, 2), rnd.choice(["Efectivo", "Tarjeta"])))
+            conn.executemany(
+                "INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) VALUES (?, ?, 1, ?, ?)",
+                [(cursor.lastrowid, rnd.randrange(1, 500), total / 3, total / 3)] * 3)
+        conn.commit()
+    conn.close()
+    return primer_anio
+
+
+def medir(ruta, anio_archivado):
+    conn = sqlite3.connect(ruta)
+    try:
+        inicio = time.perf_counter()
+        conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventas
+            WHERE DATE(fecha) = DATE(?) AND estado = 'completada'
+        """, (datetime.now().strftime("%Y-%m-%d"),)).fetchone()
+        dia = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        conn.execute("PRAGMA quick_check").fetchall()
+        chequeo = time.perf_counter() - inicio
+    finally:
+        conn.close()
+
+    desde, hasta = f"{anio_archivado}-01-01", f"{anio_archivado}-12-31 23:59:59"
+    inicio = time.perf_counter()
+    conn = conectar_historico(ruta, desde, hasta)
+    try:
+        conn.execute("SELECT COUNT(*), SUM(total) FROM ventas WHERE fecha BETWEEN ? AND ?", (desde, hasta)).fetchone()
+    finally:
+        conn.close()
+    reporte = time.perf_counter() - inicio
+    tamano = os.path.getsize(ruta) / 1024 / 1024
+    print(f"   tamaño {tamano:8.1f} MB   totales del día {dia * 1000:8.1f} ms   "
+          f"quick_check {chequeo * 1000:8.1f} ms   reporte {anio_archivado} {reporte * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del archivado de años cerrados")
+    parser.add_argument("--anios", type=int, default=5, help="Años de historial (el último es el actual)")
+    parser.add_argument("--ventas", type=int, default=100000, help="Ventas por año")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "caja_registradora.db")
+        print(f"🔄 Creando {args.anios} años x {args.ventas} ventas...")
+        primer_anio = crear_db(ruta, args.anios, args.ventas)
+
+        print("Antes de archivar:")
+        medir(ruta, primer_anio)
+        inicio = time.perf_counter()
+        resumen = archivar_anios_cerrados(ruta)
+        print(f"🗄️ Archivado de {len(resumen)} años en {time.perf_counter() - inicio:.1f} s")
+        print("Después de archivar:")
+        medir(ruta, primer_anio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: tiempo y memoria pico al cifrar y descifrar un backup.
+
+  - Fernet:  lo que usa SecurityManager; cifra el archivo completo en memoria
+             (más la copia en base64 del resultado).
+  - Bloques: backup_cifrado (AES-256-GCM por bloques de 64 KB) en streaming.
+
+La memoria pico sale de tracemalloc (solo lo que reserva Python).
+
+Uso:
+    python benchmarks/bench_backup_cifrado.py --mb 200
+    python benchmarks/bench_backup_cifrado.py --mb 50 --sin-fernet
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup_cifrado import cifrar_archivo, descifrar_archivo, TAMANO_BLOQUE
+
+
+def fernet_cifrar(origen, destino, clave):
+    with open(origen, "rb") as f:
+        datos = f.read()
+    with open(destino, "wb") as f:
+        f.write(Fernet(clave).encrypt(datos))
+
+
+def fernet_descifrar(origen, destino, clave):
+    with open(origen, "rb") as f:
+        datos = f.read()
+    with open(destino, "wb") as f:
+        f.write(Fernet(clave).decrypt(datos))
+
+
+def medir(nombre, funcion, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion(*args)
+    duracion = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    print(f"{nombre:<22} {duracion:7.2f} s   memoria pico {pico:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cifrado de backups: Fernet vs bloques AES-GCM")
+    parser.add_argument("--mb", type=int, default=200, help="Tamaño del archivo a cifrar")
+    parser.add_argument("--sin-fernet", action="store_true", help="No medir Fernet (necesita varias veces --mb de RAM)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        origen = os.path.join(carpeta, "backup.zip")
+        with open(origen, "wb") as f:
+            for _ in range(args.mb * 1024 * 1024 // TAMANO_BLOQUE):
+                f.write(os.urandom(TAMANO_BLOQUE))
+        print(f"🔄 Archivo de {args.mb} MB")
+
+        if not args.sin_fernet:
+            clave_fernet = Fernet.generate_key()
+            medir("Fernet cifrar", fernet_cifrar, origen, origen + ".fernet", clave_fernet)
+            medir("Fernet descifrar", fernet_descifrar, origen + ".fernet", origen + ".fernet.zip", clave_fernet)
+
+        clave = AESGCM.generate_key(bit_length=256)
+        medir("Bloques cifrar", cifrar_archivo, origen, origen + ".enc", clave)
+        medir("Bloques descifrar", descifrar_archivo, origen + ".enc", origen + ".enc.zip", clave)
+
+
+if __name__ == "__main__":
+    main()
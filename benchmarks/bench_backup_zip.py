@@ -0,0 +1,130 @@
+"""
+Benchmark: tiempo y bytes escritos a disco del backup en .zip.
+
+Crea una carpeta de aplicación temporal con una base de datos de N ventas,
+config.json, licencia.json y M tickets .txt, y genera el respaldo con:
+
+  - Anterior:  copia todo a backup_{timestamp}/, shutil.make_archive lo vuelve a
+               leer para comprimirlo y shutil.rmtree borra la carpeta.
+  - Streaming: backup_core.escribir_backup_zip escribe el .zip directo desde los
+               originales (solo la base de datos pasa por un temporal).
+
+Los bytes escritos salen de /proc/self/io (Linux): write_bytes es lo que llega al
+disco y wchar lo que el proceso pidió escribir. En otros sistemas se muestra "n/d".
+
+Uso:
+    python benchmarks/bench_backup_zip.py --ventas 500000 --tickets 20000
+    python benchmarks/bench_backup_zip.py --nivel 1
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup_core import archivos_backup, copiar_base_datos, escribir_backup_zip, NIVEL_COMPRESION
+
+
+def contadores_io():
+    """(write_bytes, wchar) del proceso; None si el sistema no los expone"""
+    try:
+        with open("/proc/self/io") as f:
+            valores = dict(linea.split(":") for linea in f)
+        return int(valores["write_bytes"]), int(valores["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def crear_app(carpeta, ventas, tickets):
+    conn = sqlite3.connect(os.path.join(carpeta, "caja_registradora.db"))
+    conn.executescript("""
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, fecha TIMESTAMP, total REAL, metodo_pago TEXT);
+        CREATE TABLE backups (id INTEGER PRIMARY KEY, fecha TIMESTAMP, archivo_path TEXT, tamaño REAL, tipo TEXT);
+    """)
+    rnd = random.Random(7)
+    conn.executemany("INSERT INTO ventas (fecha, total, metodo_pago) VALUES (?, ?, ?)",
+                     ((f"2026-01-{1 + i % 28:02d} 12:00:00", round(rnd.uniform(10, 2000), 2),
+                       rnd.choice(["efectivo", "tarjeta"])) for i in range(ventas)))
+    conn.commit()
+    conn.close()
+
+    for nombre in ("config.json", "licencia.json"):
+        with open(os.path.join(carpeta, nombre), "w") as f:
+            f.write('{"demo": true}')
+
+    tickets_dir = os.path.join(carpeta, "tickets")
+    os.makedirs(tickets_dir)
+    for i in range(tickets):
+        with open(os.path.join(tickets_dir, f"ticket_{i:06d}.txt"), "w") as f:
+            f.write(f"TICKET #{i}\n" + "".join(f"Producto {j:3d}    1 x ${rnd.uniform(1, 99):8.2f}\n" for j in range(20)))
+
+
+def backup_anterior(app_dir, destino, nivel):
+    """Flujo anterior: carpeta temporal + make_archive + rmtree (make_archive usa siempre el nivel por defecto)"""
+    backup_path = os.path.join(destino, "backup_anterior")
+    os.makedirs(backup_path)
+    copiar_base_datos(os.path.join(app_dir, "caja_registradora.db"), os.path.join(backup_path, "caja_registradora.db"))
+    for nombre in ("config.json", "licencia.json"):
+        shutil.copy2(os.path.join(app_dir, nombre), backup_path)
+    shutil.copytree(os.path.join(app_dir, "tickets"), os.path.join(backup_path, "tickets"))
+    zip_path = shutil.make_archive(backup_path, "zip", backup_path)
+    shutil.rmtree(backup_path)
+    return zip_path
+
+
+def backup_streaming(app_dir, destino, nivel):
+    zip_path = os.path.join(destino, "backup_streaming.zip")
+    return escribir_backup_zip(zip_path, os.path.join(app_dir, "caja_registradora.db"),
+                               archivos_backup(app_dir), nivel)
+
+
+def medir(nombre, funcion, *args):
+    antes = contadores_io()
+    inicio = time.perf_counter()
+    zip_path = funcion(*args)
+    # Los bytes se cuentan al llegar al disco: sincronizar para no perder lo que quedó en caché
+    if hasattr(os, "sync"):
+        os.sync()
+    duracion = time.perf_counter() - inicio
+    despues = contadores_io()
+    tamano = os.path.getsize(zip_path) / 1024 / 1024
+    if antes and despues:
+        disco = (despues[0] - antes[0]) / 1024 / 1024
+        logico = (despues[1] - antes[1]) / 1024 / 1024
+        io = f"escritos a disco {disco:8.1f} MB   escritos (lógico) {logico:8.1f} MB"
+    else:
+        io = "escritos n/d"
+    print(f"{nombre:<10} {duracion:7.2f} s   zip {tamano:7.1f} MB   {io}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backup en .zip: carpeta temporal vs streaming")
+    parser.add_argument("--ventas", type=int, default=500000)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--nivel", type=int, default=NIVEL_COMPRESION, choices=range(10),
+                        help="Nivel de compresión del modo streaming")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        app_dir = os.path.join(carpeta, "app")
+        destino = os.path.join(carpeta, "Backups")
+        os.makedirs(app_dir)
+        os.makedirs(destino)
+        print(f"🔄 Creando {args.ventas} ventas y {args.tickets} tickets...")
+        crear_app(app_dir, args.ventas, args.tickets)
+        tamano_db = os.path.getsize(os.path.join(app_dir, "caja_registradora.db")) / 1024 / 1024
+        print(f"   Base de datos {tamano_db:.1f} MB")
+        if hasattr(os, "sync"):
+            os.sync()
+
+        medir("Anterior", backup_anterior, app_dir, destino, args.nivel)
+        medir("Streaming", backup_streaming, app_dir, destino, args.nivel)
+
+
+if __name__ == "__main__":
+    main()
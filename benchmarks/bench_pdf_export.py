@@ -0,0 +1,129 @@
+"""
+Benchmark: memoria pico y tiempo de la exportación de ventas a PDF en streaming.
+
+Crea una base de datos temporal con N ventas y exporta el reporte completo con
+pdf_export.exportar_pdf. Cada 100,000 filas imprime la memoria máxima del proceso
+(ru_maxrss): si la exportación está acotada, el valor deja de crecer después del
+primer volumen. Con --tracemalloc mide además las asignaciones de Python (mucho
+más lento). Con --comparar mide el método anterior (fetchall + una sola tabla +
+doc.build), que solo conviene con pocas filas: su tiempo y memoria crecen con el total.
+
+Uso:
+    python benchmarks/bench_pdf_export.py --filas 1000000
+    python benchmarks/bench_pdf_export.py --filas 50000 --comparar
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_export import exportar_pdf, FILAS_POR_BLOQUE, FILAS_POR_ARCHIVO, REPORTES
+
+
+def crear_base(ruta, filas):
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE usuarios (id INTEGER PRIMARY KEY, nombre TEXT);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, fecha TIMESTAMP, total REAL,
+                             metodo_pago TEXT, usuario_id INTEGER);
+        CREATE INDEX idx_ventas_fecha ON ventas (fecha, id);
+    """)
+    conn.executemany("INSERT INTO usuarios VALUES (?, ?)", [(i, f"Cajero {i}") for i in range(1, 6)])
+    rnd = random.Random(7)
+    metodos = ["efectivo", "tarjeta", "transferencia"]
+    base = 1735689600  # 2025-01-01
+    paso = 365 * 86400 / max(filas, 1)
+
+    def generar():
+        for i in range(filas):
+            yield (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + int(i * paso))),
+                   round(rnd.uniform(10, 2000), 2), rnd.choice(metodos), rnd.randint(1, 5))
+    conn.executemany("INSERT INTO ventas (fecha, total, metodo_pago, usuario_id) VALUES (?, ?, ?, ?)", generar())
+    conn.commit()
+    return conn
+
+
+def exportar_anterior(conn, filename):
+    """Método anterior: todas las filas en una lista y una sola tabla"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, LongTable
+
+    cursor = conn.cursor()
+    cursor.execute(REPORTES["ventas"]["detalle_sql"], ("2000-01-01 00:00:00", "2100-12-31 23:59:59"))
+    data = [REPORTES["ventas"]["encabezado"]]
+    data.extend(REPORTES["ventas"]["fila"](fila) for fila in cursor.fetchall())
+    SimpleDocTemplate(filename, pagesize=A4).build([LongTable(data, repeatRows=1)])
+
+
+def memoria_maxima_mb():
+    """Memoria máxima del proceso hasta ahora (ru_maxrss está en KB en Linux, bytes en macOS)"""
+    if resource is None:
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+
+def medir(nombre, funcion, usar_tracemalloc):
+    if usar_tracemalloc:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    linea = f"{nombre:<12} {duracion:8.1f} s   RSS máximo {memoria_maxima_mb():8.1f} MB"
+    if usar_tracemalloc:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        linea += f"   pico Python {pico / 1024 / 1024:8.1f} MB"
+    print(linea)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de exportación PDF en streaming")
+    parser.add_argument("--filas", type=int, default=1000000)
+    parser.add_argument("--bloque", type=int, default=FILAS_POR_BLOQUE, help="Filas por LongTable")
+    parser.add_argument("--por-archivo", type=int, default=FILAS_POR_ARCHIVO, help="Filas por volumen PDF")
+    parser.add_argument("--comparar", action="store_true", help="Medir también el método anterior")
+    parser.add_argument("--tracemalloc", action="store_true", help="Medir asignaciones de Python (lento)")
+    args = parser.parse_args()
+
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        print("❌ ReportLab no está instalado")
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        print(f"🔄 Creando base de datos con {args.filas} ventas...")
+        conn = crear_base(os.path.join(carpeta, "bench.db"), args.filas)
+        print(f"   RSS máximo antes de exportar {memoria_maxima_mb():.1f} MB")
+
+        def progreso(escritas, total):
+            if escritas % 100000 < args.bloque:
+                print(f"   {escritas}/{total} filas   RSS máximo {memoria_maxima_mb():.1f} MB")
+
+        archivos = medir("Streaming", lambda: exportar_pdf(
+            conn, "ventas", "2000-01-01 00:00:00", "2100-12-31 23:59:59",
+            os.path.join(carpeta, "ventas.pdf"), filas_por_bloque=args.bloque,
+            filas_por_archivo=args.por_archivo, progreso=progreso), args.tracemalloc)
+        tamano = sum(os.path.getsize(a) for a in archivos)
+        print(f"📄 {len(archivos)} archivo(s), {tamano / 1024 / 1024:.1f} MB en total")
+
+        if args.comparar:
+            medir("Anterior", lambda: exportar_anterior(conn, os.path.join(carpeta, "anterior.pdf")), args.tracemalloc)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: latencia por mensaje con y sin reutilización de sesión SMTP.
+
+Levanta un servidor SMTP local en el mismo proceso (aiosmtpd si está instalado,
+si no un servidor mínimo con socketserver) y envía N mensajes:
+  1. Abriendo una conexión nueva por mensaje (comportamiento anterior)
+  2. Reutilizando la sesión de SMTPSessionManager
+
+Uso:
+    python benchmarks/bench_smtp_session.py --mensajes 200 --latencia-ms 5
+"""
+import os
+import sys
+import time
+import argparse
+import smtplib
+import socketserver
+import threading
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_system.smtp_session import SMTPSessionManager
+
+
+class _SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo: acepta todo y simula latencia de red por respuesta"""
+    latencia = 0.0
+
+    def responder(self, linea):
+        if self.latencia:
+            time.sleep(self.latencia)
+        self.wfile.write(linea.encode() + b"\r\n")
+
+    def handle(self):
+        self.responder("220 localhost ESMTP stand-in")
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode(errors="replace").strip().upper()
+            if comando.startswith(("EHLO", "HELO")):
+                if self.latencia:
+                    time.sleep(self.latencia)
+                self.wfile.write(b"250-localhost\r\n250 PIPELINING\r\n")
+            elif comando.startswith("DATA"):
+                self.responder("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.responder("250 OK")
+            elif comando.startswith("QUIT"):
+                self.responder("221 Bye")
+                return
+            else:
+                self.responder("250 OK")
+
+
+class _ServidorThreaded(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def iniciar_servidor(latencia):
+    """Inicia el servidor stand-in; retorna (host, puerto, detener)"""
+    try:
+        from aiosmtpd.controller import Controller
+
+        class _Handler:
+            async def handle_DATA(self, server, session, envelope):
+                return "250 OK"
+
+        controller = Controller(_Handler(), hostname="127.0.0.1", port=0)
+        controller.start()
+        print("ℹ️ Usando aiosmtpd como servidor local (sin latencia simulada)")
+        return controller.hostname, controller.server.sockets[0].getsockname()[1], controller.stop
+    except ImportError:
+        _SMTPStandInHandler.latencia = latencia
+        servidor = _ServidorThreaded(("127.0.0.1", 0), _SMTPStandInHandler)
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+        host, puerto = servidor.server_address
+
+        def detener():
+            servidor.shutdown()
+            servidor.server_close()
+        return host, puerto, detener
+
+
+def crear_mensaje(i):
+    msg = MIMEText(f"Ticket de prueba #{i}")
+    msg["From"] = "caja@localhost"
+    msg["To"] = "cliente@localhost"
+    msg["Subject"] = f"Ticket #{i}"
+    return msg
+
+
+def enviar_sin_reutilizar(config, n):
+    tiempos = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        server = smtplib.SMTP(config["smtp_server"], config["smtp_port"], timeout=15)
+        server.ehlo()
+        server.send_message(crear_mensaje(i))
+        server.quit()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def enviar_con_sesion(config, n):
+    sesion = SMTPSessionManager(config)
+    tiempos = []
+    try:
+        for i in range(n):
+            inicio = time.perf_counter()
+            sesion.enviar_mensaje(crear_mensaje(i))
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        sesion.cerrar()
+    return tiempos
+
+
+def resumen(nombre, tiempos):
+    tiempos = sorted(tiempos)
+    promedio = sum(tiempos) / len(tiempos) * 1000
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1] * 1000
+    print(f"{nombre:<22} promedio {promedio:8.2f} ms   p95 {p95:8.2f} ms   total {sum(tiempos):6.2f} s")
+    return promedio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reutilización de sesión SMTP")
+    parser.add_argument("--mensajes", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=5.0,
+                        help="Latencia simulada por respuesta del servidor stand-in")
+    args = parser.parse_args()
+
+    host, puerto, detener = iniciar_servidor(args.latencia_ms / 1000)
+    config = {
+        "smtp_server": host,
+        "smtp_port": puerto,
+        "email": "",
+        "password": "",
+        "usar_tls": False,  # El stand-in no tiene certificado
+    }
+
+    try:
+        print(f"📧 Enviando {args.mensajes} mensajes a {host}:{puerto}")
+        sin = resumen("Conexión por mensaje", enviar_sin_reutilizar(config, args.mensajes))
+        con = resumen("Sesión reutilizada", enviar_con_sesion(config, args.mensajes))
+        print(f"⚡ Mejora: {sin / con:.1f}x por mensaje")
+    finally:
+        detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 import sys
 import json
 import atexit
+import sqlite3
+import multiprocessing
 from datetime import datetime
 
 from PyQt6.QtWidgets import (
@@ -21,7 +23,6 @@ from inventory_manager import InventoryManagerDialog
 from cash_close_manager import CashCloseManagerDialog
 from backup_manager import BackupManagerDialog
 from category_manager import CategoryManagerDialog
-from sales_history import SalesHistoryDialog
 from config_panel import ConfigPanelDialog
 from config_manager import config_manager
 from themes import obtener_tema
@@ -29,6 +30,12 @@ from utils.helpers import formato_moneda_mx
 from licenses.licencias_manager import LicenseManager
 from licenses.dialogo_activacion import DialogoActivacion
 from email_system.email_sender import EmailSender
+from email_system.smtp_session import cerrar_sesiones
+from email_system.mail_engine import detener_motores
+from reporte_diario import ReporteDiarioScheduler
+from backup_scheduler import BackupScheduler
+from email_system.email_outbox import EmailOutbox, EmailDispatcher
+from email_system.outbox_dialog import EmailOutboxDialog
 
 # Agregar el directorio licenses al path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -86,6 +93,10 @@ class CajaGUI(QWidget):
         if not hasattr(self, 'current_user') or self.current_user is None:
             print("❌ No se pudo autenticar usuario - Cerrando aplicación")
             sys.exit(1)
+        
+        # ✅ TURNO DE CAJA: SE REUTILIZA EL ABIERTO O SE ABRE UNO AL INICIAR SESIÓN
+        self.turno_id = None
+        self.abrir_turno()
             
         # Inicializar interfaz
         self.init_ui()
@@ -99,6 +110,9 @@ class CajaGUI(QWidget):
 
         # AGREGAR SISTEMA DE EMAIL
         self.email_sender = EmailSender()
+        self.iniciar_despachador_email()
+        self.iniciar_reporte_diario()
+        self.iniciar_backup_automatico()
 
     def configurar_icono_aplicacion(self):
         """Configurar el icono de la aplicación para Windows - VERSIÓN MEJORADA"""
@@ -264,6 +278,29 @@ class CajaGUI(QWidget):
             QApplication.quit()
             sys.exit(1)
 
+    def abrir_turno(self):
+        """Reutiliza el turno abierto o abre uno nuevo pidiendo el efectivo inicial"""
+        try:
+            turno_id = self.db_manager.obtener_turno_abierto()
+            if turno_id is None:
+                monto_inicial, ok = QInputDialog.getDouble(
+                    self if self.isVisible() else None,
+                    "Abrir Turno",
+                    f"Turno de {self.current_user['nombre']}\n\nEfectivo inicial en caja:",
+                    0, 0, 1000000, 2
+                )
+                turno_id = self.db_manager.abrir_caja(self.current_user['id'], monto_inicial if ok else 0)
+                if turno_id is None:
+                    raise sqlite3.Error("no se pudo registrar el turno en la base de datos")
+                print(f"✅ Turno #{turno_id} abierto por {self.current_user['nombre']}")
+            else:
+                print(f"✅ Continuando turno abierto #{turno_id}")
+            self.turno_id = turno_id
+        except Exception as e:
+            print(f"❌ Error abriendo turno: {e}")
+            self.turno_id = None
+        return self.turno_id
+
     def guardar_configuracion_al_cerrar(self):
         """Guardar configuración al cerrar la aplicación"""
         try:
@@ -280,6 +317,14 @@ class CajaGUI(QWidget):
         """Se ejecuta cuando la ventana se cierra - VERSIÓN SIMPLE"""
         try:
             self.guardar_configuracion_al_cerrar()
+            if hasattr(self, 'reporte_diario'):
+                self.reporte_diario.detener()
+            if hasattr(self, 'backup_scheduler'):
+                self.backup_scheduler.detener()
+            if hasattr(self, 'email_dispatcher'):
+                self.email_dispatcher.detener()
+            cerrar_sesiones()
+            detener_motores()
             event.accept()
         except Exception as e:
             print(f"❌ Error en closeEvent: {e}")
@@ -406,16 +451,26 @@ class CajaGUI(QWidget):
         if self.current_user['rol'] != 'admin':
             QMessageBox.warning(self, "Error", "Solo administradores pueden gestionar backups")
             return
-        dialog = BackupManagerDialog(self.db_manager, self)
+        dialog = BackupManagerDialog(self.db_manager, self, getattr(self, 'backup_scheduler', None))
         dialog.exec()
 
     def ver_historial_ventas(self):
         if self.current_user['rol'] != 'admin':
             QMessageBox.warning(self, "Error", "Solo administradores pueden ver historial")
             return
+        # Importación diferida: NumPy/matplotlib solo se cargan cuando un admin abre el historial
+        from sales_history import SalesHistoryDialog
         dialog = SalesHistoryDialog(self.db_manager, self)
         dialog.exec()
 
+    def consolidar_cajas(self):
+        if self.current_user['rol'] != 'admin':
+            QMessageBox.warning(self, "Error", "Solo administradores pueden consolidar cajas")
+            return
+        from consolidacion_dialog import ConsolidacionDialog
+        dialog = ConsolidacionDialog(self.db_manager, self)
+        dialog.exec()
+
     # ===== INTERFAZ PRINCIPAL =====
     def init_ui(self):
         """Inicializar interfaz de usuario"""
@@ -663,6 +718,8 @@ class CajaGUI(QWidget):
         top_buttons.addWidget(QPushButton("📊 Cierres de Caja", clicked=self.gestionar_cierres))
         top_buttons.addWidget(QPushButton("💾 Sistema de Backup", clicked=self.gestionar_backups))
         top_buttons.addWidget(QPushButton("📈 Historial de Ventas", clicked=self.ver_historial_ventas))
+        top_buttons.addWidget(QPushButton("📬 Bandeja de Emails", clicked=self.ver_bandeja_emails))
+        top_buttons.addWidget(QPushButton("🏪 Consolidar Cajas", clicked=self.consolidar_cajas))
         layout.addLayout(top_buttons)
 
         sales_group = QGroupBox("Resumen de Ventas Hoy")
@@ -713,6 +770,7 @@ class CajaGUI(QWidget):
         if not item:
             QMessageBox.warning(self, "Error", "Seleccione un producto de la lista.")
             return
+        self.registrar_actividad_caja()
 
         codigo = item.text().split(" - ")[0]
         
@@ -802,7 +860,7 @@ class CajaGUI(QWidget):
         QMessageBox.information(self, "Venta cancelada", "Carrito vacío.")
 
     def enviar_ticket_por_email(self, ticket_path, venta_id, total):
-        """Ofrece enviar ticket por email usando QThreadPool - VERSIÓN DEFINITIVA"""
+        """Ofrece enviar ticket por email - SOLO ENCOLA, el despachador envía en segundo plano"""
         try:
             print("📧 Iniciando proceso de envío de email...")
             
@@ -829,69 +887,121 @@ class CajaGUI(QWidget):
                 if ok and email_cliente.strip():
                     print(f"📧 Email del cliente: {email_cliente.strip()}")
                     
-                    self.mostrar_progreso_email()
-                    
-                    try:
-                        print("🔄 Creando worker de email...")
-                        email_worker = self.email_sender.enviar_ticket_async(
-                            ticket_path, 
-                            email_cliente.strip(),
-                            venta_id,
-                            total,
-                            self.config.get("nombre_negocio", "")
-                        )
-                        
-                        print(f"✅ Worker obtenido: {email_worker}")
-                        
-                        if hasattr(email_worker, 'signals'):
-                            # Es un worker de QThreadPool - conectar señales
-                            print("✅ Conectando señales del worker...")
-                            email_worker.signals.email_enviado.connect(self.procesar_resultado_email)
-                            email_worker.signals.progreso.connect(self.actualizar_progreso_email)
-                            
-                            print("✅ Iniciando worker en ThreadPool...")
-                            from PyQt6.QtCore import QThreadPool
-                            QThreadPool.globalInstance().start(email_worker)
-                            print("✅ Worker iniciado correctamente en ThreadPool")
-                        else:
-                            # Fallback al método sincrónico
-                            print("⚠️ Usando método sincrónico como fallback")
-                            resultado, mensaje = email_worker
-                            self.ocultar_progreso_email()
-                            QMessageBox.information(self, "Envío de Ticket", mensaje)
-                            
-                    except Exception as e:
-                        print(f"❌ Error iniciando worker de email: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        self.ocultar_progreso_email()
-                        QMessageBox.warning(self, "Error", f"No se pudo iniciar el envío: {str(e)}")
+                    mensaje_id = self.email_outbox.encolar_ticket(
+                        ticket_path, 
+                        email_cliente.strip(),
+                        venta_id,
+                        total,
+                        self.config.get("nombre_negocio", "")
+                    )
+                    despachador = getattr(self, 'email_dispatcher', None)
+                    if despachador is not None:
+                        despachador.despertar()
+                    print(f"📬 Ticket encolado para envío (#{mensaje_id})")
                         
         except Exception as e:
             print(f"❌ Error en envío de email: {e}")
             import traceback
             traceback.print_exc()
-            self.ocultar_progreso_email()
+            QMessageBox.warning(self, "Error", f"No se pudo encolar el envío: {str(e)}")
+
+    def iniciar_despachador_email(self):
+        """Inicia el hilo que vacía la bandeja de salida de emails"""
+        try:
+            self.email_outbox = EmailOutbox(self.db_manager.db_name)
+            self.email_dispatcher = EmailDispatcher(self.db_manager.db_name)
+            self.email_dispatcher.mensaje_enviado.connect(self.procesar_email_enviado)
+            self.email_dispatcher.mensaje_fallido.connect(self.procesar_email_fallido)
+            self.email_dispatcher.start()
+            print("✅ Despachador de emails iniciado")
+        except Exception as e:
+            print(f"❌ Error iniciando despachador de emails: {e}")
+
+    def iniciar_reporte_diario(self):
+        """Programa el resumen diario por email (se ejecuta en segundo plano)"""
+        try:
+            self.reporte_diario = ReporteDiarioScheduler(
+                self.db_manager.db_name, self.config, getattr(self, 'email_dispatcher', None), self
+            )
+            self.reporte_diario.iniciar()
+        except Exception as e:
+            print(f"❌ Error iniciando resumen diario: {e}")
+
+    def iniciar_backup_automatico(self):
+        """Programa los backups automáticos mientras la aplicación esté abierta"""
+        try:
+            self.backup_scheduler = BackupScheduler(parent=self)
+            self.backup_scheduler.iniciar()
+        except Exception as e:
+            print(f"❌ Error iniciando backup automático: {e}")
+
+    def registrar_actividad_caja(self):
+        """Avisa al programador de backups que hay ventas en curso"""
+        if hasattr(self, 'backup_scheduler'):
+            self.backup_scheduler.registrar_actividad()
 
-    def mostrar_progreso_email(self):
-        """Versión simplificada - solo mostrar en consola"""
-        print("📧 Iniciando envío de email...")
+    def procesar_email_enviado(self, mensaje_id, destinatario):
+        """Resultado exitoso del despachador - solo consola para no interrumpir ventas"""
+        print(f"📧 Ticket enviado a {destinatario} (#{mensaje_id})")
 
-    def actualizar_progreso_email(self, mensaje):
-        """Solo mostrar en consola"""
-        print(f"📧 {mensaje}")
+    def procesar_email_fallido(self, mensaje_id, error, se_reintentara):
+        """Resultado fallido del despachador"""
+        if se_reintentara:
+            print(f"⚠️ Email #{mensaje_id} se reintentará: {error}")
+        else:
+            print(f"❌ Email #{mensaje_id} falló definitivamente: {error}")
+
+    def ver_bandeja_emails(self):
+        if self.current_user['rol'] != 'admin':
+            QMessageBox.warning(self, "Error", "Solo administradores pueden ver la bandeja de emails")
+            return
+        dialog = EmailOutboxDialog(self.db_manager.db_name, getattr(self, 'email_dispatcher', None), self)
+        dialog.exec()
 
-    def ocultar_progreso_email(self):
-        """No hacer nada en versión simplificada"""
-        print("✅ Envío de email completado")
+    def guardar_venta(self, total, iva, metodo_pago):
+        """Guarda el carrito como venta del turno actual en una sola transacción; retorna el id o None.
 
-    def procesar_resultado_email(self, exito, mensaje):
-        """Procesar resultado del envío de email - VERSIÓN SIMPLIFICADA"""
-        print(f"📧 Resultado: {mensaje}")
-        self.ocultar_progreso_email()
-        QMessageBox.information(self, "Envío de Ticket", mensaje)
+        Lanza sqlite3.IntegrityError si el turno ya no está abierto (la venta se deshace completa).
+        """
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO ventas (total, iva, metodo_pago, usuario_id) VALUES (?, ?, ?, ?)",
+                        (total, iva, metodo_pago, self.current_user['id']))
+            venta_id = cursor.lastrowid
+            
+            for item in self.carrito:
+                cursor.execute("SELECT id, stock FROM productos WHERE codigo = ? AND activo = 1", (item['codigo'],))
+                resultado = cursor.fetchone()
+                
+                if not resultado:
+                    QMessageBox.critical(self, "Error", f"Producto {item['codigo']} no encontrado")
+                    conn.rollback()
+                    return None
+                
+                producto_id, stock_actual = resultado
+                
+                if stock_actual < item['cantidad']:
+                    QMessageBox.critical(self, "Error", 
+                                    f"Stock insuficiente para {item['codigo']}\nStock actual: {stock_actual}, Solicitado: {item['cantidad']}")
+                    conn.rollback()
+                    return None
+            
+                cursor.execute('''
+                    INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) 
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (venta_id, producto_id, item['cantidad'], item['precio'], item['precio'] * item['cantidad']))
+                
+                cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", 
+                            (item['cantidad'], producto_id))
+            
+            # ✅ ACTUALIZAR RESÚMENES DIARIOS Y TOTALES DEL TURNO EN LA MISMA TRANSACCIÓN
+            self.db_manager.actualizar_resumen_diario(cursor, venta_id)
+            self.db_manager.registrar_venta_en_turno(cursor, venta_id, self.turno_id)
+            conn.commit()
+        return venta_id
 
     def finalizar_venta(self):
+        self.registrar_actividad_caja()
         # VERIFICAR LICENCIA DEMO 
         if self.license_manager.tipo_licencia == "demo":
             self.license_manager.cargar_configuracion()
@@ -957,39 +1067,32 @@ class CajaGUI(QWidget):
         total = self.calcular_total() * (1 + iva)
         metodo_pago = self.metodo_pago_combo.currentText()
         
+        # EL TURNO PUDO CERRARSE DESDE EL DIÁLOGO DE CIERRE: ABRIR UNO NUEVO
+        turno = self.db_manager.obtener_turno(self.turno_id) if self.turno_id else None
+        if turno is None or turno["estado"] != 'abierto':
+            self.turno_id = None
+            if self.abrir_turno() is None:
+                QMessageBox.critical(self, "Error", "No se pudo abrir un turno de caja.\n\nLa venta no se registró; el carrito se conserva.")
+                return
+        
         # Guardar venta en base de datos
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO ventas (total, iva, metodo_pago, usuario_id) VALUES (?, ?, ?, ?)",
-                        (total, iva, metodo_pago, self.current_user['id']))
-            venta_id = cursor.lastrowid
-            
-            for item in self.carrito:
-                cursor.execute("SELECT id, stock FROM productos WHERE codigo = ? AND activo = 1", (item['codigo'],))
-                resultado = cursor.fetchone()
-                
-                if not resultado:
-                    QMessageBox.critical(self, "Error", f"Producto {item['codigo']} no encontrado")
-                    conn.rollback()
-                    return
-                
-                producto_id, stock_actual = resultado
-                
-                if stock_actual < item['cantidad']:
-                    QMessageBox.critical(self, "Error", 
-                                    f"Stock insuficiente para {item['codigo']}\nStock actual: {stock_actual}, Solicitado: {item['cantidad']}")
-                    conn.rollback()
+        try:
+            try:
+                venta_id = self.guardar_venta(total, iva, metodo_pago)
+            except sqlite3.IntegrityError as e:
+                # ✅ EL TURNO SE CERRÓ ENTRE LA VERIFICACIÓN Y EL COBRO: LA VENTA SE DESHIZO, REINTENTAR EN OTRO TURNO
+                print(f"⚠️ {e}: se reintenta la venta en un turno nuevo")
+                self.turno_id = None
+                if self.abrir_turno() is None:
+                    QMessageBox.critical(self, "Error", "No se pudo abrir un turno de caja.\n\nLa venta no se registró; el carrito se conserva.")
                     return
-            
-                cursor.execute('''
-                    INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) 
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (venta_id, producto_id, item['cantidad'], item['precio'], item['precio'] * item['cantidad']))
-                
-                cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", 
-                            (item['cantidad'], producto_id))
-            
-            conn.commit()
+                venta_id = self.guardar_venta(total, iva, metodo_pago)
+        except sqlite3.Error as e:
+            print(f"❌ Error registrando venta: {e}")
+            QMessageBox.critical(self, "Error", f"No se pudo registrar la venta: {e}\n\nEl carrito se conserva.")
+            return
+        if venta_id is None:
+            return
         
         ticket_path = generar_ticket(self.carrito, iva, total, metodo_pago, self.config.get("nombre_negocio", ""), venta_id)
         
@@ -1327,6 +1430,8 @@ class CajaGUI(QWidget):
         QMessageBox.information(self, "Información de Contacto", mensaje)
 
 if __name__ == "__main__":
+    # ✅ NECESARIO PARA LOS PROCESOS DE CONSOLIDACIÓN EN EL EJECUTABLE DE WINDOWS
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     ventana = CajaGUI()
     ventana.show()
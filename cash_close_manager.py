@@ -2,12 +2,13 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QPushButton, QMessageBox, QTableWidget, QTableWidgetItem,
     QHeaderView, QComboBox, QDateEdit, QTextEdit, QGroupBox,
-    QInputDialog, QTabWidget, QWidget, QGridLayout
+    QInputDialog, QTabWidget, QWidget, QGridLayout, QTableView
 )
 from PyQt6.QtGui import QPalette, QColor, QFont
 from PyQt6.QtCore import Qt, QDate
 from datetime import datetime, timedelta
 from export_dialog import ExportDialog
+from ventas_model import VentasTableModel
 from utils.helpers import formato_moneda_mx 
 import sys
 
@@ -16,6 +17,8 @@ class CashCloseManagerDialog(QDialog):
         super().__init__(parent)
         self.db_manager = db_manager
         self.current_user = current_user
+        self.turno = None
+        self.efectivo_fisico = None
         self.setWindowTitle("Cierre de Caja y Reportes")
         self.setGeometry(100, 50, 1200, 800)
         
@@ -111,12 +114,23 @@ class CashCloseManagerDialog(QDialog):
         # Generar reporte inicial
         self.generar_reporte()
     
+    def done(self, resultado):
+        # ✅ LIBERAR LA CONEXIÓN A LOS AÑOS ARCHIVADOS AL CERRAR EL DIÁLOGO
+        self.modelo_ventas.cerrar()
+        super().done(resultado)
+
     def setup_sales_tab(self, layout):
         # Tabla de ventas
-        self.sales_table = QTableWidget()
-        self.sales_table.setColumnCount(6)
-        self.sales_table.setHorizontalHeaderLabels(["ID", "Fecha", "Total", "IVA", "Método Pago", "Usuario"])
+        # ✅ MODELO PAGINADO: SOLO SE CARGAN LAS FILAS VISIBLES AL HACER SCROLL
+        self.modelo_ventas = VentasTableModel(
+            self.db_manager, mostrar_productos=False,
+            encabezados=["ID", "Fecha", "Total", "IVA", "Método Pago", "Usuario"], parent=self
+        )
+        self.sales_table = QTableView()
+        self.sales_table.setModel(self.modelo_ventas)
         self.sales_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.sales_table.horizontalHeader().setSortIndicator(1, Qt.SortOrder.DescendingOrder)
+        self.sales_table.setSortingEnabled(True)
         layout.addWidget(self.sales_table)
         
         # Resumen de ventas - CON EL MISMO ESTILO QUE HISTORIAL DE VENTAS
@@ -140,12 +154,18 @@ class CashCloseManagerDialog(QDialog):
         layout.addWidget(self.products_table)
     
     def setup_cash_tab(self, layout):
+        # Turno abierto (los totales se acumulan en cada venta)
+        self.turno_label = QLabel("")
+        self.turno_label.setStyleSheet("font-weight: bold; padding: 5px; color: #2c3e50;")
+        layout.addWidget(self.turno_label)
+        
         # Formulario de cierre de caja
         form_layout = QGridLayout()
         
         form_layout.addWidget(QLabel("Efectivo Inicial:"), 0, 0)
         self.efectivo_inicial = QLineEdit()
         self.efectivo_inicial.setText("0.00")
+        self.efectivo_inicial.setReadOnly(True)
         form_layout.addWidget(self.efectivo_inicial, 0, 1)
         
         form_layout.addWidget(QLabel("Efectivo en Caja Esperado:"), 1, 0)
@@ -174,7 +194,7 @@ class CashCloseManagerDialog(QDialog):
         self.ventas_transferencia.setReadOnly(True)
         form_layout.addWidget(self.ventas_transferencia, 5, 1)
         
-        form_layout.addWidget(QLabel("TOTAL VENTAS DEL DÍA:"), 6, 0)
+        form_layout.addWidget(QLabel("TOTAL VENTAS DEL TURNO:"), 6, 0)
         self.total_ventas = QLineEdit()
         self.total_ventas.setReadOnly(True)
         form_layout.addWidget(self.total_ventas, 6, 1)
@@ -206,8 +226,9 @@ class CashCloseManagerDialog(QDialog):
         history_layout = QVBoxLayout()
         
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(5)
-        self.history_table.setHorizontalHeaderLabels(["Fecha", "Efectivo Inicial", "Efectivo Final", "Total Ventas", "Usuario"])
+        self.history_table.setColumnCount(7)
+        self.history_table.setHorizontalHeaderLabels(["Fecha", "Efectivo Inicial", "Efectivo Final", "Total Ventas",
+                                                      "N° Ventas", "Usuario", "Estado"])
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         history_layout.addWidget(self.history_table)
         
@@ -223,6 +244,7 @@ class CashCloseManagerDialog(QDialog):
         self.cargar_ventas(fecha_desde, fecha_hasta)
         self.cargar_productos_vendidos(fecha_desde, fecha_hasta)
         self.calcular_totales_cierre(fecha_desde, fecha_hasta)
+        self.cargar_turno_actual()
 
     def exportar_reporte(self):
         date_range = {
@@ -230,36 +252,17 @@ class CashCloseManagerDialog(QDialog):
             'hasta': self.date_to.date().toString("yyyy-MM-dd")
         }
         
-         # SOLO PDF 
-        dialog = ExportDialog(self.db_manager, 'cierres', date_range, self)
-        dialog.exec()
+        # PDF, CSV o JSON Lines
+        # ✅ NO MODAL: LOS REPORTES SE GENERAN EN SEGUNDO PLANO
+        self.export_dialog = ExportDialog(self.db_manager, 'cierres', date_range, self)
+        self.export_dialog.show()
     
     def cargar_ventas(self, fecha_desde, fecha_hasta):
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT v.id, v.fecha, v.total, v.iva, v.metodo_pago, u.nombre 
-                FROM ventas v 
-                JOIN usuarios u ON v.usuario_id = u.id 
-                WHERE v.fecha BETWEEN ? AND ?
-                ORDER BY v.fecha DESC
-            """, (fecha_desde, fecha_hasta))
-            
-            ventas = cursor.fetchall()
-            
-            self.sales_table.setRowCount(len(ventas))
-            for row, (id_, fecha, total, iva, metodo_pago, usuario) in enumerate(ventas):
-                self.sales_table.setItem(row, 0, QTableWidgetItem(str(id_)))
-                self.sales_table.setItem(row, 1, QTableWidgetItem(fecha))
-
-                self.sales_table.setItem(row, 2, QTableWidgetItem(formato_moneda_mx(total)))
-                self.sales_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(iva)))
-
-                self.sales_table.setItem(row, 4, QTableWidgetItem(metodo_pago))
-                self.sales_table.setItem(row, 5, QTableWidgetItem(usuario))
+        self.modelo_ventas.establecer_filtros(fecha_desde, fecha_hasta)
     
     def cargar_productos_vendidos(self, fecha_desde, fecha_hasta):
-        with self.db_manager.get_connection() as conn:
+        # ✅ MISMA CONEXIÓN QUE LA PESTAÑA DE VENTAS: INCLUYE LOS AÑOS ARCHIVADOS DEL RANGO
+        with self.modelo_ventas.conexion() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
@@ -288,78 +291,38 @@ class CashCloseManagerDialog(QDialog):
                 self.products_table.setItem(row, 4, QTableWidgetItem(ultima_venta))
     
     def calcular_totales_cierre(self, fecha_desde, fecha_hasta):
-        """Calcula los totales para el cierre de caja - VERSIÓN MEJORADA"""
+        """Resumen del período desde ventas_diarias (una consulta, sin recorrer ventas)"""
         try:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # Totales por método de pago
                 cursor.execute("""
-                    SELECT metodo_pago, COALESCE(SUM(total), 0) 
-                    FROM ventas 
-                    WHERE fecha BETWEEN ? AND ? AND estado = 'completada'
+                    SELECT metodo_pago, SUM(num_ventas), SUM(total)
+                    FROM ventas_diarias
+                    WHERE fecha BETWEEN ? AND ?
                     GROUP BY metodo_pago
-                """, (fecha_desde, fecha_hasta))
+                """, (fecha_desde[:10], fecha_hasta[:10]))
                 
                 totales = {"Efectivo": 0, "Tarjeta": 0, "Transferencia": 0}
-                for metodo, total in cursor.fetchall():
-                    if metodo in totales:
-                        totales[metodo] = total
-                
-                # Total general de ventas
-                cursor.execute("""
-                    SELECT COALESCE(SUM(total), 0) 
-                    FROM ventas 
-                    WHERE fecha BETWEEN ? AND ? AND estado = 'completada'
-                """, (fecha_desde, fecha_hasta))
-                
-                total_ventas = cursor.fetchone()[0]
-                
-                # Número total de ventas
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM ventas 
-                    WHERE fecha BETWEEN ? AND ? AND estado = 'completada'
-                """, (fecha_desde, fecha_hasta))
-                
-                numero_ventas = cursor.fetchone()[0] or 0
-                
-                # Calcular efectivo inicial (si ya se ingresó)
-                try:
-                    efectivo_inicial_text = self.efectivo_inicial.text().strip()
-                    if not efectivo_inicial_text:
-                        efectivo_inicial_text = "0"
-                    efectivo_inicial_text = efectivo_inicial_text.replace('$', '').replace(',', '').strip()
-                    efectivo_inicial = float(efectivo_inicial_text)
-                except:
-                    efectivo_inicial = 0
-                
-                # Calcular efectivo esperado
-                efectivo_esperado = efectivo_inicial + totales['Efectivo']
-                
-                # Actualizar campos del formulario
-                self.ventas_efectivo.setText(formato_moneda_mx(totales['Efectivo']))
-                self.ventas_tarjeta.setText(formato_moneda_mx(totales['Tarjeta']))
-                self.ventas_transferencia.setText(formato_moneda_mx(totales['Transferencia']))
-                self.total_ventas.setText(formato_moneda_mx(total_ventas))
-                self.efectivo_esperado.setText(formato_moneda_mx(efectivo_esperado))
-                
-                # ACTUALIZAR EL RESUMEN DE VENTAS (lo que ves vacío)
-                if hasattr(self, 'sales_summary') and self.sales_summary:
-                    fecha_hasta_corta = fecha_hasta.split()[0] 
-                    
-                    if numero_ventas > 0:
-                        resumen_texto = f"""📊 REPORTE DE VENTAS ({fecha_desde} a {fecha_hasta_corta})
+                numero_ventas = 0
+                total_ventas = 0
+                for metodo, num, total in cursor.fetchall():
+                    totales[metodo] = total
+                    numero_ventas += num
+                    total_ventas += total
+            
+            fecha_hasta_corta = fecha_hasta.split()[0]
+            if numero_ventas > 0:
+                resumen_texto = f"""📊 REPORTE DE VENTAS ({fecha_desde} a {fecha_hasta_corta})
 
     • Total Ventas: {formato_moneda_mx(total_ventas)}
     • N° de Ventas: {numero_ventas}
     • Promedio por Venta: {formato_moneda_mx(total_ventas/numero_ventas)}
 
-    • Efectivo: {formato_moneda_mx(totales['Efectivo'])} ({numero_ventas and (totales['Efectivo']/total_ventas*100):.1f}%)
-    • Tarjeta: {formato_moneda_mx(totales['Tarjeta'])} ({numero_ventas and (totales['Tarjeta']/total_ventas*100):.1f}%)
-    • Transferencia: {formato_moneda_mx(totales['Transferencia'])} ({numero_ventas and (totales['Transferencia']/total_ventas*100):.1f}%)"""
-                    else:
-                        resumen_texto = f"""📊 REPORTE DE VENTAS ({fecha_desde} a {fecha_hasta_corta})
+    • Efectivo: {formato_moneda_mx(totales['Efectivo'])} ({totales['Efectivo']/total_ventas*100 if total_ventas else 0:.1f}%)
+    • Tarjeta: {formato_moneda_mx(totales['Tarjeta'])} ({totales['Tarjeta']/total_ventas*100 if total_ventas else 0:.1f}%)
+    • Transferencia: {formato_moneda_mx(totales['Transferencia'])} ({totales['Transferencia']/total_ventas*100 if total_ventas else 0:.1f}%)"""
+            else:
+                resumen_texto = f"""📊 REPORTE DE VENTAS ({fecha_desde} a {fecha_hasta_corta})
 
     • No hay ventas registradas en este período
     • Total Ventas: {formato_moneda_mx(0)}
@@ -368,60 +331,57 @@ class CashCloseManagerDialog(QDialog):
     • Efectivo: {formato_moneda_mx(0)}
     • Tarjeta: {formato_moneda_mx(0)} 
     • Transferencia: {formato_moneda_mx(0)}"""
-                    
-                    self.sales_summary.setPlainText(resumen_texto)
-                
-                print(f"📊 CÁLCULOS DE CIERRE:")
-                print(f"   Período: {fecha_desde} a {fecha_hasta}")
-                print(f"   Ventas Efectivo: {totales['Efectivo']}")
-                print(f"   Ventas Tarjeta: {totales['Tarjeta']}")
-                print(f"   Ventas Transferencia: {totales['Transferencia']}")
-                print(f"   TOTAL VENTAS: {total_ventas}")
-                print(f"   N° VENTAS: {numero_ventas}")
-                print(f"   EFECTIVO ESPERADO: {efectivo_esperado}")
+            
+            self.sales_summary.setPlainText(resumen_texto)
                     
         except Exception as e:
             print(f"❌ Error calculando totales: {e}")
-            # Si hay error, mostrar mensaje en el resumen
-            if hasattr(self, 'sales_summary') and self.sales_summary:
-                self.sales_summary.setPlainText(f"❌ Error cargando datos de ventas:\n{str(e)}")
-            
-            # Resumen de ventas
-            summary_text = f"""
-            📊 REPORTE DE VENTAS ({fecha_desde} a {fecha_hasta.split()[0]})
-            • Total Ventas: {formato_moneda_mx(total_ventas)}
-            • Efectivo: {formato_moneda_mx(totales['Efectivo'])}
-            • Tarjeta: {formato_moneda_mx(totales['Tarjeta'])}
-            • Transferencia: {formato_moneda_mx(totales['Transferencia'])}
-            • N° de Ventas: {self.sales_table.rowCount()}
-            """
-            self.sales_summary.setPlainText(summary_text)
+            self.sales_summary.setPlainText(f"❌ Error cargando datos de ventas:\n{str(e)}")
+    
+    def turno_actual_id(self):
+        """Turno de la ventana principal o, si no hay, el último turno abierto"""
+        turno_id = getattr(self.parent(), 'turno_id', None) if self.parent() is not None else None
+        return turno_id or self.db_manager.obtener_turno_abierto()
+    
+    def cargar_turno_actual(self):
+        """Llena el formulario con los totales acumulados del turno (una sola fila)"""
+        turno_id = self.turno_actual_id()
+        self.turno = self.db_manager.obtener_turno(turno_id) if turno_id else None
+        self.efectivo_fisico = None
+        self.diferencia.clear()
+        self.diferencia.setStyleSheet("")
+        
+        if self.turno is None or self.turno["estado"] != 'abierto':
+            self.turno = None
+            self.turno_label.setText("⚠️ No hay un turno abierto (se abrirá uno con la siguiente venta)")
+            for campo in (self.efectivo_inicial, self.ventas_efectivo, self.ventas_tarjeta,
+                          self.ventas_transferencia, self.total_ventas, self.efectivo_esperado, self.efectivo_caja):
+                campo.setText(formato_moneda_mx(0))
+            return
+        
+        turno = self.turno
+        self.turno_label.setText(
+            f"🟢 Turno #{turno['id']} de {turno['usuario']} abierto desde {turno['fecha_apertura']} "
+            f"· {turno['num_ventas']} ventas"
+        )
+        self.efectivo_inicial.setText(formato_moneda_mx(turno['monto_inicial']))
+        self.ventas_efectivo.setText(formato_moneda_mx(turno['ventas_efectivo']))
+        self.ventas_tarjeta.setText(formato_moneda_mx(turno['ventas_tarjeta']))
+        self.ventas_transferencia.setText(formato_moneda_mx(turno['ventas_transferencia']))
+        self.total_ventas.setText(formato_moneda_mx(turno['total_ventas']))
+        self.efectivo_esperado.setText(formato_moneda_mx(turno['efectivo_esperado']))
+        self.efectivo_caja.setText(formato_moneda_mx(turno['efectivo_esperado']))
     
     def calcular_cierre(self):
-        """Calcula el cierre de caja con manejo robusto de errores"""
+        """Pide el efectivo físico contado y muestra la diferencia contra el turno"""
         try:
-            # Obtener y validar efectivo inicial
-            efectivo_inicial_text = self.efectivo_inicial.text().strip()
-            if not efectivo_inicial_text:
-                efectivo_inicial_text = "0"
-            
-            efectivo_inicial_text = efectivo_inicial_text.replace('$', '').replace(',', '').strip()
-            efectivo_inicial = float(efectivo_inicial_text)
-            
-            # Obtener y validar ventas en efectivo
-            ventas_efectivo_text = self.ventas_efectivo.text().strip()
-            if not ventas_efectivo_text:
-                ventas_efectivo_text = "0"
-            
-            ventas_efectivo_text = ventas_efectivo_text.replace('$', '').replace(',', '').strip()
-            ventas_efectivo = float(ventas_efectivo_text)
+            self.cargar_turno_actual()
+            if self.turno is None:
+                QMessageBox.warning(self, "Sin turno", "No hay un turno de caja abierto para cerrar.")
+                return
             
-            # Calcular efectivo esperado
-            efectivo_esperado = efectivo_inicial + ventas_efectivo
+            efectivo_esperado = self.turno['efectivo_esperado']
             
-            # CORRECCIÓN: Actualizar AMBOS campos
-            self.efectivo_esperado.setText(formato_moneda_mx(efectivo_esperado))
-            self.efectivo_caja.setText(formato_moneda_mx(efectivo_esperado)) 
             # Pedir al usuario el efectivo físico contado
             efectivo_fisico, ok = QInputDialog.getDouble(
                 self, 
@@ -434,6 +394,8 @@ class CashCloseManagerDialog(QDialog):
             )
             
             if ok:
+                self.efectivo_fisico = efectivo_fisico
+                
                 # Calcular diferencia
                 diferencia = efectivo_fisico - efectivo_esperado
                 
@@ -455,80 +417,49 @@ class CashCloseManagerDialog(QDialog):
                     print(f"🔵 Diferencia: EXACTO ({formato_moneda_mx(diferencia)})")
                     
                 print(f"✅ Cálculo completado:")
-                print(f"   Efectivo inicial: {formato_moneda_mx(efectivo_inicial)}")
-                print(f"   Ventas efectivo: {formato_moneda_mx(ventas_efectivo)}")
+                print(f"   Turno: #{self.turno['id']} ({self.turno['num_ventas']} ventas)")
+                print(f"   Efectivo inicial: {formato_moneda_mx(self.turno['monto_inicial'])}")
+                print(f"   Ventas efectivo: {formato_moneda_mx(self.turno['ventas_efectivo'])}")
                 print(f"   Efectivo esperado: {formato_moneda_mx(efectivo_esperado)}")
                 print(f"   Efectivo físico: {formato_moneda_mx(efectivo_fisico)}")
                 print(f"   Diferencia: {formato_moneda_mx(diferencia)}")
             
-        except ValueError as e:
-            print(f"❌ Error de conversión numérica: {e}")
-            QMessageBox.warning(self, "Error", "Por favor ingrese valores numéricos válidos")
         except Exception as e:
             print(f"❌ Error inesperado en calcular_cierre: {e}")
             QMessageBox.critical(self, "Error", f"Ocurrió un error inesperado: {str(e)}")
     
     def guardar_cierre(self):
-        """Guarda el cierre de caja con manejo correcto de formato de moneda"""
+        """Cierra el turno: los totales ya están acumulados, solo se registra el conteo físico"""
         try:
-            # Función auxiliar para limpiar y convertir valores monetarios
-            def limpiar_valor_monetario(texto):
-                if not texto:
-                    return 0.0
-                # Eliminar símbolos de moneda, comas y espacios
-                texto_limpio = texto.replace('$', '').replace(',', '').replace(' ', '').strip()
-                return float(texto_limpio) if texto_limpio else 0.0
+            if self.efectivo_fisico is None:
+                self.calcular_cierre()
+                if self.efectivo_fisico is None:
+                    return
             
-            # Obtener y limpiar todos los valores
-            efectivo_inicial = limpiar_valor_monetario(self.efectivo_inicial.text())
-            ventas_efectivo = limpiar_valor_monetario(self.ventas_efectivo.text())
-            ventas_tarjeta = limpiar_valor_monetario(self.ventas_tarjeta.text())
-            ventas_transferencia = limpiar_valor_monetario(self.ventas_transferencia.text())
-            total_ventas = limpiar_valor_monetario(self.total_ventas.text())
-            diferencia = limpiar_valor_monetario(self.diferencia.text())
+            turno_id = self.turno['id']
+            print(f"💾 Cerrando turno #{turno_id} con efectivo contado {self.efectivo_fisico}")
+            cierre = self.db_manager.cerrar_caja(turno_id, self.efectivo_fisico)
+            if cierre is None:
+                QMessageBox.critical(self, "Error", "No se pudo guardar el cierre (el turno ya no está abierto)")
+                self.cargar_turno_actual()
+                return
             
-            # Calcular efectivo final esperado
-            efectivo_final = efectivo_inicial + ventas_efectivo
-
-            print(f"💾 Guardando cierre:")
-            print(f"   Efectivo inicial: {efectivo_inicial}")
-            print(f"   Ventas efectivo: {ventas_efectivo}")
-            print(f"   Ventas tarjeta: {ventas_tarjeta}")
-            print(f"   Ventas transferencia: {ventas_transferencia}")
-            print(f"   Total ventas: {total_ventas}")
-            print(f"   Efectivo final: {efectivo_final}")
-            print(f"   Diferencia: {diferencia}")
-
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO cierres_caja 
-                    (usuario_id, monto_inicial, ventas_efectivo, ventas_tarjeta, 
-                    ventas_transferencia, total_ventas, total_efectivo, diferencia)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    self.current_user['id'],
-                    efectivo_inicial,
-                    ventas_efectivo,
-                    ventas_tarjeta,
-                    ventas_transferencia,
-                    total_ventas,
-                    efectivo_final,
-                    diferencia
-                ))
-                conn.commit()
+            print(f"   Total ventas: {cierre['total_ventas']} ({cierre['num_ventas']} ventas)")
+            print(f"   Efectivo final: {cierre['total_efectivo']}")
+            print(f"   Diferencia: {cierre['diferencia']}")
+            
+            # LA SIGUIENTE VENTA ABRIRÁ UN TURNO NUEVO
+            if self.parent() is not None and getattr(self.parent(), 'turno_id', None) == turno_id:
+                self.parent().turno_id = None
             
             QMessageBox.information(self, "Éxito", "Cierre de caja guardado correctamente")
             self.cargar_historial_cierres()
+            self.cargar_turno_actual()
+            
+            # ✅ ENVIAR RESUMEN DIARIO EN SEGUNDO PLANO (SI ESTÁ CONFIGURADO)
+            if self.parent() is not None and hasattr(self.parent(), 'reporte_diario'):
+                self.parent().reporte_diario.ejecutar_tras_cierre()
         
-        except ValueError as e:
-            print(f"❌ Error de conversión numérica: {e}")
-            QMessageBox.warning(
-                self, 
-                "Error de formato", 
-                f"Error al convertir valores numéricos:\n{str(e)}\n\n"
-                "Asegúrese de que todos los campos tengan valores válidos."
-            )
         except Exception as e:
             print(f"❌ Error guardando cierre: {e}")
             QMessageBox.critical(self, "Error", f"No se pudo guardar el cierre: {str(e)}")
@@ -545,7 +476,9 @@ class CashCloseManagerDialog(QDialog):
                         c.monto_inicial,
                         COALESCE(c.total_efectivo, 0),
                         COALESCE(c.total_ventas, 0),
-                        u.nombre
+                        COALESCE(c.num_ventas, 0),
+                        u.nombre,
+                        c.estado
                     FROM cierres_caja c
                     JOIN usuarios u ON c.usuario_id = u.id
                     ORDER BY c.fecha_apertura DESC
@@ -555,12 +488,14 @@ class CashCloseManagerDialog(QDialog):
                 cierres = cursor.fetchall()
                 
                 self.history_table.setRowCount(len(cierres))
-                for row, (fecha, monto_inicial, efectivo_final, total_ventas, usuario) in enumerate(cierres):
+                for row, (fecha, monto_inicial, efectivo_final, total_ventas, num_ventas, usuario, estado) in enumerate(cierres):
                     self.history_table.setItem(row, 0, QTableWidgetItem(str(fecha)))  
                     self.history_table.setItem(row, 1, QTableWidgetItem(formato_moneda_mx(monto_inicial)))
                     self.history_table.setItem(row, 2, QTableWidgetItem(formato_moneda_mx(efectivo_final)))
                     self.history_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(total_ventas)))
-                    self.history_table.setItem(row, 4, QTableWidgetItem(usuario))
+                    self.history_table.setItem(row, 4, QTableWidgetItem(str(num_ventas)))
+                    self.history_table.setItem(row, 5, QTableWidgetItem(usuario))
+                    self.history_table.setItem(row, 6, QTableWidgetItem(estado))
                 
         except Exception as e:
             print(f"Error cargando historial de cierres: {e}")
@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QWidget,
     QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
     QFileDialog, QMessageBox, QComboBox, QHeaderView,
-    QFormLayout, QGroupBox, QRadioButton, QButtonGroup
+    QFormLayout, QGroupBox, QRadioButton, QButtonGroup, QCheckBox
 )
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal
@@ -185,6 +185,33 @@ class ConfigPanelDialog(QDialog):
         
         group.setLayout(email_layout)
         layout.addWidget(group)
+        
+        # Resumen diario por email
+        digest_group = QGroupBox("📊 Resumen Diario por Email")
+        digest_layout = QFormLayout()
+        
+        self.digest_habilitado = QCheckBox("Enviar resumen del día automáticamente")
+        self.digest_habilitado.setChecked(email_sender.config.get("digest_habilitado", False))
+        digest_layout.addRow(self.digest_habilitado)
+        
+        self.digest_hora = QLineEdit(email_sender.config.get("digest_hora", "21:00"))
+        self.digest_hora.setPlaceholderText("HH:MM")
+        digest_layout.addRow("Hora de envío:", self.digest_hora)
+        
+        self.digest_destinatarios = QLineEdit(", ".join(email_sender.config.get("digest_destinatarios", [])))
+        self.digest_destinatarios.setPlaceholderText("dueño@correo.com, gerente@correo.com")
+        digest_layout.addRow("Destinatarios:", self.digest_destinatarios)
+        
+        self.digest_al_cerrar = QCheckBox("Enviar también al guardar el cierre de caja")
+        self.digest_al_cerrar.setChecked(email_sender.config.get("digest_al_cerrar", True))
+        digest_layout.addRow(self.digest_al_cerrar)
+        
+        btn_guardar_digest = QPushButton("💾 Guardar Resumen Diario")
+        btn_guardar_digest.clicked.connect(self.guardar_config_digest)
+        digest_layout.addRow(btn_guardar_digest)
+        
+        digest_group.setLayout(digest_layout)
+        layout.addWidget(digest_group)
         layout.addStretch()
         
         tab.setLayout(layout)
@@ -618,6 +645,30 @@ class ConfigPanelDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "❌ Error", f"Error guardando configuración: {str(e)}")
 
+    def guardar_config_digest(self):
+        """Guardar configuración del resumen diario"""
+        try:
+            email_sender = EmailSender()
+            resultado, mensaje = email_sender.configurar_digest(
+                self.digest_habilitado.isChecked(),
+                self.digest_hora.text().strip(),
+                self.digest_destinatarios.text().split(","),
+                self.digest_al_cerrar.isChecked()
+            )
+            
+            if not resultado:
+                QMessageBox.warning(self, "⚠️ Advertencia", mensaje)
+                return
+            
+            # ✅ REPROGRAMAR EL ENVÍO CON LA NUEVA HORA
+            if self.parent() is not None and hasattr(self.parent(), 'reporte_diario'):
+                self.parent().reporte_diario.reprogramar()
+            
+            QMessageBox.information(self, "✅ Éxito", mensaje)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "❌ Error", f"Error guardando resumen diario: {str(e)}")
+
     def probar_conexion_email(self):
         """Probar conexión de email"""
         try:
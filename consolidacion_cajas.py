@@ -0,0 +1,300 @@
+"""
+Consolidación de cierres de varias cajas (un archivo caja_registradora.db por caja).
+
+Cada base de datos se abre en SOLO LECTURA en un proceso separado; los procesos
+regresan totales ya agregados y aquí se combinan en un solo reporte / PDF.
+
+Uso por línea de comandos:
+    python consolidacion_cajas.py --desde 2026-01-01 --hasta 2026-12-31 \
+        --pdf Reportes/consolidado.pdf caja1.db caja2.db caja3.db
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.helpers import formato_moneda_mx
+from utils.db import NOMBRE_DB_POR_DEFECTO, conectar_solo_lectura
+from archivo_historico import conectar_historico
+
+
+def nombre_caja(ruta):
+    """Nombre para mostrar: el archivo, o la carpeta si usa el nombre por defecto"""
+    ruta = os.path.abspath(ruta)
+    if os.path.basename(ruta) == NOMBRE_DB_POR_DEFECTO:
+        return os.path.basename(os.path.dirname(ruta)) or ruta
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+
+def leer_caja(ruta, fecha_desde, fecha_hasta):
+    """Totales de una caja en el rango (se ejecuta en un proceso de trabajo).
+
+    Usa las tablas de resumen (ventas_diarias, productos_diarios) si existen;
+    en bases de datos de versiones anteriores agrega directamente ventas
+    (incluyendo los archive_AAAA.db de esa caja que toquen el rango).
+    Regresa solo tipos simples para que viaje barato entre procesos.
+    """
+    conn = conectar_solo_lectura(ruta)
+    try:
+        tablas = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"ventas_diarias", "productos_diarios"} <= tablas:
+            # Sin resúmenes se leen las ventas: hacen falta también los años archivados
+            conn.close()
+            conn = conectar_historico(ruta, fecha_desde, fecha_hasta)
+        columnas_cierres = {fila[1] for fila in conn.execute("PRAGMA table_info(cierres_caja)")}
+
+        if "ventas_diarias" in tablas:
+            metodos = conn.execute('''
+                SELECT metodo_pago, SUM(num_ventas), SUM(total)
+                FROM ventas_diarias
+                WHERE fecha BETWEEN ? AND ?
+                GROUP BY metodo_pago
+            ''', (fecha_desde, fecha_hasta)).fetchall()
+        else:
+            metodos = conn.execute('''
+                SELECT metodo_pago, COUNT(*), SUM(total)
+                FROM ventas
+                WHERE DATE(fecha) BETWEEN ? AND ? AND estado = 'completada'
+                GROUP BY metodo_pago
+            ''', (fecha_desde, fecha_hasta)).fetchall()
+
+        # Los ids de producto difieren entre cajas: se combinan por código
+        if "productos_diarios" in tablas:
+            productos = conn.execute('''
+                SELECT COALESCE(p.codigo, '#' || pd.producto_id), COALESCE(p.nombre, 'Producto #' || pd.producto_id),
+                       SUM(pd.cantidad), SUM(pd.importe)
+                FROM productos_diarios pd
+                LEFT JOIN productos p ON pd.producto_id = p.id
+                WHERE pd.fecha BETWEEN ? AND ?
+                GROUP BY pd.producto_id
+            ''', (fecha_desde, fecha_hasta)).fetchall()
+        else:
+            productos = conn.execute('''
+                SELECT COALESCE(p.codigo, '#' || dv.producto_id), COALESCE(p.nombre, 'Producto #' || dv.producto_id),
+                       SUM(dv.cantidad), SUM(dv.subtotal)
+                FROM detalle_ventas dv
+                JOIN ventas v ON dv.venta_id = v.id
+                LEFT JOIN productos p ON dv.producto_id = p.id
+                WHERE DATE(v.fecha) BETWEEN ? AND ? AND v.estado = 'completada'
+                GROUP BY dv.producto_id
+            ''', (fecha_desde, fecha_hasta)).fetchall()
+
+        # Cierres: turnos cerrados en el rango (o todos los registros en esquemas anteriores)
+        filtro_estado = "estado = 'cerrado' AND " if "num_ventas" in columnas_cierres else ""
+        cierres = conn.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM(total_ventas), 0), COALESCE(SUM(total_efectivo), 0),
+                   COALESCE(SUM(diferencia), 0)
+            FROM cierres_caja
+            WHERE {filtro_estado}DATE(COALESCE(fecha_cierre, fecha_apertura)) BETWEEN ? AND ?
+        ''', (fecha_desde, fecha_hasta)).fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "ruta": os.path.abspath(ruta),
+        "nombre": nombre_caja(ruta),
+        "metodos": {metodo: (int(num or 0), float(total or 0)) for metodo, num, total in metodos},
+        "productos": [(codigo, nombre, float(cantidad or 0), float(importe or 0))
+                      for codigo, nombre, cantidad, importe in productos],
+        "cierres": {
+            "num_cierres": cierres[0],
+            "total_ventas": cierres[1],
+            "total_efectivo": cierres[2],
+            "diferencia": cierres[3],
+        },
+    }
+
+
+def _leer_caja_seguro(args):
+    ruta, fecha_desde, fecha_hasta = args
+    try:
+        return leer_caja(ruta, fecha_desde, fecha_hasta)
+    except Exception as e:
+        return {"ruta": os.path.abspath(ruta), "nombre": nombre_caja(ruta), "error": str(e)}
+
+
+def combinar(resultados, fecha_desde, fecha_hasta):
+    """Une los totales de todas las cajas en un reporte consolidado"""
+    cajas = [r for r in resultados if "error" not in r]
+    errores = [(r["nombre"], r["error"]) for r in resultados if "error" in r]
+
+    metodos = {}
+    productos = {}
+    for caja in cajas:
+        for metodo, (num, total) in caja["metodos"].items():
+            acumulado = metodos.setdefault(metodo, [0, 0.0])
+            acumulado[0] += num
+            acumulado[1] += total
+        for codigo, nombre, cantidad, importe in caja["productos"]:
+            acumulado = productos.setdefault(codigo, [nombre, 0.0, 0.0])
+            acumulado[1] += cantidad
+            acumulado[2] += importe
+
+        caja["num_ventas"] = sum(num for num, _ in caja["metodos"].values())
+        caja["total"] = sum(total for _, total in caja["metodos"].values())
+
+    num_ventas = sum(num for num, _ in metodos.values())
+    total = sum(t for _, t in metodos.values())
+    return {
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "cajas": cajas,
+        "errores": errores,
+        "num_ventas": num_ventas,
+        "total": total,
+        "diferencia": sum(c["cierres"]["diferencia"] for c in cajas),
+        "metodos": {m: tuple(v) for m, v in sorted(metodos.items())},
+        "productos": sorted(
+            ((codigo, nombre, cantidad, importe) for codigo, (nombre, cantidad, importe) in productos.items()),
+            key=lambda p: p[3], reverse=True
+        ),
+    }
+
+
+def consolidar(rutas, fecha_desde, fecha_hasta, procesos=None):
+    """Lee cada base de datos en paralelo (un proceso por caja) y combina los totales"""
+    rutas = list(dict.fromkeys(os.path.abspath(r) for r in rutas))
+    tareas = [(ruta, fecha_desde, fecha_hasta) for ruta in rutas]
+    if not tareas:
+        return combinar([], fecha_desde, fecha_hasta)
+
+    procesos = procesos or min(len(tareas), os.cpu_count() or 1)
+    if procesos <= 1:
+        resultados = [_leer_caja_seguro(t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_leer_caja_seguro, tareas))
+    return combinar(resultados, fecha_desde, fecha_hasta)
+
+
+def texto_consolidado(reporte, max_productos=20):
+    """Reporte consolidado en texto plano (consola y respaldo sin ReportLab)"""
+    lineas = [
+        f"🏪 CONSOLIDADO DE CAJAS {reporte['fecha_desde']} a {reporte['fecha_hasta']}",
+        "",
+        f"• Cajas: {len(reporte['cajas'])}",
+        f"• Total Ventas: {formato_moneda_mx(reporte['total'])}",
+        f"• N° de Ventas: {reporte['num_ventas']}",
+        f"• Diferencia en cierres: {formato_moneda_mx(reporte['diferencia'])}",
+        "",
+    ]
+    for metodo, (num, total) in reporte["metodos"].items():
+        lineas.append(f"• {metodo}: {formato_moneda_mx(total)} ({num} ventas)")
+    lineas.append("")
+    for caja in reporte["cajas"]:
+        lineas.append(f"• {caja['nombre']}: {formato_moneda_mx(caja['total'])} ({caja['num_ventas']} ventas, "
+                      f"{caja['cierres']['num_cierres']} cierres, diferencia "
+                      f"{formato_moneda_mx(caja['cierres']['diferencia'])})")
+    if reporte["productos"]:
+        lineas.append("")
+        for codigo, nombre, cantidad, importe in reporte["productos"][:max_productos]:
+            lineas.append(f"• {codigo} {nombre}: {cantidad:g} - {formato_moneda_mx(importe)}")
+    for nombre, error in reporte["errores"]:
+        lineas.append(f"❌ {nombre}: {error}")
+    return "\n".join(lineas)
+
+
+def generar_pdf_consolidado(reporte, filename, max_productos=50):
+    """Genera el PDF consolidado; retorna la ruta creada (.txt si no hay ReportLab)"""
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+    except ImportError:
+        print("⚠️ ReportLab no disponible, generando consolidado en texto")
+        txt_filename = filename.replace('.pdf', '.txt')
+        with open(txt_filename, 'w', encoding='utf-8') as f:
+            f.write(texto_consolidado(reporte, max_productos))
+        return txt_filename
+
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    estilo_tabla = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F3F3')),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+    ]
+
+    elements = [
+        Paragraph("CONSOLIDADO DE CAJAS", styles['Heading1']),
+        Paragraph(f"<b>Período:</b> {reporte['fecha_desde']} a {reporte['fecha_hasta']}", styles['Normal']),
+        Paragraph(f"<b>Generado:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Spacer(1, 15),
+        Paragraph(f"<b>Total de ventas:</b> {formato_moneda_mx(reporte['total'])}", styles['Normal']),
+        Paragraph(f"<b>N° de ventas:</b> {reporte['num_ventas']}", styles['Normal']),
+        Paragraph(f"<b>Diferencia en cierres:</b> {formato_moneda_mx(reporte['diferencia'])}", styles['Normal']),
+        Spacer(1, 15),
+    ]
+
+    data = [['Caja', 'Ventas', 'Total', 'Cierres', 'Efectivo Final', 'Diferencia']]
+    for caja in reporte["cajas"]:
+        data.append([
+            caja['nombre'],
+            str(caja['num_ventas']),
+            formato_moneda_mx(caja['total']),
+            str(caja['cierres']['num_cierres']),
+            formato_moneda_mx(caja['cierres']['total_efectivo']),
+            formato_moneda_mx(caja['cierres']['diferencia'])
+        ])
+    table = Table(data, colWidths=[110, 60, 90, 50, 90, 80])
+    table.setStyle(TableStyle(estilo_tabla))
+    elements.extend([table, Spacer(1, 15)])
+
+    if reporte["metodos"]:
+        data = [['Método de Pago', 'Ventas', 'Total']]
+        for metodo, (num, total) in reporte["metodos"].items():
+            data.append([metodo, str(num), formato_moneda_mx(total)])
+        table = Table(data, colWidths=[150, 80, 120])
+        table.setStyle(TableStyle(estilo_tabla))
+        elements.extend([table, Spacer(1, 15)])
+
+    if reporte["productos"]:
+        elements.append(Paragraph("Productos más vendidos", styles['Heading2']))
+        data = [['Código', 'Producto', 'Cantidad', 'Importe']]
+        for codigo, nombre, cantidad, importe in reporte["productos"][:max_productos]:
+            data.append([codigo, nombre, f"{cantidad:g}", formato_moneda_mx(importe)])
+        table = Table(data, colWidths=[70, 200, 70, 100], repeatRows=1)
+        table.setStyle(TableStyle(estilo_tabla))
+        elements.append(table)
+
+    if reporte["errores"]:
+        elements.append(Spacer(1, 15))
+        elements.append(Paragraph("Cajas con error", styles['Heading2']))
+        for nombre, error in reporte["errores"]:
+            elements.append(Paragraph(f"<b>{nombre}:</b> {error}", styles['Normal']))
+
+    doc.build(elements)
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolida los cierres de varias cajas")
+    parser.add_argument("bases", nargs="+", help="Archivos .db de cada caja")
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    parser.add_argument("--desde", default=hoy, help="Fecha inicial YYYY-MM-DD (por defecto hoy)")
+    parser.add_argument("--hasta", default=hoy, help="Fecha final YYYY-MM-DD (por defecto hoy)")
+    parser.add_argument("--pdf", help="Ruta del PDF a generar")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos de lectura en paralelo")
+    args = parser.parse_args(argv)
+
+    inicio = datetime.now()
+    reporte = consolidar(args.bases, args.desde, args.hasta, args.procesos)
+    print(texto_consolidado(reporte))
+    print(f"\n⏱️ {len(args.bases)} cajas en {(datetime.now() - inicio).total_seconds():.2f} s")
+
+    if args.pdf:
+        directorio = os.path.dirname(os.path.abspath(args.pdf))
+        os.makedirs(directorio, exist_ok=True)
+        print(f"✅ Reporte generado: {generar_pdf_consolidado(reporte, args.pdf)}")
+    return 1 if reporte["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
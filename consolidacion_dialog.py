@@ -0,0 +1,170 @@
+import os
+from datetime import datetime
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox,
+    QListWidget, QDateEdit, QGroupBox, QTextEdit, QFileDialog, QProgressBar
+)
+from PyQt6.QtCore import QDate, QThread, pyqtSignal
+
+from config_manager import config_manager
+from consolidacion_cajas import consolidar, generar_pdf_consolidado, texto_consolidado
+from paths import get_app_directory, ensure_directory_exists
+
+
+class ConsolidacionWorker(QThread):
+    """Lee las cajas en procesos paralelos y genera el PDF sin bloquear la interfaz"""
+    terminado = pyqtSignal(bool, str, str)  # ok, texto del reporte, ruta del PDF
+
+    def __init__(self, rutas, fecha_desde, fecha_hasta, pdf_path):
+        super().__init__()
+        self.rutas = rutas
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+        self.pdf_path = pdf_path
+
+    def run(self):
+        try:
+            reporte = consolidar(self.rutas, self.fecha_desde, self.fecha_hasta)
+            ruta = generar_pdf_consolidado(reporte, self.pdf_path)
+            self.terminado.emit(True, texto_consolidado(reporte), ruta)
+        except Exception as e:
+            self.terminado.emit(False, f"❌ Error consolidando cajas: {str(e)}", "")
+
+
+class ConsolidacionDialog(QDialog):
+    """Reporte consolidado de varias cajas (cada una con su propio archivo .db)"""
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.worker = None
+        self.setWindowTitle("Consolidar Cajas")
+        self.setGeometry(200, 100, 800, 600)
+
+        layout = QVBoxLayout()
+
+        # Bases de datos de las cajas
+        bases_group = QGroupBox("Bases de datos de las cajas")
+        bases_layout = QVBoxLayout()
+        self.lista_bases = QListWidget()
+        bases_layout.addWidget(self.lista_bases)
+
+        botones_bases = QHBoxLayout()
+        btn_agregar = QPushButton("➕ Agregar...")
+        btn_agregar.clicked.connect(self.agregar_bases)
+        botones_bases.addWidget(btn_agregar)
+        btn_quitar = QPushButton("➖ Quitar")
+        btn_quitar.clicked.connect(self.quitar_base)
+        botones_bases.addWidget(btn_quitar)
+        botones_bases.addStretch()
+        bases_layout.addLayout(botones_bases)
+        bases_group.setLayout(bases_layout)
+        layout.addWidget(bases_group)
+
+        # Período
+        fechas_layout = QHBoxLayout()
+        fechas_layout.addWidget(QLabel("Desde:"))
+        self.date_from = QDateEdit()
+        self.date_from.setDate(QDate.currentDate())
+        self.date_from.setCalendarPopup(True)
+        fechas_layout.addWidget(self.date_from)
+        fechas_layout.addWidget(QLabel("Hasta:"))
+        self.date_to = QDateEdit()
+        self.date_to.setDate(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        fechas_layout.addWidget(self.date_to)
+
+        self.btn_consolidar = QPushButton("🏪 Consolidar")
+        self.btn_consolidar.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold;")
+        self.btn_consolidar.clicked.connect(self.consolidar)
+        fechas_layout.addWidget(self.btn_consolidar)
+        layout.addLayout(fechas_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.resultado = QTextEdit()
+        self.resultado.setReadOnly(True)
+        layout.addWidget(self.resultado)
+
+        btn_cerrar = QPushButton("Cerrar")
+        btn_cerrar.setStyleSheet("background-color: #7f8c8d; color: white; font-weight: bold;")
+        btn_cerrar.clicked.connect(self.accept)
+        layout.addWidget(btn_cerrar)
+
+        self.setLayout(layout)
+        self.cargar_bases()
+
+    # ===== LISTA DE CAJAS (SE RECUERDA EN LA CONFIGURACIÓN) =====
+    def cargar_bases(self):
+        bases = config_manager.load_config().get("consolidacion_bases") or [os.path.abspath(self.db_manager.db_name)]
+        self.lista_bases.addItems(bases)
+
+    def bases_actuales(self):
+        return [self.lista_bases.item(i).text() for i in range(self.lista_bases.count())]
+
+    def guardar_bases(self):
+        try:
+            config = config_manager.load_config()
+            config["consolidacion_bases"] = self.bases_actuales()
+            config_manager.update_config(config)
+        except Exception as e:
+            print(f"❌ Error guardando lista de cajas: {e}")
+
+    def agregar_bases(self):
+        archivos, _ = QFileDialog.getOpenFileNames(
+            self, "Seleccionar bases de datos", "", "Bases de datos SQLite (*.db *.sqlite);;Todos (*)"
+        )
+        actuales = set(self.bases_actuales())
+        for archivo in archivos:
+            if os.path.abspath(archivo) not in actuales:
+                self.lista_bases.addItem(os.path.abspath(archivo))
+        self.guardar_bases()
+
+    def quitar_base(self):
+        fila = self.lista_bases.currentRow()
+        if fila >= 0:
+            self.lista_bases.takeItem(fila)
+            self.guardar_bases()
+
+    # ===== CONSOLIDACIÓN =====
+    def consolidar(self):
+        rutas = self.bases_actuales()
+        if not rutas:
+            QMessageBox.warning(self, "Sin cajas", "Agregue al menos una base de datos.")
+            return
+        if self.worker is not None and self.worker.isRunning():
+            return
+
+        fecha_desde = self.date_from.date().toString("yyyy-MM-dd")
+        fecha_hasta = self.date_to.date().toString("yyyy-MM-dd")
+        reports_dir = ensure_directory_exists(os.path.join(get_app_directory(), "Reportes"))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pdf_path = os.path.join(reports_dir, f"consolidado_{fecha_desde}_{fecha_hasta}_{timestamp}.pdf")
+
+        self.btn_consolidar.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.resultado.setPlainText(f"🔄 Leyendo {len(rutas)} cajas...")
+
+        self.worker = ConsolidacionWorker(rutas, fecha_desde, fecha_hasta, pdf_path)
+        self.worker.terminado.connect(self.al_terminar)
+        self.worker.start()
+
+    def al_terminar(self, ok, texto, ruta):
+        self.btn_consolidar.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.resultado.setPlainText(texto)
+        if ok:
+            print(f"✅ Consolidado generado: {ruta}")
+            QMessageBox.information(self, "✅ Éxito",
+                f"Reporte consolidado generado correctamente\n\nArchivo: {os.path.basename(ruta)}")
+        else:
+            print(texto)
+            QMessageBox.critical(self, "❌ Error", texto)
+
+    def closeEvent(self, event):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.wait()
+        super().closeEvent(event)
@@ -0,0 +1,262 @@
+"""
+Exportación de datos crudos (CSV / JSON Lines) para contabilidad e integraciones.
+
+Las filas salen del cursor por lotes (fetchmany) y pasan por el formateador directo
+al archivo, opcionalmente comprimido con gzip: la memoria no depende del número de
+filas. Tablas: ventas, detalle_ventas, cierres y productos; las columnas y el rango
+de fechas son configurables.
+
+Uso por línea de comandos:
+    python data_export.py ventas --desde 2026-01-01 --hasta 2026-01-31 -o ventas.csv
+    python data_export.py detalle_ventas --formato jsonl --gzip \
+        --columnas venta_id,fecha,codigo,cantidad,subtotal -o detalle.jsonl.gz
+    python data_export.py productos --listar-columnas
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+from utils.db import NOMBRE_DB_POR_DEFECTO
+from archivo_historico import conectar_historico
+
+FILAS_POR_LOTE = 1000
+
+# Columna pública -> expresión SQL. El orden del diccionario es el orden por defecto.
+TABLAS = {
+    "ventas": {
+        "origen": "ventas v LEFT JOIN usuarios u ON v.usuario_id = u.id",
+        "fecha": "v.fecha",
+        "orden": "v.fecha, v.id",
+        "columnas": {
+            "id": "v.id",
+            "fecha": "v.fecha",
+            "total": "v.total",
+            "iva": "v.iva",
+            "metodo_pago": "v.metodo_pago",
+            "usuario": "u.nombre",
+            "estado": "v.estado",
+            "cierre_id": "v.cierre_id",
+        },
+    },
+    "detalle_ventas": {
+        "origen": """detalle_ventas d
+                     JOIN ventas v ON d.venta_id = v.id
+                     LEFT JOIN productos p ON d.producto_id = p.id""",
+        "fecha": "v.fecha",
+        "orden": "v.fecha, d.venta_id, d.id",
+        "columnas": {
+            "id": "d.id",
+            "venta_id": "d.venta_id",
+            "fecha": "v.fecha",
+            "producto_id": "d.producto_id",
+            "codigo": "p.codigo",
+            "producto": "p.nombre",
+            "cantidad": "d.cantidad",
+            "precio_unitario": "d.precio_unitario",
+            "subtotal": "d.subtotal",
+            "metodo_pago": "v.metodo_pago",
+        },
+    },
+    "cierres": {
+        "origen": "cierres_caja c LEFT JOIN usuarios u ON c.usuario_id = u.id",
+        "fecha": "c.fecha_apertura",
+        "orden": "c.fecha_apertura, c.id",
+        "columnas": {
+            "id": "c.id",
+            "fecha_apertura": "c.fecha_apertura",
+            "fecha_cierre": "c.fecha_cierre",
+            "usuario": "u.nombre",
+            "monto_inicial": "c.monto_inicial",
+            "ventas_efectivo": "c.ventas_efectivo",
+            "ventas_tarjeta": "c.ventas_tarjeta",
+            "ventas_transferencia": "c.ventas_transferencia",
+            "total_ventas": "c.total_ventas",
+            "total_efectivo": "c.total_efectivo",
+            "diferencia": "c.diferencia",
+            "num_ventas": "c.num_ventas",
+            "estado": "c.estado",
+            "observaciones": "c.observaciones",
+        },
+    },
+    "productos": {
+        # Catálogo actual: el rango de fechas no aplica
+        "origen": "productos p LEFT JOIN categorias cat ON p.categoria_id = cat.id",
+        "fecha": None,
+        "orden": "p.id",
+        "columnas": {
+            "id": "p.id",
+            "codigo": "p.codigo",
+            "codigo_barras": "p.codigo_barras",
+            "nombre": "p.nombre",
+            "categoria": "cat.nombre",
+            "precio": "p.precio",
+            "costo": "p.costo",
+            "stock": "p.stock",
+            "stock_minimo": "p.stock_minimo",
+            "activo": "p.activo",
+        },
+    },
+}
+
+
+def columnas_disponibles(tabla):
+    return list(TABLAS[tabla]["columnas"])
+
+
+def normalizar_fecha(fecha, fin_del_dia=False):
+    """'2026-01-31' -> '2026-01-31 23:59:59' (o 00:00:00); deja igual si ya trae hora"""
+    if not fecha:
+        return None
+    fecha = str(fecha)
+    if ' ' in fecha:
+        return fecha
+    return f"{fecha} {'23:59:59' if fin_del_dia else '00:00:00'}"
+
+
+def construir_consulta(tabla, columnas=None, fecha_desde=None, fecha_hasta=None):
+    """Retorna (sql, parámetros, columnas) validando las columnas pedidas"""
+    definicion = TABLAS[tabla]
+    columnas = list(columnas or definicion["columnas"])
+    desconocidas = [c for c in columnas if c not in definicion["columnas"]]
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas para {tabla}: {', '.join(desconocidas)}")
+
+    select = ", ".join(definicion["columnas"][c] for c in columnas)
+    sql = f"SELECT {select} FROM {definicion['origen']}"
+    condiciones, parametros = [], []
+    if definicion["fecha"]:
+        if fecha_desde:
+            condiciones.append(f"{definicion['fecha']} >= ?")
+            parametros.append(normalizar_fecha(fecha_desde))
+        if fecha_hasta:
+            condiciones.append(f"{definicion['fecha']} <= ?")
+            parametros.append(normalizar_fecha(fecha_hasta, fin_del_dia=True))
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    sql += f" ORDER BY {definicion['orden']}"
+    return sql, parametros, columnas
+
+
+def leer_filas(conn, tabla, columnas=None, fecha_desde=None, fecha_hasta=None, tamano_lote=FILAS_POR_LOTE):
+    """Generador de lotes de filas; el primer valor producido son los nombres de columna"""
+    sql, parametros, columnas = construir_consulta(tabla, columnas, fecha_desde, fecha_hasta)
+    cursor = conn.cursor()
+    cursor.execute(sql, parametros)
+    yield columnas
+    while True:
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            return
+        yield lote
+
+
+# ===== FORMATEADORES: (archivo, columnas, lotes) -> filas escritas =====
+def escribir_csv(f, columnas, lotes, progreso=None):
+    writer = csv.writer(f)
+    writer.writerow(columnas)
+    escritas = 0
+    for lote in lotes:
+        writer.writerows(lote)
+        escritas += len(lote)
+        if progreso:
+            progreso(escritas)
+    return escritas
+
+
+def escribir_jsonl(f, columnas, lotes, progreso=None):
+    escritas = 0
+    for lote in lotes:
+        f.writelines(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + "\n" for fila in lote)
+        escritas += len(lote)
+        if progreso:
+            progreso(escritas)
+    return escritas
+
+
+FORMATOS = {
+    "csv": escribir_csv,
+    "jsonl": escribir_jsonl,
+}
+
+
+def abrir_salida(ruta, formato, comprimir=False):
+    # BOM solo en CSV sin comprimir: Excel lo necesita para mostrar acentos
+    encoding = 'utf-8-sig' if formato == "csv" and not comprimir else 'utf-8'
+    if comprimir:
+        return gzip.open(ruta, 'wt', encoding=encoding, newline='')
+    return open(ruta, 'w', encoding=encoding, newline='')
+
+
+def nombre_archivo(tabla, formato, comprimir=False, fecha=None):
+    fecha = fecha or datetime.now()
+    return f"{tabla}_{fecha.strftime('%Y%m%d_%H%M%S')}.{formato}" + (".gz" if comprimir else "")
+
+
+def exportar(conn, tabla, ruta, formato="csv", columnas=None, fecha_desde=None, fecha_hasta=None,
+             comprimir=False, progreso=None):
+    """Escribe la tabla en streaming; retorna el número de filas exportadas.
+
+    progreso(filas_escritas) se llama después de cada lote. Si la exportación
+    falla, el archivo parcial se elimina.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    lotes = leer_filas(conn, tabla, columnas, fecha_desde, fecha_hasta)
+    columnas = next(lotes)
+    try:
+        with abrir_salida(ruta, formato, comprimir) as f:
+            escritas = FORMATOS[formato](f, columnas, lotes, progreso)
+    except BaseException:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        raise
+    print(f"✅ {tabla}: {escritas} filas exportadas a {ruta}")
+    return escritas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta datos crudos a CSV o JSON Lines")
+    parser.add_argument("tabla", choices=list(TABLAS))
+    parser.add_argument("--db", default=NOMBRE_DB_POR_DEFECTO, help="Base de datos de la caja")
+    parser.add_argument("--desde", help="Fecha inicial YYYY-MM-DD")
+    parser.add_argument("--hasta", help="Fecha final YYYY-MM-DD")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="csv")
+    parser.add_argument("--columnas", help="Columnas separadas por coma (por defecto todas)")
+    parser.add_argument("--gzip", action="store_true", help="Comprimir la salida")
+    parser.add_argument("-o", "--salida", help="Archivo de salida ('-' para la salida estándar)")
+    parser.add_argument("--listar-columnas", action="store_true", help="Mostrar las columnas disponibles")
+    args = parser.parse_args(argv)
+
+    if args.listar_columnas:
+        print("\n".join(columnas_disponibles(args.tabla)))
+        return 0
+
+    columnas = [c.strip() for c in args.columnas.split(",") if c.strip()] if args.columnas else None
+    try:
+        conn = conectar_historico(args.db, args.desde, args.hasta)
+    except sqlite3.Error as e:
+        print(f"❌ No se pudo abrir {args.db}: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.salida == "-":
+            lotes = leer_filas(conn, args.tabla, columnas, args.desde, args.hasta)
+            FORMATOS[args.formato](sys.stdout, next(lotes), lotes)
+            return 0
+        ruta = args.salida or nombre_archivo(args.tabla, args.formato, args.gzip)
+        exportar(conn, args.tabla, ruta, args.formato, columnas, args.desde, args.hasta, args.gzip)
+        return 0
+    except (ValueError, sqlite3.Error) as e:
+        print(f"❌ Error exportando {args.tabla}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import sqlite3
 import os
 
+from archivo_historico import adjuntar_archivos, desadjuntar_archivos
+
 class DatabaseManager:
     def __init__(self, db_name='caja_registradora.db'):
         self.db_name = db_name
@@ -26,6 +28,8 @@ class DatabaseManager:
             print("✅ Base de datos existente detectada")
             # ✅ MIGRAR CONSTRAINTS SI ES NECESARIO
             self.migrar_constraints()
+            # ✅ CREAR TABLAS AGREGADAS EN VERSIONES POSTERIORES
+            self.crear_tablas_auxiliares()
     
     def tablas_existen(self):
         """Verifica si las tablas esenciales existen"""
@@ -111,7 +115,9 @@ class DatabaseManager:
                     metodo_pago TEXT NOT NULL,
                     usuario_id INTEGER NOT NULL,
                     estado TEXT DEFAULT 'completada',
-                    FOREIGN KEY (usuario_id) REFERENCES usuarios (id)
+                    cierre_id INTEGER,
+                    FOREIGN KEY (usuario_id) REFERENCES usuarios (id),
+                    FOREIGN KEY (cierre_id) REFERENCES cierres_caja (id)
                 )
             ''')
             
@@ -145,6 +151,7 @@ class DatabaseManager:
                     diferencia REAL DEFAULT 0,
                     observaciones TEXT,
                     estado TEXT DEFAULT 'abierto',
+                    num_ventas INTEGER DEFAULT 0,
                     FOREIGN KEY (usuario_id) REFERENCES usuarios (id)
                 )
             ''')
@@ -174,11 +181,118 @@ class DatabaseManager:
             self.crear_indices_unicos()
             
             self.conn.commit()
+            
+            # Tablas auxiliares (también se crean en bases de datos existentes)
+            self.crear_tablas_auxiliares()
             print("✅ Todas las tablas creadas exitosamente")
             
         except sqlite3.Error as e:
             print(f"❌ Error creando tablas: {e}")
 
+    def crear_tablas_auxiliares(self):
+        """Crea tablas agregadas después de la versión inicial (idempotente)"""
+        if not self.conn:
+            return
+            
+        try:
+            # Bandeja de salida de emails (sobrevive reinicios y caídas de red)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha_creacion TIMESTAMP NOT NULL,
+                    tipo TEXT NOT NULL DEFAULT 'ticket',
+                    destinatario TEXT NOT NULL,
+                    asunto TEXT NOT NULL,
+                    cuerpo TEXT NOT NULL,
+                    adjunto_path TEXT,
+                    adjunto_nombre TEXT,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER DEFAULT 0,
+                    proximo_intento TIMESTAMP NOT NULL,
+                    ultimo_error TEXT,
+                    fecha_envio TIMESTAMP
+                )
+            ''')
+            
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_email_outbox_estado 
+                ON email_outbox (estado, proximo_intento)
+            ''')
+            
+            # Resumen diario de ventas (se actualiza en la misma transacción de cada venta)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ventas_diarias (
+                    fecha TEXT NOT NULL,
+                    metodo_pago TEXT NOT NULL,
+                    num_ventas INTEGER DEFAULT 0,
+                    total REAL DEFAULT 0,
+                    PRIMARY KEY (fecha, metodo_pago)
+                )
+            ''')
+            
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS productos_diarios (
+                    fecha TEXT NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    cantidad INTEGER DEFAULT 0,
+                    importe REAL DEFAULT 0,
+                    PRIMARY KEY (fecha, producto_id)
+                )
+            ''')
+            
+            # Resumen semanal por producto (semana = fecha del lunes)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS productos_semanales (
+                    semana TEXT NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    cantidad INTEGER DEFAULT 0,
+                    importe REAL DEFAULT 0,
+                    PRIMARY KEY (semana, producto_id)
+                )
+            ''')
+            
+            # ✅ TURNOS DE CAJA: CADA VENTA QUEDA LIGADA AL TURNO ABIERTO
+            self.migrar_turnos_caja()
+            
+            # Índices para lecturas por rango de fechas y detalle por venta
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (fecha, id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta ON detalle_ventas (venta_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_cierre ON ventas (cierre_id)")
+            # Índice cubriente: el análisis ABC lee el rango sin tocar la tabla
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_productos_diarios_cubriente
+                ON productos_diarios (fecha, producto_id, cantidad, importe)
+            ''')
+            
+            self.conn.commit()
+            
+            # ✅ LLENAR RESÚMENES LA PRIMERA VEZ (BASES DE DATOS CON HISTORIAL)
+            if (self.conn.execute("SELECT 1 FROM ventas_diarias LIMIT 1").fetchone() is None
+                    or self.conn.execute("SELECT 1 FROM productos_semanales LIMIT 1").fetchone() is None):
+                self.reconstruir_resumenes_diarios()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error creando tablas auxiliares: {e}")
+
+    def columnas_tabla(self, tabla):
+        return {fila[1] for fila in self.conn.execute(f"PRAGMA table_info({tabla})")}
+
+    def migrar_turnos_caja(self):
+        """Agrega ventas.cierre_id y cierres_caja.num_ventas en bases de datos existentes"""
+        if "cierre_id" not in self.columnas_tabla("ventas"):
+            print("🔄 Agregando columna cierre_id a ventas...")
+            self.conn.execute("ALTER TABLE ventas ADD COLUMN cierre_id INTEGER REFERENCES cierres_caja (id)")
+        
+        if "num_ventas" not in self.columnas_tabla("cierres_caja"):
+            print("🔄 Agregando columna num_ventas a cierres_caja...")
+            self.conn.execute("ALTER TABLE cierres_caja ADD COLUMN num_ventas INTEGER DEFAULT 0")
+            # Los cierres anteriores se guardaban ya terminados (sin turno abierto)
+            self.conn.execute('''
+                UPDATE cierres_caja
+                SET estado = 'cerrado', fecha_cierre = COALESCE(fecha_cierre, fecha_apertura)
+                WHERE estado = 'abierto'
+            ''')
+
     def crear_indices_unicos(self):
         """Crea índices únicos solo para registros activos"""
         try:
@@ -424,6 +538,9 @@ class DatabaseManager:
                     UPDATE productos SET stock = stock - ? WHERE id = ?
                 ''', (item['cantidad'], item['producto_id']))
             
+            self.actualizar_resumen_diario(cursor, venta_id)
+            if venta_data.get('cierre_id') is not None:
+                self.registrar_venta_en_turno(cursor, venta_id, venta_data['cierre_id'])
             self.conn.commit()
             return venta_id
             
@@ -432,6 +549,98 @@ class DatabaseManager:
             print(f"❌ Error registrando venta: {e}")
             return None
 
+    # ===== RESÚMENES DIARIOS =====
+    def actualizar_resumen_diario(self, cursor, venta_id):
+        """Suma una venta a los resúmenes diarios - usar ANTES del commit de la venta"""
+        cursor.execute('''
+            INSERT INTO ventas_diarias (fecha, metodo_pago, num_ventas, total)
+            SELECT DATE(fecha), metodo_pago, 1, total
+            FROM ventas WHERE id = ? AND estado = 'completada'
+            ON CONFLICT (fecha, metodo_pago) DO UPDATE SET
+                num_ventas = num_ventas + excluded.num_ventas,
+                total = total + excluded.total
+        ''', (venta_id,))
+        
+        cursor.execute('''
+            INSERT INTO productos_diarios (fecha, producto_id, cantidad, importe)
+            SELECT DATE(v.fecha), dv.producto_id, SUM(dv.cantidad), SUM(dv.subtotal)
+            FROM detalle_ventas dv
+            JOIN ventas v ON dv.venta_id = v.id
+            WHERE v.id = ? AND v.estado = 'completada'
+            GROUP BY dv.producto_id
+            ON CONFLICT (fecha, producto_id) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                importe = importe + excluded.importe
+        ''', (venta_id,))
+        
+        cursor.execute('''
+            INSERT INTO productos_semanales (semana, producto_id, cantidad, importe)
+            SELECT DATE(v.fecha, 'weekday 0', '-6 days'), dv.producto_id, SUM(dv.cantidad), SUM(dv.subtotal)
+            FROM detalle_ventas dv
+            JOIN ventas v ON dv.venta_id = v.id
+            WHERE v.id = ? AND v.estado = 'completada'
+            GROUP BY dv.producto_id
+            ON CONFLICT (semana, producto_id) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                importe = importe + excluded.importe
+        ''', (venta_id,))
+
+    def reconstruir_resumenes_diarios(self):
+        """Recalcula los resúmenes diarios desde ventas y detalle_ventas (incluye los años archivados)"""
+        alias = []
+        try:
+            # ATTACH antes de abrir la transacción; cada año está en un solo esquema y se suma
+            alias = adjuntar_archivos(self.conn, self.db_name, solo_lectura=False)
+            self.conn.execute("DELETE FROM ventas_diarias")
+            self.conn.execute("DELETE FROM productos_diarios")
+            self.conn.execute("DELETE FROM productos_semanales")
+            for esquema in ["main"] + alias:
+                # Ventas que también están en main (backup anterior al archivado) se cuentan una vez
+                repetidas = "" if esquema == "main" else "AND {}id NOT IN (SELECT id FROM main.ventas)"
+                self.conn.execute(f'''
+                    INSERT INTO ventas_diarias (fecha, metodo_pago, num_ventas, total)
+                    SELECT DATE(fecha), metodo_pago, COUNT(*), SUM(total)
+                    FROM {esquema}.ventas
+                    WHERE estado = 'completada' {repetidas.format('')}
+                    GROUP BY DATE(fecha), metodo_pago
+                    ON CONFLICT (fecha, metodo_pago) DO UPDATE SET
+                        num_ventas = num_ventas + excluded.num_ventas,
+                        total = total + excluded.total
+                ''')
+                self.conn.execute(f'''
+                    INSERT INTO productos_diarios (fecha, producto_id, cantidad, importe)
+                    SELECT DATE(v.fecha), dv.producto_id, SUM(dv.cantidad), SUM(dv.subtotal)
+                    FROM {esquema}.detalle_ventas dv
+                    JOIN {esquema}.ventas v ON dv.venta_id = v.id
+                    WHERE v.estado = 'completada' {repetidas.format('v.')}
+                    GROUP BY DATE(v.fecha), dv.producto_id
+                    ON CONFLICT (fecha, producto_id) DO UPDATE SET
+                        cantidad = cantidad + excluded.cantidad,
+                        importe = importe + excluded.importe
+                ''')
+                # Lunes de cada semana: siguiente domingo (o el mismo) menos 6 días
+                self.conn.execute(f'''
+                    INSERT INTO productos_semanales (semana, producto_id, cantidad, importe)
+                    SELECT DATE(v.fecha, 'weekday 0', '-6 days'), dv.producto_id, SUM(dv.cantidad), SUM(dv.subtotal)
+                    FROM {esquema}.detalle_ventas dv
+                    JOIN {esquema}.ventas v ON dv.venta_id = v.id
+                    WHERE v.estado = 'completada' {repetidas.format('v.')}
+                    GROUP BY DATE(v.fecha, 'weekday 0', '-6 days'), dv.producto_id
+                    ON CONFLICT (semana, producto_id) DO UPDATE SET
+                        cantidad = cantidad + excluded.cantidad,
+                        importe = importe + excluded.importe
+                ''')
+            self.conn.commit()
+            print("✅ Resúmenes diarios reconstruidos")
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"❌ Error reconstruyendo resúmenes diarios: {e}")
+        finally:
+            try:
+                desadjuntar_archivos(self.conn, alias)
+            except sqlite3.Error as e:
+                print(f"❌ Error separando archivos históricos: {e}")
+
     # ===== MÉTODOS PARA CIERRES DE CAJA =====
     def abrir_caja(self, usuario_id, monto_inicial=0):
         """Abre un turno de caja"""
@@ -449,40 +658,93 @@ class DatabaseManager:
             print(f"❌ Error abriendo caja: {e}")
             return None
 
-    def cerrar_caja(self, cierre_id, datos_cierre):
-        """Cierra un turno de caja"""
+    def obtener_turno_abierto(self):
+        """ID del turno abierto más reciente (None si no hay)"""
+        fila = self.conn.execute('''
+            SELECT id FROM cierres_caja
+            WHERE estado = 'abierto'
+            ORDER BY id DESC LIMIT 1
+        ''').fetchone()
+        return fila[0] if fila else None
+
+    def obtener_turno(self, cierre_id):
+        """Totales acumulados de un turno (una sola fila, sin recorrer ventas)"""
+        fila = self.conn.execute('''
+            SELECT c.id, c.fecha_apertura, c.fecha_cierre, c.usuario_id, COALESCE(u.nombre, ''),
+                   c.monto_inicial, c.ventas_efectivo, c.ventas_tarjeta, c.ventas_transferencia,
+                   c.total_ventas, c.num_ventas, c.total_efectivo, c.diferencia, c.estado
+            FROM cierres_caja c
+            LEFT JOIN usuarios u ON c.usuario_id = u.id
+            WHERE c.id = ?
+        ''', (cierre_id,)).fetchone()
+        if fila is None:
+            return None
+        campos = ["id", "fecha_apertura", "fecha_cierre", "usuario_id", "usuario",
+                  "monto_inicial", "ventas_efectivo", "ventas_tarjeta", "ventas_transferencia",
+                  "total_ventas", "num_ventas", "total_efectivo", "diferencia", "estado"]
+        turno = dict(zip(campos, fila))
+        turno["efectivo_esperado"] = (turno["monto_inicial"] or 0) + (turno["ventas_efectivo"] or 0)
+        return turno
+
+    def registrar_venta_en_turno(self, cursor, venta_id, cierre_id):
+        """Liga la venta al turno y suma su total al turno - usar ANTES del commit de la venta"""
+        if cierre_id is None:
+            # Una venta sin turno no aparecería en ningún cierre
+            raise sqlite3.IntegrityError(f"La venta {venta_id} no tiene un turno abierto")
+        cursor.execute("UPDATE ventas SET cierre_id = ? WHERE id = ?", (cierre_id, venta_id))
+        cursor.execute(
+            "SELECT total, metodo_pago FROM ventas WHERE id = ? AND estado = 'completada'", (venta_id,)
+        )
+        venta = cursor.fetchone()
+        if venta is None:
+            return
+        total, metodo_pago = venta
+        cursor.execute('''
+            UPDATE cierres_caja
+            SET ventas_efectivo = ventas_efectivo + ?,
+                ventas_tarjeta = ventas_tarjeta + ?,
+                ventas_transferencia = ventas_transferencia + ?,
+                total_ventas = total_ventas + ?,
+                num_ventas = num_ventas + 1
+            WHERE id = ? AND estado = 'abierto'
+        ''', (
+            total if metodo_pago == "Efectivo" else 0,
+            total if metodo_pago == "Tarjeta" else 0,
+            total if metodo_pago == "Transferencia" else 0,
+            total,
+            cierre_id
+        ))
+        if cursor.rowcount == 0:
+            raise sqlite3.IntegrityError(f"El turno {cierre_id} no está abierto")
+
+    def cerrar_caja(self, cierre_id, efectivo_contado, observaciones=''):
+        """Cierra un turno con el efectivo contado; los totales ya están acumulados en el turno"""
         try:
+            turno = self.obtener_turno(cierre_id)
+            if turno is None or turno["estado"] != 'abierto':
+                print(f"⚠️ El turno {cierre_id} no está abierto")
+                return None
+            
+            diferencia = efectivo_contado - turno["efectivo_esperado"]
             cursor = self.conn.cursor()
             cursor.execute('''
                 UPDATE cierres_caja 
                 SET fecha_cierre = CURRENT_TIMESTAMP,
-                    ventas_efectivo = ?,
-                    ventas_tarjeta = ?,
-                    ventas_transferencia = ?,
-                    total_ventas = ?,
                     total_efectivo = ?,
                     diferencia = ?,
                     observaciones = ?,
                     estado = 'cerrado'
-                WHERE id = ?
-            ''', (
-                datos_cierre['ventas_efectivo'],
-                datos_cierre['ventas_tarjeta'],
-                datos_cierre['ventas_transferencia'],
-                datos_cierre['total_ventas'],
-                datos_cierre['total_efectivo'],
-                datos_cierre['diferencia'],
-                datos_cierre.get('observaciones', ''),
-                cierre_id
-            ))
+                WHERE id = ? AND estado = 'abierto'
+            ''', (turno["efectivo_esperado"], diferencia, observaciones, cierre_id))
             
             self.conn.commit()
-            return True
+            turno.update(total_efectivo=turno["efectivo_esperado"], diferencia=diferencia, estado='cerrado')
+            return turno
             
         except sqlite3.Error as e:
             self.conn.rollback()
             print(f"❌ Error cerrando caja: {e}")
-            return False
+            return None
 
     # ===== MÉTODOS GENERALES =====
     def ejecutar_consulta(self, consulta, parametros=()):
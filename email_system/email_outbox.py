@@ -0,0 +1,260 @@
+import random
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from email_system.email_sender import EmailSender, construir_mensaje, cuerpo_ticket
+from email_system.mail_engine import obtener_motor
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+
+def _ahora():
+    return datetime.now().strftime(FORMATO_FECHA)
+
+
+class EmailOutbox:
+    """Bandeja de salida persistente (tabla email_outbox)"""
+
+    MAX_INTENTOS = 8
+    BACKOFF_BASE = 30        # segundos
+    BACKOFF_MAXIMO = 3600    # segundos
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _conectar(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def encolar(self, destinatario, asunto, cuerpo, adjunto_path=None, adjunto_nombre=None, tipo='ticket'):
+        """Agrega un mensaje a la bandeja; retorna su id"""
+        conn = self._conectar()
+        try:
+            ahora = _ahora()
+            cursor = conn.execute('''
+                INSERT INTO email_outbox
+                (fecha_creacion, tipo, destinatario, asunto, cuerpo, adjunto_path, adjunto_nombre, proximo_intento)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (ahora, tipo, destinatario, asunto, cuerpo, adjunto_path, adjunto_nombre, ahora))
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def encolar_ticket(self, ruta_ticket, email_cliente, numero_venta, total, nombre_negocio):
+        """Encola el ticket de una venta con el mismo formato que EmailSender.enviar_ticket"""
+        cuerpo = cuerpo_ticket(numero_venta, total, nombre_negocio)
+        return self.encolar(
+            email_cliente,
+            f"Ticket de Compra #{numero_venta} - {nombre_negocio}",
+            cuerpo,
+            ruta_ticket,
+            f"ticket_venta_{numero_venta}.txt",
+            'ticket'
+        )
+
+    def reclamar_lote(self, limite=20):
+        """Marca como 'enviando' y retorna los mensajes listos para enviar"""
+        conn = self._conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            filas = conn.execute('''
+                SELECT id, destinatario, asunto, cuerpo, adjunto_path, adjunto_nombre, intentos
+                FROM email_outbox
+                WHERE estado = 'pendiente' AND proximo_intento <= ?
+                ORDER BY proximo_intento, id
+                LIMIT ?
+            ''', (_ahora(), limite)).fetchall()
+            if filas:
+                conn.executemany(
+                    "UPDATE email_outbox SET estado = 'enviando' WHERE id = ?",
+                    [(fila[0],) for fila in filas]
+                )
+            conn.commit()
+            return filas
+        finally:
+            conn.close()
+
+    def marcar_enviado(self, mensaje_id):
+        conn = self._conectar()
+        try:
+            conn.execute('''
+                UPDATE email_outbox
+                SET estado = 'enviado', fecha_envio = ?, ultimo_error = NULL, intentos = intentos + 1
+                WHERE id = ?
+            ''', (_ahora(), mensaje_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def calcular_backoff(self, intentos):
+        """Backoff exponencial con jitter (mitad fija + mitad aleatoria)"""
+        espera = min(self.BACKOFF_MAXIMO, self.BACKOFF_BASE * (2 ** intentos))
+        return espera / 2 + random.uniform(0, espera / 2)
+
+    def marcar_fallo(self, mensaje_id, intentos_previos, error):
+        """Reprograma el mensaje o lo marca como fallido; retorna True si se reintentará"""
+        intentos = intentos_previos + 1
+        reintentar = intentos < self.MAX_INTENTOS
+        proximo = datetime.now() + timedelta(seconds=self.calcular_backoff(intentos_previos))
+
+        conn = self._conectar()
+        try:
+            conn.execute('''
+                UPDATE email_outbox
+                SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ?
+                WHERE id = ?
+            ''', (
+                'pendiente' if reintentar else 'fallido',
+                intentos,
+                proximo.strftime(FORMATO_FECHA),
+                str(error)[:500],
+                mensaje_id
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+        return reintentar
+
+    def recuperar_interrumpidos(self):
+        """Regresa a 'pendiente' los mensajes que quedaron en 'enviando' (cierre inesperado)"""
+        conn = self._conectar()
+        try:
+            cursor = conn.execute("UPDATE email_outbox SET estado = 'pendiente' WHERE estado = 'enviando'")
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def segundos_para_siguiente(self):
+        """Segundos hasta el próximo mensaje pendiente (None si no hay)"""
+        conn = self._conectar()
+        try:
+            fila = conn.execute(
+                "SELECT MIN(proximo_intento) FROM email_outbox WHERE estado = 'pendiente'"
+            ).fetchone()
+        finally:
+            conn.close()
+        if not fila or not fila[0]:
+            return None
+        proximo = datetime.strptime(fila[0], FORMATO_FECHA)
+        return max(0.0, (proximo - datetime.now()).total_seconds())
+
+    def listar(self, estados=('pendiente', 'enviando', 'fallido'), limite=500):
+        conn = self._conectar()
+        try:
+            marcadores = ", ".join("?" for _ in estados)
+            return conn.execute(f'''
+                SELECT id, fecha_creacion, tipo, destinatario, asunto, estado, intentos,
+                       proximo_intento, ultimo_error
+                FROM email_outbox
+                WHERE estado IN ({marcadores})
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (*estados, limite)).fetchall()
+        finally:
+            conn.close()
+
+    def reintentar_todos(self):
+        """Reprograma para ahora todos los mensajes fallidos o pendientes"""
+        conn = self._conectar()
+        try:
+            cursor = conn.execute('''
+                UPDATE email_outbox
+                SET estado = 'pendiente', intentos = CASE WHEN estado = 'fallido' THEN 0 ELSE intentos END,
+                    proximo_intento = ?
+                WHERE estado IN ('pendiente', 'fallido')
+            ''', (_ahora(),))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+class EmailDispatcher(QThread):
+    """Hilo único y de larga vida que vacía la bandeja de salida por lotes"""
+    mensaje_enviado = pyqtSignal(int, str)        # (id, destinatario)
+    mensaje_fallido = pyqtSignal(int, str, bool)  # (id, error, se_reintentara)
+
+    ESPERA_MAXIMA = 60   # segundos entre revisiones si no hay nada programado
+    TAMANO_LOTE = 20
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.outbox = EmailOutbox(db_path)
+        self.email_sender = EmailSender()
+        self._despertar = threading.Event()
+        self._detener = False
+
+    def despertar(self):
+        """Avisar que hay mensajes nuevos en la bandeja"""
+        self._despertar.set()
+
+    def detener(self, espera_ms=5000):
+        self._detener = True
+        self._despertar.set()
+        self.wait(espera_ms)
+
+    def run(self):
+        try:
+            recuperados = self.outbox.recuperar_interrumpidos()
+            if recuperados:
+                print(f"📬 {recuperados} emails interrumpidos regresaron a la bandeja")
+        except Exception as e:
+            print(f"❌ Error recuperando bandeja de emails: {e}")
+
+        while not self._detener:
+            try:
+                enviados = self.procesar_lote()
+                if enviados:
+                    continue  # Puede haber más mensajes listos
+                espera = self.outbox.segundos_para_siguiente()
+            except Exception as e:
+                print(f"❌ Error en despachador de emails: {e}")
+                espera = None
+
+            if espera is None or espera > self.ESPERA_MAXIMA:
+                espera = self.ESPERA_MAXIMA
+            self._despertar.wait(espera)
+            self._despertar.clear()
+
+    def procesar_lote(self):
+        """Envía un lote de mensajes; retorna cuántos se procesaron"""
+        lote = self.outbox.reclamar_lote(self.TAMANO_LOTE)
+        if not lote:
+            return 0
+
+        # Releer configuración por si cambió desde el panel
+        self.email_sender.cargar_configuracion()
+        config = self.email_sender.config
+
+        # Preparar mensajes; los que no se pueden construir fallan sin llegar al servidor
+        pendientes = []
+        for mensaje_id, destinatario, asunto, cuerpo, adjunto_path, adjunto_nombre, intentos in lote:
+            try:
+                if not config.get("habilitado") or not config.get("email"):
+                    raise RuntimeError("Servicio de email no configurado")
+                msg = construir_mensaje(config, destinatario, asunto, cuerpo, adjunto_path, adjunto_nombre)
+                pendientes.append((mensaje_id, destinatario, intentos, msg))
+            except Exception as e:
+                self._registrar_fallo(mensaje_id, intentos, e)
+
+        # ✅ ENVIAR EL LOTE COMPLETO CON EL MOTOR ASÍNCRONO (CONCURRENCIA LIMITADA)
+        if pendientes:
+            futuros = obtener_motor(config).enviar_lote([p[3] for p in pendientes])
+            for (mensaje_id, destinatario, intentos, _), futuro in zip(pendientes, futuros):
+                try:
+                    futuro.result()
+                    self.outbox.marcar_enviado(mensaje_id)
+                    print(f"✅ Email #{mensaje_id} enviado a {destinatario}")
+                    self.mensaje_enviado.emit(mensaje_id, destinatario)
+                except Exception as e:
+                    self._registrar_fallo(mensaje_id, intentos, e)
+
+        return len(lote)
+
+    def _registrar_fallo(self, mensaje_id, intentos, error):
+        reintentar = self.outbox.marcar_fallo(mensaje_id, intentos, error)
+        print(f"❌ Email #{mensaje_id} falló ({error}){' - se reintentará' if reintentar else ''}")
+        self.mensaje_fallido.emit(mensaje_id, str(error), reintentar)
@@ -1,4 +1,3 @@
-import smtplib
 import os
 import json
 from email.mime.text import MIMEText
@@ -7,6 +6,65 @@ from email.mime.base import MIMEBase
 from email import encoders
 from datetime import datetime
 
+from email_system.smtp_session import obtener_sesion
+from utils.helpers import formato_moneda_mx
+
+
+def cuerpo_ticket(numero_venta, total, nombre_negocio):
+    """Texto del correo que acompaña al ticket de una venta"""
+    return f"""
+            Hola,
+            
+            Adjuntamos su ticket de compra #{numero_venta} de {nombre_negocio}.
+            
+            📋 Resumen:
+            • Número de venta: {numero_venta}
+            • Total: {formato_moneda_mx(total)}
+            • Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}
+            
+            Gracias por su compra!
+            
+            --
+            {nombre_negocio}
+            """
+
+
+def construir_mensaje(config, destinatario, asunto, cuerpo, adjunto_path=None, adjunto_nombre=None):
+    """Construye un mensaje MIME con adjunto opcional"""
+    msg = MIMEMultipart()
+    msg['From'] = config["email"]
+    msg['To'] = destinatario
+    msg['Subject'] = asunto
+    msg.attach(MIMEText(cuerpo, 'plain'))
+    
+    if adjunto_path:
+        if not os.path.exists(adjunto_path):
+            raise FileNotFoundError(f"Adjunto no encontrado: {adjunto_path}")
+        with open(adjunto_path, 'rb') as archivo:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(archivo.read())
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename="{adjunto_nombre or os.path.basename(adjunto_path)}"'
+        )
+        msg.attach(part)
+    
+    return msg
+
+
+def construir_mensaje_ticket(config, ruta_ticket, email_cliente, numero_venta, total, nombre_negocio):
+    """Mensaje completo de un ticket de venta"""
+    return construir_mensaje(
+        config,
+        email_cliente,
+        f"Ticket de Compra #{numero_venta} - {nombre_negocio}",
+        cuerpo_ticket(numero_venta, total, nombre_negocio),
+        ruta_ticket,
+        f"ticket_venta_{numero_venta}.txt"
+    )
+
+
 class EmailSender:
     def __init__(self):
         self.config_path = "data/email_config.json"
@@ -25,7 +83,13 @@ class EmailSender:
                     "smtp_port": 587,
                     "email": "",
                     "password": "",
-                    "habilitado": False
+                    "habilitado": False,
+                    "concurrencia": 3,              # Envíos simultáneos del motor asíncrono
+                    "intervalo_destinatario": 1.0,  # Segundos mínimos entre mensajes al mismo destinatario
+                    "digest_habilitado": False,     # Resumen diario por email
+                    "digest_hora": "21:00",
+                    "digest_al_cerrar": True,
+                    "digest_destinatarios": []
                 }
                 self.guardar_configuracion()
         except Exception as e:
@@ -62,6 +126,27 @@ class EmailSender:
         except Exception as e:
             return False, f"❌ Error configurando email: {str(e)}"
     
+    def configurar_digest(self, habilitado, hora, destinatarios, al_cerrar=True):
+        """Configurar el resumen diario por email"""
+        try:
+            horas, minutos = (int(x) for x in hora.split(":"))
+            if not (0 <= horas < 24 and 0 <= minutos < 60):
+                raise ValueError("Hora fuera de rango")
+        except ValueError:
+            return False, "❌ La hora debe tener formato HH:MM"
+        
+        try:
+            self.config.update({
+                "digest_habilitado": habilitado,
+                "digest_hora": f"{horas:02d}:{minutos:02d}",
+                "digest_al_cerrar": al_cerrar,
+                "digest_destinatarios": [d.strip() for d in destinatarios if d.strip()]
+            })
+            self.guardar_configuracion()
+            return True, "✅ Resumen diario configurado"
+        except Exception as e:
+            return False, f"❌ Error configurando resumen diario: {str(e)}"
+    
     def enviar_ticket(self, ruta_ticket, email_cliente, numero_venta, total, nombre_negocio):
         """Enviar ticket por correo electrónico - MÉTODO SÍNCRONO (para compatibilidad)"""
         try:
@@ -71,81 +156,54 @@ class EmailSender:
             if not os.path.exists(ruta_ticket):
                 return False, "❌ Archivo de ticket no encontrado"
             
-            # Crear mensaje
-            msg = MIMEMultipart()
-            msg['From'] = self.config["email"]
-            msg['To'] = email_cliente
-            msg['Subject'] = f"Ticket de Compra #{numero_venta} - {nombre_negocio}"
-            
-            # Cuerpo del mensaje
-            cuerpo = f"""
-            Hola,
-            
-            Adjuntamos su ticket de compra #{numero_venta} de {nombre_negocio}.
-            
-            📋 Resumen:
-            • Número de venta: {numero_venta}
-            • Total: ${total:,.2f}
-            • Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-            
-            Gracias por su compra!
-            
-            --
-            {nombre_negocio}
-            """
-            
-            msg.attach(MIMEText(cuerpo, 'plain'))
-            
-            # Adjuntar ticket
-            with open(ruta_ticket, 'rb') as archivo:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(archivo.read())
-            
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= "ticket_venta_{numero_venta}.txt"'
+            # Crear mensaje con el ticket adjunto
+            msg = construir_mensaje_ticket(
+                self.config, ruta_ticket, email_cliente, numero_venta, total, nombre_negocio
             )
-            msg.attach(part)
             
-            # Enviar email
-            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"])
-            server.starttls()
-            server.login(self.config["email"], self.config["password"])
-            server.send_message(msg)
-            server.quit()
+            # Enviar email reutilizando la sesión SMTP abierta
+            obtener_sesion(self.config).enviar_mensaje(msg)
             
             return True, f"✅ Ticket enviado a {email_cliente}"
             
         except Exception as e:
             return False, f"❌ Error enviando email: {str(e)}"
     
-    def enviar_ticket_async(self, ruta_ticket, email_cliente, numero_venta, total, nombre_negocio):
-        """Enviar ticket de forma asíncrona usando QThreadPool"""
-        try:
-            print(f"📧 Iniciando envío asíncrono a: {email_cliente}")
-            
-            from email_system.email_thread import EmailWorker
-            
-            # Crear trabajador para QThreadPool
-            email_worker = EmailWorker(
-                self.config, 
-                ruta_ticket, 
-                email_cliente, 
-                numero_venta, 
-                total, 
-                nombre_negocio
-            )
-            
-            print(f"✅ Worker creado: {email_worker}")
-            return email_worker
-            
-        except Exception as e:
-            print(f"❌ Error creando worker: {e}")
-            import traceback
-            traceback.print_exc()
-            # Fallback al método sincrónico si hay error
-            return self.enviar_ticket(ruta_ticket, email_cliente, numero_venta, total, nombre_negocio)
+    def enviar_mensajes(self, mensajes):
+        """Envía varios mensajes MIME con el motor asíncrono (concurrencia limitada)
+        
+        Retorna una lista de concurrent.futures.Future, una por mensaje.
+        """
+        from email_system.mail_engine import obtener_motor
+        return obtener_motor(self.config).enviar_lote(mensajes)
+    
+    def enviar_tickets_lote(self, tickets):
+        """Envía varios tickets en bloque
+        
+        tickets: lista de dicts con ruta_ticket, email_cliente, numero_venta, total, nombre_negocio.
+        Retorna lista de (éxito, mensaje) en el mismo orden.
+        """
+        if not self.config["habilitado"] or not self.config["email"]:
+            return [(False, "❌ Servicio de email no configurado") for _ in tickets]
+        
+        resultados = [None] * len(tickets)
+        mensajes = []
+        indices = []
+        for i, ticket in enumerate(tickets):
+            try:
+                mensajes.append(construir_mensaje_ticket(self.config, **ticket))
+                indices.append(i)
+            except Exception as e:
+                resultados[i] = (False, f"❌ Error preparando email: {str(e)}")
+        
+        for i, futuro in zip(indices, self.enviar_mensajes(mensajes)):
+            try:
+                futuro.result()
+                resultados[i] = (True, f"✅ Ticket enviado a {tickets[i]['email_cliente']}")
+            except Exception as e:
+                resultados[i] = (False, f"❌ Error enviando email: {str(e)}")
+        
+        return resultados
     
     def probar_conexion(self):
         """Probar conexión con el servidor de email"""
@@ -153,10 +211,8 @@ class EmailSender:
             if not self.config["habilitado"]:
                 return False, "Servicio de email no configurado"
             
-            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"])
-            server.starttls()
-            server.login(self.config["email"], self.config["password"])
-            server.quit()
+            # Deja la sesión abierta para que el primer envío no pague el handshake
+            obtener_sesion(self.config).probar_conexion()
             
             return True, "✅ Conexión con servidor de email exitosa"
             
@@ -0,0 +1,399 @@
+import re
+import ssl
+import copy
+import time
+import base64
+import socket
+import asyncio
+import atexit
+import threading
+from email.utils import getaddresses
+
+
+class SMTPAsyncError(Exception):
+    """Respuesta inesperada del servidor SMTP"""
+
+    def __init__(self, codigo, mensaje):
+        super().__init__(f"{codigo} {mensaje}")
+        self.codigo = codigo
+        self.mensaje = mensaje
+
+
+def _preparar_datos(msg):
+    """Serializa el mensaje para DATA: fin de línea CRLF y puntos escapados"""
+    # Como smtplib.send_message: los Bcc reciben el correo pero no viajan en los encabezados
+    if msg['Bcc'] is not None or msg['Resent-Bcc'] is not None:
+        msg = copy.copy(msg)
+        del msg['Bcc']
+        del msg['Resent-Bcc']
+    datos = msg.as_bytes()
+    datos = re.sub(rb'(?:\r\n|\n|\r(?!\n))', b'\r\n', datos)
+    datos = re.sub(rb'(?m)^\.', b'..', datos)
+    if not datos.endswith(b'\r\n'):
+        datos += b'\r\n'
+    return datos + b'.\r\n'
+
+
+def _direcciones(msg):
+    """Remitente y destinatarios tal como los calcula smtplib.send_message"""
+    remitente = msg['Sender'] or msg['From']
+    remitente = getaddresses([remitente])[0][1] if remitente else ""
+    campos = [v for campo in ('To', 'Cc', 'Bcc') for v in msg.get_all(campo, [])]
+    destinatarios = [direccion for _, direccion in getaddresses(campos) if direccion]
+    return remitente, destinatarios
+
+
+class ConexionSMTPAsync:
+    """Conexión SMTP mínima sobre asyncio streams (EHLO, STARTTLS, AUTH, PIPELINING)"""
+
+    def __init__(self, host, port, timeout=15, nombre_local="localhost"):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.nombre_local = nombre_local
+        self.reader = None
+        self.writer = None
+        self.extensiones = {}
+        self.ultimo_uso = time.monotonic()
+
+    async def abrir(self, usar_tls=True, usuario=None, password=None):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        try:
+            await self._esperar((220,))
+            await self._ehlo()
+            if usar_tls:
+                if 'starttls' not in self.extensiones:
+                    raise SMTPAsyncError(0, "El servidor no soporta STARTTLS")
+                await self._comando("STARTTLS", (220,))
+                await self.writer.start_tls(ssl.create_default_context(), server_hostname=self.host)
+                await self._ehlo()
+            if usuario and password:
+                await self._login(usuario, password)
+        except BaseException:
+            self._cerrar_transporte()
+            raise
+        self.ultimo_uso = time.monotonic()
+
+    async def _leer_respuesta(self):
+        lineas = []
+        while True:
+            linea = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not linea:
+                raise ConnectionError("Conexión cerrada por el servidor SMTP")
+            lineas.append(linea[4:].strip().decode(errors='replace'))
+            if linea[3:4] != b'-':
+                return int(linea[:3]), "\n".join(lineas)
+
+    async def _esperar(self, esperados):
+        codigo, texto = await self._leer_respuesta()
+        if codigo not in esperados:
+            raise SMTPAsyncError(codigo, texto)
+        return codigo, texto
+
+    async def _comando(self, comando, esperados):
+        self.writer.write(comando.encode() + b"\r\n")
+        await self.writer.drain()
+        return await self._esperar(esperados)
+
+    async def _ehlo(self):
+        _, texto = await self._comando(f"EHLO {self.nombre_local}", (250,))
+        self.extensiones = {}
+        for linea in texto.splitlines()[1:]:
+            partes = linea.split(None, 1)
+            if partes:
+                self.extensiones[partes[0].lower()] = partes[1] if len(partes) > 1 else ""
+
+    async def _login(self, usuario, password):
+        mecanismos = self.extensiones.get('auth', '').upper().split()
+        if 'PLAIN' in mecanismos or not mecanismos:
+            token = base64.b64encode(f"\0{usuario}\0{password}".encode()).decode()
+            await self._comando(f"AUTH PLAIN {token}", (235,))
+        else:
+            await self._comando("AUTH LOGIN", (334,))
+            await self._comando(base64.b64encode(usuario.encode()).decode(), (334,))
+            await self._comando(base64.b64encode(password.encode()).decode(), (235,))
+
+    async def enviar(self, remitente, destinatarios, datos):
+        """Envía un mensaje; retorna dict de destinatarios rechazados (como smtplib)"""
+        comandos = [f"MAIL FROM:<{remitente}>"] + [f"RCPT TO:<{d}>" for d in destinatarios] + ["DATA"]
+
+        if 'pipelining' in self.extensiones:
+            # ✅ PIPELINING: UN SOLO VIAJE DE RED PARA MAIL/RCPT/DATA
+            self.writer.write("".join(c + "\r\n" for c in comandos).encode())
+            await self.writer.drain()
+            respuestas = [await self._leer_respuesta() for _ in comandos]
+        else:
+            respuestas = []
+            for comando in comandos:
+                self.writer.write(comando.encode() + b"\r\n")
+                await self.writer.drain()
+                respuestas.append(await self._leer_respuesta())
+                if comando.startswith("MAIL") and respuestas[-1][0] != 250:
+                    break
+
+        codigo_mail, texto_mail = respuestas[0]
+        if codigo_mail != 250:
+            await self.rset()
+            raise SMTPAsyncError(codigo_mail, texto_mail)
+
+        rechazados = {
+            d: respuesta for d, respuesta in zip(destinatarios, respuestas[1:len(destinatarios) + 1])
+            if respuesta[0] not in (250, 251)
+        }
+        codigo_data, texto_data = respuestas[-1] if len(respuestas) == len(comandos) else (0, "")
+
+        if len(rechazados) == len(destinatarios):
+            if codigo_data == 354:
+                # El servidor aceptó DATA sin destinatarios válidos: terminar vacío
+                self.writer.write(b".\r\n")
+                await self.writer.drain()
+                await self._leer_respuesta()
+            await self.rset()
+            raise SMTPAsyncError(550, f"Destinatarios rechazados: {rechazados}")
+        if codigo_data != 354:
+            await self.rset()
+            raise SMTPAsyncError(codigo_data, texto_data)
+
+        self.writer.write(datos)
+        await self.writer.drain()
+        await self._esperar((250,))
+        self.ultimo_uso = time.monotonic()
+        return rechazados
+
+    async def noop(self):
+        codigo, _ = await self._comando("NOOP", (250,))
+        self.ultimo_uso = time.monotonic()
+        return codigo
+
+    async def rset(self):
+        try:
+            await self._comando("RSET", (250,))
+        except Exception:
+            self._cerrar_transporte()
+
+    def _cerrar_transporte(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    @property
+    def abierta(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def cerrar(self):
+        if not self.abierta:
+            self._cerrar_transporte()
+            return
+        try:
+            await self._comando("QUIT", (221,))
+        except Exception:
+            pass
+        writer = self.writer
+        self._cerrar_transporte()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), 2)
+        except Exception:
+            pass
+
+
+class MailEngine:
+    """Motor de envío asíncrono: un event loop en su propio hilo, concurrencia limitada,
+    pool de conexiones reutilizables y límite de envíos por destinatario"""
+
+    def __init__(self, config, concurrencia=None, intervalo_destinatario=None,
+                 idle_timeout=60, keepalive_intervalo=30, timeout=15):
+        self.config = dict(config)
+        self.concurrencia = max(1, int(concurrencia or config.get("concurrencia", 3)))
+        # Segundos mínimos entre dos mensajes al mismo destinatario
+        self.intervalo_destinatario = float(
+            intervalo_destinatario if intervalo_destinatario is not None
+            else config.get("intervalo_destinatario", 1.0)
+        )
+        self.idle_timeout = idle_timeout
+        self.keepalive_intervalo = keepalive_intervalo
+        self.timeout = timeout
+        self._nombre_local = socket.getfqdn()
+
+        self._loop = asyncio.new_event_loop()
+        self._listo = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar_loop, name="MailEngine", daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+
+    def _ejecutar_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        self._libres = []              # Conexiones abiertas sin usar (LIFO)
+        self._proximo_envio = {}       # destinatario -> instante mínimo del siguiente envío
+        self._loop.call_soon(self._listo.set)
+        self._loop.call_later(self.idle_timeout, self._limpiar_inactivas)
+        self._loop.run_forever()
+
+    # ===== API PÚBLICA (segura desde cualquier hilo) =====
+    def enviar(self, msg):
+        """Programa el envío de un mensaje; retorna concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self._enviar(msg), self._loop)
+
+    def enviar_lote(self, mensajes):
+        """Programa varios mensajes; se envían en paralelo hasta el límite de concurrencia"""
+        return [self.enviar(msg) for msg in mensajes]
+
+    def detener(self, espera=5, terminar_pendientes=False):
+        """Cierra las conexiones del pool y detiene el event loop.
+
+        terminar_pendientes=True espera (hasta espera segundos) los envíos en curso antes de cerrar.
+        """
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._cerrar_todas(espera if terminar_pendientes else 0), self._loop
+            ).result(espera + 5)
+        except Exception as e:
+            print(f"❌ Error cerrando conexiones del motor de email: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(espera)
+
+    # ===== INTERNOS (dentro del event loop) =====
+    async def _enviar(self, msg):
+        remitente, destinatarios = _direcciones(msg)
+        if not destinatarios:
+            raise ValueError("El mensaje no tiene destinatarios")
+        datos = _preparar_datos(msg)
+
+        await self._respetar_limite(destinatarios)
+
+        async with self._semaforo:
+            for intento in range(2):
+                conexion = await self._tomar_conexion()
+                try:
+                    rechazados = await conexion.enviar(remitente, destinatarios, datos)
+                except SMTPAsyncError as e:
+                    if e.codigo == 421 and intento == 0:
+                        # Servidor cerrando el canal: reintentar con conexión nueva
+                        await conexion.cerrar()
+                        continue
+                    self._devolver(conexion)
+                    raise
+                except (OSError, asyncio.TimeoutError) as e:
+                    await conexion.cerrar()
+                    if intento == 1:
+                        raise
+                    print(f"🔄 Conexión SMTP perdida ({e}), reconectando...")
+                    continue
+                self._devolver(conexion)
+                return rechazados
+
+    async def _respetar_limite(self, destinatarios):
+        """Espera lo necesario para no rebasar un mensaje por intervalo a cada destinatario"""
+        if self.intervalo_destinatario <= 0:
+            return
+        ahora = time.monotonic()
+        claves = [d.lower() for d in destinatarios]
+        turno = max([ahora] + [self._proximo_envio.get(c, 0) for c in claves])
+        # Reservar el turno antes de dormir (el loop es de un solo hilo)
+        for clave in claves:
+            self._proximo_envio[clave] = turno + self.intervalo_destinatario
+        if turno > ahora:
+            await asyncio.sleep(turno - ahora)
+
+    async def _tomar_conexion(self):
+        while self._libres:
+            conexion = self._libres.pop()
+            inactiva = time.monotonic() - conexion.ultimo_uso
+            if not conexion.abierta or inactiva > self.idle_timeout:
+                await conexion.cerrar()
+                continue
+            if inactiva > self.keepalive_intervalo:
+                try:
+                    await conexion.noop()
+                except Exception:
+                    await conexion.cerrar()
+                    continue
+            return conexion
+
+        conexion = ConexionSMTPAsync(
+            self.config["smtp_server"], self.config["smtp_port"], self.timeout, self._nombre_local
+        )
+        await conexion.abrir(
+            self.config.get("usar_tls", True), self.config.get("email"), self.config.get("password")
+        )
+        print(f"🔌 Conexión SMTP asíncrona abierta con {self.config['smtp_server']}:{self.config['smtp_port']}")
+        return conexion
+
+    def _devolver(self, conexion):
+        if conexion.abierta and len(self._libres) < self.concurrencia:
+            self._libres.append(conexion)
+        else:
+            self._loop.create_task(conexion.cerrar())
+
+    def _limpiar_inactivas(self):
+        """Cierra conexiones ociosas y olvida límites de destinatario ya vencidos"""
+        ahora = time.monotonic()
+        vigentes = []
+        for conexion in self._libres:
+            if ahora - conexion.ultimo_uso > self.idle_timeout:
+                self._loop.create_task(conexion.cerrar())
+            else:
+                vigentes.append(conexion)
+        self._libres = vigentes
+        self._proximo_envio = {d: t for d, t in self._proximo_envio.items() if t > ahora}
+        self._loop.call_later(self.idle_timeout, self._limpiar_inactivas)
+
+    async def _cerrar_todas(self, espera_pendientes=0):
+        pendientes = asyncio.all_tasks() - {asyncio.current_task()}
+        if espera_pendientes and pendientes:
+            await asyncio.wait(pendientes, timeout=espera_pendientes)
+        libres, self._libres = self._libres, []
+        await asyncio.gather(*(c.cerrar() for c in libres), return_exceptions=True)
+
+
+# ===== REGISTRO DE MOTORES COMPARTIDOS =====
+_motores = {}
+_motores_lock = threading.Lock()
+
+
+def _clave_motor(config):
+    return (
+        config.get("smtp_server"),
+        config.get("smtp_port"),
+        config.get("email"),
+        config.get("password"),
+        config.get("usar_tls", True),
+        config.get("concurrencia", 3),
+        config.get("intervalo_destinatario", 1.0),
+    )
+
+
+def obtener_motor(config):
+    """Obtiene el motor compartido para una configuración SMTP dada.
+
+    Hay una sola cuenta SMTP: si la configuración cambió, el motor anterior se retira
+    (termina sus envíos en curso en segundo plano y detiene su hilo).
+    """
+    clave = _clave_motor(config)
+    with _motores_lock:
+        motor = _motores.get(clave)
+        if motor is None:
+            anteriores = list(_motores.values())
+            _motores.clear()
+            for anterior in anteriores:
+                threading.Thread(target=anterior.detener, kwargs={"espera": 60, "terminar_pendientes": True},
+                                 name="MailEngineRetiro", daemon=True).start()
+            motor = MailEngine(config)
+            _motores[clave] = motor
+        return motor
+
+
+def detener_motores():
+    """Detiene todos los motores de envío (llamar al cerrar la aplicación)"""
+    with _motores_lock:
+        motores = list(_motores.values())
+        _motores.clear()
+    for motor in motores:
+        motor.detener()
+
+
+atexit.register(detener_motores)
@@ -0,0 +1,132 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView, QComboBox
+)
+from PyQt6.QtGui import QPalette, QColor
+
+from email_system.email_outbox import EmailOutbox
+
+
+class EmailOutboxDialog(QDialog):
+    """Vista de administración de la bandeja de salida de emails"""
+
+    FILTROS = {
+        "Pendientes y fallidos": ('pendiente', 'enviando', 'fallido'),
+        "Solo fallidos": ('fallido',),
+        "Enviados": ('enviado',),
+    }
+
+    COLORES_ESTADO = {
+        'pendiente': '#f39c12',
+        'enviando': '#3498db',
+        'fallido': '#e74c3c',
+        'enviado': '#27ae60',
+    }
+
+    def __init__(self, db_path, dispatcher=None, parent=None):
+        super().__init__(parent)
+        self.outbox = EmailOutbox(db_path)
+        self.dispatcher = dispatcher
+        self.setWindowTitle("Bandeja de Salida de Emails")
+        self.setGeometry(200, 100, 900, 500)
+
+        palette = self.palette()
+        palette.setColor(QPalette.ColorRole.Window, QColor("#ecf0f1"))
+        self.setPalette(palette)
+
+        layout = QVBoxLayout()
+
+        # Filtro
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Mostrar:"))
+        self.combo_filtro = QComboBox()
+        self.combo_filtro.addItems(list(self.FILTROS.keys()))
+        self.combo_filtro.currentIndexChanged.connect(self.cargar_mensajes)
+        filter_layout.addWidget(self.combo_filtro)
+        filter_layout.addStretch(1)
+        self.lbl_resumen = QLabel()
+        filter_layout.addWidget(self.lbl_resumen)
+        layout.addLayout(filter_layout)
+
+        # Tabla de mensajes
+        self.tabla = QTableWidget()
+        self.tabla.setColumnCount(8)
+        self.tabla.setHorizontalHeaderLabels(
+            ["ID", "Creado", "Tipo", "Destinatario", "Estado", "Intentos", "Próximo intento", "Último error"]
+        )
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.tabla)
+
+        # Sin despachador (no pudo iniciarse) los mensajes quedan en la bandeja sin enviarse
+        if self.dispatcher is None:
+            lbl_sin_despachador = QLabel("⚠️ El envío de emails no está activo: los mensajes se enviarán al reiniciar la aplicación")
+            lbl_sin_despachador.setStyleSheet("color: #e74c3c; font-weight: bold;")
+            lbl_sin_despachador.setWordWrap(True)
+            layout.addWidget(lbl_sin_despachador)
+
+        # Botones
+        buttons_layout = QHBoxLayout()
+
+        btn_reintentar = QPushButton("🔄 Reintentar Todos")
+        btn_reintentar.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold;")
+        btn_reintentar.clicked.connect(self.reintentar_todos)
+        buttons_layout.addWidget(btn_reintentar)
+
+        btn_actualizar = QPushButton("Actualizar")
+        btn_actualizar.setStyleSheet("background-color: #3498db; color: white; font-weight: bold;")
+        btn_actualizar.clicked.connect(self.cargar_mensajes)
+        buttons_layout.addWidget(btn_actualizar)
+
+        btn_cerrar = QPushButton("Cerrar")
+        btn_cerrar.setStyleSheet("background-color: #7f8c8d; color: white; font-weight: bold;")
+        btn_cerrar.clicked.connect(self.accept)
+        buttons_layout.addWidget(btn_cerrar)
+
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+        self.cargar_mensajes()
+
+    def cargar_mensajes(self):
+        try:
+            estados = self.FILTROS[self.combo_filtro.currentText()]
+            mensajes = self.outbox.listar(estados)
+
+            self.tabla.setRowCount(len(mensajes))
+            for row, (id_, creado, tipo, destinatario, asunto, estado, intentos, proximo, error) in enumerate(mensajes):
+                self.tabla.setItem(row, 0, QTableWidgetItem(str(id_)))
+                self.tabla.setItem(row, 1, QTableWidgetItem(creado))
+                self.tabla.setItem(row, 2, QTableWidgetItem(tipo))
+                item_destino = QTableWidgetItem(destinatario)
+                item_destino.setToolTip(asunto)
+                self.tabla.setItem(row, 3, item_destino)
+                item_estado = QTableWidgetItem(estado)
+                item_estado.setForeground(QColor(self.COLORES_ESTADO.get(estado, '#000000')))
+                self.tabla.setItem(row, 4, item_estado)
+                self.tabla.setItem(row, 5, QTableWidgetItem(str(intentos)))
+                self.tabla.setItem(row, 6, QTableWidgetItem(proximo if estado == 'pendiente' else ""))
+                item_error = QTableWidgetItem(error or "")
+                item_error.setToolTip(error or "")
+                self.tabla.setItem(row, 7, item_error)
+
+            pendientes = sum(1 for m in mensajes if m[5] == 'pendiente')
+            fallidos = sum(1 for m in mensajes if m[5] == 'fallido')
+            self.lbl_resumen.setText(f"📬 Pendientes: {pendientes}   ❌ Fallidos: {fallidos}")
+
+        except Exception as e:
+            print(f"❌ Error cargando bandeja de emails: {e}")
+            QMessageBox.warning(self, "Error", f"No se pudo cargar la bandeja: {str(e)}")
+
+    def reintentar_todos(self):
+        try:
+            reprogramados = self.outbox.reintentar_todos()
+            if self.dispatcher is not None:
+                self.dispatcher.despertar()
+                QMessageBox.information(self, "Reintentar", f"{reprogramados} mensajes reprogramados para envío inmediato")
+            else:
+                QMessageBox.warning(self, "Reintentar",
+                                    f"{reprogramados} mensajes reprogramados; el envío de emails no está activo, "
+                                    "se enviarán al reiniciar la aplicación")
+            self.cargar_mensajes()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudieron reprogramar los mensajes: {str(e)}")
@@ -0,0 +1,184 @@
+import smtplib
+import threading
+import time
+import atexit
+
+
+class SMTPSessionManager:
+    """Mantiene una conexión SMTP autenticada y la reutiliza entre envíos"""
+
+    def __init__(self, config, idle_timeout=120, keepalive_intervalo=30, timeout=15):
+        self.config = config
+        self.idle_timeout = idle_timeout              # Segundos sin uso antes de cerrar
+        self.keepalive_intervalo = keepalive_intervalo  # Segundos antes de verificar con NOOP
+        self.timeout = timeout
+        self._server = None
+        self._ultimo_uso = 0.0
+        self._lock = threading.RLock()
+        self._timer_inactividad = None
+
+    def _conectar(self):
+        """Abre conexión, negocia TLS y autentica"""
+        server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"], timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.config.get("usar_tls", True):
+                server.starttls()
+                server.ehlo()
+            if self.config.get("email") and self.config.get("password"):
+                server.login(self.config["email"], self.config["password"])
+        except Exception:
+            self._cerrar_servidor(server)
+            raise
+        print(f"🔌 Sesión SMTP abierta con {self.config['smtp_server']}:{self.config['smtp_port']}")
+        return server
+
+    def _cerrar_servidor(self, server):
+        """Cierra un servidor sin propagar errores"""
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _descartar(self):
+        """Descarta la conexión actual (rota o expirada)"""
+        if self._server is not None:
+            self._cerrar_servidor(self._server)
+            self._server = None
+
+    def _sesion_viva(self):
+        """Verifica si la conexión actual sigue siendo utilizable"""
+        if self._server is None:
+            return False
+
+        inactivo = time.monotonic() - self._ultimo_uso
+        if inactivo > self.idle_timeout:
+            self._descartar()
+            return False
+
+        # Solo mandar NOOP si la conexión lleva un rato sin usarse
+        if inactivo > self.keepalive_intervalo:
+            try:
+                codigo, _ = self._server.noop()
+                if codigo != 250:
+                    self._descartar()
+                    return False
+            except (smtplib.SMTPException, OSError):
+                self._descartar()
+                return False
+
+        return True
+
+    def _obtener_servidor(self):
+        if not self._sesion_viva():
+            self._server = self._conectar()
+        self._ultimo_uso = time.monotonic()
+        return self._server
+
+    def _programar_cierre_inactividad(self):
+        """Reinicia el temporizador que cierra la sesión tras el idle_timeout"""
+        if self._timer_inactividad is not None:
+            self._timer_inactividad.cancel()
+        self._timer_inactividad = threading.Timer(self.idle_timeout, self._cerrar_si_inactiva)
+        self._timer_inactividad.daemon = True
+        self._timer_inactividad.start()
+
+    def _cerrar_si_inactiva(self):
+        with self._lock:
+            if self._server is not None and time.monotonic() - self._ultimo_uso >= self.idle_timeout:
+                print("💤 Cerrando sesión SMTP inactiva")
+                self._descartar()
+
+    @staticmethod
+    def _es_error_de_conexion(error):
+        """True si el error indica que la conexión se cayó (y vale la pena reconectar)"""
+        # SMTPException hereda de OSError: distinguir primero los errores del protocolo
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code == 421
+        if isinstance(error, smtplib.SMTPException):
+            return False
+        return isinstance(error, OSError)
+
+    def enviar_mensaje(self, msg):
+        """Envía un mensaje reutilizando la sesión; reconecta una vez si la conexión se perdió"""
+        with self._lock:
+            for intento in range(2):
+                server = self._obtener_servidor()
+                try:
+                    server.send_message(msg)
+                    self._ultimo_uso = time.monotonic()
+                    self._programar_cierre_inactividad()
+                    return
+                except Exception as e:
+                    if not self._es_error_de_conexion(e):
+                        # Error del mensaje (destinatario rechazado, etc.): la sesión sigue sana
+                        try:
+                            server.rset()
+                        except Exception:
+                            self._descartar()
+                        raise
+                    self._descartar()
+                    if intento == 1:
+                        raise
+                    print(f"🔄 Conexión SMTP perdida ({e}), reconectando...")
+
+    def probar_conexion(self):
+        """Abre (o verifica) la sesión y la deja lista para el siguiente envío"""
+        with self._lock:
+            self._obtener_servidor()
+            codigo, _ = self._server.noop()
+            self._programar_cierre_inactividad()
+            return codigo == 250
+
+    def cerrar(self):
+        """Cierra la sesión de forma ordenada"""
+        with self._lock:
+            if self._timer_inactividad is not None:
+                self._timer_inactividad.cancel()
+                self._timer_inactividad = None
+            if self._server is not None:
+                print("🔌 Cerrando sesión SMTP")
+            self._descartar()
+
+
+# ===== REGISTRO DE SESIONES COMPARTIDAS =====
+_sesiones = {}
+_sesiones_lock = threading.Lock()
+
+
+def _clave_sesion(config):
+    return (
+        config.get("smtp_server"),
+        config.get("smtp_port"),
+        config.get("email"),
+        config.get("password"),
+        config.get("usar_tls", True),
+    )
+
+
+def obtener_sesion(config):
+    """Obtiene la sesión compartida para una configuración SMTP dada"""
+    clave = _clave_sesion(config)
+    with _sesiones_lock:
+        sesion = _sesiones.get(clave)
+        if sesion is None:
+            sesion = SMTPSessionManager(dict(config))
+            _sesiones[clave] = sesion
+        return sesion
+
+
+def cerrar_sesiones():
+    """Cierra todas las sesiones SMTP abiertas (llamar al cerrar la aplicación)"""
+    with _sesiones_lock:
+        sesiones = list(_sesiones.values())
+        _sesiones.clear()
+    for sesion in sesiones:
+        sesion.cerrar()
+
+
+atexit.register(cerrar_sesiones)
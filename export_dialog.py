@@ -1,11 +1,30 @@
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-    QMessageBox, QComboBox, QGroupBox
+    QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QPushButton, 
+    QMessageBox, QComboBox, QGroupBox, QProgressBar, QCheckBox, QListWidget, QListWidgetItem
 )
 from PyQt6.QtGui import QPalette, QColor
+from PyQt6.QtCore import Qt, QTimer
 import os
 from datetime import datetime
-from utils.helpers import formato_moneda_mx  
+from archivo_historico import conectar_historico
+from export_jobs import GestorExportaciones, carpeta_reportes_del_dia
+from pdf_export import exportar_texto
+from data_export import TABLAS, columnas_disponibles
+
+# Reportes que se pueden generar en paralelo desde el diálogo
+NOMBRES_REPORTES = {
+    "ventas": "Ventas",
+    "cierres": "Cierres de caja",
+    "inventario": "Inventario (existencias actuales)",
+}
+
+# Formatos del combo: PDF (reportes) o datos crudos para contabilidad
+FORMATOS_EXPORTACION = [
+    ("pdf", "PDF - Documento imprimible"),
+    ("csv", "CSV - Datos para contabilidad"),
+    ("jsonl", "JSON Lines - Integraciones"),
+]
+
 
 class ExportDialog(QDialog):
     def __init__(self, db_manager, report_type, date_range, parent=None):
@@ -13,8 +32,12 @@ class ExportDialog(QDialog):
         self.db_manager = db_manager
         self.report_type = report_type
         self.date_range = date_range
+        self.gestor = GestorExportaciones()
+        self.trabajos = {}  # trabajo_id -> tipo
+        self.resultados = []
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.setWindowTitle(f"Exportar Reporte de {report_type.capitalize()}")
-        self.setGeometry(300, 200, 450, 250)
+        self.setGeometry(300, 200, 480, 380)
         
         palette = self.palette()
         palette.setColor(QPalette.ColorRole.Window, QColor("#ecf0f1"))
@@ -36,20 +59,69 @@ class ExportDialog(QDialog):
         format_layout = QVBoxLayout()
         format_layout.addWidget(QLabel("Seleccione el formato:"))
         self.format_combo = QComboBox()
-        self.format_combo.addItems([
-            "PDF - Documento imprimible"
-        ])
+        for formato, nombre in FORMATOS_EXPORTACION:
+            self.format_combo.addItem(nombre, formato)
+        self.format_combo.currentIndexChanged.connect(self.cambiar_formato)
         format_layout.addWidget(self.format_combo)
         format_group.setLayout(format_layout)
         layout.addWidget(format_group)
         
+        # Reportes a generar (cada uno en su propio proceso)
+        reportes_group = QGroupBox("Reportes a generar")
+        reportes_layout = QGridLayout()
+        self.checks = {}
+        self.barras = {}
+        for fila, (tipo, nombre) in enumerate(NOMBRES_REPORTES.items()):
+            check = QCheckBox(nombre)
+            check.setChecked(tipo == report_type)
+            barra = QProgressBar()
+            barra.setVisible(False)
+            reportes_layout.addWidget(check, fila, 0)
+            reportes_layout.addWidget(barra, fila, 1)
+            self.checks[tipo] = check
+            self.barras[tipo] = barra
+        reportes_group.setLayout(reportes_layout)
+        layout.addWidget(reportes_group)
+        self.reportes_group = reportes_group
+        
+        # Datos crudos: tabla, columnas y compresión
+        self.datos_group = QGroupBox("Datos a exportar")
+        datos_layout = QVBoxLayout()
+        self.tabla_combo = QComboBox()
+        self.tabla_combo.addItems(list(TABLAS))
+        self.tabla_combo.setCurrentText("ventas" if report_type == "ventas" else "cierres")
+        self.tabla_combo.currentTextChanged.connect(self.cargar_columnas)
+        datos_layout.addWidget(self.tabla_combo)
+        self.columnas_list = QListWidget()
+        datos_layout.addWidget(self.columnas_list)
+        self.check_gzip = QCheckBox("Comprimir (gzip)")
+        datos_layout.addWidget(self.check_gzip)
+        barra = QProgressBar()
+        barra.setVisible(False)
+        datos_layout.addWidget(barra)
+        self.barras["datos"] = barra
+        self.datos_group.setLayout(datos_layout)
+        self.datos_group.setVisible(False)
+        layout.addWidget(self.datos_group)
+        self.cargar_columnas(self.tabla_combo.currentText())
+        
+        self.timer_trabajos = QTimer(self)
+        self.timer_trabajos.setInterval(200)
+        self.timer_trabajos.timeout.connect(self.revisar_trabajos)
+        
         # Botones
         buttons_layout = QHBoxLayout()
         
-        btn_export = QPushButton("💾 Exportar")
-        btn_export.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold; padding: 10px;")
-        btn_export.clicked.connect(self.exportar_reporte)
-        buttons_layout.addWidget(btn_export)
+        self.btn_export = QPushButton("💾 Exportar")
+        self.btn_export.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold; padding: 10px;")
+        self.btn_export.clicked.connect(self.exportar_reporte)
+        buttons_layout.addWidget(self.btn_export)
+        
+        self.btn_detener = QPushButton("⏹ Detener")
+        self.btn_detener.setStyleSheet("background-color: #f39c12; color: white; font-weight: bold; padding: 10px;")
+        self.btn_detener.setEnabled(False)
+        self.btn_detener.clicked.connect(self.detener_exportaciones)
+        buttons_layout.addWidget(self.btn_detener)
         
         btn_cancel = QPushButton("❌ Cancelar")
         btn_cancel.setStyleSheet("background-color: #e74c3c; color: white; font-weight: bold; padding: 10px;")
@@ -59,26 +131,6 @@ class ExportDialog(QDialog):
         layout.addLayout(buttons_layout)
         self.setLayout(layout)
     
-    def verificar_datos_reporte(self):
-        """Verificar si hay datos para el reporte"""
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                fecha_desde = self.date_range['desde'].split(' ')[0] + ' 00:00:00'
-                fecha_hasta = self.date_range['hasta'].split(' ')[0] + ' 23:59:59'
-                
-                if self.report_type == "ventas":
-                    cursor.execute("SELECT COUNT(*) FROM ventas WHERE fecha BETWEEN ? AND ?", (fecha_desde, fecha_hasta))
-                else:
-                    cursor.execute("SELECT COUNT(*) FROM cierres_caja WHERE fecha_apertura BETWEEN ? AND ?", (fecha_desde, fecha_hasta))
-                
-                count = cursor.fetchone()[0]
-                return count > 0
-                
-        except Exception as e:
-            return False
-    
     def normalizar_fechas_consulta(self):
         """Normalizar formato de fechas para consultas SQL - CON DIAGNÓSTICO"""
         try:
@@ -123,295 +175,177 @@ class ExportDialog(QDialog):
                 'hasta': '2030-12-31 23:59:59'
             }
         
-    def diagnosticar_exportacion(self):
-        """Función de diagnóstico para ver qué está pasando"""
-        print("=== DIAGNÓSTICO DE EXPORTACIÓN ===")
+    def cambiar_formato(self):
+        es_pdf = self.format_combo.currentData() == "pdf"
+        self.reportes_group.setVisible(es_pdf)
+        self.datos_group.setVisible(not es_pdf)
+    
+    def cargar_columnas(self, tabla):
+        self.columnas_list.clear()
+        for columna in columnas_disponibles(tabla):
+            item = QListWidgetItem(columna)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            self.columnas_list.addItem(item)
+    
+    def columnas_seleccionadas(self):
+        return [self.columnas_list.item(i).text() for i in range(self.columnas_list.count())
+                if self.columnas_list.item(i).checkState() == Qt.CheckState.Checked]
+    
+    def tipos_seleccionados(self):
+        return [tipo for tipo, check in self.checks.items() if check.isChecked()]
+    
+    def exportar_datos(self):
+        """CSV / JSON Lines en segundo plano (ver data_export)"""
+        if "datos" in self.trabajos.values():
+            return
+        columnas = self.columnas_seleccionadas()
+        if not columnas:
+            QMessageBox.warning(self, "Sin columnas", "Seleccione al menos una columna.")
+            return
         
-        # 1. Verificar conexión a la base de datos
         try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Verificar tablas existentes
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tablas = cursor.fetchall()
-                print("📊 Tablas en la base de datos:", [t[0] for t in tablas])
-                
-                # Verificar fechas que se están usando
-                fechas = self.normalizar_fechas_consulta()
-                print("📅 Fechas normalizadas:", fechas)
-                
-                # Verificar datos en ventas
-                if self.report_type == "ventas":
-                    cursor.execute("SELECT COUNT(*) FROM ventas WHERE fecha BETWEEN ? AND ?", 
-                                (fechas['desde'], fechas['hasta']))
-                    count_ventas = cursor.fetchone()[0]
-                    print(f"🛒 Ventas en el período: {count_ventas}")
-                    
-                    # Ver algunas ventas de ejemplo
-                    cursor.execute("SELECT id, fecha, total FROM ventas ORDER BY fecha DESC LIMIT 3")
-                    ventas_ejemplo = cursor.fetchall()
-                    print("📝 Últimas 3 ventas:", ventas_ejemplo)
-                    
-                else:  # cierres
-                    cursor.execute("SELECT COUNT(*) FROM cierres_caja WHERE fecha_apertura BETWEEN ? AND ?", 
-                                (fechas['desde'], fechas['hasta']))
-                    count_cierres = cursor.fetchone()[0]
-                    print(f"💰 Cierres en el período: {count_cierres}")
-                    
-                    # Ver algunos cierres de ejemplo
-                    cursor.execute("SELECT id, fecha_apertura, total_ventas FROM cierres_caja ORDER BY fecha_apertura DESC LIMIT 3")
-                    cierres_ejemplo = cursor.fetchall()
-                    print("📝 Últimos 3 cierres:", cierres_ejemplo)
-                    
+            fechas = self.normalizar_fechas_consulta()
+            trabajo_id, filename = self.gestor.enviar_datos(
+                self.db_manager.db_name, self.tabla_combo.currentText(), self.format_combo.currentData(),
+                columnas, fechas['desde'], fechas['hasta'], self.check_gzip.isChecked())
+            self.trabajos[trabajo_id] = "datos"
+            barra = self.barras["datos"]
+            barra.setRange(0, 0)  # Sin total: solo indica actividad y filas escritas
+            barra.setFormat("")
+            barra.setVisible(True)
+            self.btn_detener.setEnabled(True)
+            self.timer_trabajos.start()
         except Exception as e:
-            print(f"❌ Error en diagnóstico: {e}")
+            QMessageBox.critical(self, "❌ Error", f"No se pudo exportar: {str(e)}")
     
     def exportar_reporte(self):
-        reports_dir = "Reportes"
-        os.makedirs(reports_dir, exist_ok=True)
+        if self.format_combo.currentData() != "pdf":
+            self.exportar_datos()
+            return
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{reports_dir}/{self.report_type}_{timestamp}.pdf"
+        tipos = self.tipos_seleccionados()
+        if not tipos:
+            QMessageBox.warning(self, "Sin reportes", "Seleccione al menos un reporte.")
+            return
         
         try:
-            self.exportar_pdf(filename)
-            QMessageBox.information(self, "✅ Éxito", 
-                f"Reporte PDF exportado correctamente\n\nArchivo: {os.path.basename(filename)}")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"No se pudo exportar PDF: {str(e)}")
-    
-    def exportar_pdf(self, filename):
-        """Exportar a PDF - VERSIÓN MEJORADA QUE USA REPORTLAB REAL"""
-        try:
-            print(f"🔄 Exportando PDF a: {filename}")
+            carpeta = carpeta_reportes_del_dia()
             
             # Verificar explícitamente si reportlab está disponible
             try:
                 import reportlab
                 print("✅ ReportLab está instalado, generando PDF real...")
-                
-                from reportlab.lib.pagesizes import A4
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.styles import getSampleStyleSheet
-                from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-                from reportlab.lib import colors
-                from reportlab.lib.units import inch
-                
-                # Crear documento PDF real
-                doc = SimpleDocTemplate(filename, pagesize=A4)
-                elements = []
-                styles = getSampleStyleSheet()
-                
-                # Título
-                title_style = getSampleStyleSheet()['Heading1']
-                elements.append(Paragraph(f"REPORTE DE {self.report_type.upper()}", title_style))
-                elements.append(Spacer(1, 20))
-                
-                # Información del reporte
-                normal_style = styles['Normal']
-                elements.append(Paragraph(f"<b>Generado:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style))
-                elements.append(Paragraph(f"<b>Período:</b> {self.date_range['desde']} a {self.date_range['hasta']}", normal_style))
-                elements.append(Spacer(1, 20))
-                
-                # Contenido específico del reporte
-                if self.report_type == "ventas":
-                    content = self._generar_contenido_ventas_pdf()
-                else:
-                    content = self._generar_contenido_cierres_pdf()
-                
-                elements.extend(content)
-                
-                # Construir PDF
-                doc.build(elements)
-                print(f"✅ PDF real generado correctamente: {filename}")
-                
-                QMessageBox.information(self, "✅ PDF Exportado", 
-                    f"PDF con formato profesional generado correctamente\n\nArchivo: {os.path.basename(filename)}")
-                
-                return filename
-                
             except ImportError as e:
+                # Fallback a texto plano solo si ReportLab no está instalado
                 print(f"⚠️ ReportLab no disponible: {e}")
-                raise ImportError("ReportLab no está instalado")
-                
-        except ImportError:
-            # Fallback a texto plano solo si ReportLab no está instalado
-            print("🔄 Usando fallback a texto plano para PDF")
-            return self._exportar_pdf_fallback(filename)
+                print("🔄 Usando fallback a texto plano para PDF")
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                archivos = [self._exportar_pdf_fallback(os.path.join(carpeta, f"{tipo}_{timestamp}.pdf"), tipo)
+                            for tipo in tipos]
+                QMessageBox.information(self, "✅ Éxito", 
+                    "Reportes exportados como texto (ReportLab no está instalado)\n\n"
+                    + "\n".join(os.path.basename(archivo) for archivo in archivos))
+                return
+            
+            fechas = self.normalizar_fechas_consulta()
+            periodo = f"{self.date_range['desde']} a {self.date_range['hasta']}"
+            en_curso = set(self.trabajos.values())
+            
+            for tipo in tipos:
+                if tipo in en_curso:
+                    continue
+                trabajo_id, filename = self.gestor.enviar(self.db_manager.db_name, tipo, fechas['desde'], fechas['hasta'],
+                                                          periodo=periodo, carpeta=carpeta)
+                self.trabajos[trabajo_id] = tipo
+                barra = self.barras[tipo]
+                barra.setRange(0, 0)  # Indeterminada hasta el primer aviso
+                barra.setVisible(True)
+            
+            self.btn_detener.setEnabled(True)
+            self.timer_trabajos.start()
+            
         except Exception as e:
-            print(f"❌ Error generando PDF real: {e}")
-            # Fallback a texto plano en caso de error
-            return self._exportar_pdf_fallback(filename)
+            QMessageBox.critical(self, "❌ Error", f"No se pudo exportar PDF: {str(e)}")
+    
+    def revisar_trabajos(self):
+        """Actualiza barras de progreso y recoge los trabajos terminados"""
+        for trabajo_id, escritas, total in self.gestor.progreso_pendiente():
+            clave = self.trabajos.get(trabajo_id)
+            if clave:
+                barra = self.barras[clave]
+                if total:
+                    barra.setRange(0, total)
+                    barra.setValue(escritas)
+                else:
+                    barra.setFormat(f"{escritas:,} filas")
         
-    def _exportar_pdf_fallback(self, filename):
+        for trabajo_id, tipo, estado, mensaje, archivos in self.gestor.terminados():
+            clave = self.trabajos.pop(trabajo_id, tipo)
+            self.barras[clave].setVisible(False)
+            nombre = NOMBRES_REPORTES.get(tipo, tipo)
+            if estado == 'ok':
+                print(f"✅ Exportación generada correctamente: {', '.join(archivos)}")
+                self.resultados.append(f"✅ {nombre}: " + ", ".join(os.path.basename(a) for a in archivos))
+            elif estado == 'cancelado':
+                print(f"⏹ Exportación de {tipo} cancelada")
+                self.resultados.append(f"⏹ {nombre}: cancelado")
+            elif clave == "datos":
+                print(f"❌ Error exportando {tipo}: {mensaje}")
+                self.resultados.append(f"❌ {nombre}: {mensaje}")
+            else:
+                print(f"❌ Error generando PDF real ({tipo}): {mensaje}")
+                # Fallback a texto plano en caso de error
+                try:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    txt_filename = self._exportar_pdf_fallback(
+                        os.path.join(carpeta_reportes_del_dia(), f"{tipo}_{timestamp}.pdf"), tipo)
+                    self.resultados.append(f"⚠️ {nombre}: error en PDF ({mensaje}), exportado como texto: {os.path.basename(txt_filename)}")
+                except Exception as e:
+                    self.resultados.append(f"❌ {nombre}: {str(e)}")
+        
+        if not self.trabajos:
+            self.timer_trabajos.stop()
+            self.btn_detener.setEnabled(False)
+            if self.resultados:
+                QMessageBox.information(self, "✅ Exportación terminada", 
+                    f"Carpeta: {carpeta_reportes_del_dia()}\n\n" + "\n".join(self.resultados))
+                self.resultados = []
+    
+    def detener_exportaciones(self):
+        self.gestor.cancelar_todos()
+    
+    def done(self, resultado):
+        # ✅ NO CERRAR CON EXPORTACIONES EN CURSO SIN CONFIRMAR
+        if self.trabajos:
+            respuesta = QMessageBox.question(self, "Exportación en curso", 
+                "Hay reportes generándose. ¿Cancelarlos y cerrar?")
+            if respuesta != QMessageBox.StandardButton.Yes:
+                return
+        self.timer_trabajos.stop()
+        self.gestor.cerrar()
+        self.trabajos.clear()
+        super().done(resultado)
+        
+    def _exportar_pdf_fallback(self, filename, tipo=None):
         """Fallback a texto plano para PDF"""
+        tipo = tipo or self.report_type
         txt_filename = filename.replace('.pdf', '.txt')
+        fechas = self.normalizar_fechas_consulta()
         
         with open(txt_filename, 'w', encoding='utf-8') as f:
             f.write("=" * 60 + "\n")
             f.write("SISTEMA DE CAJA REGISTRADORA\n")
             f.write("=" * 60 + "\n\n")
-            f.write(f"REPORTE DE {self.report_type.upper()}\n")
+            f.write(f"REPORTE DE {tipo.upper()}\n")
             f.write(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"Período: {self.date_range['desde']} a {self.date_range['hasta']}\n\n")
-            
-            if self.report_type == "ventas":
-                self._exportar_ventas_texto(f)
-            else:
-                self._exportar_cierres_texto(f)
+            # ✅ MISMA CONEXIÓN QUE LOS PROCESOS: INCLUYE LOS AÑOS ARCHIVADOS DEL PERÍODO
+            conn = conectar_historico(self.db_manager.db_name, fechas['desde'], fechas['hasta'])
+            try:
+                exportar_texto(conn, tipo, fechas['desde'], fechas['hasta'], f)
+            finally:
+                conn.close()
         
         print(f"✅ PDF fallback generado como texto: {txt_filename}")
         return txt_filename
-    
-    def _generar_contenido_ventas_pdf(self):
-        """Generar contenido para PDF de ventas - VERSIÓN SIMPLIFICADA Y FUNCIONAL"""
-        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                fechas = self.normalizar_fechas_consulta()
-                
-                # Resumen
-                cursor.execute("SELECT COUNT(*), SUM(total) FROM ventas WHERE fecha BETWEEN ? AND ?", 
-                            (fechas['desde'], fechas['hasta']))
-                resultado = cursor.fetchone()
-                total_ventas = resultado[0] if resultado else 0
-                monto_total = resultado[1] if resultado else 0
-                
-                elements.append(Paragraph(f"<b>Total de ventas:</b> {total_ventas}", styles['Normal']))
-                elements.append(Paragraph(f"<b>Monto total:</b> {formato_moneda_mx(monto_total)}", styles['Normal']))
-                elements.append(Spacer(1, 15))
-                
-                if total_ventas > 0:
-                    # Detalle de ventas (limitado para no hacer el PDF muy grande)
-                    cursor.execute("""
-                        SELECT v.id, v.fecha, v.total, v.metodo_pago, u.nombre
-                        FROM ventas v 
-                        JOIN usuarios u ON v.usuario_id = u.id 
-                        WHERE v.fecha BETWEEN ? AND ?
-                        ORDER BY v.fecha DESC
-                        LIMIT 30
-                    """, (fechas['desde'], fechas['hasta']))
-                    
-                    ventas = cursor.fetchall()
-                    
-                    # Crear tabla simple
-                    data = [['ID', 'Fecha', 'Total', 'Método', 'Vendedor']]
-                    for venta in ventas:
-                        id_venta, fecha, total, metodo, vendedor = venta
-                        # Formatear fecha para que sea más corta
-                        fecha_corta = fecha.split()[0] if ' ' in fecha else fecha
-                        data.append([
-                            str(id_venta),
-                            fecha_corta,
-                            formato_moneda_mx(total),
-                            metodo,
-                            vendedor
-                        ])
-                    
-                    if len(data) > 1:  # Si hay datos además del encabezado
-                        table = Table(data, colWidths=[50, 80, 70, 80, 100])
-                        table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, 0), 10),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F3F3')),
-                            ('FONTSIZE', (0, 1), (-1, -1), 8),
-                            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-                        ]))
-                        elements.append(table)
-                    else:
-                        elements.append(Paragraph("No hay datos para mostrar", styles['Normal']))
-                
-        except Exception as e:
-            print(f"❌ Error generando contenido PDF: {e}")
-            elements.append(Paragraph(f"Error al generar contenido: {str(e)}", styles['Normal']))
-        
-        return elements
-    
-    def _generar_contenido_cierres_pdf(self):
-        """Generar contenido para PDF de cierres"""
-        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                fechas = self.normalizar_fechas_consulta()
-                
-                # Resumen
-                cursor.execute("SELECT COUNT(*), SUM(total_ventas), AVG(diferencia) FROM cierres_caja WHERE fecha_apertura BETWEEN ? AND ?", 
-                             (fechas['desde'], fechas['hasta']))
-                resultado = cursor.fetchone()
-                total_cierres = resultado[0] if resultado else 0
-                ventas_total = resultado[1] if resultado else 0
-                diff_promedio = resultado[2] if resultado else 0
-                
-                elements.append(Paragraph(f"<b>Total de cierres:</b> {total_cierres}", styles['Normal']))
-                elements.append(Paragraph(f"<b>Ventas totales:</b> {formato_moneda_mx(ventas_total)}", styles['Normal']))
-                elements.append(Paragraph(f"<b>Diferencia promedio:</b> {formato_moneda_mx(diff_promedio)}", styles['Normal']))
-                elements.append(Spacer(1, 15))
-                
-                if total_cierres > 0:
-                    # Detalle de cierres
-                    cursor.execute("""
-                        SELECT c.fecha_apertura, u.nombre, c.monto_inicial, c.ventas_efectivo,
-                               c.ventas_tarjeta, c.total_ventas, c.diferencia
-                        FROM cierres_caja c
-                        JOIN usuarios u ON c.usuario_id = u.id
-                        WHERE c.fecha_apertura BETWEEN ? AND ?
-                        ORDER BY c.fecha_apertura DESC
-                    """, (fechas['desde'], fechas['hasta']))
-                    
-                    cierres = cursor.fetchall()
-                    
-                    # Crear tabla
-                    data = [['Fecha', 'Usuario', 'Monto Inicial', 'Ventas Efectivo', 'Ventas Tarjeta', 'Total', 'Diferencia']]
-                    for cierre in cierres:
-                        fecha, usuario, inicial, efectivo, tarjeta, total, diff = cierre
-                        fecha_corta = fecha.split()[0] if ' ' in fecha else fecha
-                        data.append([
-                            fecha_corta,
-                            usuario,
-                            formato_moneda_mx(inicial),
-                            formato_moneda_mx(efectivo),
-                            formato_moneda_mx(tarjeta),
-                            formato_moneda_mx(total),
-                            formato_moneda_mx(diff)
-                        ])
-                    
-                    if len(data) > 1:
-                        table = Table(data, colWidths=[80, 80, 70, 70, 70, 70, 70])
-                        table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, 0), 9),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F3F3')),
-                            ('FONTSIZE', (0, 1), (-1, -1), 8),
-                            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-                        ]))
-                        elements.append(table)
-                    else:
-                        elements.append(Paragraph("No hay datos para mostrar", styles['Normal']))
-                
-        except Exception as e:
-            print(f"❌ Error generando contenido PDF cierres: {e}")
-            elements.append(Paragraph(f"Error al generar contenido: {str(e)}", styles['Normal']))
-        
-        return elements
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Exportaciones en segundo plano.
+
+Cada reporte se genera en un proceso del pool: ReportLab es Python puro y en un
+hilo competiría por el GIL con la interfaz. Los procesos avisan su progreso por
+una cola compartida y revisan un Event de cancelación después de cada bloque.
+Varios reportes (PDF de ventas, cierres, inventario y datos crudos CSV / JSON
+Lines) pueden generarse a la vez; los archivos quedan en Reportes/AAAA-MM-DD/.
+"""
+import os
+import queue
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from archivo_historico import conectar_historico
+from paths import get_app_directory, ensure_directory_exists
+from pdf_export import exportar_pdf, ruta_volumen
+from data_export import exportar as exportar_datos, nombre_archivo
+
+MAX_PROCESOS = 3
+
+
+class ExportacionCancelada(Exception):
+    """El usuario canceló la exportación"""
+
+
+def carpeta_reportes_del_dia(fecha=None):
+    """Reportes/AAAA-MM-DD junto a la aplicación"""
+    fecha = fecha or datetime.now()
+    return ensure_directory_exists(os.path.join(get_app_directory(), "Reportes", fecha.strftime("%Y-%m-%d")))
+
+
+def borrar_volumenes(filename):
+    """Elimina los volúmenes ya guardados de una exportación cancelada"""
+    volumen = 1
+    while os.path.exists(ruta_volumen(filename, volumen)):
+        os.remove(ruta_volumen(filename, volumen))
+        volumen += 1
+
+
+def _apagar_manager(manager, futures):
+    """Apaga el Manager cuando los trabajos en curso terminan (en un hilo aparte)"""
+    wait(futures)
+    manager.shutdown()
+
+
+def generar_reporte(trabajo_id, db_path, tipo, fecha_desde, fecha_hasta, filename, periodo, eventos, cancelar):
+    """Se ejecuta en un proceso de trabajo; retorna la lista de archivos creados"""
+    def progreso(escritas, total):
+        if cancelar.is_set():
+            raise ExportacionCancelada()
+        eventos.put((trabajo_id, escritas, total))
+
+    conn = conectar_historico(db_path, fecha_desde, fecha_hasta)
+    try:
+        return exportar_pdf(conn, tipo, fecha_desde, fecha_hasta, filename, periodo=periodo, progreso=progreso)
+    except ExportacionCancelada:
+        borrar_volumenes(filename)
+        raise
+    finally:
+        conn.close()
+
+
+def generar_datos(trabajo_id, db_path, tabla, formato, columnas, fecha_desde, fecha_hasta, comprimir,
+                  filename, eventos, cancelar):
+    """Exportación CSV / JSON Lines en un proceso de trabajo; el total no se conoce (0)"""
+    def progreso(escritas):
+        if cancelar.is_set():
+            raise ExportacionCancelada()
+        eventos.put((trabajo_id, escritas, 0))
+
+    conn = conectar_historico(db_path, fecha_desde, fecha_hasta)
+    try:
+        exportar_datos(conn, tabla, filename, formato, columnas, fecha_desde, fecha_hasta, comprimir, progreso)
+        return [filename]
+    finally:
+        conn.close()
+
+
+class GestorExportaciones:
+    """Pool de procesos, cola de progreso compartida y un Event de cancelación por trabajo.
+
+    El pool y el Manager se crean con el primer trabajo. Sin Qt: la interfaz consulta
+    progreso_pendiente() y terminados() con un QTimer.
+    """
+
+    def __init__(self, max_procesos=MAX_PROCESOS):
+        self.max_procesos = max(1, min(max_procesos, os.cpu_count() or 1))
+        self.pool = None
+        self.manager = None
+        self.eventos = None
+        self.trabajos = {}  # trabajo_id -> (future, cancelar, tipo, ruta)
+        self.siguiente_id = 1
+
+    def _iniciar(self):
+        if self.pool is None:
+            self.manager = multiprocessing.Manager()
+            self.eventos = self.manager.Queue()
+            self.pool = ProcessPoolExecutor(max_workers=self.max_procesos)
+
+    def _reservar_id_y_ruta(self, carpeta, nombre):
+        trabajo_id = self.siguiente_id
+        self.siguiente_id += 1
+        filename = os.path.join(carpeta, nombre)
+        # Dos trabajos iguales en el mismo segundo no deben pisarse (ni borrarse al cancelar)
+        if os.path.exists(filename) or filename in (ruta for _, _, _, ruta in self.trabajos.values()):
+            base, ext = nombre.split(".", 1)
+            filename = os.path.join(carpeta, f"{base}_{trabajo_id}.{ext}")
+        return trabajo_id, filename
+
+    def _enviar(self, funcion, trabajo_id, tipo, filename, *args):
+        cancelar = self.manager.Event()
+        future = self.pool.submit(funcion, trabajo_id, *args, self.eventos, cancelar)
+        self.trabajos[trabajo_id] = (future, cancelar, tipo, filename)
+        print(f"🔄 Exportación #{trabajo_id} ({tipo}) en cola: {filename}")
+        return trabajo_id, filename
+
+    def enviar(self, db_path, tipo, fecha_desde, fecha_hasta, periodo=None, carpeta=None):
+        """Encola un reporte PDF; retorna (trabajo_id, ruta del PDF)"""
+        self._iniciar()
+        carpeta = carpeta or carpeta_reportes_del_dia()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        trabajo_id, filename = self._reservar_id_y_ruta(carpeta, f"{tipo}_{timestamp}.pdf")
+        return self._enviar(generar_reporte, trabajo_id, tipo, filename, os.path.abspath(db_path), tipo,
+                            fecha_desde, fecha_hasta, filename, periodo)
+
+    def enviar_datos(self, db_path, tabla, formato, columnas=None, fecha_desde=None, fecha_hasta=None,
+                     comprimir=False, carpeta=None):
+        """Encola una exportación de datos crudos; retorna (trabajo_id, ruta del archivo)"""
+        self._iniciar()
+        carpeta = carpeta or carpeta_reportes_del_dia()
+        trabajo_id, filename = self._reservar_id_y_ruta(carpeta, nombre_archivo(tabla, formato, comprimir))
+        return self._enviar(generar_datos, trabajo_id, tabla, filename, os.path.abspath(db_path), tabla, formato,
+                            columnas, fecha_desde, fecha_hasta, comprimir, filename)
+
+    def cancelar(self, trabajo_id):
+        trabajo = self.trabajos.get(trabajo_id)
+        if trabajo:
+            future, cancelar, _, _ = trabajo
+            # Si aún no empezó se quita de la cola; si ya corre, se detiene en el siguiente bloque
+            if not future.cancel():
+                cancelar.set()
+
+    def cancelar_todos(self):
+        for trabajo_id in list(self.trabajos):
+            self.cancelar(trabajo_id)
+
+    def activos(self):
+        return len(self.trabajos)
+
+    def progreso_pendiente(self):
+        """Vacía la cola de progreso: lista de (trabajo_id, filas_escritas, total)"""
+        avisos = []
+        if self.eventos is None:
+            return avisos
+        while True:
+            try:
+                avisos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                return avisos
+
+    def terminados(self):
+        """Trabajos que acabaron desde la última consulta: lista de
+        (trabajo_id, tipo, estado, mensaje, archivos) con estado 'ok', 'cancelado' o 'error'"""
+        resultados = []
+        for trabajo_id, (future, _, tipo, _) in list(self.trabajos.items()):
+            if not future.done():
+                continue
+            del self.trabajos[trabajo_id]
+            if future.cancelled():
+                resultados.append((trabajo_id, tipo, 'cancelado', "Cancelado", []))
+                continue
+            error = future.exception()
+            if isinstance(error, ExportacionCancelada):
+                resultados.append((trabajo_id, tipo, 'cancelado', "Cancelado", []))
+            elif error is not None:
+                resultados.append((trabajo_id, tipo, 'error', str(error), []))
+            else:
+                resultados.append((trabajo_id, tipo, 'ok', "", future.result()))
+        return resultados
+
+    def cerrar(self):
+        """Cancela lo pendiente y libera los procesos sin bloquear la interfaz"""
+        self.cancelar_todos()
+        if self.pool is not None:
+            # ✅ LOS EVENTS YA ESTÁN PUESTOS: LO EN COLA SE DESCARTA Y LO QUE CORRE SE DETIENE
+            # EN EL SIGUIENTE BLOQUE. EL MANAGER SIGUE VIVO HASTA ENTONCES (LOS PROCESOS
+            # CONSULTAN SU EVENT Y BORRAN SUS VOLÚMENES PARCIALES)
+            en_curso = [future for future, _, _, _ in self.trabajos.values()]
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            threading.Thread(target=_apagar_manager, args=(self.manager, en_curso), daemon=True).start()
+            self.pool = None
+            self.manager = None
+            self.eventos = None
+        self.trabajos.clear()
@@ -0,0 +1,168 @@
+import io
+import math
+import threading
+from collections import OrderedDict
+
+# ✅ SOLO Figure + Agg: NO SE CARGA pyplot NI EL BACKEND DE Qt DE MATPLOTLIB
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from utils.helpers import formato_moneda_mx
+
+COLORES_METODOS = ['#e74c3c', '#3498db', '#2ecc71', '#f39c12']
+MENSAJE_SIN_DATOS = 'No hay ventas registradas\npara el período seleccionado'
+MAX_IMAGENES = 16
+
+# Imágenes ya renderizadas: clave -> (png_dias, png_metodos)
+_cache_imagenes = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _png(figura):
+    buffer = io.BytesIO()
+    figura.canvas.print_png(buffer)
+    return buffer.getvalue()
+
+
+class RenderizadorGraficos:
+    """Dibuja las gráficas de ventas fuera de pantalla y reutiliza los artistas entre filtros"""
+
+    def __init__(self, ancho=6, alto=4, dpi=100):
+        self.figura_dias = Figure(figsize=(ancho, alto), dpi=dpi)
+        FigureCanvasAgg(self.figura_dias)
+        self.figura_dias.subplots_adjust(left=0.15, right=0.95, top=0.90, bottom=0.25)
+        self.ax_dias = self.figura_dias.add_subplot(111)
+
+        self.figura_metodos = Figure(figsize=(ancho, alto), dpi=dpi)
+        FigureCanvasAgg(self.figura_metodos)
+        self.figura_metodos.subplots_adjust(left=0.05, right=0.85, top=0.90, bottom=0.1)
+        self.ax_metodos = self.figura_metodos.add_subplot(111)
+
+        self._barras = None
+        self._textos_barras = []
+        self._pastel = None
+        self._metodos_pastel = None
+
+    # ===== API =====
+    def renderizar(self, clave, serie_diaria, metodos):
+        """PNG de ambas gráficas; si la clave ya se dibujó antes no se toca matplotlib"""
+        with _cache_lock:
+            imagenes = _cache_imagenes.get(clave)
+            if imagenes is not None:
+                _cache_imagenes.move_to_end(clave)
+                return imagenes
+
+        fechas, totales = serie_diaria
+        imagenes = (self._dibujar_dias(fechas, totales), self._dibujar_metodos(metodos))
+
+        with _cache_lock:
+            _cache_imagenes[clave] = imagenes
+            while len(_cache_imagenes) > MAX_IMAGENES:
+                _cache_imagenes.popitem(last=False)
+        return imagenes
+
+    # ===== VENTAS POR DÍA =====
+    def _dibujar_dias(self, fechas, totales):
+        ax = self.ax_dias
+        if not fechas or not any(totales):
+            self._barras = None
+            self._textos_barras = []
+            ax.clear()
+            ax.text(0.5, 0.5, MENSAJE_SIN_DATOS, ha='center', va='center', transform=ax.transAxes,
+                    fontsize=12, style='italic', color='gray')
+            ax.set_title('Ventas por Día', fontsize=12, fontweight='bold')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            return _png(self.figura_dias)
+
+        max_val = max(totales)
+        etiquetas = [f[5:10] if len(f) >= 10 else f for f in fechas]  # MM-DD
+
+        if self._barras is not None and len(self._barras) == len(totales):
+            # ✅ MISMO NÚMERO DE DÍAS: SOLO SE ACTUALIZAN ALTURAS Y TEXTOS
+            for barra, texto, valor in zip(self._barras, self._textos_barras, totales):
+                barra.set_height(valor)
+                texto.set_position((barra.get_x() + barra.get_width() / 2., valor + max_val * 0.01))
+                texto.set_text(formato_moneda_mx(valor).replace('$', '') if valor > 0 else '')
+        else:
+            ax.clear()
+            self._barras = ax.bar(range(len(totales)), totales, color='#3498db', alpha=0.7, width=0.6)
+            ax.set_title('Ventas por Día', fontsize=12, fontweight='bold', pad=15)
+            ax.set_xlabel('Fecha', fontsize=10, labelpad=10)
+            ax.set_ylabel('Total Ventas ($)', fontsize=10, labelpad=10)
+            ax.set_xticks(range(len(totales)))
+            ax.grid(True, alpha=0.2, axis='y')
+            self._textos_barras = [
+                ax.text(barra.get_x() + barra.get_width() / 2., valor + max_val * 0.01,
+                        formato_moneda_mx(valor).replace('$', '') if valor > 0 else '',
+                        ha='center', va='bottom', fontsize=8)
+                for barra, valor in zip(self._barras, totales)
+            ]
+
+        ax.set_xticklabels(etiquetas, rotation=45, ha='right', fontsize=8)
+        ax.set_ylim(0, max_val * 1.15)
+        return _png(self.figura_dias)
+
+    # ===== MÉTODOS DE PAGO =====
+    def _dibujar_metodos(self, metodos_data):
+        ax = self.ax_metodos
+        datos = [(metodo, total) for metodo, total, _ in metodos_data if total > 0]
+        if not datos:
+            self._pastel = None
+            self._metodos_pastel = None
+            ax.clear()
+            ax.text(0.5, 0.5, MENSAJE_SIN_DATOS, ha='center', va='center', transform=ax.transAxes,
+                    fontsize=12, style='italic', color='gray')
+            ax.set_title('Métodos de Pago', fontsize=12, fontweight='bold')
+            return _png(self.figura_metodos)
+
+        metodos = [d[0] for d in datos]
+        totales = [d[1] for d in datos]
+
+        if self._pastel is not None and self._metodos_pastel == metodos:
+            # ✅ MISMOS MÉTODOS: SE MUEVEN LOS ÁNGULOS Y TEXTOS EXISTENTES
+            self._actualizar_pastel(totales)
+        else:
+            ax.clear()
+            wedges, texts, autotexts = ax.pie(
+                totales,
+                labels=metodos,
+                autopct=lambda p: f'{p:.1f}%' if p > 0 else '',
+                colors=COLORES_METODOS[:len(totales)],
+                startangle=90,
+                textprops={'fontsize': 9}
+            )
+            for autotext in autotexts:
+                autotext.set_color('white')
+                autotext.set_fontweight('bold')
+                autotext.set_fontsize(9)
+            ax.axis('equal')
+            ax.set_title('Métodos de Pago', fontsize=12, fontweight='bold', pad=15)
+            self._pastel = (wedges, texts, autotexts)
+            self._metodos_pastel = metodos
+
+        return _png(self.figura_metodos)
+
+    def _actualizar_pastel(self, totales):
+        """Recalcula ángulos con el mismo criterio que Axes.pie (startangle=90, antihorario)"""
+        wedges, texts, autotexts = self._pastel
+        suma = float(sum(totales))
+        theta1 = 90.0
+        for wedge, texto, autotexto, valor in zip(wedges, texts, autotexts, totales):
+            fraccion = valor / suma
+            theta2 = theta1 + 360.0 * fraccion
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            medio = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(medio), math.sin(medio)
+            texto.set_position((1.1 * x, 1.1 * y))
+            texto.set_horizontalalignment('left' if x > 0 else 'right')
+            autotexto.set_position((0.6 * x, 0.6 * y))
+            autotexto.set_text(f'{fraccion * 100:.1f}%' if fraccion > 0 else '')
+            theta1 = theta2
+
+
+def limpiar_cache():
+    with _cache_lock:
+        _cache_imagenes.clear()
@@ -7,6 +7,7 @@ from PyQt6.QtGui import QPalette, QColor
 from PyQt6.QtCore import Qt, pyqtSignal
 
 from utils.helpers import formato_moneda_mx
+from archivo_historico import producto_en_archivos
 
 class InventoryManagerDialog(QDialog):
 
@@ -405,6 +406,8 @@ class InventoryManagerDialog(QDialog):
                 # VERIFICAR SI EL PRODUCTO TIENE VENTAS HISTÓRICAS
                 cursor.execute("SELECT COUNT(*) FROM detalle_ventas WHERE producto_id = ?", (producto_id,))
                 tiene_ventas = cursor.fetchone()[0] > 0
+                # ✅ TAMBIÉN LAS VENTAS DE AÑOS ARCHIVADOS (archive_AAAA.db)
+                tiene_ventas = tiene_ventas or producto_en_archivos(self.db_manager.db_name, producto_id)
                 
                 if tiene_ventas:
                     # SOLO DESACTIVAR (no eliminar) para mantener consistencia
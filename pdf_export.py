@@ -0,0 +1,265 @@
+"""
+Exportación de reportes (ventas, cierres de caja e inventario) a PDF en streaming.
+
+Las filas se leen con fetchmany y cada lote se convierte en un bloque LongTable de
+tamaño fijo con el encabezado repetido (repeatRows), así que nunca existe una lista
+con todas las filas ni una tabla gigante.
+
+Los reportes grandes se parten en volúmenes (reporte.pdf, reporte_parte2.pdf, ...)
+de a lo más FILAS_POR_ARCHIVO filas, y cada volumen se arma con doc.build (API
+pública de ReportLab): se guarda y se libera antes de empezar el siguiente, y la
+memoria pico depende del tamaño del volumen, no del total.
+"""
+import os
+from datetime import datetime
+
+from utils.helpers import formato_moneda_mx
+
+FILAS_POR_BLOQUE = 200       # filas por LongTable (y por fetchmany)
+FILAS_POR_ARCHIVO = 25000    # filas por volumen PDF (doc.build retiene el volumen completo)
+
+
+def _fecha_corta(fecha):
+    fecha = str(fecha or '')
+    return fecha.split()[0] if ' ' in fecha else fecha
+
+
+# ===== DEFINICIÓN DE CADA REPORTE =====
+def _resumen_ventas(cursor, fecha_desde, fecha_hasta):
+    cursor.execute("SELECT COUNT(*), SUM(total) FROM ventas WHERE fecha BETWEEN ? AND ?",
+                   (fecha_desde, fecha_hasta))
+    total_ventas, monto_total = cursor.fetchone()
+    total_ventas = total_ventas or 0
+    return total_ventas, [
+        ("Total de ventas", str(total_ventas)),
+        ("Monto total", formato_moneda_mx(monto_total or 0)),
+    ]
+
+
+def _fila_venta(fila):
+    id_venta, fecha, total, metodo, vendedor = fila
+    return [str(id_venta), _fecha_corta(fecha), formato_moneda_mx(total), metodo, vendedor]
+
+
+def _resumen_cierres(cursor, fecha_desde, fecha_hasta):
+    cursor.execute("SELECT COUNT(*), SUM(total_ventas), AVG(diferencia) FROM cierres_caja WHERE fecha_apertura BETWEEN ? AND ?",
+                   (fecha_desde, fecha_hasta))
+    total_cierres, ventas_total, diff_promedio = cursor.fetchone()
+    total_cierres = total_cierres or 0
+    return total_cierres, [
+        ("Total de cierres", str(total_cierres)),
+        ("Ventas totales", formato_moneda_mx(ventas_total or 0)),
+        ("Diferencia promedio", formato_moneda_mx(diff_promedio or 0)),
+    ]
+
+
+def _fila_cierre(fila):
+    fecha, usuario, inicial, efectivo, tarjeta, total, diff = fila
+    return [
+        _fecha_corta(fecha),
+        usuario,
+        formato_moneda_mx(inicial),
+        formato_moneda_mx(efectivo),
+        formato_moneda_mx(tarjeta),
+        formato_moneda_mx(total),
+        formato_moneda_mx(diff)
+    ]
+
+
+def _resumen_inventario(cursor, fecha_desde, fecha_hasta):
+    # Existencias actuales: el rango de fechas no aplica
+    cursor.execute("""
+        SELECT COUNT(*), SUM(stock), SUM(stock * costo), SUM(CASE WHEN stock <= stock_minimo THEN 1 ELSE 0 END)
+        FROM productos WHERE activo = 1
+    """)
+    total_productos, unidades, valor, bajo_minimo = cursor.fetchone()
+    total_productos = total_productos or 0
+    return total_productos, [
+        ("Productos activos", str(total_productos)),
+        ("Unidades en existencia", str(unidades or 0)),
+        ("Valor del inventario (costo)", formato_moneda_mx(valor or 0)),
+        ("Productos en o bajo el mínimo", str(bajo_minimo or 0)),
+    ]
+
+
+def _fila_inventario(fila):
+    codigo, nombre, categoria, precio, stock, minimo, valor = fila
+    return [codigo, nombre[:30], categoria[:15], formato_moneda_mx(precio), str(stock), str(minimo), formato_moneda_mx(valor)]
+
+
+# ✅ LEFT JOIN: LAS FILAS DEL DETALLE COINCIDEN CON EL CONTEO DEL RESUMEN (PARA EL PROGRESO)
+REPORTES = {
+    "ventas": {
+        "resumen": _resumen_ventas,
+        "detalle_sql": """
+            SELECT v.id, v.fecha, v.total, v.metodo_pago, COALESCE(u.nombre, '')
+            FROM ventas v
+            LEFT JOIN usuarios u ON v.usuario_id = u.id
+            WHERE v.fecha BETWEEN ? AND ?
+            ORDER BY v.fecha DESC, v.id DESC
+        """,
+        "encabezado": ['ID', 'Fecha', 'Total', 'Método', 'Vendedor'],
+        "anchos": [50, 80, 70, 80, 100],
+        "color": '#4CAF50',
+        "fila": _fila_venta,
+    },
+    "cierres": {
+        "resumen": _resumen_cierres,
+        "detalle_sql": """
+            SELECT c.fecha_apertura, COALESCE(u.nombre, ''), c.monto_inicial, c.ventas_efectivo,
+                   c.ventas_tarjeta, c.total_ventas, c.diferencia
+            FROM cierres_caja c
+            LEFT JOIN usuarios u ON c.usuario_id = u.id
+            WHERE c.fecha_apertura BETWEEN ? AND ?
+            ORDER BY c.fecha_apertura DESC
+        """,
+        "encabezado": ['Fecha', 'Usuario', 'Monto Inicial', 'Ventas Efectivo', 'Ventas Tarjeta', 'Total', 'Diferencia'],
+        "anchos": [80, 80, 70, 70, 70, 70, 70],
+        "color": '#366092',
+        "fila": _fila_cierre,
+    },
+    "inventario": {
+        "resumen": _resumen_inventario,
+        "por_fecha": False,
+        "detalle_sql": """
+            SELECT p.codigo, p.nombre, COALESCE(c.nombre, 'Sin categoría'), p.precio, p.stock,
+                   p.stock_minimo, p.stock * p.costo
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.activo = 1
+            ORDER BY c.nombre, p.nombre
+        """,
+        "encabezado": ['Código', 'Producto', 'Categoría', 'Precio', 'Stock', 'Mínimo', 'Valor'],
+        "anchos": [55, 125, 75, 55, 40, 40, 60],
+        "color": '#8e44ad',
+        "fila": _fila_inventario,
+    },
+}
+
+
+def parametros_detalle(reporte, fecha_desde, fecha_hasta):
+    return (fecha_desde, fecha_hasta) if reporte.get("por_fecha", True) else ()
+
+
+def leer_lotes(cursor, tamano):
+    """Generador de lotes con fetchmany: solo un lote vive en memoria a la vez"""
+    while True:
+        filas = cursor.fetchmany(tamano)
+        if not filas:
+            return
+        yield filas
+
+
+def ruta_volumen(filename, volumen):
+    """reporte.pdf, reporte_parte2.pdf, reporte_parte3.pdf, ..."""
+    if volumen == 1:
+        return filename
+    base, ext = os.path.splitext(filename)
+    return f"{base}_parte{volumen}{ext}"
+
+
+def exportar_pdf(conn, tipo, fecha_desde, fecha_hasta, filename, periodo=None,
+                 filas_por_bloque=FILAS_POR_BLOQUE, filas_por_archivo=FILAS_POR_ARCHIVO,
+                 progreso=None):
+    """Genera el reporte en streaming; retorna la lista de archivos creados.
+
+    progreso(filas_escritas, total_filas) se llama después de cada bloque.
+    Lanza ImportError si ReportLab no está instalado.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, LongTable, TableStyle
+    from reportlab.lib import colors
+
+    reporte = REPORTES[tipo]
+    styles = getSampleStyleSheet()
+    titulo = f"REPORTE DE {tipo.upper()}"
+    if not reporte.get("por_fecha", True):
+        periodo = f"Existencias al {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    periodo = periodo or f"{fecha_desde} a {fecha_hasta}"
+    estilo_tabla = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(reporte["color"])),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F3F3')),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+    ])
+
+    def pie_pagina(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 7)
+        canvas.drawString(doc.leftMargin, doc.bottomMargin / 2, f"{titulo} · {periodo}")
+        canvas.drawRightString(doc.leftMargin + doc.width, doc.bottomMargin / 2, f"Página {doc.page}")
+        canvas.restoreState()
+
+    def construir(ruta, flowables):
+        """doc.build público de ReportLab; el volumen ya viene acotado a filas_por_archivo"""
+        doc = BaseDocTemplate(ruta, pagesize=A4, pageCompression=1, title=titulo)
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+        doc.addPageTemplates([PageTemplate(id='pagina', frames=[frame], onPage=pie_pagina)])
+        doc.build(list(flowables))
+
+    cursor = conn.cursor()
+    total_filas, resumen = reporte["resumen"](cursor, fecha_desde, fecha_hasta)
+    cursor.execute(reporte["detalle_sql"], parametros_detalle(reporte, fecha_desde, fecha_hasta))
+    lotes = leer_lotes(cursor, filas_por_bloque)
+    lote = next(lotes, None)
+    escritas = 0
+    archivos = []
+
+    def contenido(volumen):
+        nonlocal lote, escritas
+        yield Paragraph(titulo + (f" (parte {volumen})" if volumen > 1 else ""), styles['Heading1'])
+        yield Spacer(1, 20)
+        yield Paragraph(f"<b>Generado:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal'])
+        yield Paragraph(f"<b>Período:</b> {periodo}", styles['Normal'])
+        yield Spacer(1, 20)
+        if volumen == 1:
+            for etiqueta, valor in resumen:
+                yield Paragraph(f"<b>{etiqueta}:</b> {valor}", styles['Normal'])
+            yield Spacer(1, 15)
+            if lote is None:
+                yield Paragraph("No hay datos para mostrar", styles['Normal'])
+
+        filas_volumen = 0
+        while lote is not None and filas_volumen < filas_por_archivo:
+            data = [reporte["encabezado"]]
+            data.extend(reporte["fila"](fila) for fila in lote)
+            tabla = LongTable(data, colWidths=reporte["anchos"], repeatRows=1)
+            tabla.setStyle(estilo_tabla)
+            filas_volumen += len(lote)
+            escritas += len(lote)
+            lote = None
+            yield tabla
+            if progreso:
+                progreso(escritas, total_filas)
+            lote = next(lotes, None)
+
+    volumen = 0
+    while volumen == 0 or lote is not None:
+        volumen += 1
+        ruta = ruta_volumen(filename, volumen)
+        construir(ruta, contenido(volumen))
+        archivos.append(ruta)
+        print(f"✅ PDF generado ({escritas}/{total_filas} filas): {ruta}")
+
+    return archivos
+
+
+def exportar_texto(conn, tipo, fecha_desde, fecha_hasta, f, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Respaldo en texto plano cuando no hay ReportLab; también en streaming"""
+    reporte = REPORTES[tipo]
+    cursor = conn.cursor()
+    total_filas, resumen = reporte["resumen"](cursor, fecha_desde, fecha_hasta)
+    for etiqueta, valor in resumen:
+        f.write(f"{etiqueta}: {valor}\n")
+    f.write("\n" + " | ".join(reporte["encabezado"]) + "\n")
+    f.write("-" * 60 + "\n")
+
+    cursor.execute(reporte["detalle_sql"], parametros_detalle(reporte, fecha_desde, fecha_hasta))
+    for lote in leer_lotes(cursor, filas_por_bloque):
+        f.writelines(" | ".join(str(valor) for valor in reporte["fila"](fila)) + "\n" for fila in lote)
+    return total_filas
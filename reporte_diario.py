@@ -0,0 +1,338 @@
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from email_system.email_sender import EmailSender
+from email_system.email_outbox import EmailOutbox
+from paths import get_app_directory, ensure_directory_exists
+from utils.helpers import formato_moneda_mx
+
+CLAVE_ULTIMO_ENVIO = "digest_ultimo_envio"
+
+
+def get_digest_directory():
+    """Carpeta donde se guardan los PDF del resumen diario"""
+    return os.path.join(get_app_directory(), "Reportes", "digest")
+
+
+def calcular_resumen_dia(conn, fecha):
+    """Resumen de un día a partir de las tablas de resumen (ventas_diarias, productos_diarios)"""
+    por_metodo = {
+        metodo: {"num_ventas": num, "total": total}
+        for metodo, num, total in conn.execute(
+            "SELECT metodo_pago, num_ventas, total FROM ventas_diarias WHERE fecha = ? ORDER BY metodo_pago",
+            (fecha,)
+        )
+    }
+    productos = conn.execute('''
+        SELECT COALESCE(p.nombre, 'Producto #' || pd.producto_id), pd.cantidad, pd.importe
+        FROM productos_diarios pd
+        LEFT JOIN productos p ON pd.producto_id = p.id
+        WHERE pd.fecha = ?
+        ORDER BY pd.importe DESC
+        LIMIT 10
+    ''', (fecha,)).fetchall()
+    cierres = conn.execute('''
+        SELECT c.fecha_cierre, COALESCE(u.nombre, ''), c.monto_inicial, c.total_ventas,
+               c.total_efectivo, c.diferencia
+        FROM cierres_caja c
+        LEFT JOIN usuarios u ON c.usuario_id = u.id
+        WHERE c.estado = 'cerrado' AND DATE(c.fecha_cierre) = ?
+        ORDER BY c.fecha_cierre
+    ''', (fecha,)).fetchall()
+
+    num_ventas = sum(m["num_ventas"] for m in por_metodo.values())
+    total = sum(m["total"] for m in por_metodo.values())
+    return {
+        "fecha": fecha,
+        "num_ventas": num_ventas,
+        "total": total,
+        "promedio": total / num_ventas if num_ventas else 0,
+        "por_metodo": por_metodo,
+        "productos": [list(p) for p in productos],
+        "cierres": [list(c) for c in cierres],
+    }
+
+
+def huella_resumen(resumen):
+    """Identificador corto del contenido; cambia solo si cambian los datos del día"""
+    contenido = json.dumps(resumen, sort_keys=True, default=str).encode()
+    return hashlib.sha1(contenido).hexdigest()[:10]
+
+
+def texto_resumen(resumen, nombre_negocio):
+    """Resumen en texto plano (cuerpo del email y respaldo sin ReportLab)"""
+    lineas = [
+        f"📊 RESUMEN DEL DÍA {resumen['fecha']} - {nombre_negocio}",
+        "",
+        f"• Total Ventas: {formato_moneda_mx(resumen['total'])}",
+        f"• N° de Ventas: {resumen['num_ventas']}",
+        f"• Promedio por Venta: {formato_moneda_mx(resumen['promedio'])}",
+        "",
+    ]
+    for metodo, datos in resumen["por_metodo"].items():
+        lineas.append(f"• {metodo}: {formato_moneda_mx(datos['total'])} ({datos['num_ventas']} ventas)")
+    if resumen["cierres"]:
+        lineas.append("")
+        for _, usuario, _, total_ventas, _, diferencia in resumen["cierres"]:
+            lineas.append(f"• Cierre de {usuario}: {formato_moneda_mx(total_ventas)} "
+                          f"(diferencia {formato_moneda_mx(diferencia)})")
+    return "\n".join(lineas)
+
+
+def generar_pdf_resumen(resumen, nombre_negocio, filename):
+    """Genera el PDF del resumen; retorna la ruta creada (.txt si no hay ReportLab)"""
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+    except ImportError:
+        print("⚠️ ReportLab no disponible, generando resumen en texto")
+        txt_filename = filename.replace('.pdf', '.txt')
+        with open(txt_filename, 'w', encoding='utf-8') as f:
+            f.write(texto_resumen(resumen, nombre_negocio))
+        return txt_filename
+
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    estilo_tabla = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F3F3F3')),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+    ]
+
+    elements = [
+        Paragraph(f"RESUMEN DEL DÍA {resumen['fecha']}", styles['Heading1']),
+        Paragraph(f"<b>{nombre_negocio}</b>", styles['Normal']),
+        Paragraph(f"<b>Generado:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Spacer(1, 15),
+        Paragraph(f"<b>Total de ventas:</b> {formato_moneda_mx(resumen['total'])}", styles['Normal']),
+        Paragraph(f"<b>N° de ventas:</b> {resumen['num_ventas']}", styles['Normal']),
+        Paragraph(f"<b>Promedio por venta:</b> {formato_moneda_mx(resumen['promedio'])}", styles['Normal']),
+        Spacer(1, 15),
+    ]
+
+    if resumen["por_metodo"]:
+        data = [['Método de Pago', 'Ventas', 'Total']]
+        for metodo, datos in resumen["por_metodo"].items():
+            data.append([metodo, str(datos['num_ventas']), formato_moneda_mx(datos['total'])])
+        table = Table(data, colWidths=[150, 80, 120])
+        table.setStyle(TableStyle(estilo_tabla))
+        elements.extend([table, Spacer(1, 15)])
+
+    if resumen["productos"]:
+        elements.append(Paragraph("Productos más vendidos", styles['Heading2']))
+        data = [['Producto', 'Cantidad', 'Importe']]
+        for nombre, cantidad, importe in resumen["productos"]:
+            data.append([nombre, str(cantidad), formato_moneda_mx(importe)])
+        table = Table(data, colWidths=[220, 80, 120])
+        table.setStyle(TableStyle(estilo_tabla))
+        elements.extend([table, Spacer(1, 15)])
+
+    if resumen["cierres"]:
+        elements.append(Paragraph("Cierres de caja", styles['Heading2']))
+        data = [['Hora', 'Usuario', 'Monto Inicial', 'Total Ventas', 'Efectivo Final', 'Diferencia']]
+        for fecha, usuario, inicial, total_ventas, efectivo, diferencia in resumen["cierres"]:
+            data.append([
+                fecha.split()[1] if ' ' in fecha else fecha,
+                usuario,
+                formato_moneda_mx(inicial),
+                formato_moneda_mx(total_ventas),
+                formato_moneda_mx(efectivo),
+                formato_moneda_mx(diferencia)
+            ])
+        table = Table(data, colWidths=[60, 90, 80, 80, 80, 80])
+        table.setStyle(TableStyle(estilo_tabla))
+        elements.append(table)
+
+    doc.build(elements)
+    return filename
+
+
+def obtener_pdf_resumen(resumen, nombre_negocio):
+    """PDF del día desde caché; solo se genera si cambiaron los datos del día"""
+    directorio = ensure_directory_exists(get_digest_directory())
+    prefijo = f"resumen_{resumen['fecha']}_"
+    base = os.path.join(directorio, f"{prefijo}{huella_resumen(resumen)}")
+
+    for extension in (".pdf", ".txt"):
+        if os.path.exists(base + extension):
+            print(f"♻️ Resumen del {resumen['fecha']} tomado de caché")
+            return base + extension
+
+    # Las versiones anteriores del día se conservan: pueden seguir en la bandeja de salida
+    ruta = generar_pdf_resumen(resumen, nombre_negocio, base + ".pdf")
+    print(f"✅ Resumen del {resumen['fecha']} generado: {ruta}")
+    return ruta
+
+
+def leer_ultimo_envio(conn):
+    fila = conn.execute("SELECT valor FROM configuracion WHERE clave = ?", (CLAVE_ULTIMO_ENVIO,)).fetchone()
+    return fila[0] if fila else ""
+
+
+def registrar_envio(conn, fecha):
+    conn.execute('''
+        INSERT INTO configuracion (clave, valor, descripcion) VALUES (?, ?, 'Último resumen diario enviado')
+        ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor
+    ''', (CLAVE_ULTIMO_ENVIO, fecha))
+    conn.commit()
+
+
+class ReporteDiarioWorker(QThread):
+    """Calcula el resumen, genera (o reutiliza) el PDF y lo encola para cada destinatario"""
+    terminado = pyqtSignal(bool, str)
+
+    def __init__(self, db_path, fecha, destinatarios, nombre_negocio, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.fecha = fecha
+        self.destinatarios = destinatarios
+        self.nombre_negocio = nombre_negocio
+
+    def run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                resumen = calcular_resumen_dia(conn, self.fecha)
+                ruta = obtener_pdf_resumen(resumen, self.nombre_negocio)
+
+                outbox = EmailOutbox(self.db_path)
+                for destinatario in self.destinatarios:
+                    outbox.encolar(
+                        destinatario,
+                        f"Resumen del día {self.fecha} - {self.nombre_negocio}",
+                        texto_resumen(resumen, self.nombre_negocio),
+                        ruta,
+                        os.path.basename(ruta),
+                        'reporte'
+                    )
+                registrar_envio(conn, self.fecha)
+            finally:
+                conn.close()
+            self.terminado.emit(True, f"✅ Resumen del {self.fecha} encolado para {len(self.destinatarios)} destinatarios")
+        except Exception as e:
+            self.terminado.emit(False, f"❌ Error generando resumen diario: {str(e)}")
+
+
+class ReporteDiarioScheduler(QObject):
+    """Programa el envío del resumen diario a la hora configurada (sin abrir diálogos)"""
+
+    def __init__(self, db_path, config, dispatcher=None, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.config = config          # Configuración general (nombre_negocio)
+        self.dispatcher = dispatcher
+        self.worker = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._al_disparar)
+
+    @staticmethod
+    def _config_digest():
+        config = EmailSender().config
+        destinatarios = config.get("digest_destinatarios", [])
+        if isinstance(destinatarios, str):
+            destinatarios = [d.strip() for d in destinatarios.split(",")]
+        return {
+            "habilitado": bool(config.get("digest_habilitado", False)),
+            "hora": config.get("digest_hora", "21:00"),
+            "al_cerrar": bool(config.get("digest_al_cerrar", True)),
+            "destinatarios": [d for d in destinatarios if d],
+        }
+
+    @staticmethod
+    def hora_programada(fecha, hora):
+        """datetime de la fecha dada a la hora 'HH:MM'"""
+        horas, minutos = (int(x) for x in hora.split(":"))
+        return datetime.combine(fecha, datetime.min.time()).replace(hour=horas, minute=minutos)
+
+    def iniciar(self):
+        """Programa el siguiente envío y recupera el del día si ya pasó la hora"""
+        config = self._config_digest()
+        if config["habilitado"]:
+            try:
+                ahora = datetime.now()
+                programada = self.hora_programada(ahora.date(), config["hora"])
+                # Antes de la hora de hoy, el pendiente es el de ayer
+                fecha_pendiente = ahora.date() if ahora >= programada else ahora.date() - timedelta(days=1)
+                conn = sqlite3.connect(self.db_path, timeout=10)
+                try:
+                    ultimo = leer_ultimo_envio(conn)
+                finally:
+                    conn.close()
+                # Solo se recupera el último día pendiente, no todos los atrasados
+                if ultimo < fecha_pendiente.isoformat():
+                    print(f"⏰ Resumen del {fecha_pendiente} pendiente, enviando ahora")
+                    self.ejecutar(fecha_pendiente.isoformat())
+            except Exception as e:
+                print(f"❌ Error recuperando resumen diario pendiente: {e}")
+        self.reprogramar()
+
+    def reprogramar(self):
+        """Calcula una sola vez la próxima hora de envío y arma el temporizador"""
+        self.timer.stop()
+        config = self._config_digest()
+        if not config["habilitado"]:
+            return
+        try:
+            ahora = datetime.now()
+            proxima = self.hora_programada(ahora.date(), config["hora"])
+            if proxima <= ahora:
+                proxima += timedelta(days=1)
+            self.timer.start(int((proxima - ahora).total_seconds() * 1000) + 1000)
+            print(f"⏰ Resumen diario programado para {proxima.strftime('%Y-%m-%d %H:%M')}")
+        except Exception as e:
+            print(f"❌ Hora de resumen diario inválida ({config['hora']}): {e}")
+
+    def _al_disparar(self):
+        self.ejecutar(datetime.now().strftime("%Y-%m-%d"))
+        self.reprogramar()
+
+    def ejecutar_tras_cierre(self):
+        """Se llama al guardar un cierre de caja"""
+        if self._config_digest()["al_cerrar"]:
+            self.ejecutar(datetime.now().strftime("%Y-%m-%d"), forzar=True)
+
+    def ejecutar(self, fecha, forzar=False):
+        """Genera y encola el resumen de la fecha dada en segundo plano"""
+        config = self._config_digest()
+        if not config["habilitado"] or not config["destinatarios"]:
+            return False
+        if self.worker is not None and self.worker.isRunning():
+            print("⚠️ Resumen diario en proceso, se omite esta ejecución")
+            return False
+
+        if not forzar:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                if leer_ultimo_envio(conn) >= fecha:
+                    return False
+            finally:
+                conn.close()
+
+        self.worker = ReporteDiarioWorker(
+            self.db_path, fecha, config["destinatarios"], self.config.get("nombre_negocio", ""), self
+        )
+        self.worker.terminado.connect(self._al_terminar)
+        self.worker.start()
+        return True
+
+    def _al_terminar(self, exito, mensaje):
+        print(mensaje)
+        if exito and self.dispatcher is not None:
+            self.dispatcher.despertar()
+
+    def detener(self):
+        self.timer.stop()
+        if self.worker is not None:
+            self.worker.wait(5000)
@@ -0,0 +1,489 @@
+import csv
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from archivo_historico import hay_archivos_en_rango, conectar_historico
+
+TAMANO_BLOQUE = 5000
+SEGUNDOS_DIA = 86400
+SEMANAS_TENDENCIA = 5
+LIMITES_ABC = (0.80, 0.95)  # A: primer 80% del ingreso, B: siguiente 15%, C: último 5%
+
+
+class DatosPeriodo:
+    """Ventas y detalle de un rango de fechas en columnas NumPy (una sola lectura)"""
+
+    def __init__(self, fecha_desde, fecha_hasta):
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+
+    @property
+    def num_ventas(self):
+        return len(self.venta_id)
+
+
+def _leer_columnas(cursor, num_columnas):
+    """Lee el cursor por bloques y regresa una lista por columna"""
+    columnas = [[] for _ in range(num_columnas)]
+    while True:
+        filas = cursor.fetchmany(TAMANO_BLOQUE)
+        if not filas:
+            return columnas
+        for destino, valores in zip(columnas, zip(*filas)):
+            destino.extend(valores)
+
+
+def _categorias(valores):
+    """Convierte una columna de texto en (etiquetas, códigos enteros)"""
+    if not valores:
+        return np.array([], dtype=object), np.array([], dtype=np.int64)
+    etiquetas, codigos = np.unique(np.array(valores, dtype=object), return_inverse=True)
+    return etiquetas, codigos.astype(np.int64)
+
+
+def _dias_a_texto(dias):
+    """Días desde epoch -> 'YYYY-MM-DD'"""
+    return np.asarray(dias, dtype='datetime64[D]').astype(str)
+
+
+def _sumar_por_grupo(codigos, num_grupos, pesos=None):
+    return np.bincount(codigos, weights=pesos, minlength=num_grupos)
+
+
+def cargar_periodo(conn, fecha_desde, fecha_hasta):
+    """Lee una sola vez ventas y detalle del rango y los guarda en columnas"""
+    datos = DatosPeriodo(fecha_desde, fecha_hasta)
+    cursor = conn.cursor()
+
+    # Ventas del rango (solo las columnas que usan los análisis)
+    cursor.execute("""
+        SELECT v.id, CAST(strftime('%s', v.fecha) AS INTEGER), v.total, v.iva, v.metodo_pago, v.estado,
+               CAST(strftime('%s', v.fecha, 'localtime') AS INTEGER)
+        FROM ventas v
+        WHERE v.fecha BETWEEN ? AND ?
+    """, (fecha_desde, fecha_hasta))
+    ids, epochs, totales, ivas, metodos, estados, epochs_locales = _leer_columnas(cursor, 7)
+
+    datos.venta_id = np.fromiter(ids, dtype=np.int64, count=len(ids))
+    datos.epoch = np.fromiter((e or 0 for e in epochs), dtype=np.int64, count=len(epochs))
+    # fecha es CURRENT_TIMESTAMP (UTC); el mapa de calor va en hora local
+    datos.epoch_local = np.fromiter((e or 0 for e in epochs_locales), dtype=np.int64, count=len(epochs_locales))
+    datos.total = np.fromiter(totales, dtype=np.float64, count=len(totales))
+    datos.iva = np.fromiter(ivas, dtype=np.float64, count=len(ivas))
+    datos.metodos, datos.metodo = _categorias(metodos)
+    datos.completada = np.array([e == 'completada' for e in estados], dtype=bool)
+    datos.dia = datos.epoch // SEGUNDOS_DIA
+
+    # Detalle de esas ventas
+    cursor.execute("""
+        SELECT dv.venta_id, dv.producto_id, dv.cantidad, dv.subtotal
+        FROM detalle_ventas dv
+        JOIN ventas v ON dv.venta_id = v.id
+        WHERE v.fecha BETWEEN ? AND ?
+    """, (fecha_desde, fecha_hasta))
+    venta_ids, producto_ids, cantidades, subtotales = _leer_columnas(cursor, 4)
+
+    detalle_venta = np.fromiter(venta_ids, dtype=np.int64, count=len(venta_ids))
+    datos.detalle_producto = np.fromiter(producto_ids, dtype=np.int64, count=len(producto_ids))
+    datos.detalle_cantidad = np.fromiter(cantidades, dtype=np.float64, count=len(cantidades))
+    datos.detalle_subtotal = np.fromiter(subtotales, dtype=np.float64, count=len(subtotales))
+
+    # Fila de venta a la que pertenece cada renglón de detalle
+    orden = np.argsort(datos.venta_id, kind='stable')
+    posicion = np.searchsorted(datos.venta_id, detalle_venta, sorter=orden)
+    datos.detalle_fila = orden[posicion] if len(orden) else posicion
+
+    # Nombres y categorías solo de los productos que aparecen en el rango
+    productos_unicos = np.unique(datos.detalle_producto)
+    datos.nombres_producto = {}
+    if len(productos_unicos):
+        marcadores = ", ".join("?" for _ in productos_unicos)
+        cursor.execute(f"""
+            SELECT p.id, p.nombre, COALESCE(c.nombre, 'Sin categoría')
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.id IN ({marcadores})
+        """, [int(p) for p in productos_unicos])
+        datos.nombres_producto = {id_: (nombre, categoria) for id_, nombre, categoria in cursor.fetchall()}
+
+    return datos
+
+
+def _resumen_metodos(datos, mascara):
+    """[(método, total, número de ventas)] para las ventas seleccionadas"""
+    num_metodos = len(datos.metodos)
+    codigos = datos.metodo[mascara]
+    totales = _sumar_por_grupo(codigos, num_metodos, datos.total[mascara])
+    conteos = _sumar_por_grupo(codigos, num_metodos)
+    return [
+        (datos.metodos[i], float(totales[i]), int(conteos[i]))
+        for i in range(num_metodos) if conteos[i]
+    ]
+
+
+def _lunes(dia):
+    """Días desde epoch -> día del lunes de su semana (el 1970-01-01 fue jueves)"""
+    return dia - (dia + 3) % 7
+
+
+def cargar_tendencias(conn, fecha_hasta, semanas=SEMANAS_TENDENCIA):
+    """Tendencias semanales por producto a partir de productos_semanales.
+
+    La semana actual es la que contiene fecha_hasta. Regresa
+    {producto_id: (cambio semanal %, promedio 4 semanas, lugar, cambio de lugar)}
+    """
+    semana_final = _lunes(np.datetime64(fecha_hasta[:10], 'D').astype(np.int64))
+    semana_inicial = semana_final - 7 * (semanas - 1)
+    desde, hasta = _dias_a_texto([semana_inicial, semana_final])
+
+    # Lugar de cada producto dentro de su semana (por importe) con función de ventana
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT semana, producto_id, cantidad,
+               RANK() OVER (PARTITION BY semana ORDER BY importe DESC)
+        FROM productos_semanales
+        WHERE semana BETWEEN ? AND ?
+    """, (str(desde), str(hasta)))
+    semanas_txt, producto_ids, cantidades, lugares = _leer_columnas(cursor, 4)
+    if not producto_ids:
+        return {}
+
+    # Matriz densa producto x semana: las semanas sin ventas quedan en cero
+    ids, fila = np.unique(np.array(producto_ids, dtype=np.int64), return_inverse=True)
+    columna = (np.array(semanas_txt, dtype='datetime64[D]').astype(np.int64) - semana_inicial) // 7
+    cantidad = np.zeros((len(ids), semanas))
+    lugar = np.zeros((len(ids), semanas), dtype=np.int64)  # 0 = sin ventas esa semana
+    cantidad[fila, columna] = cantidades
+    lugar[fila, columna] = lugares
+
+    actual, previa = cantidad[:, -1], cantidad[:, -2]
+    con_previa = previa > 0
+    cambio = np.divide(actual - previa, previa, out=np.zeros_like(actual), where=con_previa) * 100
+    promedio = cantidad[:, -4:].mean(axis=1)
+    lugar_actual, lugar_previo = lugar[:, -1], lugar[:, -2]
+
+    return {
+        int(ids[i]): (
+            float(cambio[i]) if con_previa[i] else None,
+            float(promedio[i]),
+            int(lugar_actual[i]) or None,
+            int(lugar_previo[i] - lugar_actual[i]) if lugar_actual[i] and lugar_previo[i] else None,
+        )
+        for i in range(len(ids))
+    }
+
+
+def _ranking_productos(datos, tendencias):
+    """Productos vendidos en el rango ordenados por importe, con su tendencia semanal"""
+    if not len(datos.detalle_producto):
+        return []
+
+    ids, codigos = np.unique(datos.detalle_producto, return_inverse=True)
+    num = len(ids)
+    cantidad = _sumar_por_grupo(codigos, num, datos.detalle_cantidad)
+    importe = _sumar_por_grupo(codigos, num, datos.detalle_subtotal)
+
+    dia_linea = datos.dia[datos.detalle_fila]
+    ultimo_dia = np.full(num, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(ultimo_dia, codigos, dia_linea)
+
+    ultimas = _dias_a_texto(ultimo_dia)
+    sin_tendencia = (None, 0.0, None, None)
+    ranking = []
+    for i in np.argsort(-importe, kind='stable'):
+        producto_id = int(ids[i])
+        nombre, categoria = datos.nombres_producto.get(producto_id, (f"Producto #{producto_id}", "Sin categoría"))
+        ranking.append((nombre, categoria, float(cantidad[i]), float(importe[i]), str(ultimas[i]))
+                       + tendencias.get(producto_id, sin_tendencia))
+    return ranking
+
+
+def _binear_mapa_calor(epoch, totales):
+    """Conteo e importe por día de la semana (lunes=0) y hora: (conteos 7x24, importes 7x24).
+
+    epoch es la hora local expresada como segundos (strftime('%s', fecha, 'localtime'))."""
+    dia_semana = (epoch // SEGUNDOS_DIA + 3) % 7   # El 1970-01-01 fue jueves
+    hora = (epoch % SEGUNDOS_DIA) // 3600
+    celda = dia_semana * 24 + hora
+    conteos = _sumar_por_grupo(celda, 7 * 24).reshape(7, 24)
+    importes = _sumar_por_grupo(celda, 7 * 24, totales).reshape(7, 24)
+    return conteos, importes
+
+
+def _mapa_calor(datos):
+    completadas = datos.completada
+    return _binear_mapa_calor(datos.epoch_local[completadas], datos.total[completadas])
+
+
+def cargar_mapa_calor(conn, fecha_desde, fecha_hasta):
+    """Mapa de calor de un rango leyendo solo fecha (como entero) y total de las ventas completadas"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT CAST(strftime('%s', fecha, 'localtime') AS INTEGER), total
+        FROM ventas
+        WHERE fecha BETWEEN ? AND ? AND estado = 'completada'
+    """, (fecha_desde, fecha_hasta))
+    epochs, totales = _leer_columnas(cursor, 2)
+    return _binear_mapa_calor(
+        np.fromiter((e or 0 for e in epochs), dtype=np.int64, count=len(epochs)),
+        np.fromiter(totales, dtype=np.float64, count=len(totales)),
+    )
+
+
+def analizar_periodo(datos, tendencias=None):
+    """Deriva totales, métodos, serie diaria y ranking a partir de las columnas
+    (las filas de la tabla las pagina VentasTableModel directamente en SQL)"""
+    # Serie diaria: solo ventas completadas
+    completadas = datos.completada
+    dias, codigos_dia = np.unique(datos.dia[completadas], return_inverse=True)
+    totales_dia = _sumar_por_grupo(codigos_dia, len(dias), datos.total[completadas])
+
+    return {
+        "resumen": {
+            "total": float(datos.total.sum()),
+            "iva": float(datos.iva.sum()),
+            "num_ventas": int(datos.num_ventas),
+        },
+        # Resumen general y métodos: todo el rango, sin filtros de método/usuario
+        "metodos": _resumen_metodos(datos, slice(None)),
+        "metodos_completadas": _resumen_metodos(datos, completadas),
+        "serie_diaria": (list(_dias_a_texto(dias)), [float(t) for t in totales_dia]),
+        "productos": _ranking_productos(datos, tendencias or {}),
+        "mapa_calor": _mapa_calor(datos),
+    }
+
+
+class AnalisisABC:
+    """Clasificación ABC / Pareto: una columna NumPy por campo, ordenadas por ingreso"""
+
+    COLUMNAS_CSV = ["Clase", "Producto", "Categoría", "Vendidos", "Ingreso", "% Ingreso",
+                    "% Acumulado", "Costo", "Margen", "% Margen", "% Contribución"]
+
+    def __init__(self, fecha_desde, fecha_hasta):
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+
+    def __len__(self):
+        return len(self.producto_id)
+
+    def resumen_clases(self):
+        """{clase: (productos, ingreso, margen)}"""
+        return {
+            clase: (int(mascara.sum()), float(self.ingreso[mascara].sum()), float(self.margen[mascara].sum()))
+            for clase in "ABC"
+            for mascara in [self.clase == clase]
+        }
+
+    def filas(self):
+        """Genera los renglones de exportación uno a uno (sin lista intermedia)"""
+        for i in range(len(self)):
+            yield (
+                self.clase[i], self.nombre[i], self.categoria[i], f"{self.cantidad[i]:g}",
+                f"{self.ingreso[i]:.2f}", f"{self.participacion[i] * 100:.2f}",
+                f"{self.acumulado[i] * 100:.2f}", f"{self.costo_total[i]:.2f}", f"{self.margen[i]:.2f}",
+                f"{self.margen_pct[i] * 100:.2f}", f"{self.contribucion[i] * 100:.2f}",
+            )
+
+
+def cargar_agregados_productos(conn, fecha_desde, fecha_hasta):
+    """Cantidad e ingreso por producto del rango desde productos_diarios (ventas completadas).
+
+    La suma sale del índice cubriente de productos_diarios; nombre, categoría
+    y costo se leen aparte y se acomodan por id con searchsorted.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT producto_id, SUM(cantidad), SUM(importe)
+        FROM productos_diarios
+        WHERE fecha BETWEEN ? AND ?
+        GROUP BY producto_id
+        ORDER BY producto_id
+    """, (fecha_desde[:10], fecha_hasta[:10]))
+    producto_ids, cantidades, importes = _leer_columnas(cursor, 3)
+
+    ids = np.fromiter(producto_ids, dtype=np.int64, count=len(producto_ids))
+    cantidad = np.fromiter(cantidades, dtype=np.float64, count=len(cantidades))
+    ingreso = np.fromiter(importes, dtype=np.float64, count=len(importes))
+
+    nombres = np.array([f"Producto #{i}" for i in ids], dtype=object)
+    categorias = np.full(len(ids), "Sin categoría", dtype=object)
+    costos = np.zeros(len(ids))
+    if len(ids):
+        cursor.execute("""
+            SELECT p.id, p.nombre, COALESCE(c.nombre, 'Sin categoría'), COALESCE(p.costo, 0)
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.id BETWEEN ? AND ?
+        """, (int(ids[0]), int(ids[-1])))
+        p_ids, p_nombres, p_categorias, p_costos = _leer_columnas(cursor, 4)
+        p_ids = np.fromiter(p_ids, dtype=np.int64, count=len(p_ids))
+        # Posición de cada producto leído dentro de ids (solo los que se vendieron)
+        posicion = np.searchsorted(ids, p_ids)
+        presentes = (posicion < len(ids)) & (ids[np.minimum(posicion, len(ids) - 1)] == p_ids)
+        destino = posicion[presentes]
+        nombres[destino] = np.array(p_nombres, dtype=object)[presentes]
+        categorias[destino] = np.array(p_categorias, dtype=object)[presentes]
+        costos[destino] = np.fromiter(p_costos, dtype=np.float64, count=len(p_costos))[presentes]
+
+    return ids, nombres, categorias, costos, cantidad, ingreso
+
+
+def clasificar_abc(fecha_desde, fecha_hasta, ids, nombres, categorias, costos, cantidad, ingreso):
+    """Ingreso, participación acumulada, margen y clase en una sola pasada vectorizada"""
+    abc = AnalisisABC(fecha_desde, fecha_hasta)
+    num = len(ids)
+    orden = np.argsort(-ingreso, kind='stable')
+
+    abc.producto_id = ids[orden]
+    abc.nombre = nombres[orden]
+    abc.categoria = categorias[orden]
+    abc.cantidad = cantidad[orden]
+    abc.ingreso = ingreso[orden]
+    # Costo actual del producto (el detalle de venta no guarda el costo histórico)
+    abc.costo_total = abc.cantidad * costos[orden]
+    abc.margen = abc.ingreso - abc.costo_total
+
+    abc.total_ingreso = float(abc.ingreso.sum())
+    abc.total_margen = float(abc.margen.sum())
+    abc.participacion = abc.ingreso / abc.total_ingreso if abc.total_ingreso else np.zeros(num)
+    abc.acumulado = np.cumsum(abc.participacion)
+    abc.margen_pct = np.divide(abc.margen, abc.ingreso, out=np.zeros(num), where=abc.ingreso != 0)
+    abc.contribucion = abc.margen / abc.total_margen if abc.total_margen else np.zeros(num)
+
+    # La clase depende de la participación acumulada ANTES del producto:
+    # el producto que cruza el 80% todavía es A
+    previo = abc.acumulado - abc.participacion
+    abc.clase = np.array(["A", "B", "C"])[np.searchsorted(LIMITES_ABC, previo, side='right')]
+    return abc
+
+
+def exportar_abc_csv(abc, ruta):
+    """Escribe la clasificación ABC a CSV (UTF-8 con BOM para abrirlo en Excel)"""
+    with open(ruta, "w", newline="", encoding="utf-8-sig") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(AnalisisABC.COLUMNAS_CSV)
+        escritor.writerows(abc.filas())
+    return ruta
+
+
+class SalesAnalytics:
+    """Memoriza los periodos leídos y los análisis derivados mientras los datos no cambien"""
+
+    def __init__(self, db_manager, max_periodos=8, max_analisis=32):
+        self.db_manager = db_manager
+        self.max_periodos = max_periodos
+        self.max_analisis = max_analisis
+        self._periodos = OrderedDict()
+        self._analisis = OrderedDict()
+        self._mapas = OrderedDict()
+        self._abc = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version_datos(self):
+        """Cambia con cualquier escritura: propia (total_changes) o de otra conexión (data_version)"""
+        conn = self.db_manager.get_connection()
+        return conn.total_changes, conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def _guardar(cache, clave, valor, maximo):
+        cache[clave] = valor
+        cache.move_to_end(clave)
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+
+    def _leer(self, cargar, fecha_desde, fecha_hasta):
+        """cargar(conn, desde, hasta) con la conexión compartida; si el rango toca años
+        archivados, con una conexión de solo lectura que los adjunta"""
+        db_path = self.db_manager.db_name
+        if not hay_archivos_en_rango(db_path, fecha_desde, fecha_hasta):
+            return cargar(self.db_manager.get_connection(), fecha_desde, fecha_hasta)
+        conn = conectar_historico(db_path, fecha_desde, fecha_hasta)
+        try:
+            return cargar(conn, fecha_desde, fecha_hasta)
+        finally:
+            conn.close()
+
+    def periodo(self, fecha_desde, fecha_hasta):
+        version = self.version_datos()
+        clave = (fecha_desde, fecha_hasta, version)
+        with self._lock:
+            datos = self._periodos.get(clave)
+            if datos is not None:
+                self._periodos.move_to_end(clave)
+                return datos
+        datos = self._leer(cargar_periodo, fecha_desde, fecha_hasta)
+        with self._lock:
+            self._guardar(self._periodos, clave, datos, self.max_periodos)
+        return datos
+
+    def analizar(self, fecha_desde, fecha_hasta):
+        """Análisis completo del rango (memorizado por rango y versión de datos)"""
+        version = self.version_datos()
+        clave = (fecha_desde, fecha_hasta, version)
+        with self._lock:
+            resultado = self._analisis.get(clave)
+            if resultado is not None:
+                self._analisis.move_to_end(clave)
+                return resultado
+        tendencias = cargar_tendencias(self.db_manager.get_connection(), fecha_hasta)
+        resultado = analizar_periodo(self.periodo(fecha_desde, fecha_hasta), tendencias)
+        resultado["clave"] = clave
+        with self._lock:
+            self._guardar(self._analisis, clave, resultado, self.max_analisis)
+        return resultado
+
+    def abc(self, fecha_desde, fecha_hasta):
+        """Clasificación ABC del rango (memorizada por rango y versión de datos)"""
+        version = self.version_datos()
+        clave = (fecha_desde, fecha_hasta, version)
+        with self._lock:
+            resultado = self._abc.get(clave)
+            if resultado is not None:
+                self._abc.move_to_end(clave)
+                return resultado
+        columnas = cargar_agregados_productos(self.db_manager.get_connection(), fecha_desde, fecha_hasta)
+        resultado = clasificar_abc(fecha_desde, fecha_hasta, *columnas)
+        with self._lock:
+            self._guardar(self._abc, clave, resultado, self.max_periodos)
+        return resultado
+
+    def mapa_calor(self, fecha_desde, fecha_hasta):
+        """Mapa de calor de un rango (p. ej. el periodo de comparación) sin cargar el detalle"""
+        version = self.version_datos()
+        clave = (fecha_desde, fecha_hasta, version)
+        with self._lock:
+            resultado = self._analisis.get(clave)
+            if resultado is not None:
+                self._analisis.move_to_end(clave)
+                return resultado["mapa_calor"]
+            datos = self._periodos.get(clave)
+            mapa = self._mapas.get(clave)
+        if mapa is None:
+            mapa = _mapa_calor(datos) if datos is not None else self._leer(
+                cargar_mapa_calor, fecha_desde, fecha_hasta)
+            with self._lock:
+                self._guardar(self._mapas, clave, mapa, self.max_analisis)
+        return mapa
+
+    def limpiar(self):
+        with self._lock:
+            self._periodos.clear()
+            self._analisis.clear()
+            self._mapas.clear()
+            self._abc.clear()
+
+
+# ===== REGISTRO POR BASE DE DATOS =====
+_motores = {}
+_motores_lock = threading.Lock()
+
+
+def obtener_analitica(db_manager):
+    """Motor de análisis compartido para una base de datos (sobrevive entre diálogos)"""
+    with _motores_lock:
+        motor = _motores.get(db_manager.db_name)
+        if motor is None or motor.db_manager is not db_manager:
+            motor = SalesAnalytics(db_manager)
+            _motores[db_manager.db_name] = motor
+        return motor
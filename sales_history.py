@@ -2,23 +2,31 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView,
     QDateEdit, QComboBox, QGroupBox, QTextEdit, QTabWidget,
-    QApplication, QLineEdit, QCheckBox, QWidget, QSizePolicy
+    QApplication, QLineEdit, QCheckBox, QWidget, QSizePolicy, QTableView,
+    QSplitter, QAbstractItemView
 )
-from PyQt6.QtGui import QPalette, QColor, QFont
+from PyQt6.QtGui import QPalette, QColor, QFont, QPixmap
 from PyQt6.QtCore import Qt, QDate, QTimer
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import numpy as np
+import os
 
 from export_dialog import ExportDialog
+from sales_analytics import obtener_analitica, exportar_abc_csv
+from ventas_model import VentasTableModel, DetalleVentasCache, ABCTableModel
 from utils.helpers import formato_moneda_mx
+from paths import get_app_directory, ensure_directory_exists
+
+DIAS_SEMANA = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
 
 class SalesHistoryDialog(QDialog):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db_manager = db_manager
+        self.analitica = obtener_analitica(db_manager)
+        self.detalles = DetalleVentasCache(db_manager, conexion=lambda: self.modelo_ventas.conexion())
+        self.renderizador = None        # Se crea (e importa matplotlib) al abrir la pestaña de análisis
+        self.analisis_actual = None
+        self.graficos_pendientes = False
         self.setWindowTitle("Historial y Análisis de Ventas")
         self.setGeometry(100, 50, 1200, 800)
         
@@ -103,7 +111,7 @@ class SalesHistoryDialog(QDialog):
         analysis_layout = QVBoxLayout()
         self.setup_analysis_tab(analysis_layout)
         analysis_tab.setLayout(analysis_layout)
-        self.tabs.addTab(analysis_tab, "Análisis")
+        self.indice_analisis = self.tabs.addTab(analysis_tab, "Análisis")
         
         # Pestaña de productos
         products_tab = QWidget()
@@ -112,6 +120,22 @@ class SalesHistoryDialog(QDialog):
         products_tab.setLayout(products_layout)
         self.tabs.addTab(products_tab, "Productos")
         
+        # Pestaña de mapa de calor (día de la semana x hora)
+        heatmap_tab = QWidget()
+        heatmap_layout = QVBoxLayout()
+        self.setup_heatmap_tab(heatmap_layout)
+        heatmap_tab.setLayout(heatmap_layout)
+        self.tabs.addTab(heatmap_tab, "Mapa de Calor")
+        
+        # Pestaña de clasificación ABC (se calcula al abrirla)
+        abc_tab = QWidget()
+        abc_layout = QVBoxLayout()
+        self.setup_abc_tab(abc_layout)
+        abc_tab.setLayout(abc_layout)
+        self.indice_abc = self.tabs.addTab(abc_tab, "ABC / Pareto")
+        self.abc_pendiente = True
+        
+        self.tabs.currentChanged.connect(self.al_cambiar_pestana)
         layout.addWidget(self.tabs)
         
         # Resumen general
@@ -138,6 +162,11 @@ class SalesHistoryDialog(QDialog):
         self.cargar_usuarios()
         self.cargar_ventas()
     
+    def done(self, resultado):
+        # ✅ LIBERAR LA CONEXIÓN A LOS AÑOS ARCHIVADOS AL CERRAR EL DIÁLOGO
+        self.modelo_ventas.cerrar()
+        super().done(resultado)
+
     def cargar_usuarios(self):
         with self.db_manager.get_connection() as conn:
             cursor = conn.cursor()
@@ -148,12 +177,74 @@ class SalesHistoryDialog(QDialog):
                 self.combo_usuario.addItem(f"{nombre} ({id_})", id_)
     
     def setup_sales_tab(self, layout):
-        self.sales_table = QTableWidget()
-        self.sales_table.setColumnCount(7)
-        self.sales_table.setHorizontalHeaderLabels(["ID", "Fecha", "Total", "IVA", "Método", "Usuario", "Productos"])
+        # ✅ MODELO PAGINADO: FILTROS Y ORDEN SE RESUELVEN EN SQL
+        self.modelo_ventas = VentasTableModel(self.db_manager, parent=self)
+        self.sales_table = QTableView()
+        self.sales_table.setModel(self.modelo_ventas)
         self.sales_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.sales_table.horizontalHeader().setSortIndicator(1, Qt.SortOrder.DescendingOrder)
+        self.sales_table.setSortingEnabled(True)
+        self.sales_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.sales_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.sales_table.doubleClicked.connect(self.mostrar_detalle_venta)
-        layout.addWidget(self.sales_table)
+        self.sales_table.selectionModel().currentRowChanged.connect(self.mostrar_detalle_venta)
+        
+        # ✅ PRECARGA DEL DETALLE DE LAS FILAS VISIBLES (AGRUPADA CON UN TEMPORIZADOR)
+        self.timer_precarga = QTimer(self)
+        self.timer_precarga.setSingleShot(True)
+        self.timer_precarga.setInterval(50)
+        self.timer_precarga.timeout.connect(self.precargar_detalles_visibles)
+        self.sales_table.verticalScrollBar().valueChanged.connect(self.timer_precarga.start)
+        self.modelo_ventas.modelReset.connect(self.timer_precarga.start)
+        self.modelo_ventas.rowsInserted.connect(self.timer_precarga.start)
+        
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        splitter.addWidget(self.sales_table)
+        splitter.addWidget(self.crear_panel_detalle())
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
+    
+    def crear_panel_detalle(self):
+        """Panel lateral con los renglones de la venta seleccionada"""
+        panel = QGroupBox("Detalle de Venta")
+        panel_layout = QVBoxLayout()
+        
+        self.detalle_titulo = QLabel("Seleccione una venta")
+        self.detalle_titulo.setStyleSheet("font-weight: bold; padding: 5px;")
+        panel_layout.addWidget(self.detalle_titulo)
+        
+        self.detalle_table = QTableWidget()
+        self.detalle_table.setColumnCount(4)
+        self.detalle_table.setHorizontalHeaderLabels(["Producto", "Cant.", "Precio", "Subtotal"])
+        self.detalle_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.detalle_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.detalle_table.verticalHeader().setVisible(False)
+        panel_layout.addWidget(self.detalle_table)
+        
+        self.detalle_total = QLabel("")
+        self.detalle_total.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.detalle_total.setStyleSheet("font-weight: bold; padding: 5px;")
+        panel_layout.addWidget(self.detalle_total)
+        
+        panel.setLayout(panel_layout)
+        panel.setMinimumWidth(300)
+        return panel
+    
+    def precargar_detalles_visibles(self):
+        """Una sola consulta para el detalle de todas las ventas visibles en la tabla"""
+        filas = self.modelo_ventas.rowCount()
+        if not filas:
+            return
+        primera = self.sales_table.rowAt(0)
+        ultima = self.sales_table.rowAt(self.sales_table.viewport().height() - 1)
+        primera = max(primera, 0)
+        ultima = filas - 1 if ultima < 0 else ultima
+        
+        try:
+            self.detalles.precargar([self.modelo_ventas.venta_id(row) for row in range(primera, ultima + 1)])
+        except Exception as e:
+            print(f"❌ Error precargando detalle de ventas: {e}")
     
     def setup_analysis_tab(self, layout):
         """Configurar pestaña de análisis con layout mejorado"""
@@ -167,13 +258,10 @@ class SalesHistoryDialog(QDialog):
         chart1_group = QGroupBox("Ventas por Día")
         chart1_group_layout = QVBoxLayout()
         
-        # CONFIGURACIÓN MEJORADA - Canvas más grande
-        self.figure1 = Figure(figsize=(5, 4), dpi=100)
-        self.canvas1 = FigureCanvas(self.figure1)
-        self.canvas1.setMinimumSize(450, 350)
-        self.canvas1.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        # ✅ IMAGEN RENDERIZADA FUERA DE PANTALLA (matplotlib se carga hasta que se muestra)
+        self.grafico_dias = self.crear_contenedor_grafico()
         
-        chart1_group_layout.addWidget(self.canvas1)
+        chart1_group_layout.addWidget(self.grafico_dias)
         chart1_group.setLayout(chart1_group_layout)
         chart1_layout.addWidget(chart1_group)
         
@@ -186,13 +274,9 @@ class SalesHistoryDialog(QDialog):
         chart2_group = QGroupBox("Métodos de Pago")
         chart2_group_layout = QVBoxLayout()
         
-        # CONFIGURACIÓN MEJORADA
-        self.figure2 = Figure(figsize=(5, 4), dpi=100)
-        self.canvas2 = FigureCanvas(self.figure2)
-        self.canvas2.setMinimumSize(450, 350)
-        self.canvas2.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.grafico_metodos = self.crear_contenedor_grafico()
         
-        chart2_group_layout.addWidget(self.canvas2)
+        chart2_group_layout.addWidget(self.grafico_metodos)
         chart2_group.setLayout(chart2_group_layout)
         chart2_layout.addWidget(chart2_group)
         
@@ -204,306 +288,318 @@ class SalesHistoryDialog(QDialog):
         
         layout.addLayout(charts_layout)
     
+    def crear_contenedor_grafico(self):
+        etiqueta = QLabel("📊 Cargando gráfica...")
+        etiqueta.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        etiqueta.setMinimumSize(450, 350)
+        etiqueta.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        etiqueta.setStyleSheet("color: gray; font-style: italic;")
+        return etiqueta
+    
     def setup_products_tab(self, layout):
         self.products_table = QTableWidget()
-        self.products_table.setColumnCount(6)
-        self.products_table.setHorizontalHeaderLabels(["Producto", "Categoría", "Vendidos", "Total", "Última Venta", "Tendencia"])
+        self.products_table.setColumnCount(8)
+        self.products_table.setHorizontalHeaderLabels([
+            "Producto", "Categoría", "Vendidos", "Total", "Última Venta",
+            "Tendencia (sem.)", "Prom. 4 sem.", "Lugar sem."
+        ])
         self.products_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.products_table)
     
+    def setup_heatmap_tab(self, layout):
+        controles = QHBoxLayout()
+        controles.addWidget(QLabel("Mostrar:"))
+        self.combo_mapa_valor = QComboBox()
+        self.combo_mapa_valor.addItems(["N° de ventas", "Importe"])
+        self.combo_mapa_valor.currentIndexChanged.connect(self.mostrar_mapa_calor)
+        controles.addWidget(self.combo_mapa_valor)
+        
+        controles.addSpacing(20)
+        self.check_comparar = QCheckBox("Comparar con:")
+        self.check_comparar.toggled.connect(self.mostrar_mapa_calor)
+        controles.addWidget(self.check_comparar)
+        
+        self.comp_from = QDateEdit()
+        self.comp_from.setCalendarPopup(True)
+        self.comp_from.setDate(QDate.currentDate().addDays(-61))
+        controles.addWidget(self.comp_from)
+        controles.addWidget(QLabel("a"))
+        self.comp_to = QDateEdit()
+        self.comp_to.setCalendarPopup(True)
+        self.comp_to.setDate(QDate.currentDate().addDays(-31))
+        controles.addWidget(self.comp_to)
+        
+        btn_comparar = QPushButton("🔄 Actualizar")
+        btn_comparar.clicked.connect(self.mostrar_mapa_calor)
+        controles.addWidget(btn_comparar)
+        controles.addStretch()
+        layout.addLayout(controles)
+        
+        self.heatmap_table = QTableWidget(7, 24)
+        self.heatmap_table.setVerticalHeaderLabels(DIAS_SEMANA)
+        self.heatmap_table.setHorizontalHeaderLabels([f"{h:02d}" for h in range(24)])
+        self.heatmap_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.heatmap_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.heatmap_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.heatmap_table)
+        
+        self.heatmap_label = QLabel("")
+        self.heatmap_label.setStyleSheet("padding: 5px; color: #2c3e50;")
+        layout.addWidget(self.heatmap_label)
+    
+    def mostrar_mapa_calor(self):
+        """Pinta la cuadrícula 7x24; en modo comparación muestra la diferencia contra el otro periodo"""
+        if self.analisis_actual is None:
+            return
+        indice_valor = self.combo_mapa_valor.currentIndex()  # 0 = conteos, 1 = importes
+        valores = self.analisis_actual["mapa_calor"][indice_valor]
+        
+        comparando = self.check_comparar.isChecked()
+        if comparando:
+            desde = self.comp_from.date().toString("yyyy-MM-dd")
+            hasta = self.comp_to.date().toString("yyyy-MM-dd 23:59:59")
+            try:
+                referencia = self.analitica.mapa_calor(desde, hasta)[indice_valor]
+            except Exception as e:
+                print(f"❌ Error cargando periodo de comparación: {e}")
+                QMessageBox.warning(self, "Error", f"No se pudo cargar el periodo de comparación: {str(e)}")
+                return
+            valores = valores - referencia
+        
+        maximo = float(abs(valores).max()) or 1.0
+        for dia in range(7):
+            for hora in range(24):
+                valor = float(valores[dia, hora])
+                if indice_valor == 0:
+                    texto = f"{valor:+.0f}" if comparando else f"{valor:.0f}"
+                else:
+                    texto = f"{valor:+,.0f}" if comparando else f"{valor:,.0f}"
+                item = QTableWidgetItem(texto if valor else "")
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                
+                intensidad = int(255 * abs(valor) / maximo)
+                if comparando and valor < 0:
+                    item.setBackground(QColor(231, 76, 60, intensidad))
+                elif comparando:
+                    item.setBackground(QColor(46, 204, 113, intensidad))
+                else:
+                    item.setBackground(QColor(52, 152, 219, intensidad))
+                self.heatmap_table.setItem(dia, hora, item)
+        
+        if comparando:
+            self.heatmap_label.setText("🟩 Más que el periodo de comparación   🟥 Menos que el periodo de comparación")
+        else:
+            self.heatmap_label.setText("Ventas completadas por día de la semana y hora (sin filtros de método/usuario)")
+    
+    def setup_abc_tab(self, layout):
+        self.abc_label = QLabel("")
+        self.abc_label.setStyleSheet("font-size: 12px; padding: 5px;")
+        layout.addWidget(self.abc_label)
+        
+        self.modelo_abc = ABCTableModel(self)
+        self.abc_table = QTableView()
+        self.abc_table.setModel(self.modelo_abc)
+        self.abc_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.abc_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
+        layout.addWidget(self.abc_table)
+        
+        btn_exportar_abc = QPushButton("📄 Exportar CSV")
+        btn_exportar_abc.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold;")
+        btn_exportar_abc.setFixedHeight(30)
+        btn_exportar_abc.clicked.connect(self.exportar_abc)
+        layout.addWidget(btn_exportar_abc)
+    
+    def rango_actual(self):
+        return (self.date_from.date().toString("yyyy-MM-dd"),
+                self.date_to.date().toString("yyyy-MM-dd 23:59:59"))
+    
+    def cargar_abc(self):
+        """Clasificación ABC del rango (memorizada por periodo en el motor de análisis)"""
+        try:
+            abc = self.analitica.abc(*self.rango_actual())
+        except Exception as e:
+            print(f"❌ Error calculando clasificación ABC: {e}")
+            self.abc_label.setText(f"❌ Error calculando clasificación ABC: {e}")
+            return None
+        
+        self.modelo_abc.establecer_analisis(abc)
+        self.abc_pendiente = False
+        
+        partes = []
+        for clase, (productos, ingreso, margen) in abc.resumen_clases().items():
+            porcentaje = ingreso / abc.total_ingreso * 100 if abc.total_ingreso else 0
+            partes.append(f"<b>{clase}</b>: {productos} productos · {formato_moneda_mx(ingreso)} "
+                          f"({porcentaje:.1f}%) · margen {formato_moneda_mx(margen)}")
+        self.abc_label.setText(
+            f"💰 Ingreso: {formato_moneda_mx(abc.total_ingreso)} &nbsp; "
+            f"📈 Margen: {formato_moneda_mx(abc.total_margen)}<br>" + " &nbsp;|&nbsp; ".join(partes)
+        )
+        return abc
+    
+    def exportar_abc(self):
+        abc = self.cargar_abc()
+        if abc is None:
+            return
+        if not len(abc):
+            QMessageBox.information(self, "Sin datos", "No hay productos vendidos en el período seleccionado.")
+            return
+        
+        reports_dir = ensure_directory_exists(os.path.join(get_app_directory(), "Reportes"))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ruta = os.path.join(reports_dir, f"abc_{abc.fecha_desde}_{abc.fecha_hasta[:10]}_{timestamp}.csv")
+        try:
+            exportar_abc_csv(abc, ruta)
+            print(f"✅ Clasificación ABC exportada: {ruta}")
+            QMessageBox.information(self, "✅ Éxito",
+                f"Clasificación ABC exportada correctamente\n\nArchivo: {os.path.basename(ruta)}")
+        except Exception as e:
+            print(f"❌ Error exportando clasificación ABC: {e}")
+            QMessageBox.critical(self, "❌ Error", f"No se pudo exportar el CSV: {str(e)}")
+    
     def cargar_ventas(self):
         fecha_desde = self.date_from.date().toString("yyyy-MM-dd")
         fecha_hasta = self.date_to.date().toString("yyyy-MM-dd 23:59:59")
         metodo = self.combo_metodo.currentText()
         usuario_info = self.combo_usuario.currentData()
         
-        query = """
-            SELECT v.id, v.fecha, v.total, v.iva, v.metodo_pago, u.nombre,
-                   (SELECT COUNT(*) FROM detalle_ventas dv WHERE dv.venta_id = v.id) as num_productos
-            FROM ventas v 
-            JOIN usuarios u ON v.usuario_id = u.id 
-            WHERE v.fecha BETWEEN ? AND ?
-        """
-        params = [fecha_desde, fecha_hasta]
-        
-        if metodo != "Todos":
-            query += " AND v.metodo_pago = ?"
-            params.append(metodo)
-        
-        if usuario_info:
-            query += " AND v.usuario_id = ?"
-            params.append(usuario_info)
-        
-        query += " ORDER BY v.fecha DESC"
-        
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            ventas = cursor.fetchall()
-            
-            self.sales_table.setRowCount(len(ventas))
-            for row, (id_, fecha, total, iva, metodo_pago, usuario, num_productos) in enumerate(ventas):
-                self.sales_table.setItem(row, 0, QTableWidgetItem(str(id_)))
-                self.sales_table.setItem(row, 1, QTableWidgetItem(fecha))
-
-                self.sales_table.setItem(row, 2, QTableWidgetItem(formato_moneda_mx(total)))
-                self.sales_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(iva)))
-
-                self.sales_table.setItem(row, 4, QTableWidgetItem(metodo_pago))
-                self.sales_table.setItem(row, 5, QTableWidgetItem(usuario))
-                self.sales_table.setItem(row, 6, QTableWidgetItem(str(num_productos)))
-            
-            # Calcular resumen
-            cursor.execute("SELECT SUM(total), SUM(iva), COUNT(*) FROM ventas WHERE fecha BETWEEN ? AND ?", 
-                          (fecha_desde, fecha_hasta))
-            total_ventas, total_iva, num_ventas = cursor.fetchone()
-            total_ventas = total_ventas or 0
-            total_iva = total_iva or 0
-            num_ventas = num_ventas or 0
-            
-            # Por método de pago
-            cursor.execute("""
-                SELECT metodo_pago, SUM(total), COUNT(*) 
-                FROM ventas 
-                WHERE fecha BETWEEN ? AND ?
-                GROUP BY metodo_pago
-            """, (fecha_desde, fecha_hasta))
-            
-            metodos_text = ""
-            for metodo, total, count in cursor.fetchall():
-                metodos_text += f"{metodo}: {formato_moneda_mx(total)} ({count} ventas)\n"
-            
-            self.summary_label.setText(
-                f"📊 PERIODO: {fecha_desde} a {fecha_hasta.split()[0]}\n"
-                f"💰 TOTAL VENTAS: {formato_moneda_mx(total_ventas)}\n"
-                f"📈 TOTAL IVA: {formato_moneda_mx(total_iva)}\n"
-                f"🛒 N° VENTAS: {num_ventas}\n"
-                f"💳 MÉTODOS DE PAGO:\n{metodos_text}"
-            )
-            
-            self.generar_graficos(fecha_desde, fecha_hasta)
-            self.cargar_productos_vendidos(fecha_desde, fecha_hasta)
-            self.generar_graficos(fecha_desde, fecha_hasta)
+        # ✅ UNA SOLA LECTURA DEL PERIODO; TODO LO DEMÁS SE DERIVA EN MEMORIA (Y SE MEMORIZA)
+        try:
+            analisis = self.analitica.analizar(fecha_desde, fecha_hasta)
+        except Exception as e:
+            print(f"❌ Error analizando ventas: {e}")
+            QMessageBox.critical(self, "Error", f"No se pudieron cargar las ventas: {str(e)}")
+            return
+        
+        self.modelo_ventas.establecer_filtros(fecha_desde, fecha_hasta, metodo, usuario_info)
+        
+        # Calcular resumen
+        resumen = analisis["resumen"]
+        metodos_text = ""
+        for metodo, total, count in analisis["metodos"]:
+            metodos_text += f"{metodo}: {formato_moneda_mx(total)} ({count} ventas)\n"
+        
+        self.summary_label.setText(
+            f"📊 PERIODO: {fecha_desde} a {fecha_hasta.split()[0]}\n"
+            f"💰 TOTAL VENTAS: {formato_moneda_mx(resumen['total'])}\n"
+            f"📈 TOTAL IVA: {formato_moneda_mx(resumen['iva'])}\n"
+            f"🛒 N° VENTAS: {resumen['num_ventas']}\n"
+            f"💳 MÉTODOS DE PAGO:\n{metodos_text}"
+        )
+        
+        self.cargar_productos_vendidos(analisis)
+        self.generar_graficos(analisis)
+        self.mostrar_mapa_calor()
+        
+        self.abc_pendiente = True
+        if self.tabs.currentIndex() == self.indice_abc:
+            self.cargar_abc()
+    
+    def generar_graficos(self, analisis):
+        """Muestra las gráficas; si la pestaña no está visible se dibujan al abrirla"""
+        self.analisis_actual = analisis
+        self.graficos_pendientes = True
+        if self.tabs.currentIndex() == self.indice_analisis:
+            self.dibujar_graficos()
+    
+    def al_cambiar_pestana(self, indice):
+        if indice == self.indice_analisis and self.graficos_pendientes:
+            self.dibujar_graficos()
+        elif indice == self.indice_abc and self.abc_pendiente:
+            self.cargar_abc()
     
-    def generar_graficos(self, fecha_desde, fecha_hasta):
-        """Genera gráficas - VERSIÓN DEFINITIVA CORREGIDA"""
+    def dibujar_graficos(self):
+        """Obtiene las imágenes (caché o render Agg) y las coloca en las etiquetas"""
+        if self.analisis_actual is None:
+            return
         try:
-            print(f"📊 Generando gráficas para {fecha_desde} a {fecha_hasta}")
+            if self.renderizador is None:
+                print("📊 Cargando matplotlib para gráficas...")
+                from graficos_ventas import RenderizadorGraficos
+                self.renderizador = RenderizadorGraficos()
             
-            # GRÁFICO 1: Ventas por día
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT DATE(v.fecha), COALESCE(SUM(v.total), 0), COUNT(*)
-                    FROM ventas v
-                    WHERE v.fecha BETWEEN ? AND ? AND v.estado = 'completada'
-                    GROUP BY DATE(v.fecha)
-                    ORDER BY DATE(v.fecha)
-                """, (fecha_desde, fecha_hasta))
-                
-                datos = cursor.fetchall()
-                fechas = [d[0] for d in datos]
-                totales = [d[1] for d in datos]
-        
-            # CONFIGURACIÓN ROBUSTA GRÁFICO 1
-            self.figure1.clear()
-            self.figure1.set_size_inches(6, 4)
-            self.figure1.subplots_adjust(left=0.15, right=0.95, top=0.90, bottom=0.25)
-            
-            ax1 = self.figure1.add_subplot(111)
-            
-            if datos and any(totales):
-                # Simplificar fechas para mejor visualización
-                fechas_simplificadas = []
-                for fecha in fechas:
-                    if isinstance(fecha, str) and len(fecha) > 10:
-                        fechas_simplificadas.append(fecha[5:10])  # MM-DD
-                    else:
-                        fechas_simplificadas.append(str(fecha))
-                
-                # Crear gráfico de barras
-                bars = ax1.bar(range(len(fechas)), totales, color='#3498db', alpha=0.7, width=0.6)
-                ax1.set_title('Ventas por Día', fontsize=12, fontweight='bold', pad=15)
-                ax1.set_xlabel('Fecha', fontsize=10, labelpad=10)
-                ax1.set_ylabel('Total Ventas ($)', fontsize=10, labelpad=10)
-                
-                # Configurar eje X
-                ax1.set_xticks(range(len(fechas)))
-                ax1.set_xticklabels(fechas_simplificadas, rotation=45, ha='right', fontsize=8)
-                
-                # Ajustar límites
-                max_val = max(totales) if totales else 1
-                ax1.set_ylim(0, max_val * 1.15)
-                ax1.grid(True, alpha=0.2, axis='y')
-                
-                # Agregar valores en las barras
-                for i, bar in enumerate(bars):
-                    height = bar.get_height()
-                    if height > 0:
-                        ax1.text(bar.get_x() + bar.get_width()/2., height + max_val*0.01,
-                                formato_moneda_mx(height).replace('$', ''), 
-                                ha='center', va='bottom', fontsize=8)
-            else:
-                # ✅ MENSAJE MEJORADO cuando no hay datos
-                ax1.text(0.5, 0.5, 'No hay ventas registradas\npara el período seleccionado', 
-                        ha='center', va='center', transform=ax1.transAxes, fontsize=12,
-                        style='italic', color='gray')
-                ax1.set_title('Ventas por Día', fontsize=12, fontweight='bold')
-                ax1.set_xticks([])
-                ax1.set_yticks([])
-            
-            # ACTUALIZAR CANVAS 1
-            self.canvas1.draw()
-            
-            # GRÁFICO 2: Métodos de pago
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT metodo_pago, COALESCE(SUM(total), 0), COUNT(*)
-                    FROM ventas 
-                    WHERE fecha BETWEEN ? AND ? AND estado = 'completada'
-                    GROUP BY metodo_pago
-                """, (fecha_desde, fecha_hasta))
-                
-                metodos_data = cursor.fetchall()
-        
-            # CONFIGURACIÓN ROBUSTA GRÁFICO 2
-            self.figure2.clear()
-            self.figure2.set_size_inches(6, 4)
-            self.figure2.subplots_adjust(left=0.05, right=0.85, top=0.90, bottom=0.1)
-            
-            ax2 = self.figure2.add_subplot(111)
-            
-            if metodos_data and any(d[1] > 0 for d in metodos_data):
-                metodos = [d[0] for d in metodos_data]
-                totals = [d[1] for d in metodos_data]
-                colors = ['#e74c3c', '#3498db', '#2ecc71', '#f39c12']
-                
-                # Gráfico de pastel
-                wedges, texts, autotexts = ax2.pie(
-                    totals, 
-                    labels=metodos, 
-                    autopct=lambda p: f'{p:.1f}%' if p > 0 else '',
-                    colors=colors[:len(totals)],
-                    startangle=90,
-                    textprops={'fontsize': 9}
-                )
-                
-                for autotext in autotexts:
-                    autotext.set_color('white')
-                    autotext.set_fontweight('bold')
-                    autotext.set_fontsize(9)
-                
-                ax2.axis('equal')
-                ax2.set_title('Métodos de Pago', fontsize=12, fontweight='bold', pad=15)
-                
-            else:
-                # MENSAJE MEJORADO cuando no hay datos
-                ax2.text(0.5, 0.5, 'No hay ventas registradas\npara el período seleccionado', 
-                        ha='center', va='center', transform=ax2.transAxes, fontsize=12,
-                        style='italic', color='gray')
-                ax2.set_title('Métodos de Pago', fontsize=12, fontweight='bold')
+            analisis = self.analisis_actual
+            png_dias, png_metodos = self.renderizador.renderizar(
+                analisis["clave"], analisis["serie_diaria"], analisis["metodos_completadas"]
+            )
             
-            # ACTUALIZAR CANVAS 2
-            self.canvas2.draw()
+            for etiqueta, png in ((self.grafico_dias, png_dias), (self.grafico_metodos, png_metodos)):
+                pixmap = QPixmap()
+                pixmap.loadFromData(png, "PNG")
+                etiqueta.setStyleSheet("")
+                etiqueta.setPixmap(pixmap)
             
+            self.graficos_pendientes = False
             print("✅ Gráficas generadas exitosamente")
             
         except Exception as e:
             print(f"❌ Error generando gráficos: {e}")
-            # MOSTRAR ERROR EN LAS GRÁFICAS
             self.mostrar_error_graficas(str(e))
 
     def mostrar_error_graficas(self, mensaje_error):
         """Muestra mensaje de error en las gráficas"""
-        try:
-            self.figure1.clear()
-            ax1 = self.figure1.add_subplot(111)
-            ax1.text(0.5, 0.5, f'Error cargando gráficas:\n{mensaje_error}', 
-                    ha='center', va='center', transform=ax1.transAxes, fontsize=10,
-                    color='red')
-            self.canvas1.draw()
-            
-            self.figure2.clear()
-            ax2 = self.figure2.add_subplot(111)
-            ax2.text(0.5, 0.5, f'Error cargando gráficas:\n{mensaje_error}', 
-                    ha='center', va='center', transform=ax2.transAxes, fontsize=10,
-                    color='red')
-            self.canvas2.draw()
-        except:
-            pass
-
-    def mostrarEvent(self, event):
-        """Se ejecuta cuando la pestaña se muestra"""
-        super().showEvent(event)
-        # FORZAR REDIBUJADO CUANDO SE MUESTRA LA PESTAÑA
-        if hasattr(self, 'canvas1') and hasattr(self, 'canvas2'):
-            self.canvas1.update()
-            self.canvas2.update()
-            QTimer.singleShot(100, self.actualizar_graficos)
-
-    def actualizar_graficos(self):
-        """Forzar actualización de gráficos"""
-        if hasattr(self, 'canvas1'):
-            self.canvas1.draw()
-        if hasattr(self, 'canvas2'):
-            self.canvas2.draw()
+        for etiqueta in (self.grafico_dias, self.grafico_metodos):
+            etiqueta.setPixmap(QPixmap())
+            etiqueta.setStyleSheet("color: red;")
+            etiqueta.setText(f"Error cargando gráficas:\n{mensaje_error}")
     
-    def cargar_productos_vendidos(self, fecha_desde, fecha_hasta):
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.nombre, c.nombre, SUM(dv.cantidad), SUM(dv.subtotal), MAX(v.fecha),
-                       (SELECT SUM(dv2.cantidad) FROM detalle_ventas dv2 
-                        JOIN ventas v2 ON dv2.venta_id = v2.id 
-                        WHERE dv2.producto_id = p.id AND v2.fecha BETWEEN ? AND DATE(?, '-7 days'))
-                FROM detalle_ventas dv
-                JOIN productos p ON dv.producto_id = p.id
-                JOIN categorias c ON p.categoria_id = c.id
-                JOIN ventas v ON dv.venta_id = v.id
-                WHERE v.fecha BETWEEN ? AND ?
-                GROUP BY p.id
-                ORDER BY SUM(dv.subtotal) DESC
-            """, (fecha_desde, fecha_hasta, fecha_desde, fecha_hasta))
-            
-            productos = cursor.fetchall()
-            
-            self.products_table.setRowCount(len(productos))
-            for row, (nombre, categoria, cantidad, total, ultima_venta, venta_anterior) in enumerate(productos):
-                self.products_table.setItem(row, 0, QTableWidgetItem(nombre))
-                self.products_table.setItem(row, 1, QTableWidgetItem(categoria))
-                self.products_table.setItem(row, 2, QTableWidgetItem(str(int(cantidad))))
+    def cargar_productos_vendidos(self, analisis):
+        productos = analisis["productos"]
+        
+        self.products_table.setRowCount(len(productos))
+        for row, (nombre, categoria, cantidad, total, ultima_venta,
+                  tendencia, promedio_4s, lugar, cambio_lugar) in enumerate(productos):
+            self.products_table.setItem(row, 0, QTableWidgetItem(nombre))
+            self.products_table.setItem(row, 1, QTableWidgetItem(categoria))
+            self.products_table.setItem(row, 2, QTableWidgetItem(str(int(cantidad))))
 
-                self.products_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(total)))
-                self.products_table.setItem(row, 4, QTableWidgetItem(ultima_venta.split()[0]))
-                
-                # Calcular tendencia
-                if venta_anterior and cantidad:
-                    tendencia = (cantidad - venta_anterior) / venta_anterior * 100
-                    tendencia_text = f"{tendencia:+.1f}%"
-                    self.products_table.setItem(row, 5, QTableWidgetItem(tendencia_text))
-                else:
-                    self.products_table.setItem(row, 5, QTableWidgetItem("N/A"))
-    
-    def mostrar_detalle_venta(self, index):
-        venta_id = self.sales_table.item(index.row(), 0).text()
-        
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT p.nombre, dv.cantidad, dv.precio_unitario, dv.subtotal
-                FROM detalle_ventas dv
-                JOIN productos p ON dv.producto_id = p.id
-                WHERE dv.venta_id = ?
-            """, (venta_id,))
+            self.products_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(total)))
+            self.products_table.setItem(row, 4, QTableWidgetItem(ultima_venta))
             
-            detalle = cursor.fetchall()
+            # Tendencia semanal (resumen productos_semanales, semana que contiene "hasta")
+            if tendencia is not None:
+                self.products_table.setItem(row, 5, QTableWidgetItem(f"{tendencia:+.1f}%"))
+            else:
+                self.products_table.setItem(row, 5, QTableWidgetItem("N/A"))
             
-            detalle_text = f"Detalle de Venta #{venta_id}:\n\n"
-            for nombre, cantidad, precio, subtotal in detalle:
-                detalle_text += f"{nombre} x{cantidad} - {formato_moneda_mx(precio)} = {formato_moneda_mx(subtotal)}\n"
+            self.products_table.setItem(row, 6, QTableWidgetItem(f"{promedio_4s:.1f}"))
             
-            QMessageBox.information(self, "Detalle de Venta", detalle_text)
+            if lugar is None:
+                texto_lugar = "N/A"
+            elif cambio_lugar is None:
+                texto_lugar = f"#{lugar} (nuevo)"
+            elif cambio_lugar > 0:
+                texto_lugar = f"#{lugar} ▲{cambio_lugar}"
+            elif cambio_lugar < 0:
+                texto_lugar = f"#{lugar} ▼{-cambio_lugar}"
+            else:
+                texto_lugar = f"#{lugar} ="
+            self.products_table.setItem(row, 7, QTableWidgetItem(texto_lugar))
+    
+    def mostrar_detalle_venta(self, index, anterior=None):
+        venta_id = self.modelo_ventas.venta_id(index.row()) if index.isValid() else None
+        if venta_id is None:
+            self.detalle_titulo.setText("Seleccione una venta")
+            self.detalle_table.setRowCount(0)
+            self.detalle_total.setText("")
+            return
+        
+        try:
+            detalle = self.detalles.obtener(venta_id)
+        except Exception as e:
+            print(f"❌ Error cargando detalle de venta: {e}")
+            self.detalle_titulo.setText(f"Venta #{venta_id}: error al cargar el detalle")
+            return
+        
+        self.detalle_titulo.setText(f"Venta #{venta_id}")
+        self.detalle_table.setRowCount(len(detalle))
+        total = 0
+        for row, (nombre, cantidad, precio, subtotal) in enumerate(detalle):
+            self.detalle_table.setItem(row, 0, QTableWidgetItem(nombre))
+            self.detalle_table.setItem(row, 1, QTableWidgetItem(str(cantidad)))
+            self.detalle_table.setItem(row, 2, QTableWidgetItem(formato_moneda_mx(precio)))
+            self.detalle_table.setItem(row, 3, QTableWidgetItem(formato_moneda_mx(subtotal)))
+            total += subtotal
+        self.detalle_total.setText(f"Total: {formato_moneda_mx(total)}")
     
     # Exportar reporte
     def exportar_reporte(self):
@@ -512,6 +608,7 @@ class SalesHistoryDialog(QDialog):
             'hasta': self.date_to.date().toString("yyyy-MM-dd")
         }
         
-        # SOLO PDF
-        dialog = ExportDialog(self.db_manager, 'ventas', date_range, self)
-        dialog.exec()
\ No newline at end of file
+        # PDF, CSV o JSON Lines
+        # ✅ NO MODAL: LOS REPORTES SE GENERAN EN SEGUNDO PLANO
+        self.export_dialog = ExportDialog(self.db_manager, 'ventas', date_range, self)
+        self.export_dialog.show()
\ No newline at end of file
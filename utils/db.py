@@ -0,0 +1,11 @@
+import os
+import sqlite3
+from urllib.request import pathname2url
+
+NOMBRE_DB_POR_DEFECTO = "caja_registradora.db"
+
+
+def conectar_solo_lectura(ruta):
+    """Conexión URI mode=ro: no crea el archivo ni toma bloqueos de escritura"""
+    uri = f"file:{pathname2url(os.path.abspath(ruta))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=10)
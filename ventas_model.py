@@ -0,0 +1,301 @@
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from utils.helpers import formato_moneda_mx
+from archivo_historico import hay_archivos_en_rango, conectar_historico
+
+
+class VentasTableModel(QAbstractTableModel):
+    """Modelo de ventas paginado por llave (orden, id): carga páginas al hacer scroll
+    y conserva solo las más recientes en memoria"""
+
+    # (encabezado, expresión SQL, ordenable)
+    COLUMNAS = [
+        ("ID", "v.id", True),
+        ("Fecha", "v.fecha", True),
+        ("Total", "v.total", True),
+        ("IVA", "v.iva", True),
+        ("Método", "v.metodo_pago", True),
+        ("Usuario", "u.nombre", True),
+        ("Productos", "(SELECT COUNT(*) FROM detalle_ventas dv WHERE dv.venta_id = v.id)", False),
+    ]
+    COLUMNAS_MONEDA = (2, 3)
+
+    def __init__(self, db_manager, mostrar_productos=True, encabezados=None,
+                 tamano_pagina=200, max_paginas=20, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.columnas = self.COLUMNAS if mostrar_productos else self.COLUMNAS[:6]
+        self.encabezados = encabezados or [c[0] for c in self.columnas]
+        self.tamano_pagina = tamano_pagina
+        self.max_paginas = max_paginas
+        self._filtros = None          # (desde, hasta, metodo, usuario_id)
+        self._columna_orden = 1       # Fecha
+        self._descendente = True
+        self._conexion_historica = None  # Solo si el rango toca años archivados
+        self._reiniciar_paginas()
+
+    def _reiniciar_paginas(self):
+        self._filas_cargadas = 0
+        self._fin = self._filtros is None
+        self._limites = []              # Llave (orden, id) de la última fila de cada página
+        self._inicios = []              # Llave (orden, id) de la primera fila de cada página
+        self._paginas = OrderedDict()   # Caché LRU: número de página -> filas
+
+    # ===== FILTROS Y ORDEN (SE APLICAN EN SQL) =====
+    def establecer_filtros(self, fecha_desde, fecha_hasta, metodo=None, usuario_id=None):
+        """Reinicia el modelo con nuevos filtros y carga la primera página"""
+        self.beginResetModel()
+        self._filtros = (fecha_desde, fecha_hasta, metodo, usuario_id)
+        self._abrir_conexion(fecha_desde, fecha_hasta)
+        self._reiniciar_paginas()
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def cerrar(self):
+        """Cierra la conexión histórica (con los archivos adjuntos); llamarlo al cerrar el diálogo"""
+        if self._conexion_historica is not None:
+            self._conexion_historica.close()
+            self._conexion_historica = None
+
+    def _abrir_conexion(self, fecha_desde, fecha_hasta):
+        self.cerrar()
+        if hay_archivos_en_rango(self.db_manager.db_name, fecha_desde, fecha_hasta):
+            self._conexion_historica = conectar_historico(self.db_manager.db_name, fecha_desde, fecha_hasta)
+
+    def conexion(self):
+        """Conexión para leer el rango filtrado (la compartida o la que adjunta los años archivados)"""
+        if self._conexion_historica is not None:
+            return self._conexion_historica
+        return self.db_manager.get_connection()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0 or column >= len(self.columnas) or not self.columnas[column][2]:
+            return
+        self._columna_orden = column
+        self._descendente = order == Qt.SortOrder.DescendingOrder
+        if self._filtros is not None:
+            self.establecer_filtros(*self._filtros)
+
+    def _leer_pagina(self, despues_de, incluir=False):
+        """Lee una página a partir de la llave dada (None = desde el inicio);
+        con incluir=True la fila de esa llave es la primera de la página"""
+        fecha_desde, fecha_hasta, metodo, usuario_id = self._filtros
+        expr_orden = self.columnas[self._columna_orden][1]
+        direccion = "DESC" if self._descendente else "ASC"
+        comparador = ("<" if self._descendente else ">") + ("=" if incluir else "")
+
+        condiciones = ["v.fecha BETWEEN ? AND ?"]
+        params = [fecha_desde, fecha_hasta]
+        if metodo and metodo != "Todos":
+            condiciones.append("v.metodo_pago = ?")
+            params.append(metodo)
+        if usuario_id:
+            condiciones.append("v.usuario_id = ?")
+            params.append(usuario_id)
+        if despues_de is not None:
+            condiciones.append(f"({expr_orden}, v.id) {comparador} (?, ?)")
+            params.extend(despues_de)
+
+        columnas_sql = ", ".join(c[1] for c in self.columnas)
+        cursor = self.conexion().cursor()
+        cursor.execute(f"""
+            SELECT {columnas_sql}, {expr_orden}
+            FROM ventas v
+            JOIN usuarios u ON v.usuario_id = u.id
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY {expr_orden} {direccion}, v.id {direccion}
+            LIMIT ?
+        """, params + [self.tamano_pagina])
+        return cursor.fetchmany(self.tamano_pagina)
+
+    @staticmethod
+    def _llave(fila):
+        return (fila[-1], fila[0])
+
+    def _guardar_pagina(self, numero, filas):
+        self._paginas[numero] = filas
+        self._paginas.move_to_end(numero)
+        while len(self._paginas) > self.max_paginas:
+            self._paginas.popitem(last=False)
+
+    def _pagina(self, numero):
+        filas = self._paginas.get(numero)
+        if filas is not None:
+            self._paginas.move_to_end(numero)
+            return filas
+        # ✅ PÁGINA DESCARTADA DE LA CACHÉ: SE VUELVE A LEER DESDE SU PRIMERA FILA, NO DESDE
+        # EL INICIO (LAS VENTAS NUEVAS NO DEBEN RECORRER LA PÁGINA 0 YA MOSTRADA)
+        filas = self._leer_pagina(self._inicios[numero], incluir=True)
+        self._guardar_pagina(numero, filas)
+        return filas
+
+    def _fila(self, row):
+        filas = self._pagina(row // self.tamano_pagina)
+        indice = row % self.tamano_pagina
+        return filas[indice] if indice < len(filas) else None
+
+    # ===== CARGA PEREZOSA =====
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._fin
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._fin:
+            return
+        try:
+            filas = self._leer_pagina(self._limites[-1] if self._limites else None)
+        except Exception as e:
+            print(f"❌ Error cargando ventas: {e}")
+            self._fin = True
+            return
+
+        if len(filas) < self.tamano_pagina:
+            self._fin = True
+        if not filas:
+            return
+
+        inicio = self._filas_cargadas
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(filas) - 1)
+        self._guardar_pagina(len(self._limites), filas)
+        self._inicios.append(self._llave(filas[0]))
+        self._limites.append(self._llave(filas[-1]))
+        self._filas_cargadas += len(filas)
+        self.endInsertRows()
+
+    # ===== INTERFAZ DEL MODELO =====
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._filas_cargadas
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        fila = self._fila(index.row())
+        if fila is None:
+            return None
+        valor = fila[index.column()]
+        if index.column() in self.COLUMNAS_MONEDA:
+            return formato_moneda_mx(valor)
+        return str(valor)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.encabezados[section]
+        return None
+
+    def venta_id(self, row):
+        """ID de la venta en la fila dada"""
+        fila = self._fila(row)
+        return fila[0] if fila else None
+
+
+class DetalleVentasCache:
+    """Renglones de detalle por venta: se precargan por lotes (una consulta IN)
+    y se conservan las ventas usadas más recientemente"""
+
+    MAX_PARAMETROS = 500  # Por debajo del límite de variables de SQLite
+
+    def __init__(self, db_manager, max_ventas=1000, conexion=None):
+        self.db_manager = db_manager
+        self.conexion = conexion or db_manager.get_connection  # p. ej. VentasTableModel.conexion
+        self.max_ventas = max_ventas
+        self._detalles = OrderedDict()  # venta_id -> [(nombre, cantidad, precio, subtotal)]
+
+    def precargar(self, venta_ids):
+        """Lee en una sola consulta el detalle de las ventas que aún no están en caché"""
+        faltantes = [v for v in dict.fromkeys(venta_ids) if v is not None and v not in self._detalles]
+        for inicio in range(0, len(faltantes), self.MAX_PARAMETROS):
+            lote = faltantes[inicio:inicio + self.MAX_PARAMETROS]
+            marcadores = ", ".join("?" for _ in lote)
+            cursor = self.conexion().cursor()
+            cursor.execute(f"""
+                SELECT dv.venta_id, p.nombre, dv.cantidad, dv.precio_unitario, dv.subtotal
+                FROM detalle_ventas dv
+                JOIN productos p ON dv.producto_id = p.id
+                WHERE dv.venta_id IN ({marcadores})
+                ORDER BY dv.venta_id, dv.id
+            """, lote)
+
+            detalles = {venta_id: [] for venta_id in lote}
+            for venta_id, *renglon in cursor.fetchall():
+                detalles[venta_id].append(tuple(renglon))
+            for venta_id, renglones in detalles.items():
+                self._guardar(venta_id, renglones)
+
+    def obtener(self, venta_id):
+        """Detalle de una venta (de la caché, o con una consulta si no se precargó)"""
+        renglones = self._detalles.get(venta_id)
+        if renglones is None:
+            self.precargar([venta_id])
+            renglones = self._detalles.get(venta_id, [])
+        else:
+            self._detalles.move_to_end(venta_id)
+        return renglones
+
+    def _guardar(self, venta_id, renglones):
+        self._detalles[venta_id] = renglones
+        self._detalles.move_to_end(venta_id)
+        while len(self._detalles) > self.max_ventas:
+            self._detalles.popitem(last=False)
+
+
+class ABCTableModel(QAbstractTableModel):
+    """Muestra un AnalisisABC leyendo directamente de sus columnas NumPy
+    (solo se formatean las celdas visibles)"""
+
+    # (encabezado, atributo, formato)
+    COLUMNAS = [
+        ("Clase", "clase", "texto"),
+        ("Producto", "nombre", "texto"),
+        ("Categoría", "categoria", "texto"),
+        ("Vendidos", "cantidad", "numero"),
+        ("Ingreso", "ingreso", "moneda"),
+        ("% Ingreso", "participacion", "porcentaje"),
+        ("% Acumulado", "acumulado", "porcentaje"),
+        ("Margen", "margen", "moneda"),
+        ("% Margen", "margen_pct", "porcentaje"),
+        ("% Contribución", "contribucion", "porcentaje"),
+    ]
+    COLORES_CLASE = {"A": QColor("#d5f5e3"), "B": QColor("#fcf3cf"), "C": QColor("#fadbd8")}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.abc = None
+
+    def establecer_analisis(self, abc):
+        self.beginResetModel()
+        self.abc = abc
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.abc is None else len(self.abc)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.abc is None:
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self.COLORES_CLASE.get(self.abc.clase[row])
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        _, atributo, formato = self.COLUMNAS[index.column()]
+        valor = getattr(self.abc, atributo)[row]
+        if formato == "moneda":
+            return formato_moneda_mx(valor)
+        if formato == "porcentaje":
+            return f"{valor * 100:.1f}%"
+        if formato == "numero":
+            return f"{valor:g}"
+        return str(valor)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNAS[section][0]
+        return None